@@ -0,0 +1,56 @@
+"""工地每日指标汇总表 - 报表预聚合
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17
+
+新增表:
+- daily_site_metrics - 按 工地 + 日期 预聚合的培训/授权/进出计数
+  由写入路径增量维护，夜间任务按明细表重算纠偏
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'daily_site_metrics',
+        sa.Column('id', postgresql.UUID(as_uuid=True), primary_key=True, server_default=sa.text('gen_random_uuid()')),
+        sa.Column('site_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('site.site_id', ondelete='CASCADE'), nullable=False),
+        sa.Column('metric_date', sa.Date, nullable=False),
+        sa.Column('worker_count', sa.Integer, server_default='0'),
+        sa.Column('not_started_count', sa.Integer, server_default='0'),
+        sa.Column('in_learning_count', sa.Integer, server_default='0'),
+        sa.Column('completed_count', sa.Integer, server_default='0'),
+        sa.Column('failed_count', sa.Integer, server_default='0'),
+        sa.Column('videos_required', sa.Integer, server_default='0'),
+        sa.Column('videos_completed', sa.Integer, server_default='0'),
+        sa.Column('training_session_count', sa.Integer, server_default='0'),
+        sa.Column('training_seconds', sa.Float, server_default='0'),
+        sa.Column('grant_count', sa.Integer, server_default='0'),
+        sa.Column('grant_pending_count', sa.Integer, server_default='0'),
+        sa.Column('grant_synced_count', sa.Integer, server_default='0'),
+        sa.Column('grant_failed_count', sa.Integer, server_default='0'),
+        sa.Column('grant_revoked_count', sa.Integer, server_default='0'),
+        sa.Column('sync_seconds', sa.Float, server_default='0'),
+        sa.Column('sync_attempts', sa.Integer, server_default='0'),
+        sa.Column('max_sync_attempts', sa.Integer, server_default='0'),
+        sa.Column('pass_event_count', sa.Integer, server_default='0'),
+        sa.Column('deny_event_count', sa.Integer, server_default='0'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), onupdate=sa.func.now()),
+        sa.UniqueConstraint('site_id', 'metric_date', name='uq_site_metrics_site_date'),
+    )
+    op.create_index('idx_site_metrics_date', 'daily_site_metrics', ['metric_date'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_site_metrics_date', table_name='daily_site_metrics')
+    op.drop_table('daily_site_metrics')
@@ -0,0 +1,49 @@
+"""异步导出任务表
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17
+
+新增表:
+- export_job - 报表/作业票异步导出任务（状态、进度、结果文件位置）
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'export_job',
+        sa.Column('job_id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('created_by', postgresql.UUID(as_uuid=True), sa.ForeignKey('sys_user.user_id', ondelete='SET NULL'), nullable=True),
+        sa.Column('export_type', sa.String(32), nullable=False),
+        sa.Column('file_format', sa.String(8), nullable=False, server_default='xlsx'),
+        sa.Column('params', postgresql.JSONB, nullable=True),
+        sa.Column('tenant_scope', postgresql.JSONB, nullable=True),
+        sa.Column('status', sa.String(16), nullable=False, server_default='PENDING'),
+        sa.Column('rows_written', sa.Integer, server_default='0'),
+        sa.Column('error_msg', sa.Text, nullable=True),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('file_name', sa.String(255), nullable=True),
+        sa.Column('storage_backend', sa.String(16), nullable=True),
+        sa.Column('storage_key', sa.String(512), nullable=True),
+        sa.Column('file_size', sa.Integer, nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), onupdate=sa.func.now()),
+    )
+    op.create_index('idx_export_job_creator', 'export_job', ['created_by', 'created_at'])
+    op.create_index('idx_export_job_status', 'export_job', ['status'])
+
+
+def downgrade() -> None:
+    op.drop_index('idx_export_job_status', table_name='export_job')
+    op.drop_index('idx_export_job_creator', table_name='export_job')
+    op.drop_table('export_job')
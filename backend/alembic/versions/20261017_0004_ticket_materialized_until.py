@@ -0,0 +1,40 @@
+"""作业票日票滚动物化
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17
+
+新增列:
+- work_ticket.materialized_until - 日票已生成至该日期（存量作业票按已有日票回填）
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'work_ticket',
+        sa.Column('materialized_until', sa.Date, nullable=True, comment='日票已生成至该日期')
+    )
+    op.execute(
+        """
+        UPDATE work_ticket wt
+        SET materialized_until = dt.max_date
+        FROM (
+            SELECT ticket_id, MAX(date) AS max_date
+            FROM daily_ticket
+            GROUP BY ticket_id
+        ) dt
+        WHERE wt.ticket_id = dt.ticket_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('work_ticket', 'materialized_until')
@@ -0,0 +1,28 @@
+"""授权推送租约
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17
+
+新增列:
+- access_grant.sync_lease_until - 推送租约到期时间（SKIP LOCKED 领取后写入）
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        'access_grant',
+        sa.Column('sync_lease_until', sa.DateTime(timezone=True), nullable=True, comment='推送租约到期时间')
+    )
+
+
+def downgrade() -> None:
+    op.drop_column('access_grant', 'sync_lease_until')
@@ -0,0 +1,49 @@
+"""门禁权限对账差异表
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17
+
+新增表:
+- access_reconcile_diff - 二级对账差异明细（按对账批次追加写入，记录自动修复动作）
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers
+revision = '0006'
+down_revision = '0005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'access_reconcile_diff',
+        sa.Column('diff_id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('run_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('site_id', postgresql.UUID(as_uuid=True), sa.ForeignKey('site.site_id', ondelete='CASCADE'), nullable=False),
+        sa.Column('diff_type', sa.String(20), nullable=False),
+        sa.Column('worker_id', sa.String(64), nullable=False),
+        sa.Column('area_id', sa.String(64), nullable=False),
+        sa.Column('vendor_ref', sa.String(128), nullable=True),
+        sa.Column('grant_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('repair_action', sa.String(16), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index('idx_reconcile_diff_run_site', 'access_reconcile_diff', ['run_id', 'site_id'])
+    op.create_index('idx_reconcile_diff_site_time', 'access_reconcile_diff', ['site_id', 'created_at'])
+    # 对账按 (worker_id, area_id, vendor_ref) 有序流式读取已同步授权
+    op.create_index(
+        'idx_grant_reconcile_order', 'access_grant',
+        ['site_id', 'worker_id', 'area_id'],
+        postgresql_where=sa.text("status = 'SYNCED'")
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_grant_reconcile_order', table_name='access_grant')
+    op.drop_index('idx_reconcile_diff_site_time', table_name='access_reconcile_diff')
+    op.drop_index('idx_reconcile_diff_run_site', table_name='access_reconcile_diff')
+    op.drop_table('access_reconcile_diff')
@@ -0,0 +1,126 @@
+"""进出记录按月分区
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17
+
+变更:
+- access_event 重建为按 event_time 的月范围分区表（access_event_pYYYYMM + access_event_default）
+- 分区表的主键/唯一约束必须包含分区键：
+  主键改为 (event_id, event_time)，门禁事件ID去重改为 (vendor_event_id, event_time)；
+  (device_id, worker_id, event_time, direction) 去重约束已含分区键，保持不变
+- 补齐模型中已有、初始迁移缺失的 updated_at 列及 idx_event_result / idx_event_reason 索引
+- 为已有数据所在月份至未来3个月建分区，之后由 manage_partitions 任务每日预建
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+COLUMNS = (
+    "event_id, vendor_event_id, device_id, device_name, worker_id, area_id, site_id, "
+    "event_time, direction, result, reason_code, reason_message, face_photo_url, "
+    "face_id, confidence, created_at"
+)
+
+
+def _create_columns_table(name: str, **kwargs) -> None:
+    op.create_table(
+        name,
+        sa.Column('event_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('vendor_event_id', sa.String(128), nullable=True),
+        sa.Column('device_id', sa.String(64), nullable=False),
+        sa.Column('device_name', sa.String(128), nullable=True),
+        sa.Column('worker_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('area_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('site_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('event_time', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('direction', sa.String(10), nullable=True),
+        sa.Column('result', sa.String(20), nullable=False),
+        sa.Column('reason_code', sa.String(50), nullable=True),
+        sa.Column('reason_message', sa.String(255), nullable=True),
+        sa.Column('face_photo_url', sa.String(512), nullable=True),
+        sa.Column('face_id', sa.String(128), nullable=True),
+        sa.Column('confidence', sa.Float, nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        **kwargs
+    )
+
+
+def _create_constraints(vendor_unique_columns: list, primary_key_columns: list) -> None:
+    op.create_primary_key('access_event_pkey', 'access_event', primary_key_columns)
+    op.create_unique_constraint('uq_event_vendor_event_id', 'access_event', vendor_unique_columns)
+    op.create_unique_constraint(
+        'uq_event_device_worker_time_direction', 'access_event',
+        ['device_id', 'worker_id', 'event_time', 'direction']
+    )
+    op.create_foreign_key(
+        'fk_access_event_worker', 'access_event', 'worker',
+        ['worker_id'], ['worker_id'], ondelete='SET NULL'
+    )
+    op.create_foreign_key(
+        'fk_access_event_area', 'access_event', 'work_area',
+        ['area_id'], ['area_id'], ondelete='SET NULL'
+    )
+    op.create_foreign_key(
+        'fk_access_event_site', 'access_event', 'site',
+        ['site_id'], ['site_id'], ondelete='CASCADE'
+    )
+    op.create_index('idx_event_site_time', 'access_event', ['site_id', 'event_time'])
+    op.create_index('idx_event_worker_time', 'access_event', ['worker_id', 'event_time'])
+    op.create_index('idx_event_result', 'access_event', ['result', 'event_time'])
+    op.create_index('idx_event_reason', 'access_event', ['reason_code'])
+
+
+def upgrade() -> None:
+    # 1. 新建分区主表（约束与索引在数据迁移后创建）
+    _create_columns_table('access_event_partitioned', postgresql_partition_by='RANGE (event_time)')
+
+    # 2. 按月建分区：已有数据最早月份 ~ 未来3个月，另建默认分区兜底
+    op.execute("""
+        DO $$
+        DECLARE
+            m date;
+            end_month date := (date_trunc('month', now()) + interval '4 months')::date;
+        BEGIN
+            SELECT date_trunc('month', coalesce(min(event_time), now()))::date INTO m FROM access_event;
+            WHILE m < end_month LOOP
+                EXECUTE format(
+                    'CREATE TABLE %I PARTITION OF access_event_partitioned FOR VALUES FROM (%L) TO (%L)',
+                    'access_event_p' || to_char(m, 'YYYYMM'), m, (m + interval '1 month')::date
+                );
+                m := (m + interval '1 month')::date;
+            END LOOP;
+        END $$;
+    """)
+    op.execute("CREATE TABLE access_event_default PARTITION OF access_event_partitioned DEFAULT")
+
+    # 3. 迁移数据（旧表无 updated_at，取 created_at）
+    op.execute(
+        f"INSERT INTO access_event_partitioned ({COLUMNS}, updated_at) "
+        f"SELECT {COLUMNS}, created_at FROM access_event"
+    )
+
+    # 4. 替换旧表，创建约束与索引（自动建到各分区）
+    op.drop_table('access_event')
+    op.rename_table('access_event_partitioned', 'access_event')
+    _create_constraints(['vendor_event_id', 'event_time'], ['event_id', 'event_time'])
+
+
+def downgrade() -> None:
+    _create_columns_table('access_event_plain')
+    op.execute(
+        f"INSERT INTO access_event_plain ({COLUMNS}, updated_at) "
+        f"SELECT {COLUMNS}, updated_at FROM access_event"
+    )
+    # 分区表删除时各分区一并删除（已分离的分区为独立表，不受影响）
+    op.drop_table('access_event')
+    op.rename_table('access_event_plain', 'access_event')
+    _create_constraints(['vendor_event_id'], ['event_id'])
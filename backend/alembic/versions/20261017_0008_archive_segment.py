@@ -0,0 +1,47 @@
+"""冷数据归档清单表
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17
+
+新增表:
+- archive_segment - 进出记录/审计日志归档文件清单（时间范围、行数、存储位置、校验和）
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers
+revision = '0008'
+down_revision = '0007'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'archive_segment',
+        sa.Column('segment_id', postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column('table_name', sa.String(64), nullable=False),
+        sa.Column('source_table', sa.String(64), nullable=False),
+        sa.Column('range_start', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('range_end', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('row_count', sa.Integer, nullable=False, server_default='0'),
+        sa.Column('file_format', sa.String(16), nullable=False),
+        sa.Column('storage_backend', sa.String(16), nullable=False),
+        sa.Column('storage_key', sa.String(512), nullable=False),
+        sa.Column('file_size', sa.BigInteger, nullable=False, server_default='0'),
+        sa.Column('checksum', sa.String(64), nullable=False),
+        sa.Column('status', sa.String(16), nullable=False, server_default='EXPORTED'),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.create_index(
+        'idx_archive_segment_range', 'archive_segment',
+        ['table_name', 'range_start', 'range_end']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('idx_archive_segment_range', table_name='archive_segment')
+    op.drop_table('archive_segment')
@@ -0,0 +1,39 @@
+"""游标分页索引
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17
+
+变更:
+- audit_log: (created_at, log_id) 替换 idx_audit_created
+- access_event: 新增 (event_time, event_id)（分区表上创建，自动建到各分区）
+- alert: 新增 (created_at, alert_id)；alert 表由应用启动时建表，未建表时跳过
+"""
+from alembic import op
+
+# revision identifiers
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index('idx_audit_created_id', 'audit_log', ['created_at', 'log_id'])
+    op.drop_index('idx_audit_created', table_name='audit_log')
+    op.create_index('idx_event_time_id', 'access_event', ['event_time', 'event_id'])
+    op.execute("""
+        DO $$
+        BEGIN
+            IF to_regclass('alert') IS NOT NULL THEN
+                CREATE INDEX IF NOT EXISTS idx_alert_created_id ON alert (created_at, alert_id);
+            END IF;
+        END $$;
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS idx_alert_created_id")
+    op.drop_index('idx_event_time_id', table_name='access_event')
+    op.create_index('idx_audit_created', 'audit_log', ['created_at'])
+    op.drop_index('idx_audit_created_id', table_name='audit_log')
@@ -1,21 +1,49 @@
 """
 门禁系统适配器 (Mock实现)
 - 推送授权 (P1-1: 幂等)
+- 批量推送授权（按工地/门禁组分组分片，门禁不支持时逐条推送）
+- 熔断与自适应并发（状态经 Redis 在 worker 间共享）
 - 撤销授权
-- 查询有效权限 (P0-6: 对账)
+- 查询有效权限 (P0-6: 对账，支持有序分页拉取)
 """
 import uuid
 from datetime import datetime
-from typing import Optional, List, Any
+from typing import Optional, List, Any, Dict, AsyncIterator, Tuple
 import logging
 import asyncio
 import random
 
 from app.core.config import settings
+from app.adapters.http_client import get_http_client, throttle
+from app.adapters.circuit_breaker import CircuitBreaker
 
 logger = logging.getLogger(__name__)
 
 
+def effective_grant_key(grant: dict) -> Tuple[str, str, str]:
+    """
+    有效权限的比对键 (worker_id, area_id, vendor_ref)
+    
+    UUID 统一为小写标准格式：其字符串顺序与 PostgreSQL uuid 列的排序一致
+    """
+    def _normalize(value) -> str:
+        try:
+            return str(uuid.UUID(str(value)))
+        except (ValueError, TypeError):
+            return str(value)
+    
+    return (
+        _normalize(grant["worker_id"]),
+        _normalize(grant["area_id"]),
+        grant.get("vendor_ref") or ""
+    )
+
+
+def circuit_open_result() -> dict:
+    """熔断期内未发出的请求结果（调用方应保持授权状态不变，不计入同步次数）"""
+    return {"success": False, "error": "Circuit open", "circuit_open": True}
+
+
 class AccessControlAdapter:
     """
     门禁系统适配器
@@ -36,6 +64,32 @@ class AccessControlAdapter:
         self.is_mock = not bool(self.api_url)
         self.supports_time_window = settings.ACCESS_CONTROL_SUPPORTS_TIME_WINDOW
         self.supports_query = settings.ACCESS_CONTROL_SUPPORTS_QUERY
+        self.supports_batch = settings.ACCESS_CONTROL_SUPPORTS_BATCH
+        self.batch_size = settings.ACCESS_CONTROL_BATCH_SIZE
+        self.breaker = CircuitBreaker("access_control")
+    
+    async def _record_outcome(self, status_code: Optional[int]) -> None:
+        """记录请求结果：网络异常、5xx、429 计为门禁故障，其余视为门禁正常"""
+        if status_code is None or status_code >= 500 or status_code == 429:
+            await self.breaker.record_failure()
+        else:
+            await self.breaker.record_success()
+    
+    def _build_grant_payload(self, grant: Any) -> dict:
+        """构造单条授权的推送内容（P1-1: grant_id 作为幂等键）"""
+        return {
+            "idempotency_key": str(grant.grant_id),
+            "worker": {
+                "external_id": str(grant.worker_id),
+                "face_id": grant.worker.face_id if hasattr(grant, 'worker') else None,
+            },
+            "area": {
+                "access_group_id": grant.area.access_group_id if hasattr(grant, 'area') else None,
+            },
+            "valid_from": grant.valid_from.isoformat(),
+            "valid_to": grant.valid_to.isoformat(),
+            "action": "GRANT"
+        }
     
     async def push_grant(self, grant: Any) -> dict:
         """
@@ -51,62 +105,166 @@ class AccessControlAdapter:
             return await self._mock_push_grant(grant)
         
         # 真实实现
-        import httpx
-        
         # P1-1: 使用 grant_id 作为幂等键
         idempotency_key = str(grant.grant_id)
         
-        payload = {
-            "idempotency_key": idempotency_key,
-            "worker": {
-                "external_id": str(grant.worker_id),
-                "face_id": grant.worker.face_id if hasattr(grant, 'worker') else None,
-            },
-            "area": {
-                "access_group_id": grant.area.access_group_id if hasattr(grant, 'area') else None,
-            },
-            "valid_from": grant.valid_from.isoformat(),
-            "valid_to": grant.valid_to.isoformat(),
-            "action": "GRANT"
-        }
+        payload = self._build_grant_payload(grant)
+        
+        if not await self.breaker.allow_request():
+            return circuit_open_result()
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.api_url}/grants",
-                    json=payload,
-                    headers={
-                        "Authorization": f"Bearer {self.api_key}",
-                        "Idempotency-Key": idempotency_key
-                    }
-                )
+            await throttle("access_control")
+            client = get_http_client("access_control")
+            response = await client.post(
+                f"{self.api_url}/grants",
+                json=payload,
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Idempotency-Key": idempotency_key
+                }
+            )
+            await self._record_outcome(response.status_code)
+            
+            if response.status_code == 200:
+                data = response.json()
+                return {
+                    "success": True,
+                    "vendor_ref": data.get("grant_ref")
+                }
+            elif response.status_code == 409:
+                # 幂等：已存在，视为成功
+                logger.info(f"Grant already exists (idempotent): {idempotency_key}")
+                return {
+                    "success": True,
+                    "vendor_ref": idempotency_key
+                }
+            else:
+                return {
+                    "success": False,
+                    "error": f"HTTP {response.status_code}: {response.text}"
+                }
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    return {
-                        "success": True,
-                        "vendor_ref": data.get("grant_ref")
-                    }
-                elif response.status_code == 409:
-                    # 幂等：已存在，视为成功
-                    logger.info(f"Grant already exists (idempotent): {idempotency_key}")
-                    return {
-                        "success": True,
-                        "vendor_ref": idempotency_key
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "error": f"HTTP {response.status_code}: {response.text}"
-                    }
-                    
         except Exception as e:
             logger.error(f"Failed to push grant: {e}")
+            await self._record_outcome(None)
             return {
                 "success": False,
                 "error": str(e)
             }
     
+    async def push_grants_batch(self, grants: List[Any]) -> Dict[str, dict]:
+        """
+        批量推送授权到门禁系统
+        
+        按 工地 + 门禁组 分组，每组按 batch_size 分片，每片一次请求；
+        门禁不支持批量接口时逐条推送；在途请求数由熔断器的 AIMD 并发数限制
+        （上限 ACCESS_PUSH_CONCURRENCY），熔断期内直接返回未推送
+        
+        Args:
+            grants: AccessGrant对象列表（需预加载 worker/area）
+        
+        Returns:
+            Dict[str, dict]: grant_id → {"success": bool, "vendor_ref": str, "error": str}
+        """
+        if not grants:
+            return {}
+        
+        if not self.is_mock and await self.breaker.is_open():
+            return {str(g.grant_id): circuit_open_result() for g in grants}
+        
+        # 同时在途的门禁请求数上限
+        concurrency = settings.ACCESS_PUSH_CONCURRENCY if self.is_mock else await self.breaker.get_concurrency()
+        semaphore = asyncio.Semaphore(concurrency)
+        
+        if not self.is_mock and not self.supports_batch:
+            async def _push(grant):
+                async with semaphore:
+                    return await self.push_grant(grant)
+            
+            results = await asyncio.gather(*[_push(g) for g in grants])
+            return {str(g.grant_id): r for g, r in zip(grants, results)}
+        
+        # 按 工地 + 门禁组 分组
+        groups: Dict[tuple, List[Any]] = {}
+        for grant in grants:
+            access_group_id = grant.area.access_group_id if hasattr(grant, 'area') and grant.area else None
+            groups.setdefault((grant.site_id, access_group_id), []).append(grant)
+        
+        chunks = [
+            (site_id, access_group_id, members[i:i + self.batch_size])
+            for (site_id, access_group_id), members in groups.items()
+            for i in range(0, len(members), self.batch_size)
+        ]
+        
+        push_chunk = self._mock_push_grants_chunk if self.is_mock else self._push_grants_chunk
+        
+        async def _push_chunk(site_id, access_group_id, chunk):
+            async with semaphore:
+                return await push_chunk(site_id, access_group_id, chunk)
+        
+        chunk_results = await asyncio.gather(*[
+            _push_chunk(site_id, access_group_id, chunk)
+            for site_id, access_group_id, chunk in chunks
+        ])
+        
+        results: Dict[str, dict] = {}
+        for chunk_result in chunk_results:
+            results.update(chunk_result)
+        return results
+    
+    async def _push_grants_chunk(
+        self,
+        site_id: uuid.UUID,
+        access_group_id: Optional[str],
+        grants: List[Any]
+    ) -> Dict[str, dict]:
+        """调用门禁批量授权接口推送一片授权"""
+        keys = [str(g.grant_id) for g in grants]
+        payload = {
+            "site_id": str(site_id),
+            "access_group_id": access_group_id,
+            "grants": [self._build_grant_payload(g) for g in grants]
+        }
+        
+        if not await self.breaker.allow_request():
+            return {key: circuit_open_result() for key in keys}
+        
+        try:
+            await throttle("access_control")
+            client = get_http_client("access_control")
+            response = await client.post(
+                f"{self.api_url}/grants/batch",
+                json=payload,
+                headers={"Authorization": f"Bearer {self.api_key}"}
+            )
+            await self._record_outcome(response.status_code)
+            
+            if response.status_code != 200:
+                error = f"HTTP {response.status_code}: {response.text}"
+                return {key: {"success": False, "error": error} for key in keys}
+            
+            items = {
+                item.get("idempotency_key"): item
+                for item in response.json().get("results", [])
+            }
+        except Exception as e:
+            logger.error(f"Failed to push grants batch: {e}")
+            await self._record_outcome(None)
+            return {key: {"success": False, "error": str(e)} for key in keys}
+        
+        results = {}
+        for key in keys:
+            item = items.get(key)
+            if item is None:
+                results[key] = {"success": False, "error": "Missing in batch response"}
+            elif item.get("success") or item.get("status") == 409:
+                # 幂等：已存在视为成功
+                results[key] = {"success": True, "vendor_ref": item.get("grant_ref") or key}
+            else:
+                results[key] = {"success": False, "error": item.get("error")}
+        return results
+    
     async def revoke_grant(self, grant: Any) -> dict:
         """
         撤销授权
@@ -120,27 +278,46 @@ class AccessControlAdapter:
         if self.is_mock:
             return await self._mock_revoke_grant(grant)
         
+        return await self.revoke_by_ref(grant.vendor_ref)
+    
+    async def revoke_by_ref(self, vendor_ref: str) -> dict:
+        """
+        按门禁侧授权ID撤销（对账修复：门禁侧多出、本系统无对应授权）
+        
+        Args:
+            vendor_ref: 门禁系统返回的授权ID
+        
+        Returns:
+            dict: {"success": bool, "error": str}
+        """
+        if self.is_mock:
+            return await self._mock_revoke_by_ref(vendor_ref)
+        
         # 真实实现
-        import httpx
+        if not await self.breaker.allow_request():
+            return circuit_open_result()
         
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.delete(
-                    f"{self.api_url}/grants/{grant.vendor_ref}",
-                    headers={"Authorization": f"Bearer {self.api_key}"}
-                )
+            await throttle("access_control")
+            client = get_http_client("access_control")
+            response = await client.delete(
+                f"{self.api_url}/grants/{vendor_ref}",
+                headers={"Authorization": f"Bearer {self.api_key}"}
+            )
+            await self._record_outcome(response.status_code)
+            
+            if response.status_code in [200, 204, 404]:
+                # 404也视为成功（幂等：已不存在）
+                return {"success": True}
+            else:
+                return {
+                    "success": False,
+                    "error": f"HTTP {response.status_code}: {response.text}"
+                }
                 
-                if response.status_code in [200, 204, 404]:
-                    # 404也视为成功（幂等：已不存在）
-                    return {"success": True}
-                else:
-                    return {
-                        "success": False,
-                        "error": f"HTTP {response.status_code}: {response.text}"
-                    }
-                    
         except Exception as e:
             logger.error(f"Failed to revoke grant: {e}")
+            await self._record_outcome(None)
             return {
                 "success": False,
                 "error": str(e)
@@ -164,26 +341,92 @@ class AccessControlAdapter:
             return await self._mock_query_effective_grants(site_id)
         
         # 真实实现
-        import httpx
-        
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(
-                    f"{self.api_url}/grants/effective",
-                    params={"site_id": str(site_id)},
-                    headers={"Authorization": f"Bearer {self.api_key}"}
-                )
+            await throttle("access_control")
+            client = get_http_client("access_control")
+            response = await client.get(
+                f"{self.api_url}/grants/effective",
+                params={"site_id": str(site_id)},
+                headers={"Authorization": f"Bearer {self.api_key}"}
+            )
+            
+            if response.status_code == 200:
+                return response.json().get("grants", [])
+            else:
+                logger.error(f"Failed to query grants: HTTP {response.status_code}")
+                return []
                 
-                if response.status_code == 200:
-                    return response.json().get("grants", [])
-                else:
-                    logger.error(f"Failed to query grants: HTTP {response.status_code}")
-                    return []
-                    
         except Exception as e:
             logger.error(f"Failed to query grants: {e}")
             return []
     
+    async def iter_effective_grants(
+        self,
+        site_id: uuid.UUID,
+        page_size: Optional[int] = None
+    ) -> AsyncIterator[List[dict]]:
+        """
+        分页拉取有效权限，按 (worker_id, area_id, vendor_ref) 升序 (P0-6: 流式对账)
+        
+        门禁接口返回 next_cursor 时逐页请求；未返回 next_cursor（不支持分页）时
+        视为全量列表，在本地排序后一次返回。请求失败时抛出异常，
+        避免不完整的数据被当作门禁侧缺失
+        
+        Args:
+            site_id: 工地ID
+            page_size: 每页数量（默认 ACCESS_RECONCILE_PAGE_SIZE）
+        
+        Yields:
+            List[dict]: [{"worker_id": str, "area_id": str, "vendor_ref": str}, ...]
+        """
+        if not self.supports_query:
+            logger.warning("Access control system does not support query grants")
+            return
+        
+        page_size = page_size or settings.ACCESS_RECONCILE_PAGE_SIZE
+        
+        if self.is_mock:
+            grants = sorted(
+                await self._mock_query_effective_grants(site_id),
+                key=effective_grant_key
+            )
+            for i in range(0, len(grants), page_size):
+                yield grants[i:i + page_size]
+            return
+        
+        cursor = None
+        while True:
+            params = {
+                "site_id": str(site_id),
+                "order": "worker_id,area_id,vendor_ref",
+                "limit": page_size,
+            }
+            if cursor:
+                params["cursor"] = cursor
+            
+            await throttle("access_control")
+            client = get_http_client("access_control")
+            response = await client.get(
+                f"{self.api_url}/grants/effective",
+                params=params,
+                headers={"Authorization": f"Bearer {self.api_key}"}
+            )
+            if response.status_code != 200:
+                raise RuntimeError(f"Failed to query grants: HTTP {response.status_code}")
+            
+            data = response.json()
+            grants = data.get("grants", [])
+            if "next_cursor" not in data:
+                # 不支持分页：全量返回，本地排序
+                yield sorted(grants, key=effective_grant_key)
+                return
+            
+            if grants:
+                yield grants
+            cursor = data.get("next_cursor")
+            if not cursor:
+                return
+    
     # Mock实现方法
     async def _mock_push_grant(self, grant: Any) -> dict:
         """Mock推送授权"""
@@ -223,6 +466,41 @@ class AccessControlAdapter:
             "vendor_ref": self._mock_grants[grant_key]["vendor_ref"]
         }
     
+    async def _mock_push_grants_chunk(
+        self,
+        site_id: uuid.UUID,
+        access_group_id: Optional[str],
+        grants: List[Any]
+    ) -> Dict[str, dict]:
+        """Mock批量推送授权（一次请求的延迟）"""
+        await asyncio.sleep(random.uniform(0.1, 0.5))
+        
+        results = {}
+        for grant in grants:
+            grant_key = str(grant.grant_id)
+            if random.random() < 0.05:
+                results[grant_key] = {"success": False, "error": "Mock simulated failure"}
+                continue
+            
+            self._mock_grants[grant_key] = {
+                "grant_id": grant_key,
+                "worker_id": str(grant.worker_id),
+                "area_id": str(grant.area_id),
+                "valid_from": grant.valid_from.isoformat(),
+                "valid_to": grant.valid_to.isoformat(),
+                "vendor_ref": f"mock_ref_{grant_key[:8]}"
+            }
+            results[grant_key] = {
+                "success": True,
+                "vendor_ref": self._mock_grants[grant_key]["vendor_ref"]
+            }
+        
+        logger.info(
+            f"Mock: Grants batch pushed: site={site_id}, "
+            f"access_group={access_group_id}, count={len(grants)}"
+        )
+        return results
+    
     async def _mock_revoke_grant(self, grant: Any) -> dict:
         """Mock撤销授权"""
         await asyncio.sleep(random.uniform(0.1, 0.3))
@@ -236,6 +514,17 @@ class AccessControlAdapter:
         
         return {"success": True}
     
+    async def _mock_revoke_by_ref(self, vendor_ref: str) -> dict:
+        """Mock按门禁侧授权ID撤销"""
+        await asyncio.sleep(random.uniform(0.1, 0.3))
+        
+        for grant_key, grant_data in list(self._mock_grants.items()):
+            if grant_data["vendor_ref"] == vendor_ref:
+                del self._mock_grants[grant_key]
+                logger.info(f"Mock: Grant revoked by ref: {vendor_ref}")
+        
+        return {"success": True}
+    
     async def _mock_query_effective_grants(self, site_id: uuid.UUID) -> List[dict]:
         """Mock查询有效权限"""
         await asyncio.sleep(random.uniform(0.1, 0.3))
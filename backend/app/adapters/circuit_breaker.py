@@ -0,0 +1,183 @@
+"""
+第三方接口熔断器
+- 状态保存在 Redis，所有 worker 共享：CLOSED → OPEN → HALF_OPEN → CLOSED
+- 连续失败达到阈值后熔断，熔断期内请求直接拒绝，不占用 worker
+- 冷却期后只放行一个探测请求（半开），成功则恢复，失败则继续熔断
+- AIMD 并发控制：成功时并发数 +1，失败时按比例下调
+- Redis 不可用时放行全部请求（不熔断）
+"""
+import time
+from typing import Optional
+import logging
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+STATE_CLOSED = "CLOSED"
+STATE_OPEN = "OPEN"
+STATE_HALF_OPEN = "HALF_OPEN"
+
+
+class CircuitBreaker:
+    """
+    熔断器（状态跨进程共享）
+
+    Redis 结构:
+    - circuit:{name}        Hash: state / failures / opened_at / concurrency
+    - circuit:{name}:probe  半开探测令牌（SET NX，同一时刻只有一个探测请求）
+    """
+
+    KEY_PREFIX = "circuit:"
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: Optional[int] = None,
+        recovery_timeout: Optional[int] = None,
+        min_concurrency: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        decrease_factor: Optional[float] = None
+    ):
+        self.name = name
+        self.key = f"{self.KEY_PREFIX}{name}"
+        self.probe_key = f"{self.key}:probe"
+        self.failure_threshold = failure_threshold or settings.CIRCUIT_FAILURE_THRESHOLD
+        self.recovery_timeout = recovery_timeout or settings.CIRCUIT_RECOVERY_TIMEOUT
+        self.min_concurrency = min_concurrency or settings.CIRCUIT_MIN_CONCURRENCY
+        self.max_concurrency = max_concurrency or settings.ACCESS_PUSH_CONCURRENCY
+        self.decrease_factor = decrease_factor or settings.CIRCUIT_DECREASE_FACTOR
+
+    async def _redis(self):
+        from app.utils.cache import get_redis_client
+        return await get_redis_client()
+
+    async def _load(self, r) -> dict:
+        data = await r.hgetall(self.key) or {}
+        return {
+            "state": data.get("state") or STATE_CLOSED,
+            "failures": int(data.get("failures") or 0),
+            "opened_at": float(data.get("opened_at") or 0),
+            "concurrency": int(data.get("concurrency") or self.max_concurrency),
+        }
+
+    async def allow_request(self) -> bool:
+        """
+        是否放行请求
+
+        OPEN 且冷却期已过时转为 HALF_OPEN，只有拿到探测令牌的请求放行
+        """
+        try:
+            r = await self._redis()
+            if r is None:
+                return True
+            data = await self._load(r)
+            if data["state"] == STATE_CLOSED:
+                return True
+            if data["state"] == STATE_OPEN and time.time() - data["opened_at"] < self.recovery_timeout:
+                return False
+
+            # 冷却期已过（或已半开）：争抢探测令牌
+            if await r.set(self.probe_key, "1", nx=True, ex=self.recovery_timeout):
+                await r.hset(self.key, "state", STATE_HALF_OPEN)
+                logger.info(f"Circuit half-open, probing: {self.name}")
+                return True
+            return False
+        except Exception as e:
+            logger.warning(f"Circuit breaker unavailable, allowing request: {self.name}, error={e}")
+            return True
+
+    async def is_open(self) -> bool:
+        """是否处于熔断期（不消耗探测令牌，用于任务入口快速跳过）"""
+        try:
+            r = await self._redis()
+            if r is None:
+                return False
+            data = await self._load(r)
+            if data["state"] == STATE_OPEN:
+                return time.time() - data["opened_at"] < self.recovery_timeout
+            if data["state"] == STATE_HALF_OPEN:
+                return bool(await r.exists(self.probe_key))
+            return False
+        except Exception:
+            return False
+
+    async def record_success(self) -> None:
+        """请求成功：清零失败计数，恢复 CLOSED，并发数加性增加"""
+        try:
+            r = await self._redis()
+            if r is None:
+                return
+            data = await self._load(r)
+            mapping = {
+                "failures": 0,
+                "concurrency": min(self.max_concurrency, data["concurrency"] + 1),
+            }
+            if data["state"] != STATE_CLOSED:
+                mapping["state"] = STATE_CLOSED
+                await r.delete(self.probe_key)
+                logger.info(f"Circuit closed: {self.name}")
+            await r.hset(self.key, mapping=mapping)
+        except Exception as e:
+            logger.warning(f"Failed to record circuit success: {self.name}, error={e}")
+
+    async def record_failure(self) -> None:
+        """请求失败：失败计数加一，并发数乘性减少；达到阈值或探测失败时熔断"""
+        try:
+            r = await self._redis()
+            if r is None:
+                return
+            data = await self._load(r)
+            failures = await r.hincrby(self.key, "failures", 1)
+            mapping = {
+                "concurrency": max(
+                    self.min_concurrency,
+                    int(data["concurrency"] * self.decrease_factor)
+                ),
+            }
+            if data["state"] == STATE_HALF_OPEN or (
+                data["state"] == STATE_CLOSED and failures >= self.failure_threshold
+            ):
+                mapping["state"] = STATE_OPEN
+                mapping["opened_at"] = time.time()
+                await r.delete(self.probe_key)
+                logger.warning(
+                    f"Circuit opened: {self.name}, failures={failures}, "
+                    f"retry after {self.recovery_timeout}s"
+                )
+            await r.hset(self.key, mapping=mapping)
+        except Exception as e:
+            logger.warning(f"Failed to record circuit failure: {self.name}, error={e}")
+
+    async def get_concurrency(self) -> int:
+        """当前允许的并发数（AIMD）"""
+        try:
+            r = await self._redis()
+            if r is None:
+                return self.max_concurrency
+            data = await self._load(r)
+            return max(self.min_concurrency, min(self.max_concurrency, data["concurrency"]))
+        except Exception:
+            return self.max_concurrency
+
+    async def get_state(self) -> dict:
+        """熔断器状态（健康检查用）"""
+        try:
+            r = await self._redis()
+            if r is None:
+                return {"state": "UNKNOWN", "error": "Redis unavailable"}
+            data = await self._load(r)
+            result = {
+                "state": data["state"],
+                "failures": data["failures"],
+                "concurrency": data["concurrency"],
+            }
+            if data["state"] != STATE_CLOSED:
+                result["opened_at"] = data["opened_at"]
+                result["retry_in_seconds"] = max(
+                    0, int(self.recovery_timeout - (time.time() - data["opened_at"]))
+                )
+            return result
+        except Exception as e:
+            return {"state": "UNKNOWN", "error": str(e)}
@@ -10,6 +10,7 @@ import asyncio
 import random
 
 from app.core.config import settings
+from app.adapters.http_client import get_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -57,35 +58,33 @@ class FaceVerifyAdapter:
             return await self._mock_verify_face(photo_base64, id_no, worker_id)
         
         # 真实实现
-        import httpx
-        
         try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.api_url}/verify",
-                    json={
-                        "photo": photo_base64,
-                        "id_no": id_no,
-                        "worker_id": str(worker_id) if worker_id else None
-                    },
-                    headers={"Authorization": f"Bearer {self.api_key}"}
-                )
+            client = get_http_client("face_verify")
+            response = await client.post(
+                f"{self.api_url}/verify",
+                json={
+                    "photo": photo_base64,
+                    "id_no": id_no,
+                    "worker_id": str(worker_id) if worker_id else None
+                },
+                headers={"Authorization": f"Bearer {self.api_key}"}
+            )
+            
+            if response.status_code == 200:
+                data = response.json()
+                return {
+                    "success": True,
+                    "passed": data.get("passed", False),
+                    "confidence": data.get("confidence", 0),
+                    "liveness_passed": data.get("liveness_passed", False)
+                }
+            else:
+                return {
+                    "success": False,
+                    "passed": False,
+                    "error": f"HTTP {response.status_code}: {response.text}"
+                }
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    return {
-                        "success": True,
-                        "passed": data.get("passed", False),
-                        "confidence": data.get("confidence", 0),
-                        "liveness_passed": data.get("liveness_passed", False)
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "passed": False,
-                        "error": f"HTTP {response.status_code}: {response.text}"
-                    }
-                    
         except Exception as e:
             logger.error(f"Face verify failed: {e}")
             return {
@@ -122,8 +121,6 @@ class FaceVerifyAdapter:
             return await self._mock_verify_liveness(action_type)
         
         # 真实实现
-        import httpx
-        
         try:
             payload = {"action_type": action_type}
             if photo_base64:
@@ -131,27 +128,27 @@ class FaceVerifyAdapter:
             if video_base64:
                 payload["video"] = video_base64
             
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.post(
-                    f"{self.api_url}/liveness",
-                    json=payload,
-                    headers={"Authorization": f"Bearer {self.api_key}"}
-                )
+            client = get_http_client("face_verify")
+            response = await client.post(
+                f"{self.api_url}/liveness",
+                json=payload,
+                headers={"Authorization": f"Bearer {self.api_key}"}
+            )
+            
+            if response.status_code == 200:
+                data = response.json()
+                return {
+                    "success": True,
+                    "passed": data.get("passed", False),
+                    "confidence": data.get("confidence", 0)
+                }
+            else:
+                return {
+                    "success": False,
+                    "passed": False,
+                    "error": f"HTTP {response.status_code}: {response.text}"
+                }
                 
-                if response.status_code == 200:
-                    data = response.json()
-                    return {
-                        "success": True,
-                        "passed": data.get("passed", False),
-                        "confidence": data.get("confidence", 0)
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "passed": False,
-                        "error": f"HTTP {response.status_code}: {response.text}"
-                    }
-                    
         except Exception as e:
             logger.error(f"Liveness verify failed: {e}")
             return {
@@ -0,0 +1,142 @@
+"""
+第三方接口 HTTP 客户端注册表
+- 每个第三方系统一个长连接池（keep-alive），避免每次请求重新握手
+- 启用 HTTP/2（依赖 httpx[http2]，未安装 h2 时退回 HTTP/1.1）
+- 按第三方系统限速（进程内令牌间隔）
+- 在 FastAPI lifespan / Celery worker 进程初始化时打开，退出时关闭
+"""
+import asyncio
+import time
+from typing import Dict, Optional
+import logging
+
+import httpx
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# 各第三方系统的请求超时（秒）
+VENDOR_TIMEOUTS: Dict[str, float] = {
+    "access_control": 30.0,
+    "face_verify": 30.0,
+    "wechat": 10.0,
+    "realname": 5.0,
+}
+
+try:
+    import h2  # type: ignore  # noqa: F401
+    HTTP2_AVAILABLE = True
+except Exception:  # pragma: no cover
+    HTTP2_AVAILABLE = False
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+_client_loops: Dict[str, Optional[asyncio.AbstractEventLoop]] = {}
+_rate_limiters: Dict[str, "RateLimiter"] = {}
+
+
+class RateLimiter:
+    """
+    进程内限速器：按 1/rate 的间隔依次分配请求时间片，
+    超出速率的请求等待到自己的时间片再发出
+    """
+    
+    def __init__(self, rate: float):
+        self.rate = rate
+        self._next_slot = 0.0
+    
+    async def acquire(self) -> None:
+        now = time.monotonic()
+        slot = max(now, self._next_slot)
+        self._next_slot = slot + 1.0 / self.rate
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+def _vendor_rate_limit(vendor: str) -> float:
+    """各第三方系统的每秒请求数上限（0 不限）"""
+    if vendor == "access_control":
+        return settings.ACCESS_CONTROL_RATE_LIMIT
+    return 0
+
+
+def _current_loop() -> Optional[asyncio.AbstractEventLoop]:
+    try:
+        return asyncio.get_running_loop()
+    except RuntimeError:
+        return None
+
+
+def _create_client(vendor: str) -> httpx.AsyncClient:
+    timeout = VENDOR_TIMEOUTS.get(vendor, 30.0)
+    return httpx.AsyncClient(
+        timeout=httpx.Timeout(timeout, connect=settings.ADAPTER_HTTP_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=settings.ADAPTER_HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=settings.ADAPTER_HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=settings.ADAPTER_HTTP_KEEPALIVE_EXPIRY,
+        ),
+        http2=settings.ADAPTER_HTTP2 and HTTP2_AVAILABLE,
+    )
+
+
+def get_http_client(vendor: str) -> httpx.AsyncClient:
+    """
+    获取第三方系统的共享客户端
+
+    未初始化、已关闭或事件循环已变化（连接池与事件循环绑定）时重新创建
+
+    Args:
+        vendor: access_control / face_verify / wechat / realname
+    """
+    client = _clients.get(vendor)
+    loop = _current_loop()
+    if client is None or client.is_closed or _client_loops.get(vendor) is not loop:
+        client = _create_client(vendor)
+        _clients[vendor] = client
+        _client_loops[vendor] = loop
+    return client
+
+
+def get_rate_limiter(vendor: str) -> Optional[RateLimiter]:
+    """获取第三方系统的限速器，未配置限速时返回 None"""
+    rate = _vendor_rate_limit(vendor)
+    if rate <= 0:
+        return None
+    limiter = _rate_limiters.get(vendor)
+    if limiter is None or limiter.rate != rate:
+        limiter = RateLimiter(rate)
+        _rate_limiters[vendor] = limiter
+    return limiter
+
+
+async def throttle(vendor: str) -> None:
+    """按第三方系统的限速等待（未配置限速时立即返回）"""
+    limiter = get_rate_limiter(vendor)
+    if limiter is not None:
+        await limiter.acquire()
+
+
+async def init_http_clients() -> None:
+    """打开全部第三方系统的连接池"""
+    for vendor in VENDOR_TIMEOUTS:
+        get_http_client(vendor)
+    logger.info(
+        f"Adapter HTTP clients initialized: vendors={list(VENDOR_TIMEOUTS)}, "
+        f"http2={settings.ADAPTER_HTTP2 and HTTP2_AVAILABLE}"
+    )
+
+
+async def close_http_clients() -> None:
+    """关闭全部连接池"""
+    clients = list(_clients.values())
+    _clients.clear()
+    _client_loops.clear()
+    for client in clients:
+        if not client.is_closed:
+            try:
+                await client.aclose()
+            except Exception as e:
+                logger.warning(f"Failed to close adapter HTTP client: {e}")
+    logger.info("Adapter HTTP clients closed")
@@ -10,6 +10,7 @@ import logging
 import random
 
 from app.core.config import settings
+from app.adapters.http_client import get_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -114,25 +115,23 @@ class RealnameAdapter:
             )
         
         # 真实实现
-        import httpx
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.api_url}/workers",
-                params={
-                    "keyword": keyword,
-                    "contractor_name": contractor_name,
-                    "page": page,
-                    "page_size": page_size
-                },
-                headers={"Authorization": f"Bearer {self.api_key}"}
-            )
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                logger.error(f"Realname API error: {response.status_code}")
-                raise Exception(f"Realname API error: {response.status_code}")
+        client = get_http_client("realname")
+        response = await client.get(
+            f"{self.api_url}/workers",
+            params={
+                "keyword": keyword,
+                "contractor_name": contractor_name,
+                "page": page,
+                "page_size": page_size
+            },
+            headers={"Authorization": f"Bearer {self.api_key}"}
+        )
+        
+        if response.status_code == 200:
+            return response.json()
+        else:
+            logger.error(f"Realname API error: {response.status_code}")
+            raise Exception(f"Realname API error: {response.status_code}")
     
     async def get_worker_by_id_no(self, id_no: str) -> Optional[RealnameWorker]:
         """
@@ -148,22 +147,20 @@ class RealnameAdapter:
             return await self._mock_get_worker_by_id_no(id_no)
         
         # 真实实现
-        import httpx
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                f"{self.api_url}/workers/{id_no}",
-                headers={"Authorization": f"Bearer {self.api_key}"}
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                return RealnameWorker(**data)
-            elif response.status_code == 404:
-                return None
-            else:
-                logger.error(f"Realname API error: {response.status_code}")
-                raise Exception(f"Realname API error: {response.status_code}")
+        client = get_http_client("realname")
+        response = await client.get(
+            f"{self.api_url}/workers/{id_no}",
+            headers={"Authorization": f"Bearer {self.api_key}"}
+        )
+        
+        if response.status_code == 200:
+            data = response.json()
+            return RealnameWorker(**data)
+        elif response.status_code == 404:
+            return None
+        else:
+            logger.error(f"Realname API error: {response.status_code}")
+            raise Exception(f"Realname API error: {response.status_code}")
     
     async def match_worker(
         self,
@@ -9,6 +9,7 @@ import logging
 import asyncio
 
 from app.core.config import settings
+from app.adapters.http_client import get_http_client
 
 logger = logging.getLogger(__name__)
 
@@ -46,35 +47,33 @@ class WechatAdapter:
         if self.is_mock:
             return await self._mock_code2session(code)
         
-        import httpx
-        
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(
-                    "https://api.weixin.qq.com/sns/jscode2session",
-                    params={
-                        "appid": self.appid,
-                        "secret": self.secret,
-                        "js_code": code,
-                        "grant_type": "authorization_code"
-                    }
-                )
-                
-                data = response.json()
-                
-                if "errcode" in data and data["errcode"] != 0:
-                    return {
-                        "success": False,
-                        "error": data.get("errmsg", "Unknown error")
-                    }
-                
+            client = get_http_client("wechat")
+            response = await client.get(
+                "https://api.weixin.qq.com/sns/jscode2session",
+                params={
+                    "appid": self.appid,
+                    "secret": self.secret,
+                    "js_code": code,
+                    "grant_type": "authorization_code"
+                }
+            )
+            
+            data = response.json()
+            
+            if "errcode" in data and data["errcode"] != 0:
                 return {
-                    "success": True,
-                    "openid": data.get("openid"),
-                    "unionid": data.get("unionid"),
-                    "session_key": data.get("session_key")
+                    "success": False,
+                    "error": data.get("errmsg", "Unknown error")
                 }
-                
+            
+            return {
+                "success": True,
+                "openid": data.get("openid"),
+                "unionid": data.get("unionid"),
+                "session_key": data.get("session_key")
+            }
+            
         except Exception as e:
             logger.error(f"code2session failed: {e}")
             return {
@@ -104,34 +103,32 @@ class WechatAdapter:
         if self.is_mock:
             return await self._mock_get_phone_number(code)
         
-        import httpx
-        
         try:
             # 获取 access_token
             access_token = await self._get_access_token()
             if not access_token:
                 return {"success": False, "error": "Failed to get access token"}
             
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.post(
-                    f"https://api.weixin.qq.com/wxa/business/getuserphonenumber?access_token={access_token}",
-                    json={"code": code}
-                )
-                
-                data = response.json()
-                
-                if data.get("errcode") != 0:
-                    return {
-                        "success": False,
-                        "error": data.get("errmsg", "Unknown error")
-                    }
-                
-                phone_info = data.get("phone_info", {})
+            client = get_http_client("wechat")
+            response = await client.post(
+                f"https://api.weixin.qq.com/wxa/business/getuserphonenumber?access_token={access_token}",
+                json={"code": code}
+            )
+            
+            data = response.json()
+            
+            if data.get("errcode") != 0:
                 return {
-                    "success": True,
-                    "phone": phone_info.get("purePhoneNumber")
+                    "success": False,
+                    "error": data.get("errmsg", "Unknown error")
                 }
-                
+            
+            phone_info = data.get("phone_info", {})
+            return {
+                "success": True,
+                "phone": phone_info.get("purePhoneNumber")
+            }
+            
         except Exception as e:
             logger.error(f"getPhoneNumber failed: {e}")
             return {
@@ -181,8 +178,6 @@ class WechatAdapter:
             openid = worker.wechat_openid
         
         # 发送消息
-        import httpx
-        
         try:
             access_token = await self._get_access_token()
             if not access_token:
@@ -192,29 +187,29 @@ class WechatAdapter:
             template_id = self._get_template_id(notification_type)
             template_data = self._format_template_data(notification_type, data)
             
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.post(
-                    f"https://api.weixin.qq.com/cgi-bin/message/subscribe/send?access_token={access_token}",
-                    json={
-                        "touser": openid,
-                        "template_id": template_id,
-                        "page": "pages/index/index",
-                        "data": template_data,
-                        "miniprogram_state": "formal",
-                        "lang": "zh_CN"
-                    }
-                )
-                
-                result = response.json()
+            client = get_http_client("wechat")
+            response = await client.post(
+                f"https://api.weixin.qq.com/cgi-bin/message/subscribe/send?access_token={access_token}",
+                json={
+                    "touser": openid,
+                    "template_id": template_id,
+                    "page": "pages/index/index",
+                    "data": template_data,
+                    "miniprogram_state": "formal",
+                    "lang": "zh_CN"
+                }
+            )
+            
+            result = response.json()
+            
+            if result.get("errcode") == 0:
+                return {"success": True}
+            else:
+                return {
+                    "success": False,
+                    "error": result.get("errmsg", "Unknown error")
+                }
                 
-                if result.get("errcode") == 0:
-                    return {"success": True}
-                else:
-                    return {
-                        "success": False,
-                        "error": result.get("errmsg", "Unknown error")
-                    }
-                    
         except Exception as e:
             logger.error(f"send_subscribe_message failed: {e}")
             return {
@@ -225,22 +220,20 @@ class WechatAdapter:
     async def _get_access_token(self) -> Optional[str]:
         """获取 access_token（带缓存）"""
         # TODO: 实现 access_token 缓存
-        import httpx
-        
         try:
-            async with httpx.AsyncClient(timeout=10.0) as client:
-                response = await client.get(
-                    "https://api.weixin.qq.com/cgi-bin/token",
-                    params={
-                        "grant_type": "client_credential",
-                        "appid": self.appid,
-                        "secret": self.secret
-                    }
-                )
-                
-                data = response.json()
-                return data.get("access_token")
-                
+            client = get_http_client("wechat")
+            response = await client.get(
+                "https://api.weixin.qq.com/cgi-bin/token",
+                params={
+                    "grant_type": "client_credential",
+                    "appid": self.appid,
+                    "secret": self.secret
+                }
+            )
+            
+            data = response.json()
+            return data.get("access_token")
+            
         except Exception as e:
             logger.error(f"get_access_token failed: {e}")
             return None
@@ -15,6 +15,7 @@ from .audit_logs import router as audit_logs_router
 from .alerts import router as alerts_router
 from .users import router as users_router
 from .daily_tickets import router as daily_tickets_router
+from .exports import router as exports_router
 
 admin_router = APIRouter()
 
@@ -27,6 +28,7 @@ admin_router.include_router(workers_router, prefix="/workers", tags=["人员管
 admin_router.include_router(contractors_router, prefix="/contractors", tags=["施工单位管理"])
 admin_router.include_router(sites_router, prefix="/sites", tags=["工地管理"])
 admin_router.include_router(reports_router, prefix="/reports", tags=["报表统计"])
+admin_router.include_router(exports_router, prefix="/exports", tags=["导出任务"])
 admin_router.include_router(alerts_router, prefix="/alerts", tags=["告警管理"])
 admin_router.include_router(users_router, prefix="/users", tags=["用户管理"])
 admin_router.include_router(audit_logs_router, prefix="/audit-logs", tags=["审计日志"])
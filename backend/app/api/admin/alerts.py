@@ -93,7 +93,8 @@ async def list_alerts(
     """
     获取告警列表
     
-    支持分页、状态和严重程度筛选
+    支持分页、状态和严重程度筛选；
+    深分页使用 cursor（上一页返回的 next_cursor），count_mode=estimate/none 跳过精确计数
     """
     ctx = get_tenant_context()
     
@@ -115,7 +116,8 @@ async def list_alerts(
             Alert.message.ilike(f"%{query.keyword}%")
         )
     
-    result = await paginate(db, stmt, query)
+    # 游标分页：按 (创建时间, 告警ID) 倒序
+    result = await paginate(db, stmt, query, keyset=(Alert.created_at, Alert.alert_id))
     
     items = [
         {
@@ -137,7 +139,9 @@ async def list_alerts(
         "items": items,
         "total": result.total,
         "page": result.page,
-        "page_size": result.page_size
+        "page_size": result.page_size,
+        "next_cursor": result.next_cursor,
+        "total_is_estimate": result.total_is_estimate
     })
 
 
@@ -2,7 +2,7 @@
 审计日志查询API
 """
 import uuid
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
 from typing import Optional
 
 from fastapi import APIRouter, Depends
@@ -16,6 +16,7 @@ from app.api.admin.auth import get_current_user
 from app.middleware.tenant import get_tenant_context, TenantQueryFilter
 from app.utils.response import success_response, error_response, ErrorCode
 from app.utils.pagination import PaginationParams, paginate
+from app.services.archive_service import ArchiveService
 
 router = APIRouter()
 
@@ -30,6 +31,30 @@ class AuditLogQuery(PaginationParams):
     operator_id: Optional[uuid.UUID] = None
 
 
+# 审计日志列表字段（归档数据为 JSON，字段同名）
+AUDIT_LOG_ITEM_FIELDS = (
+    "log_id", "operator_id", "operator_name", "operator_role", "action",
+    "resource_type", "resource_id", "resource_name", "old_value", "new_value",
+    "reason", "ip_address", "is_success", "error_message", "created_at"
+)
+
+
+def _archived_log_matches(row: dict, query: AuditLogQuery, ctx) -> bool:
+    """归档审计日志是否满足查询条件（与在线查询的过滤条件一致）"""
+    site_id = uuid.UUID(row["site_id"]) if row.get("site_id") else None
+    if not TenantQueryFilter.allows(site_id, ctx):
+        return False
+    if query.resource_type and row["resource_type"] != query.resource_type:
+        return False
+    if query.resource_id and row["resource_id"] != str(query.resource_id):
+        return False
+    if query.action and row["action"] != query.action:
+        return False
+    if query.operator_id and row["operator_id"] != str(query.operator_id):
+        return False
+    return True
+
+
 @router.get("")
 async def list_audit_logs(
     query: AuditLogQuery = Depends(),
@@ -42,8 +67,10 @@ async def list_audit_logs(
     支持筛选：
     - resource_type: 资源类型 (WorkTicket/DailyTicket/Worker等)
     - action: 操作类型 (CREATE/UPDATE/DELETE/TICKET_CHANGE等)
-    - start_date/end_date: 时间范围
+    - start_date/end_date: 时间范围（起始日期早于在线保留期时透明读取归档数据）
     - operator_id: 操作人ID
+    
+    深分页使用 cursor（上一页返回的 next_cursor），count_mode=estimate/none 跳过精确计数
     """
     ctx = get_tenant_context()
     
@@ -75,8 +102,8 @@ async def list_audit_logs(
     if query.operator_id:
         stmt = stmt.where(AuditLog.operator_id == query.operator_id)
     
-    # 分页
-    result = await paginate(db, stmt, query)
+    # 分页（游标分页：按 (时间, 日志ID) 倒序）
+    result = await paginate(db, stmt, query, keyset=(AuditLog.created_at, AuditLog.log_id))
     
     # 格式化响应
     items = []
@@ -99,12 +126,37 @@ async def list_audit_logs(
             "created_at": log.created_at.isoformat()
         })
     
-    return success_response({
+    response = {
         "items": items,
         "total": result.total,
         "page": result.page,
-        "page_size": result.page_size
-    })
+        "page_size": result.page_size,
+        "next_cursor": result.next_cursor,
+        "total_is_estimate": result.total_is_estimate
+    }
+    
+    # 指定起始日期时透明读取归档数据：归档数据均早于在线数据，排在在线数据之后
+    # （按页码偏移拼接，只在页码分页且精确计数时合并）
+    if query.start_date and not query.cursor and query.count_mode == "exact":
+        archived, truncated = await ArchiveService(db).read_archived(
+            "audit_log",
+            datetime.combine(query.start_date, datetime.min.time()),
+            datetime.combine(query.end_date + timedelta(days=1), datetime.min.time())
+            if query.end_date else datetime.now(),
+            lambda row: _archived_log_matches(row, query, ctx)
+        )
+        if archived:
+            archive_offset = max(0, query.offset - result.total)
+            remaining = query.page_size - len(items)
+            items.extend(
+                {key: row[key] for key in AUDIT_LOG_ITEM_FIELDS}
+                for row in archived[archive_offset:archive_offset + remaining]
+            )
+            response["total"] = result.total + len(archived)
+            response["archived"] = True
+            response["archive_truncated"] = truncated
+    
+    return success_response(response)
 
 
 @router.get("/{log_id}")
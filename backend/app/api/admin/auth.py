@@ -14,6 +14,7 @@ from app.core.database import get_db
 from app.core.security import verify_password, create_access_token, get_password_hash
 from app.models import SysUser
 from app.utils.response import success_response, error_response, ErrorCode
+from app.utils.principal_cache import principal_cache
 
 router = APIRouter()
 
@@ -25,18 +26,18 @@ async def get_current_user(
 ) -> SysUser:
     """
     从请求中获取当前用户
+    
+    令牌由租户中间件解码一次后共用；用户通过认证主体缓存获取
     """
-    from app.core.security import decode_access_token
+    from app.core.security import get_request_token_payload
     
     # 获取Token
     auth_header = request.headers.get("Authorization")
     if not auth_header or not auth_header.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="未认证")
     
-    token = auth_header.split(" ")[1]
-    
     # 解析Token
-    payload = decode_access_token(token)
+    payload = get_request_token_payload(request)
     if not payload:
         raise HTTPException(status_code=401, detail="令牌无效")
     
@@ -45,10 +46,7 @@ async def get_current_user(
     if not user_id:
         raise HTTPException(status_code=401, detail="令牌无效")
     
-    result = await db.execute(
-        select(SysUser).where(SysUser.user_id == uuid.UUID(user_id))
-    )
-    user = result.scalar_one_or_none()
+    user = await principal_cache.get(db, SysUser, uuid.UUID(user_id))
     
     if not user:
         raise HTTPException(status_code=401, detail="用户不存在")
@@ -165,6 +163,9 @@ async def change_password(
     db: AsyncSession = Depends(get_db)
 ):
     """修改密码"""
+    # 认证主体缓存不含密码哈希，从库中加载
+    await db.refresh(current_user, ["password_hash"])
+    
     # 验证旧密码
     if not verify_password(request.old_password, current_user.password_hash):
         return error_response(
@@ -0,0 +1,158 @@
+"""
+异步导出任务API
+- 提交导出任务，立即返回任务ID，由 Celery export 队列生成文件
+- 轮询任务状态（已写入行数）并获取下载链接
+"""
+import uuid
+import logging
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter, Depends
+from fastapi.responses import FileResponse, RedirectResponse
+from pydantic import BaseModel
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import get_db
+from app.models import SysUser, ExportJob
+from app.api.admin.auth import get_current_user
+from app.middleware.tenant import get_tenant_context
+from app.utils.response import success_response, error_response, ErrorCode
+from app.utils.export import EXPORT_FORMATS, MEDIA_TYPES
+from app.services.export_service import ExportService, EXPORT_TYPES
+
+router = APIRouter()
+
+logger = logging.getLogger(__name__)
+
+
+class ExportJobCreate(BaseModel):
+    """提交导出任务请求"""
+    export_type: str  # training/access-sync/access-events/reconciliation/tickets
+    format: str = "xlsx"
+    start_date: Optional[date] = None
+    end_date: Optional[date] = None
+    # 作业票导出筛选
+    status: Optional[str] = None
+    contractor_id: Optional[uuid.UUID] = None
+
+
+def _can_access_job(job: ExportJob, user: SysUser) -> bool:
+    """仅提交人和系统管理员可查看/下载"""
+    return user.is_sys_admin or job.created_by == user.user_id
+
+
+def _job_to_dict(job: ExportJob) -> dict:
+    data = {
+        "job_id": str(job.job_id),
+        "export_type": job.export_type,
+        "format": job.file_format,
+        "status": job.status,
+        "rows_written": job.rows_written or 0,
+        "file_name": job.file_name,
+        "file_size": job.file_size,
+        "error_msg": job.error_msg,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+        "download_url": None,
+    }
+    if job.status == "SUCCESS":
+        data["download_url"] = f"{settings.API_V1_PREFIX}/admin/exports/{job.job_id}/download"
+    return data
+
+
+@router.post("")
+async def create_export_job(
+    data: ExportJobCreate,
+    current_user: SysUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    提交异步导出任务
+
+    返回任务ID，通过 GET /exports/{job_id} 轮询进度
+    """
+    if data.export_type not in EXPORT_TYPES:
+        return error_response(
+            code=ErrorCode.VALIDATION_ERROR,
+            message=f"不支持的导出类型: {data.export_type}"
+        )
+    if data.format not in EXPORT_FORMATS:
+        return error_response(
+            code=ErrorCode.VALIDATION_ERROR,
+            message=f"不支持的导出格式: {data.format}"
+        )
+
+    params = data.model_dump(mode="json", exclude={"export_type", "format"}, exclude_none=True)
+
+    service = ExportService(db)
+    job = await service.create_job(
+        export_type=data.export_type,
+        file_format=data.format,
+        params=params,
+        ctx=get_tenant_context(),
+        created_by=current_user.user_id
+    )
+
+    # 先提交，保证任务执行时能读到记录
+    await db.commit()
+
+    from app.tasks.export import run_export_job
+    run_export_job.delay(str(job.job_id))
+
+    return success_response(_job_to_dict(job), message="导出任务已提交")
+
+
+@router.get("/{job_id}")
+async def get_export_job(
+    job_id: uuid.UUID,
+    current_user: SysUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """查询导出任务状态与进度"""
+    job = await ExportService(db).get_job(job_id)
+    if not job or not _can_access_job(job, current_user):
+        return error_response(
+            code=ErrorCode.NOT_FOUND,
+            message="导出任务不存在"
+        )
+
+    return success_response(_job_to_dict(job))
+
+
+@router.get("/{job_id}/download")
+async def download_export_file(
+    job_id: uuid.UUID,
+    current_user: SysUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    下载导出文件
+
+    本地存储直接返回文件；MinIO 存储重定向到预签名地址
+    """
+    from app.utils.storage import local_export_path, presigned_export_url
+
+    job = await ExportService(db).get_job(job_id)
+    if not job or not _can_access_job(job, current_user):
+        return error_response(
+            code=ErrorCode.NOT_FOUND,
+            message="导出任务不存在"
+        )
+
+    if job.status != "SUCCESS":
+        return error_response(
+            code=ErrorCode.VALIDATION_ERROR,
+            message=f"导出任务尚未完成: {job.status}"
+        )
+
+    if job.storage_backend == "minio":
+        return RedirectResponse(presigned_export_url(job.storage_key, job.file_name))
+
+    return FileResponse(
+        local_export_path(job.storage_key),
+        media_type=MEDIA_TYPES[job.file_format],
+        filename=job.file_name
+    )
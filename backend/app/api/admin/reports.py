@@ -3,68 +3,65 @@
 """
 from datetime import date, datetime, timedelta
 from typing import Optional
-from io import BytesIO
 import uuid
 import json
-import hashlib
 import logging
 
 from fastapi import APIRouter, Depends
-from fastapi.responses import StreamingResponse
 from sqlalchemy import select, func, cast, Integer
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
-import openpyxl
-from openpyxl.styles import Font, Alignment, PatternFill
 
-from app.core.config import settings
 from app.core.database import get_db
 from app.models import (
     WorkTicket, DailyTicket, DailyTicketWorker, 
-    TrainingSession, AccessGrant, AccessEvent, SysUser,
-    WorkTicketArea, Worker, WorkArea
+    AccessGrant, AccessEvent, SysUser,
+    WorkTicketArea
 )
 from app.api.admin.auth import get_current_user
 from app.middleware.tenant import get_tenant_context, TenantQueryFilter
-from app.utils.response import success_response
+from app.utils.response import success_response, error_response, ErrorCode
+from app.utils.export import EXPORT_FORMATS, streaming_export
+from app.utils.pagination import PaginationParams, paginate
+from app.utils.cache import get_redis_client, tenant_scope_key
+from app.services.report_service import (
+    ReportService, TREND_METRICS, TREND_MAX_DAYS,
+    rate, avg_training_minutes, avg_sync_seconds
+)
+from app.services.export_service import build_report_export
+from app.services.archive_service import ArchiveService
 
 router = APIRouter()
 
 logger = logging.getLogger(__name__)
 
-try:
-    import redis.asyncio as redis_async  # type: ignore
-except Exception:  # pragma: no cover
-    redis_async = None
-
-_redis_client = None
-
 
-async def _get_redis_client():
-    global _redis_client
-    if redis_async is None:
-        return None
-    if _redis_client is None:
-        _redis_client = redis_async.from_url(
-            settings.REDIS_URL, encoding="utf-8", decode_responses=True
-        )
-    return _redis_client
+def _build_dashboard_cache_key(ctx, today: date) -> str:
+    return f"dashboard:v1:{today.isoformat()}:{tenant_scope_key(ctx)}"
 
 
-def _build_dashboard_cache_key(ctx, today: date) -> str:
-    role = getattr(ctx, "user_role", None) or "unknown"
-    if ctx is None:
-        scope = "anonymous"
-    elif getattr(ctx, "is_sys_admin", False):
-        scope = "all"
-    else:
-        sites = getattr(ctx, "accessible_sites", None) or []
-        if sites:
-            raw = ",".join(sorted(str(s) for s in sites))
-            scope = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
-        else:
-            scope = "none"
-    return f"dashboard:v1:{today.isoformat()}:{role}:{scope}"
+def _build_dashboard_stats(metrics: dict) -> dict:
+    """将看板聚合结果映射为前端需要的 stats / todayStatus 格式"""
+    synced_grants = metrics["synced_grants"]
+    total_grants = synced_grants + metrics["pending_grants"]
+    sync_rate = round(synced_grants / total_grants * 100, 1) if total_grants > 0 else 0
+    
+    status_counts = metrics["status_counts"]
+    return {
+        "stats": {
+            "todayTasks": metrics["today_tickets"],
+            "activeTickets": metrics["active_tickets"],
+            "todayTrainings": metrics["completed_training"],
+            "accessGrants": synced_grants,
+            "syncRate": sync_rate
+        },
+        "todayStatus": {
+            "notStarted": status_counts.get("DRAFT", 0) + status_counts.get("PUBLISHED", 0),
+            "inProgress": status_counts.get("IN_PROGRESS", 0),
+            "completed": status_counts.get("EXPIRED", 0),
+            "failed": status_counts.get("CANCELLED", 0)
+        }
+    }
 
 
 @router.get("/dashboard")
@@ -81,7 +78,7 @@ async def get_dashboard(
     today = date.today()
 
     # 轻量缓存：避免每次进入Dashboard都打多条聚合SQL（TTL=60s）
-    redis_client = await _get_redis_client()
+    redis_client = await get_redis_client()
     cache_key = _build_dashboard_cache_key(ctx, today)
     if redis_client is not None:
         try:
@@ -91,105 +88,8 @@ async def get_dashboard(
         except Exception as e:  # pragma: no cover
             logger.warning(f"Dashboard cache read failed: {e}")
     
-    # 今日作业票统计
-    stmt = select(func.count(DailyTicket.daily_ticket_id)).where(
-        DailyTicket.date == today,
-        DailyTicket.status.in_(["PUBLISHED", "IN_PROGRESS"])
-    )
-    stmt = TenantQueryFilter.apply(stmt, ctx)
-    today_tickets_result = await db.execute(stmt)
-    today_tickets = today_tickets_result.scalar() or 0
-    
-    # 今日培训统计
-    stmt = select(func.count(DailyTicketWorker.id)).join(DailyTicket).where(
-        DailyTicketWorker.training_status == "COMPLETED",
-        DailyTicket.date == today
-    )
-    if ctx is not None and not ctx.is_sys_admin and ctx.accessible_sites:
-        stmt = stmt.where(DailyTicket.site_id.in_(ctx.accessible_sites))
-    completed_training_result = await db.execute(stmt)
-    completed_training = completed_training_result.scalar() or 0
-    
-    stmt = select(func.count(DailyTicketWorker.id)).join(DailyTicket).where(
-        DailyTicket.date == today,
-        DailyTicketWorker.status == "ACTIVE"
-    )
-    if ctx is not None and not ctx.is_sys_admin and ctx.accessible_sites:
-        stmt = stmt.where(DailyTicket.site_id.in_(ctx.accessible_sites))
-    total_training_result = await db.execute(stmt)
-    total_training = total_training_result.scalar() or 0
-    
-    # 今日授权统计
-    stmt = select(func.count(AccessGrant.grant_id)).join(DailyTicket).where(
-        DailyTicket.date == today,
-        AccessGrant.status == "SYNCED"
-    )
-    if ctx is not None and not ctx.is_sys_admin and ctx.accessible_sites:
-        stmt = stmt.where(DailyTicket.site_id.in_(ctx.accessible_sites))
-    synced_grants_result = await db.execute(stmt)
-    synced_grants = synced_grants_result.scalar() or 0
-    
-    stmt = select(func.count(AccessGrant.grant_id)).join(DailyTicket).where(
-        DailyTicket.date == today,
-        AccessGrant.status.in_(["PENDING_SYNC", "SYNC_FAILED"])
-    )
-    if ctx is not None and not ctx.is_sys_admin and ctx.accessible_sites:
-        stmt = stmt.where(DailyTicket.site_id.in_(ctx.accessible_sites))
-    pending_grants_result = await db.execute(stmt)
-    pending_grants = pending_grants_result.scalar() or 0
-    
-    # 今日进出统计
-    today_start = datetime.combine(today, datetime.min.time())
-    today_end = datetime.combine(today, datetime.max.time())
-    
-    stmt = select(func.count(AccessEvent.event_id)).where(
-        AccessEvent.event_time >= today_start,
-        AccessEvent.event_time <= today_end,
-        AccessEvent.result == "PASS"
-    )
-    stmt = TenantQueryFilter.apply(stmt, ctx)
-    pass_events_result = await db.execute(stmt)
-    pass_events = pass_events_result.scalar() or 0
-    
-    stmt = select(func.count(AccessEvent.event_id)).where(
-        AccessEvent.event_time >= today_start,
-        AccessEvent.event_time <= today_end,
-        AccessEvent.result == "DENY"
-    )
-    stmt = TenantQueryFilter.apply(stmt, ctx)
-    deny_events_result = await db.execute(stmt)
-    deny_events = deny_events_result.scalar() or 0
-    
-    # 计算同步率
-    total_grants = synced_grants + pending_grants
-    sync_rate = round(synced_grants / total_grants * 100, 1) if total_grants > 0 else 0
-    
-    # 统计今日作业状态（按 DailyTicket 状态分组统计）
-    stmt = select(
-        DailyTicket.status,
-        func.count(DailyTicket.daily_ticket_id)
-    ).where(
-        DailyTicket.date == today
-    ).group_by(DailyTicket.status)
-    stmt = TenantQueryFilter.apply(stmt, ctx)
-    status_result = await db.execute(stmt)
-    status_counts = {row[0]: row[1] for row in status_result.all()}
-    
-    # 映射状态到前端需要的格式
-    today_status = {
-        "notStarted": status_counts.get("DRAFT", 0) + status_counts.get("PUBLISHED", 0),
-        "inProgress": status_counts.get("IN_PROGRESS", 0),
-        "completed": status_counts.get("EXPIRED", 0),
-        "failed": status_counts.get("CANCELLED", 0)
-    }
-    
-    # 获取进行中的作业票数量（ACTIVE 状态表示已发布正在进行中）
-    stmt = select(func.count(WorkTicket.ticket_id)).where(
-        WorkTicket.status == "ACTIVE"
-    )
-    stmt = TenantQueryFilter.apply(stmt, ctx)
-    active_tickets_result = await db.execute(stmt)
-    active_tickets = active_tickets_result.scalar() or 0
+    # 今日统计：单次聚合查询
+    metrics = await ReportService(db).get_dashboard_metrics(today, ctx)
     
     # 获取待处理作业票（已发布且正在进行中的）
     stmt = select(WorkTicket).options(
@@ -251,14 +151,7 @@ async def get_dashboard(
         })
     
     payload = {
-        "stats": {
-            "todayTasks": today_tickets,
-            "activeTickets": active_tickets,
-            "todayTrainings": completed_training,
-            "accessGrants": synced_grants,
-            "syncRate": sync_rate
-        },
-        "todayStatus": today_status,
+        **_build_dashboard_stats(metrics),
         "pendingTickets": pending_tickets_list,
         "recentAlerts": []  # 暂时返回空数组，后续可以添加告警数据
     }
@@ -285,7 +178,7 @@ async def get_dashboard_stats(
     ctx = get_tenant_context()
     today = date.today()
 
-    redis_client = await _get_redis_client()
+    redis_client = await get_redis_client()
     cache_key = _build_dashboard_cache_key(ctx, today) + ":stats"
     if redis_client is not None:
         try:
@@ -295,85 +188,8 @@ async def get_dashboard_stats(
         except Exception as e:  # pragma: no cover
             logger.warning(f"Dashboard stats cache read failed: {e}")
 
-    # 今日作业票统计（今日日票）
-    stmt = select(func.count(DailyTicket.daily_ticket_id)).where(
-        DailyTicket.date == today,
-        DailyTicket.status.in_(["PUBLISHED", "IN_PROGRESS"])
-    )
-    stmt = TenantQueryFilter.apply(stmt, ctx)
-    today_tickets_result = await db.execute(stmt)
-    today_tickets = today_tickets_result.scalar() or 0
-
-    # 今日培训完成数（完成的人员条目数）
-    stmt = select(func.count(DailyTicketWorker.id)).join(DailyTicket).where(
-        DailyTicketWorker.training_status == "COMPLETED",
-        DailyTicket.date == today
-    )
-    if ctx is not None and not ctx.is_sys_admin and ctx.accessible_sites:
-        stmt = stmt.where(DailyTicket.site_id.in_(ctx.accessible_sites))
-    completed_training_result = await db.execute(stmt)
-    completed_training = completed_training_result.scalar() or 0
-
-    # 今日授权数（已同步）
-    stmt = select(func.count(AccessGrant.grant_id)).join(DailyTicket).where(
-        DailyTicket.date == today,
-        AccessGrant.status == "SYNCED"
-    )
-    if ctx is not None and not ctx.is_sys_admin and ctx.accessible_sites:
-        stmt = stmt.where(DailyTicket.site_id.in_(ctx.accessible_sites))
-    synced_grants_result = await db.execute(stmt)
-    synced_grants = synced_grants_result.scalar() or 0
-
-    # 计算同步率需要分母（同步+待同步/失败）
-    stmt = select(func.count(AccessGrant.grant_id)).join(DailyTicket).where(
-        DailyTicket.date == today,
-        AccessGrant.status.in_(["PENDING_SYNC", "SYNC_FAILED"])
-    )
-    if ctx is not None and not ctx.is_sys_admin and ctx.accessible_sites:
-        stmt = stmt.where(DailyTicket.site_id.in_(ctx.accessible_sites))
-    pending_grants_result = await db.execute(stmt)
-    pending_grants = pending_grants_result.scalar() or 0
-
-    total_grants = synced_grants + pending_grants
-    sync_rate = round(synced_grants / total_grants * 100, 1) if total_grants > 0 else 0
-
-    # 进行中的作业票数量（ACTIVE 状态表示已发布正在进行中）
-    stmt = select(func.count(WorkTicket.ticket_id)).where(
-        WorkTicket.status == "ACTIVE"
-    )
-    stmt = TenantQueryFilter.apply(stmt, ctx)
-    active_tickets_result = await db.execute(stmt)
-    active_tickets = active_tickets_result.scalar() or 0
-
-    # 统计今日作业状态（按 DailyTicket 状态分组统计）
-    stmt = select(
-        DailyTicket.status,
-        func.count(DailyTicket.daily_ticket_id)
-    ).where(
-        DailyTicket.date == today
-    ).group_by(DailyTicket.status)
-    stmt = TenantQueryFilter.apply(stmt, ctx)
-    status_result = await db.execute(stmt)
-    status_counts = {row[0]: row[1] for row in status_result.all()}
-    
-    # 映射状态到前端需要的格式
-    today_status = {
-        "notStarted": status_counts.get("DRAFT", 0) + status_counts.get("PUBLISHED", 0),
-        "inProgress": status_counts.get("IN_PROGRESS", 0),
-        "completed": status_counts.get("EXPIRED", 0),
-        "failed": status_counts.get("CANCELLED", 0)
-    }
-
-    payload = {
-        "stats": {
-            "todayTasks": today_tickets,
-            "activeTickets": active_tickets,
-            "todayTrainings": completed_training,
-            "accessGrants": synced_grants,
-            "syncRate": sync_rate
-        },
-        "todayStatus": today_status
-    }
+    metrics = await ReportService(db).get_dashboard_metrics(today, ctx)
+    payload = _build_dashboard_stats(metrics)
 
     if redis_client is not None:
         try:
@@ -501,110 +317,81 @@ async def get_trend(
     """
     获取趋势数据
     
-    metric: 指标类型
+    metric: 指标类型，多个指标用逗号分隔（如 completion_rate,sync_rate）
     - completion_rate: 培训完成率趋势
     - sync_rate: 同步成功率趋势
     - training_duration: 培训时长趋势
     
-    days: 查询天数（默认7天）
+    days: 查询天数（默认7天，最多365天）
+    
+    返回 data 为第一个指标的数据（兼容单指标调用），series 为全部指标
     """
     ctx = get_tenant_context()
     
-    from datetime import timedelta
+    metrics = [m.strip() for m in metric.split(",") if m.strip()]
+    invalid = [m for m in metrics if m not in TREND_METRICS]
+    if not metrics or invalid:
+        return error_response(
+            code=ErrorCode.VALIDATION_ERROR,
+            message=f"不支持的指标: {','.join(invalid) or metric}，可选: {','.join(TREND_METRICS)}"
+        )
+    
+    if days < 1 or days > TREND_MAX_DAYS:
+        return error_response(
+            code=ErrorCode.VALIDATION_ERROR,
+            message=f"days 取值范围为 1~{TREND_MAX_DAYS}"
+        )
+    
     end_date = date.today()
     start_date = end_date - timedelta(days=days)
     
-    trend_data = []
-    current_date = start_date
-    
-    while current_date <= end_date:
-        if metric == "completion_rate":
-            # 培训完成率
-            stmt = select(DailyTicketWorker).join(DailyTicket).where(
-                DailyTicket.date == current_date,
-                DailyTicketWorker.status == "ACTIVE"
-            )
-            stmt = TenantQueryFilter.apply(stmt, ctx)
-            
-            result = await db.execute(stmt)
-            workers = result.scalars().all()
-            
-            total = len(workers)
-            completed = sum(1 for w in workers if w.training_status == "COMPLETED")
-            rate = round((completed / total * 100), 2) if total > 0 else 0
-            
-            trend_data.append({
-                "date": str(current_date),
-                "value": rate
-            })
-            
-        elif metric == "sync_rate":
-            # 同步成功率
-            from app.models import AccessGrant
-            from datetime import datetime
-            
-            stmt = select(AccessGrant).where(
-                AccessGrant.created_at >= datetime.combine(current_date, datetime.min.time()),
-                AccessGrant.created_at <= datetime.combine(current_date, datetime.max.time())
-            )
-            stmt = TenantQueryFilter.apply(stmt, ctx)
-            
-            result = await db.execute(stmt)
-            grants = result.scalars().all()
-            
-            total = len(grants)
-            synced = sum(1 for g in grants if g.status == "SYNCED")
-            rate = round((synced / total * 100), 2) if total > 0 else 0
-            
-            trend_data.append({
-                "date": str(current_date),
-                "value": rate
-            })
-            
-        elif metric == "training_duration":
-            # 平均培训时长
-            from app.models import TrainingSession
-            
-            session_stmt = select(
-                func.avg(func.extract('epoch', TrainingSession.ended_at - TrainingSession.started_at))
-            ).join(DailyTicketWorker).join(DailyTicket).where(
-                DailyTicket.date == current_date,
-                TrainingSession.status == "COMPLETED"
-            )
-            session_stmt = TenantQueryFilter.apply(session_stmt, ctx)
-            
-            session_result = await db.execute(session_stmt)
-            avg_seconds = session_result.scalar() or 0
-            avg_minutes = round(avg_seconds / 60, 1) if avg_seconds else 0
-            
-            trend_data.append({
-                "date": str(current_date),
-                "value": avg_minutes
-            })
-        
-        current_date += timedelta(days=1)
+    series = await ReportService(db).get_trend(metrics, start_date, end_date, ctx)
     
     return success_response({
         "metric": metric,
         "days": days,
-        "data": trend_data
+        "data": series[metrics[0]],
+        "series": series
     })
 
 
+# 进出事件明细字段（归档数据为 JSON，字段同名）
+ACCESS_EVENT_ITEM_FIELDS = (
+    "event_id", "worker_id", "device_id", "event_time",
+    "direction", "result", "reason_code", "reason_message"
+)
+
+
+def _access_event_item(event: AccessEvent) -> dict:
+    return {
+        "event_id": str(event.event_id),
+        "worker_id": str(event.worker_id) if event.worker_id else None,
+        "device_id": event.device_id,
+        "event_time": event.event_time.isoformat(),
+        "direction": event.direction,
+        "result": event.result,
+        "reason_code": event.reason_code,
+        "reason_message": event.reason_message
+    }
+
+
 @router.get("/access-events")
 async def get_access_events(
     date_str: Optional[str] = None,
     result_filter: Optional[str] = None,
-    page: int = 1,
-    page_size: int = 20,
+    pagination: PaginationParams = Depends(),
     current_user: SysUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
     """
     获取进出事件记录
     
-    支持按日期和结果筛选
+    支持按日期和结果筛选；日期早于在线保留期时透明读取归档数据
+    （archive_truncated 表示归档匹配行数超过读取上限被截断）
+    
+    深分页使用 cursor（上一页返回的 next_cursor），count_mode=estimate/none 跳过精确计数
     """
+    page, page_size = pagination.page, pagination.page_size
     ctx = get_tenant_context()
     
     query_date = date.fromisoformat(date_str) if date_str else date.today()
@@ -621,35 +408,47 @@ async def get_access_events(
     if result_filter:
         stmt = stmt.where(AccessEvent.result == result_filter)
     
-    # 分页
-    total_stmt = select(func.count()).select_from(stmt.subquery())
-    total_result = await db.execute(total_stmt)
-    total = total_result.scalar() or 0
+    # 归档数据（该日无归档文件时为空，只查在线数据）
+    archived, truncated = await ArchiveService(db).read_archived(
+        "access_event",
+        date_start,
+        datetime.combine(query_date + timedelta(days=1), datetime.min.time()),
+        lambda row: (
+            TenantQueryFilter.allows(uuid.UUID(row["site_id"]), ctx)
+            and (not result_filter or row["result"] == result_filter)
+        )
+    )
     
-    stmt = stmt.offset((page - 1) * page_size).limit(page_size)
-    result = await db.execute(stmt)
-    events = result.scalars().all()
+    if archived:
+        # 归档日期的在线数据只有归档后迟到的少量事件，与归档数据合并后按时间倒序分页
+        result = await db.execute(stmt)
+        rows = [_access_event_item(event) for event in result.scalars().all()]
+        rows.extend({key: row[key] for key in ACCESS_EVENT_ITEM_FIELDS} for row in archived)
+        rows.sort(key=lambda item: datetime.fromisoformat(item["event_time"]), reverse=True)
+        
+        return success_response({
+            "date": str(query_date),
+            "total": len(rows),
+            "page": page,
+            "page_size": page_size,
+            "items": rows[(page - 1) * page_size:page * page_size],
+            "archived": True,
+            "archive_truncated": truncated
+        })
     
-    items = [
-        {
-            "event_id": str(event.event_id),
-            "worker_id": str(event.worker_id) if event.worker_id else None,
-            "device_id": event.device_id,
-            "event_time": event.event_time.isoformat(),
-            "direction": event.direction,
-            "result": event.result,
-            "reason_code": event.reason_code,
-            "reason_message": event.reason_message
-        }
-        for event in events
-    ]
+    # 分页（游标分页：按 (事件时间, 事件ID) 倒序）
+    result = await paginate(db, stmt, pagination, keyset=(AccessEvent.event_time, AccessEvent.event_id))
+    
+    items = [_access_event_item(event) for event in result.items]
     
     return success_response({
         "date": str(query_date),
-        "total": total,
+        "total": result.total,
         "page": page,
         "page_size": page_size,
-        "items": items
+        "items": items,
+        "next_cursor": result.next_cursor,
+        "total_is_estimate": result.total_is_estimate
     })
 
 
@@ -671,65 +470,27 @@ async def get_training_stats(
     query_start_date = date.fromisoformat(start_date) if start_date else date.today() - timedelta(days=7)
     query_end_date = date.fromisoformat(end_date) if end_date else date.today()
     
-    # 获取时间范围内的所有培训数据
-    stmt = select(DailyTicketWorker).join(
-        DailyTicket, DailyTicketWorker.daily_ticket_id == DailyTicket.daily_ticket_id
-    ).where(
-        DailyTicket.date >= query_start_date,
-        DailyTicket.date <= query_end_date,
-        DailyTicketWorker.status == "ACTIVE"
-    )
-    stmt = TenantQueryFilter.apply(stmt, ctx)
-    
-    result = await db.execute(stmt)
-    workers = result.scalars().all()
-    
-    # 统计数据
-    total_workers = len(workers)
-    completed_count = sum(1 for w in workers if w.training_status == "COMPLETED")
-    in_learning_count = sum(1 for w in workers if w.training_status == "IN_LEARNING")
-    not_started_count = sum(1 for w in workers if w.training_status == "NOT_STARTED")
-    failed_count = sum(1 for w in workers if w.training_status == "FAILED")
-    
-    # 计算完成率
-    completion_rate = round((completed_count / total_workers * 100), 2) if total_workers > 0 else 0
-    
-    # 计算平均培训时长（分钟）
-    start_datetime = datetime.combine(query_start_date, datetime.min.time())
-    end_datetime = datetime.combine(query_end_date, datetime.max.time())
-    
-    session_stmt = select(
-        func.avg(func.extract('epoch', TrainingSession.ended_at - TrainingSession.started_at))
-    ).select_from(TrainingSession).join(
-        DailyTicket, TrainingSession.daily_ticket_id == DailyTicket.daily_ticket_id
-    ).where(
-        DailyTicket.date >= query_start_date,
-        DailyTicket.date <= query_end_date,
-        TrainingSession.status == "COMPLETED"
-    )
-    session_stmt = TenantQueryFilter.apply(session_stmt, ctx)
-    
-    session_result = await db.execute(session_stmt)
-    avg_seconds = session_result.scalar() or 0
-    avg_duration_minutes = round(avg_seconds / 60, 1) if avg_seconds else 0
+    # 读取预聚合合计
+    metrics = await ReportService(db).get_metrics_summary(query_start_date, query_end_date, ctx)
     
-    # 获取总视频完成数
-    total_videos_completed = sum(w.completed_video_count for w in workers if w.completed_video_count)
-    total_videos_required = sum(w.total_video_count for w in workers if w.total_video_count)
+    total_workers = metrics["worker_count"]
+    completed_count = metrics["completed_count"]
+    total_videos_completed = metrics["videos_completed"]
+    total_videos_required = metrics["videos_required"]
     
     return success_response({
         "start_date": str(query_start_date),
         "end_date": str(query_end_date),
         "total_workers": total_workers,
         "completed_count": completed_count,
-        "in_learning_count": in_learning_count,
-        "not_started_count": not_started_count,
-        "failed_count": failed_count,
-        "completion_rate": completion_rate,
-        "avg_duration_minutes": avg_duration_minutes,
+        "in_learning_count": metrics["in_learning_count"],
+        "not_started_count": metrics["not_started_count"],
+        "failed_count": metrics["failed_count"],
+        "completion_rate": rate(completed_count, total_workers),
+        "avg_duration_minutes": avg_training_minutes(metrics),
         "total_videos_completed": total_videos_completed,
         "total_videos_required": total_videos_required,
-        "video_completion_rate": round((total_videos_completed / total_videos_required * 100), 2) if total_videos_required > 0 else 0
+        "video_completion_rate": rate(total_videos_completed, total_videos_required)
     })
 
 
@@ -751,67 +512,32 @@ async def get_access_sync_stats(
     query_start_date = date.fromisoformat(start_date) if start_date else date.today() - timedelta(days=7)
     query_end_date = date.fromisoformat(end_date) if end_date else date.today()
     
-    start_datetime = datetime.combine(query_start_date, datetime.min.time())
-    end_datetime = datetime.combine(query_end_date, datetime.max.time())
-    
-    # 获取时间范围内的所有授权记录
-    stmt = select(AccessGrant).where(
-        AccessGrant.created_at >= start_datetime,
-        AccessGrant.created_at <= end_datetime
-    )
-    stmt = TenantQueryFilter.apply(stmt, ctx)
-    
-    result = await db.execute(stmt)
-    grants = result.scalars().all()
+    report_service = ReportService(db)
     
-    # 统计数据
-    total_count = len(grants)
-    synced_count = sum(1 for g in grants if g.status == "SYNCED")
-    pending_count = sum(1 for g in grants if g.status == "PENDING_SYNC")
-    failed_count = sum(1 for g in grants if g.status == "SYNC_FAILED")
-    revoked_count = sum(1 for g in grants if g.status == "REVOKED")
+    # 读取预聚合合计
+    metrics = await report_service.get_metrics_summary(query_start_date, query_end_date, ctx)
     
-    # 计算同步成功率
-    sync_rate = round((synced_count / total_count * 100), 2) if total_count > 0 else 0
+    total_count = metrics["grant_count"]
+    synced_count = metrics["grant_synced_count"]
     
-    # 计算平均同步时长（秒）
-    synced_grants = [g for g in grants if g.status == "SYNCED" and g.last_sync_at]
-    avg_sync_duration = 0
-    if synced_grants:
-        total_sync_time = sum(
-            (g.last_sync_at - g.created_at).total_seconds() 
-            for g in synced_grants 
-            if g.last_sync_at and g.created_at
-        )
-        avg_sync_duration = round(total_sync_time / len(synced_grants), 1)
-    
-    # 统计失败原因
-    failure_reasons = {}
-    for grant in grants:
-        if grant.status == "SYNC_FAILED" and grant.sync_error_msg:
-            reason = grant.sync_error_msg[:50]  # 截取前50个字符
-            failure_reasons[reason] = failure_reasons.get(reason, 0) + 1
-    
-    # 获取重试次数统计
-    max_retry_count = max((g.sync_attempt_count for g in grants), default=0)
-    avg_retry_count = round(sum(g.sync_attempt_count for g in grants) / total_count, 1) if total_count > 0 else 0
+    # 失败原因需要明细，库内分组只取 Top 10
+    failure_reasons = await report_service.get_grant_failure_reasons(
+        query_start_date, query_end_date, ctx
+    )
     
     return success_response({
         "start_date": str(query_start_date),
         "end_date": str(query_end_date),
         "total_count": total_count,
         "synced_count": synced_count,
-        "pending_count": pending_count,
-        "failed_count": failed_count,
-        "revoked_count": revoked_count,
-        "sync_rate": sync_rate,
-        "avg_sync_duration_seconds": avg_sync_duration,
-        "max_retry_count": max_retry_count,
-        "avg_retry_count": avg_retry_count,
-        "failure_reasons": [
-            {"reason": reason, "count": count}
-            for reason, count in sorted(failure_reasons.items(), key=lambda x: x[1], reverse=True)[:10]
-        ]
+        "pending_count": metrics["grant_pending_count"],
+        "failed_count": metrics["grant_failed_count"],
+        "revoked_count": metrics["grant_revoked_count"],
+        "sync_rate": rate(synced_count, total_count),
+        "avg_sync_duration_seconds": avg_sync_seconds(metrics),
+        "max_retry_count": metrics["max_sync_attempts"],
+        "avg_retry_count": round(metrics["sync_attempts"] / total_count, 1) if total_count > 0 else 0,
+        "failure_reasons": failure_reasons
     })
 
 
@@ -820,6 +546,7 @@ async def export_report(
     report_type: str,
     start_date: Optional[str] = None,
     end_date: Optional[str] = None,
+    format: str = "xlsx",
     current_user: SysUser = Depends(get_current_user),
     db: AsyncSession = Depends(get_db)
 ):
@@ -831,297 +558,37 @@ async def export_report(
     - access-sync: 门禁同步统计报表
     - access-events: 门禁事件记录报表
     - reconciliation: 对账报告
-    """
-    ctx = get_tenant_context()
-    
-    # 解析日期范围
-    query_start_date = date.fromisoformat(start_date) if start_date else date.today() - timedelta(days=7)
-    query_end_date = date.fromisoformat(end_date) if end_date else date.today()
-    
-    # 创建 Excel 工作簿
-    wb = openpyxl.Workbook()
-    ws = wb.active
     
-    # 设置表头样式
-    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF")
+    format: xlsx（默认）/ csv
     
-    if report_type == "training":
-        # 培训统计报表
-        ws.title = "培训统计报表"
-        
-        # 表头
-        headers = ["日期", "总人数", "已完成", "学习中", "未开始", "失败", "完成率(%)", "平均时长(分钟)"]
-        ws.append(headers)
-        
-        # 设置表头样式
-        for cell in ws[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal="center", vertical="center")
-        
-        # 获取数据
-        current_date = query_start_date
-        while current_date <= query_end_date:
-            stmt = select(DailyTicketWorker).join(DailyTicket).where(
-                DailyTicket.date == current_date,
-                DailyTicketWorker.status == "ACTIVE"
-            )
-            stmt = TenantQueryFilter.apply(stmt, ctx)
-            
-            result = await db.execute(stmt)
-            workers = result.scalars().all()
-            
-            total = len(workers)
-            completed = sum(1 for w in workers if w.training_status == "COMPLETED")
-            in_learning = sum(1 for w in workers if w.training_status == "IN_LEARNING")
-            not_started = sum(1 for w in workers if w.training_status == "NOT_STARTED")
-            failed = sum(1 for w in workers if w.training_status == "FAILED")
-            completion_rate = round((completed / total * 100), 2) if total > 0 else 0
-            
-            # 计算平均时长
-            session_stmt = select(
-                func.avg(func.extract('epoch', TrainingSession.ended_at - TrainingSession.started_at))
-            ).join(DailyTicketWorker).join(DailyTicket).where(
-                DailyTicket.date == current_date,
-                TrainingSession.status == "COMPLETED"
-            )
-            session_stmt = TenantQueryFilter.apply(session_stmt, ctx)
-            
-            session_result = await db.execute(session_stmt)
-            avg_seconds = session_result.scalar() or 0
-            avg_duration = round(avg_seconds / 60, 1) if avg_seconds else 0
-            
-            ws.append([
-                current_date.strftime("%Y-%m-%d"),
-                total,
-                completed,
-                in_learning,
-                not_started,
-                failed,
-                completion_rate,
-                avg_duration
-            ])
-            
-            current_date += timedelta(days=1)
-        
-        # 调整列宽
-        column_widths = [12, 10, 10, 10, 10, 10, 12, 15]
-        for i, width in enumerate(column_widths, 1):
-            ws.column_dimensions[openpyxl.utils.get_column_letter(i)].width = width
-    
-    elif report_type == "access-sync":
-        # 门禁同步统计报表
-        ws.title = "门禁同步统计报表"
-        
-        # 表头
-        headers = ["日期", "总数", "已同步", "待同步", "失败", "已撤销", "同步率(%)", "平均时长(秒)"]
-        ws.append(headers)
-        
-        # 设置表头样式
-        for cell in ws[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal="center", vertical="center")
-        
-        # 获取数据
-        current_date = query_start_date
-        while current_date <= query_end_date:
-            start_datetime = datetime.combine(current_date, datetime.min.time())
-            end_datetime = datetime.combine(current_date, datetime.max.time())
-            
-            stmt = select(AccessGrant).where(
-                AccessGrant.created_at >= start_datetime,
-                AccessGrant.created_at <= end_datetime
-            )
-            stmt = TenantQueryFilter.apply(stmt, ctx)
-            
-            result = await db.execute(stmt)
-            grants = result.scalars().all()
-            
-            total = len(grants)
-            synced = sum(1 for g in grants if g.status == "SYNCED")
-            pending = sum(1 for g in grants if g.status == "PENDING_SYNC")
-            failed = sum(1 for g in grants if g.status == "SYNC_FAILED")
-            revoked = sum(1 for g in grants if g.status == "REVOKED")
-            sync_rate = round((synced / total * 100), 2) if total > 0 else 0
-            
-            # 计算平均同步时长
-            synced_grants = [g for g in grants if g.status == "SYNCED" and g.last_sync_at]
-            avg_sync_duration = 0
-            if synced_grants:
-                total_sync_time = sum(
-                    (g.last_sync_at - g.created_at).total_seconds() 
-                    for g in synced_grants 
-                    if g.last_sync_at and g.created_at
-                )
-                avg_sync_duration = round(total_sync_time / len(synced_grants), 1)
-            
-            ws.append([
-                current_date.strftime("%Y-%m-%d"),
-                total,
-                synced,
-                pending,
-                failed,
-                revoked,
-                sync_rate,
-                avg_sync_duration
-            ])
-            
-            current_date += timedelta(days=1)
-        
-        # 调整列宽
-        column_widths = [12, 10, 10, 10, 10, 10, 12, 15]
-        for i, width in enumerate(column_widths, 1):
-            ws.column_dimensions[openpyxl.utils.get_column_letter(i)].width = width
-    
-    elif report_type == "access-events":
-        # 门禁事件记录报表
-        ws.title = "门禁事件记录"
-        
-        # 表头
-        headers = ["时间", "工人姓名", "设备ID", "方向", "结果", "原因代码", "原因说明"]
-        ws.append(headers)
-        
-        # 设置表头样式
-        for cell in ws[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal="center", vertical="center")
-        
-        # 获取数据
-        start_datetime = datetime.combine(query_start_date, datetime.min.time())
-        end_datetime = datetime.combine(query_end_date, datetime.max.time())
-        
-        stmt = select(AccessEvent).where(
-            AccessEvent.event_time >= start_datetime,
-            AccessEvent.event_time <= end_datetime
-        ).order_by(AccessEvent.event_time.desc()).limit(1000)  # 限制1000条
-        
-        stmt = TenantQueryFilter.apply(stmt, ctx)
-        
-        result = await db.execute(stmt)
-        events = result.scalars().all()
-        
-        # 获取工人信息
-        worker_ids = [e.worker_id for e in events if e.worker_id]
-        if worker_ids:
-            worker_stmt = select(Worker).where(Worker.worker_id.in_(worker_ids))
-            worker_result = await db.execute(worker_stmt)
-            workers = {w.worker_id: w.name for w in worker_result.scalars().all()}
-        else:
-            workers = {}
-        
-        # 填充数据
-        direction_map = {"IN": "进入", "OUT": "离开"}
-        result_map = {"PASS": "通过", "DENY": "拒绝"}
-        
-        for event in events:
-            worker_name = workers.get(event.worker_id, "未知") if event.worker_id else "未知"
-            ws.append([
-                event.event_time.strftime("%Y-%m-%d %H:%M:%S"),
-                worker_name,
-                event.device_id or "",
-                direction_map.get(event.direction, event.direction),
-                result_map.get(event.result, event.result),
-                event.reason_code or "",
-                event.reason_message or ""
-            ])
-        
-        # 调整列宽
-        column_widths = [20, 15, 15, 10, 10, 15, 30]
-        for i, width in enumerate(column_widths, 1):
-            ws.column_dimensions[openpyxl.utils.get_column_letter(i)].width = width
+    明细类报表通过服务端游标流式读取并逐块输出，内存占用与行数无关；
+    大数据量导出可使用 POST /exports 提交异步任务
+    """
+    ctx = get_tenant_context()
     
-    elif report_type == "reconciliation":
-        # 对账报告
-        ws.title = "对账报告"
-        
-        # 表头
-        headers = ["授权ID", "工人姓名", "区域名称", "状态", "重试次数", "最后同步时间", "错误信息"]
-        ws.append(headers)
-        
-        # 设置表头样式
-        for cell in ws[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal="center", vertical="center")
-        
-        # 获取卡住的授权
-        cutoff = datetime.now() - timedelta(minutes=10)
-        
-        stmt = select(AccessGrant).join(DailyTicket).where(
-            DailyTicket.date >= query_start_date,
-            DailyTicket.date <= query_end_date,
-            AccessGrant.status.in_(["PENDING_SYNC", "SYNC_FAILED"]),
-            AccessGrant.created_at < cutoff
+    if format not in EXPORT_FORMATS:
+        return error_response(
+            code=ErrorCode.VALIDATION_ERROR,
+            message=f"不支持的导出格式: {format}"
         )
-        stmt = TenantQueryFilter.apply(stmt, ctx)
-        
-        result = await db.execute(stmt)
-        grants = result.scalars().all()
-        
-        # 获取工人和区域信息
-        worker_ids = [g.worker_id for g in grants]
-        area_ids = [g.area_id for g in grants]
-        
-        if worker_ids:
-            worker_stmt = select(Worker).where(Worker.worker_id.in_(worker_ids))
-            worker_result = await db.execute(worker_stmt)
-            workers = {w.worker_id: w.name for w in worker_result.scalars().all()}
-        else:
-            workers = {}
-        
-        if area_ids:
-            area_stmt = select(WorkArea).where(WorkArea.area_id.in_(area_ids))
-            area_result = await db.execute(area_stmt)
-            areas = {a.area_id: a.name for a in area_result.scalars().all()}
-        else:
-            areas = {}
-        
-        # 填充数据
-        status_map = {
-            "PENDING_SYNC": "待同步",
-            "SYNC_FAILED": "同步失败"
-        }
-        
-        for grant in grants:
-            worker_name = workers.get(grant.worker_id, "未知")
-            area_name = areas.get(grant.area_id, "未知")
-            
-            ws.append([
-                str(grant.grant_id),
-                worker_name,
-                area_name,
-                status_map.get(grant.status, grant.status),
-                grant.sync_attempt_count,
-                grant.last_sync_at.strftime("%Y-%m-%d %H:%M:%S") if grant.last_sync_at else "",
-                grant.sync_error_msg or ""
-            ])
-        
-        # 调整列宽
-        column_widths = [36, 15, 20, 12, 10, 20, 40]
-        for i, width in enumerate(column_widths, 1):
-            ws.column_dimensions[openpyxl.utils.get_column_letter(i)].width = width
     
-    else:
-        from app.utils.response import error_response, ErrorCode
+    spec = build_report_export(
+        report_type,
+        date.fromisoformat(start_date) if start_date else None,
+        date.fromisoformat(end_date) if end_date else None,
+        ctx
+    )
+    if spec is None:
         return error_response(
             code=ErrorCode.VALIDATION_ERROR,
             message=f"不支持的报表类型: {report_type}"
         )
     
-    # 保存到内存
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    # 生成文件名
-    filename = f"{ws.title}_{query_start_date.strftime('%Y%m%d')}_{query_end_date.strftime('%Y%m%d')}.xlsx"
-    
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
+    return streaming_export(
+        title=spec.title,
+        headers=spec.headers,
+        rows=spec.rows,
+        filename=spec.filename,
+        export_format=format,
+        column_widths=spec.column_widths
     )
-
@@ -2,12 +2,14 @@
 作业票管理API
 """
 import uuid
+import json
+import logging
 from datetime import date, time, datetime
 from typing import List, Optional
 
 from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel, Field
-from sqlalchemy import select
+from sqlalchemy import select, func
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import selectinload
 
@@ -15,19 +17,25 @@ from app.core.database import get_db
 from app.models import (
     WorkTicket, WorkTicketWorker, WorkTicketArea, WorkTicketVideo,
     DailyTicket, DailyTicketWorker, DailyTicketSnapshot,
-    Worker, WorkArea, TrainingVideo, SysUser
+    Worker, TrainingVideo, SysUser
 )
 from app.api.admin.auth import get_current_user
-from app.middleware.tenant import get_tenant_context, TenantQueryFilter
+from app.middleware.tenant import get_tenant_context
 from app.utils.response import success_response, error_response, ErrorCode
 from app.utils.pagination import PaginationParams, paginate
+from app.utils.export import EXPORT_FORMATS, streaming_export
+from app.utils.cache import get_redis_client, tenant_scope_key
 from app.utils.change_compensator import (
     TicketChanges, TicketChangeValidator, TicketChangeCompensator
 )
 from app.services.audit_service import AuditService
+from app.services.export_service import build_ticket_export
+from app.services.ticket_service import TicketService
 
 router = APIRouter()
 
+logger = logging.getLogger(__name__)
+
 
 # 请求/响应模型
 class WorkTicketCreate(BaseModel):
@@ -89,7 +97,7 @@ async def list_tickets(
         stmt = select(WorkTicket).options(
             selectinload(WorkTicket.contractor),
             selectinload(WorkTicket.work_ticket_workers),
-            selectinload(WorkTicket.work_ticket_areas),
+            selectinload(WorkTicket.work_ticket_areas).selectinload(WorkTicketArea.area),
         ).order_by(WorkTicket.created_at.desc())
         
         # 暂时跳过多租户过滤，先让基本功能工作
@@ -116,6 +124,26 @@ async def list_tickets(
         # 分页
         result = await paginate(db, stmt, query)
         
+        # 当日已完成培训人数（一次分组聚合，按作业票汇总）
+        completed_map = {}
+        ticket_ids = [ticket.ticket_id for ticket in result.items]
+        if ticket_ids:
+            completed_result = await db.execute(
+                select(DailyTicket.ticket_id, func.count(DailyTicketWorker.id))
+                .join(
+                    DailyTicketWorker,
+                    DailyTicketWorker.daily_ticket_id == DailyTicket.daily_ticket_id
+                )
+                .where(
+                    DailyTicket.ticket_id.in_(ticket_ids),
+                    DailyTicket.date == date.today(),
+                    DailyTicketWorker.status == "ACTIVE",
+                    DailyTicketWorker.training_status == "COMPLETED"
+                )
+                .group_by(DailyTicket.ticket_id)
+            )
+            completed_map = dict(completed_result.all())
+        
         # 格式化响应
         items = []
         for ticket in result.items:
@@ -123,21 +151,17 @@ async def list_tickets(
             active_workers = [w for w in ticket.work_ticket_workers if w.status == "ACTIVE"]
             active_areas = [a for a in ticket.work_ticket_areas if a.status == "ACTIVE"]
             
-            # 获取区域信息（需要单独查询）
-            area_details = []
-            for area_rel in active_areas:
-                area_result = await db.execute(
-                    select(WorkArea).where(WorkArea.area_id == area_rel.area_id)
-                )
-                area = area_result.scalar_one_or_none()
-                if area:
-                    area_details.append({
-                        "area_id": str(area.area_id),
-                        "name": area.name
-                    })
+            # 区域信息已随查询批量加载
+            area_details = [
+                {
+                    "area_id": str(area_rel.area.area_id),
+                    "name": area_rel.area.name
+                }
+                for area_rel in active_areas
+                if area_rel.area
+            ]
             
-            # 计算已完成培训的人员数（简化版：暂时设为0，后续可以优化）
-            completed_workers = 0
+            completed_workers = completed_map.get(ticket.ticket_id, 0)
             total_workers = len(active_workers)
             
             items.append({
@@ -310,6 +334,95 @@ async def create_ticket(
         )
 
 
+@router.get("/stats")
+async def get_ticket_stats(
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    use_cache: bool = False,
+    current_user: SysUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    获取作业票统计数据 (P1-1)
+    
+    返回作业票总数、各状态数量、完成率等统计信息
+    
+    use_cache=true 时按租户范围缓存60秒（与看板缓存一致）
+    """
+    ctx = get_tenant_context()
+    
+    redis_client = await get_redis_client() if use_cache else None
+    cache_key = (
+        f"ticket_stats:v1:{start_date or ''}:{end_date or ''}:{tenant_scope_key(ctx)}"
+    )
+    if redis_client is not None:
+        try:
+            cached = await redis_client.get(cache_key)
+            if cached:
+                return success_response(json.loads(cached))
+        except Exception as e:  # pragma: no cover
+            logger.warning(f"Ticket stats cache read failed: {e}")
+    
+    stats = await TicketService(db).get_ticket_stats(start_date, end_date, ctx)
+    
+    total_count = stats["total_count"]
+    active_count = stats["active_count"]
+    
+    # 计算活跃率
+    active_rate = round((active_count / total_count * 100), 2) if total_count > 0 else 0
+    
+    payload = {
+        **stats,
+        "active_rate": active_rate,
+        "start_date": str(start_date) if start_date else None,
+        "end_date": str(end_date) if end_date else None
+    }
+    
+    if redis_client is not None:
+        try:
+            await redis_client.set(cache_key, json.dumps(payload, ensure_ascii=False), ex=60)
+        except Exception as e:  # pragma: no cover
+            logger.warning(f"Ticket stats cache write failed: {e}")
+    
+    return success_response(payload)
+
+
+@router.get("/export")
+async def export_tickets(
+    status: Optional[str] = None,
+    contractor_id: Optional[uuid.UUID] = None,
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    format: str = "xlsx",
+    current_user: SysUser = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    导出作业票数据为 Excel / CSV 格式 (P1-2)
+    
+    支持按状态、施工单位、日期范围筛选；结果通过服务端游标流式输出，
+    大数据量导出可使用 POST /exports 提交异步任务
+    """
+    ctx = get_tenant_context()
+    
+    if format not in EXPORT_FORMATS:
+        return error_response(
+            code=ErrorCode.VALIDATION_ERROR,
+            message=f"不支持的导出格式: {format}"
+        )
+    
+    spec = build_ticket_export(status, contractor_id, start_date, end_date, ctx)
+    
+    return streaming_export(
+        title=spec.title,
+        headers=spec.headers,
+        rows=spec.rows,
+        filename=spec.filename,
+        export_format=format,
+        column_widths=spec.column_widths
+    )
+
+
 @router.get("/{ticket_id}")
 async def get_ticket(
     ticket_id: uuid.UUID,
@@ -765,186 +878,67 @@ async def close_ticket(
     }, message=f"作业票已关闭，已撤销 {revoked_count} 个授权")
 
 
-@router.get("/stats")
-async def get_ticket_stats(
-    start_date: Optional[date] = None,
-    end_date: Optional[date] = None,
-    current_user: SysUser = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
-):
+async def _batch_close(
+    db: AsyncSession,
+    current_user: SysUser,
+    ticket_ids: List[uuid.UUID],
+    reason: str,
+    ticket_status: str,
+    skip_statuses: List[str],
+    audit_action: str,
+    revoke_reason: str,
+    cancel_reason: Optional[str] = None
+) -> dict:
     """
-    获取作业票统计数据 (P1-1)
+    批量关闭/取消的公共流程
     
-    返回作业票总数、各状态数量、完成率等统计信息
+    集合更新作业票、日票、授权后提交，再将门禁侧撤销一次性投递为任务组
     """
-    from sqlalchemy import func
-    
-    ctx = get_tenant_context()
-    
-    # 构建基础查询
-    stmt = select(WorkTicket)
-    stmt = TenantQueryFilter.apply(stmt, ctx)
-    
-    # 日期范围过滤
-    if start_date:
-        stmt = stmt.where(WorkTicket.created_at >= datetime.combine(start_date, datetime.min.time()))
-    if end_date:
-        stmt = stmt.where(WorkTicket.created_at <= datetime.combine(end_date, datetime.max.time()))
-    
-    result = await db.execute(stmt)
-    tickets = result.scalars().all()
-    
-    # 统计各状态数量（WorkTicket 状态: DRAFT/ACTIVE/CANCELLED）
-    total_count = len(tickets)
-    draft_count = sum(1 for t in tickets if t.status == "DRAFT")
-    active_count = sum(1 for t in tickets if t.status == "ACTIVE")
-    cancelled_count = sum(1 for t in tickets if t.status == "CANCELLED")
-    
-    # 计算活跃率
-    active_rate = round((active_count / total_count * 100), 2) if total_count > 0 else 0
-    
-    # 统计人员数量
-    total_workers = 0
-    for ticket in tickets:
-        worker_stmt = select(func.count(WorkTicketWorker.id)).where(
-            WorkTicketWorker.ticket_id == ticket.ticket_id,
-            WorkTicketWorker.status == "ACTIVE"
-        )
-        worker_result = await db.execute(worker_stmt)
-        total_workers += worker_result.scalar() or 0
-    
-    # 统计区域数量
-    total_areas = 0
-    for ticket in tickets:
-        area_stmt = select(func.count(WorkTicketArea.id)).where(
-            WorkTicketArea.ticket_id == ticket.ticket_id,
-            WorkTicketArea.status == "ACTIVE"
-        )
-        area_result = await db.execute(area_stmt)
-        total_areas += area_result.scalar() or 0
+    outcome = await TicketService(db).bulk_close_tickets(
+        ticket_ids,
+        ticket_status=ticket_status,
+        skip_statuses=skip_statuses,
+        daily_ticket_status=ticket_status,
+        revoke_reason=revoke_reason,
+        cancel_reason=cancel_reason
+    )
+    revoked_by_ticket = outcome["revoked_by_ticket"]
     
-    return success_response({
-        "total_count": total_count,
-        "draft_count": draft_count,
-        "active_count": active_count,
-        "cancelled_count": cancelled_count,
-        "active_rate": active_rate,
-        "total_workers": total_workers,
-        "total_areas": total_areas,
-        "start_date": str(start_date) if start_date else None,
-        "end_date": str(end_date) if end_date else None
-    })
-
-
-@router.get("/export")
-async def export_tickets(
-    status: Optional[str] = None,
-    contractor_id: Optional[uuid.UUID] = None,
-    start_date: Optional[date] = None,
-    end_date: Optional[date] = None,
-    current_user: SysUser = Depends(get_current_user),
-    db: AsyncSession = Depends(get_db)
-):
-    """
-    导出作业票数据为 Excel 格式 (P1-2)
+    # 记录审计日志（随事务一次写入）
+    try:
+        audit_service = AuditService(db)
+        for ticket in outcome["tickets"]:
+            await audit_service.record(
+                action=audit_action,
+                resource_type="WorkTicket",
+                resource_id=ticket.ticket_id,
+                resource_name=ticket.title,
+                operator_id=current_user.user_id,
+                reason=reason,
+                new_value={
+                    "status": ticket_status,
+                    "revoked_grants_count": revoked_by_ticket.get(ticket.ticket_id, 0)
+                }
+            )
+    except Exception as e:
+        logger.warning(f"Failed to record audit log: {e}")
     
-    支持按状态、施工单位、日期范围筛选
-    """
-    from io import BytesIO
-    import openpyxl
-    from openpyxl.styles import Font, Alignment, PatternFill
-    from fastapi.responses import StreamingResponse
+    await db.commit()
     
-    ctx = get_tenant_context()
+    # 门禁侧撤销（提交后投递，任务读取到的已是 REVOKED 状态）
+    if outcome["vendor_revoke_ids"]:
+        from app.tasks.access import dispatch_vendor_revocations
+        try:
+            dispatch_vendor_revocations(outcome["vendor_revoke_ids"])
+        except Exception as e:
+            logger.error(f"Failed to dispatch vendor revocations: {e}")
     
-    # 构建查询
-    stmt = select(WorkTicket).options(
-        selectinload(WorkTicket.contractor),
-        selectinload(WorkTicket.work_ticket_workers),
-        selectinload(WorkTicket.work_ticket_areas)
-    ).order_by(WorkTicket.created_at.desc())
-    
-    stmt = TenantQueryFilter.apply(stmt, ctx)
-    
-    # 筛选条件
-    if status:
-        stmt = stmt.where(WorkTicket.status == status)
-    if contractor_id:
-        stmt = stmt.where(WorkTicket.contractor_id == contractor_id)
-    if start_date:
-        stmt = stmt.where(WorkTicket.end_date >= start_date)
-    if end_date:
-        stmt = stmt.where(WorkTicket.start_date <= end_date)
-    
-    result = await db.execute(stmt)
-    tickets = result.scalars().all()
-    
-    # 创建 Excel 工作簿
-    wb = openpyxl.Workbook()
-    ws = wb.active
-    ws.title = "作业票列表"
-    
-    # 设置表头
-    headers = [
-        "作业票ID", "标题", "施工单位", "状态", "开始日期", "结束日期",
-        "人员数量", "区域数量", "创建时间", "备注"
-    ]
-    ws.append(headers)
-    
-    # 设置表头样式
-    header_fill = PatternFill(start_color="4472C4", end_color="4472C4", fill_type="solid")
-    header_font = Font(bold=True, color="FFFFFF")
-    
-    for cell in ws[1]:
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.alignment = Alignment(horizontal="center", vertical="center")
-    
-    # 填充数据
-    status_map = {
-        "DRAFT": "草稿",
-        "IN_PROGRESS": "进行中",
-        "CLOSED": "已关闭",
-        "CANCELLED": "已取消"
+    return {
+        "success_count": len(outcome["tickets"]),
+        "failed_count": len(outcome["failed_tickets"]),
+        "total_revoked_grants": sum(revoked_by_ticket.values()),
+        "failed_tickets": outcome["failed_tickets"]
     }
-    
-    for ticket in tickets:
-        worker_count = sum(1 for w in ticket.work_ticket_workers if w.status == "ACTIVE")
-        area_count = sum(1 for a in ticket.work_ticket_areas if a.status == "ACTIVE")
-        
-        row = [
-            str(ticket.ticket_id),
-            ticket.title,
-            ticket.contractor.name if ticket.contractor else "",
-            status_map.get(ticket.status, ticket.status),
-            ticket.start_date.strftime("%Y-%m-%d"),
-            ticket.end_date.strftime("%Y-%m-%d"),
-            worker_count,
-            area_count,
-            ticket.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-            ticket.remark or ""
-        ]
-        ws.append(row)
-    
-    # 调整列宽
-    column_widths = [36, 30, 20, 12, 12, 12, 10, 10, 20, 30]
-    for i, width in enumerate(column_widths, 1):
-        ws.column_dimensions[openpyxl.utils.get_column_letter(i)].width = width
-    
-    # 保存到内存
-    output = BytesIO()
-    wb.save(output)
-    output.seek(0)
-    
-    # 生成文件名
-    from datetime import datetime as dt
-    filename = f"作业票列表_{dt.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-    
-    return StreamingResponse(
-        output,
-        media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": f"attachment; filename={filename}"}
-    )
 
 
 @router.post("/batch-close")
@@ -959,105 +953,18 @@ async def batch_close_tickets(
     
     关闭多个作业票，并撤销所有相关授权
     """
-    from app.models import AccessGrant
-    from app.services.access_service import AccessService
-    
-    access_service = AccessService(db)
-    
-    success_count = 0
-    failed_count = 0
-    total_revoked = 0
-    failed_tickets = []
-    
-    for ticket_id in ticket_ids:
-        try:
-            # 获取作业票
-            result = await db.execute(
-                select(WorkTicket).where(WorkTicket.ticket_id == ticket_id)
-            )
-            ticket = result.scalar_one_or_none()
-            
-            if not ticket:
-                failed_tickets.append({"ticket_id": str(ticket_id), "reason": "作业票不存在"})
-                failed_count += 1
-                continue
-            
-            if ticket.status in ["CANCELLED", "CLOSED"]:
-                failed_tickets.append({"ticket_id": str(ticket_id), "reason": f"作业票已{ticket.status}"})
-                failed_count += 1
-                continue
-            
-            # 更新状态
-            ticket.status = "CLOSED"
-            
-            # 关闭所有相关的日票
-            daily_result = await db.execute(
-                select(DailyTicket).where(
-                    DailyTicket.ticket_id == ticket_id,
-                    DailyTicket.status.in_(["PUBLISHED", "IN_PROGRESS"])
-                )
-            )
-            daily_tickets = daily_result.scalars().all()
-            
-            for dt in daily_tickets:
-                dt.status = "CLOSED"
-            
-            # 撤销所有相关授权
-            grants_result = await db.execute(
-                select(AccessGrant)
-                .join(DailyTicket)
-                .where(
-                    DailyTicket.ticket_id == ticket_id,
-                    AccessGrant.status.in_(["SYNCED", "PENDING_SYNC", "SYNC_FAILED"])
-                )
-            )
-            grants = grants_result.scalars().all()
-            
-            revoked_count = 0
-            for grant in grants:
-                success = await access_service.revoke_grant(
-                    grant.grant_id,
-                    reason="BATCH_TICKET_CLOSED"
-                )
-                if success:
-                    revoked_count += 1
-            
-            total_revoked += revoked_count
-            
-            # 记录审计日志
-            try:
-                audit_service = AuditService(db)
-                await audit_service.record(
-                    action="BATCH_TICKET_CLOSE",
-                    resource_type="WorkTicket",
-                    resource_id=ticket.ticket_id,
-                    resource_name=ticket.title,
-                    operator_id=current_user.user_id,
-                    reason=reason,
-                    new_value={
-                        "status": "CLOSED",
-                        "revoked_grants_count": revoked_count
-                    }
-                )
-            except Exception as e:
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.warning(f"Failed to record audit log: {e}")
-            
-            success_count += 1
-            
-        except Exception as e:
-            failed_tickets.append({"ticket_id": str(ticket_id), "reason": str(e)})
-            failed_count += 1
-    
-    await db.commit()
+    data = await _batch_close(
+        db, current_user, ticket_ids, reason,
+        ticket_status="CLOSED",
+        skip_statuses=["CANCELLED", "CLOSED"],
+        audit_action="BATCH_TICKET_CLOSE",
+        revoke_reason="BATCH_TICKET_CLOSED"
+    )
     
-    return success_response({
-        "success_count": success_count,
-        "failed_count": failed_count,
-        "total_revoked_grants": total_revoked,
-        "failed_tickets": failed_tickets
-    }, message=f"批量关闭完成：成功 {success_count} 个，失败 {failed_count} 个")
+    return success_response(
+        data,
+        message=f"批量关闭完成：成功 {data['success_count']} 个，失败 {data['failed_count']} 个"
+    )
 
 
 @router.post("/batch-cancel")
@@ -1072,104 +979,16 @@ async def batch_cancel_tickets(
     
     取消多个作业票，并撤销所有相关授权
     """
-    from app.models import AccessGrant
-    from app.services.access_service import AccessService
-    
-    access_service = AccessService(db)
-    
-    success_count = 0
-    failed_count = 0
-    total_revoked = 0
-    failed_tickets = []
-    
-    for ticket_id in ticket_ids:
-        try:
-            # 获取作业票
-            result = await db.execute(
-                select(WorkTicket).where(WorkTicket.ticket_id == ticket_id)
-            )
-            ticket = result.scalar_one_or_none()
-            
-            if not ticket:
-                failed_tickets.append({"ticket_id": str(ticket_id), "reason": "作业票不存在"})
-                failed_count += 1
-                continue
-            
-            if ticket.status == "CANCELLED":
-                failed_tickets.append({"ticket_id": str(ticket_id), "reason": "作业票已取消"})
-                failed_count += 1
-                continue
-            
-            # 更新状态
-            ticket.status = "CANCELLED"
-            
-            # 取消所有相关的日票
-            daily_result = await db.execute(
-                select(DailyTicket).where(
-                    DailyTicket.ticket_id == ticket_id,
-                    DailyTicket.status.in_(["PUBLISHED", "IN_PROGRESS"])
-                )
-            )
-            daily_tickets = daily_result.scalars().all()
-            
-            for dt in daily_tickets:
-                dt.status = "CANCELLED"
-                dt.cancel_reason = reason
-            
-            # 撤销所有相关授权
-            grants_result = await db.execute(
-                select(AccessGrant)
-                .join(DailyTicket)
-                .where(
-                    DailyTicket.ticket_id == ticket_id,
-                    AccessGrant.status.in_(["SYNCED", "PENDING_SYNC", "SYNC_FAILED"])
-                )
-            )
-            grants = grants_result.scalars().all()
-            
-            revoked_count = 0
-            for grant in grants:
-                success = await access_service.revoke_grant(
-                    grant.grant_id,
-                    reason="BATCH_TICKET_CANCELLED"
-                )
-                if success:
-                    revoked_count += 1
-            
-            total_revoked += revoked_count
-            
-            # 记录审计日志
-            try:
-                audit_service = AuditService(db)
-                await audit_service.record(
-                    action="BATCH_TICKET_CANCEL",
-                    resource_type="WorkTicket",
-                    resource_id=ticket.ticket_id,
-                    resource_name=ticket.title,
-                    operator_id=current_user.user_id,
-                    reason=reason,
-                    new_value={
-                        "status": "CANCELLED",
-                        "revoked_grants_count": revoked_count
-                    }
-                )
-            except Exception as e:
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.warning(f"Failed to record audit log: {e}")
-            
-            success_count += 1
-            
-        except Exception as e:
-            failed_tickets.append({"ticket_id": str(ticket_id), "reason": str(e)})
-            failed_count += 1
-    
-    await db.commit()
+    data = await _batch_close(
+        db, current_user, ticket_ids, reason,
+        ticket_status="CANCELLED",
+        skip_statuses=["CANCELLED"],
+        audit_action="BATCH_TICKET_CANCEL",
+        revoke_reason="BATCH_TICKET_CANCELLED",
+        cancel_reason=reason
+    )
     
-    return success_response({
-        "success_count": success_count,
-        "failed_count": failed_count,
-        "total_revoked_grants": total_revoked,
-        "failed_tickets": failed_tickets
-    }, message=f"批量取消完成：成功 {success_count} 个，失败 {failed_count} 个")
-
+    return success_response(
+        data,
+        message=f"批量取消完成：成功 {data['success_count']} 个，失败 {data['failed_count']} 个"
+    )
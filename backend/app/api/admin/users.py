@@ -16,6 +16,7 @@ from app.api.admin.auth import get_current_user
 from app.middleware.tenant import require_sys_admin, get_tenant_context, TenantQueryFilter
 from app.utils.response import success_response, error_response, ErrorCode
 from app.utils.pagination import PaginationParams, paginate
+from app.utils.principal_cache import invalidate_principal
 
 router = APIRouter()
 
@@ -280,6 +281,7 @@ async def update_user(
         user.is_active = request.is_active
     
     await db.commit()
+    await invalidate_principal("sys_user", user.user_id)
     
     return success_response({
         "user_id": str(user.user_id)
@@ -314,6 +316,7 @@ async def reset_password(
     user.login_fail_count = 0
     user.is_locked = False
     await db.commit()
+    await invalidate_principal("sys_user", user.user_id)
     
     return success_response(message="密码重置成功")
 
@@ -352,6 +355,7 @@ async def delete_user(
     
     await db.delete(user)
     await db.commit()
+    await invalidate_principal("sys_user", user_id)
     
     return success_response(message="用户删除成功")
 
@@ -16,6 +16,8 @@ from app.api.admin.auth import get_current_user
 from app.middleware.tenant import get_tenant_context, TenantQueryFilter
 from app.utils.response import success_response, error_response, ErrorCode
 from app.utils.pagination import PaginationParams, paginate
+from app.utils.worker_identity_cache import invalidate_worker_identities
+from app.utils.principal_cache import invalidate_principal, invalidate_principals
 
 router = APIRouter()
 
@@ -203,6 +205,7 @@ async def sync_from_realname(
     # 获取实名制系统人员
     page = 1
     synced_count = 0
+    updated_worker_ids = []
     
     while True:
         result = await adapter.search_workers(page=page, page_size=100)
@@ -228,6 +231,7 @@ async def sync_from_realname(
                 worker.job_type = item.get("job_type")
                 worker.team_name = item.get("team_name")
                 worker.face_id = item.get("face_id")
+                updated_worker_ids.append(worker.worker_id)
             else:
                 # 新增
                 worker = Worker(
@@ -249,6 +253,8 @@ async def sync_from_realname(
         page += 1
     
     await db.commit()
+    await invalidate_worker_identities(site_id)
+    await invalidate_principals("worker", updated_worker_ids)
     
     return success_response({
         "synced_count": synced_count
@@ -347,6 +353,7 @@ async def create_worker(
     )
     db.add(worker)
     await db.commit()
+    await invalidate_worker_identities(site_id)
     
     return success_response({
         "worker_id": str(worker.worker_id)
@@ -418,6 +425,8 @@ async def update_worker(
         worker.status = request.status
     
     await db.commit()
+    await invalidate_worker_identities(worker.site_id)
+    await invalidate_principal("worker", worker.worker_id)
     
     return success_response({
         "worker_id": str(worker.worker_id)
@@ -444,6 +453,8 @@ async def delete_worker(
     
     worker.status = "INACTIVE"
     await db.commit()
+    await invalidate_worker_identities(worker.site_id)
+    await invalidate_principal("worker", worker.worker_id)
     
     return success_response(message="人员删除成功")
 
@@ -606,6 +617,8 @@ async def import_workers(
         
         # 提交事务
         await db.commit()
+        if success_count:
+            await invalidate_worker_identities(ctx.site_id)
         
         return success_response({
             "success_count": success_count,
@@ -7,13 +7,11 @@ import uuid
 
 from fastapi import APIRouter, Depends, Header
 from pydantic import BaseModel
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.exc import IntegrityError
 
 from app.core.database import get_db
 from app.core.config import settings
-from app.models import AccessEvent, Worker, WorkArea
+from app.services.access_event_service import AccessEventService, AccessEventStream
 from app.utils.response import success_response, error_response, ErrorCode
 
 router = APIRouter()
@@ -47,7 +45,9 @@ async def receive_access_event(
     """
     接收门禁事件回调 (P1-1: 去重)
     
-    门禁系统推送进出事件到此接口
+    门禁系统推送进出事件到此接口。
+    ACCESS_EVENT_INGEST_MODE=stream 时只校验并写入缓冲队列，由消费任务批量写库
+    （去重在写库时进行）；队列不可用或积压超限时同步写库
     """
     # 验证API Key
     if x_api_key != settings.ACCESS_CONTROL_API_KEY:
@@ -56,72 +56,53 @@ async def receive_access_event(
             message="API Key无效"
         )
     
-    # 尝试匹配工人
-    worker_id = None
-    if event.worker_external_id:
+    if settings.ACCESS_EVENT_INGEST_MODE == "stream":
         try:
-            worker_id = uuid.UUID(event.worker_external_id)
+            uuid.UUID(event.site_id)
         except ValueError:
-            pass
-    elif event.face_id:
-        # 通过人脸ID匹配
-        result = await db.execute(
-            select(Worker).where(Worker.face_id == event.face_id)
-        )
-        worker = result.scalar_one_or_none()
-        if worker:
-            worker_id = worker.worker_id
-    elif event.id_no:
-        # 通过身份证号匹配
-        result = await db.execute(
-            select(Worker).where(Worker.id_no == event.id_no)
+            return error_response(
+                code=ErrorCode.VALIDATION_ERROR,
+                message="site_id无效"
+            )
+        
+        message_id = await AccessEventStream().append(event.model_dump(mode="json"))
+        if message_id:
+            return success_response({
+                "message_id": message_id,
+                "status": "queued"
+            })
+    
+    # 人员匹配走人员身份缓存；P1-1: 去重 - 唯一约束冲突的事件不写入
+    service = AccessEventService(db)
+    event_data = event.model_dump()
+    try:
+        [worker_id] = await service.resolve_workers([event_data])
+        row = service.build_row(event_data, worker_id)
+    except ValueError:
+        return error_response(
+            code=ErrorCode.VALIDATION_ERROR,
+            message="site_id无效"
         )
-        worker = result.scalar_one_or_none()
-        if worker:
-            worker_id = worker.worker_id
     
-    # 尝试匹配区域
-    area_id = None
-    if event.area_id:
-        try:
-            area_id = uuid.UUID(event.area_id)
-        except ValueError:
-            pass
+    result = await service.bulk_insert([row])
+    await db.commit()
     
-    # P1-1: 去重 - 创建事件记录
-    try:
-        access_event = AccessEvent(
-            vendor_event_id=event.event_id,
-            device_id=event.device_id,
-            device_name=event.device_name,
-            worker_id=worker_id,
-            area_id=area_id,
-            site_id=uuid.UUID(event.site_id),
-            event_time=event.event_time,
-            direction=event.direction,
-            result=event.result,
-            reason_code=event.reason_code,
-            reason_message=event.reason_message,
-            face_photo_url=event.face_photo_url,
-            face_id=event.face_id,
-            confidence=event.confidence
+    if result["errors"]:
+        return error_response(
+            code=ErrorCode.NOT_FOUND,
+            message="工地不存在"
         )
-        
-        db.add(access_event)
-        await db.commit()
-        
-        return success_response({
-            "event_id": str(access_event.event_id),
-            "status": "created"
-        })
-        
-    except IntegrityError:
-        # P1-1: 唯一约束冲突 = 重复事件，直接忽略
-        await db.rollback()
+    
+    if result["duplicates"]:
         return success_response({
             "status": "duplicate",
             "message": "Event already processed"
         })
+    
+    return success_response({
+        "event_id": str(result["event_ids"][0]),
+        "status": "created"
+    })
 
 
 @router.post("/batch-callback")
@@ -132,6 +113,8 @@ async def receive_batch_events(
 ):
     """
     批量接收门禁事件
+    
+    门禁控制器断网恢复后会一次补传数千条事件，整批在一个事务中写入
     """
     if x_api_key != settings.ACCESS_CONTROL_API_KEY:
         return error_response(
@@ -139,60 +122,45 @@ async def receive_batch_events(
             message="API Key无效"
         )
     
-    created_count = 0
-    duplicate_count = 0
+    # 人员按 人员ID/人脸ID/身份证号 经人员身份缓存批量匹配；
+    # 一条多行 INSERT ... ON CONFLICT DO NOTHING RETURNING：重复事件只跳过自身，
+    # 不影响同批其他事件；重复数由返回行数得出
+    service = AccessEventService(db)
+    rows = []
     error_count = 0
     
-    for event in events:
+    event_data = [event.model_dump() for event in events]
+    worker_ids = await service.resolve_workers(event_data)
+    
+    for data, worker_id in zip(event_data, worker_ids):
         try:
-            # 尝试匹配工人
-            worker_id = None
-            if event.worker_external_id:
-                try:
-                    worker_id = uuid.UUID(event.worker_external_id)
-                except ValueError:
-                    pass
-            
-            # 尝试匹配区域
-            area_id = None
-            if event.area_id:
-                try:
-                    area_id = uuid.UUID(event.area_id)
-                except ValueError:
-                    pass
-            
-            access_event = AccessEvent(
-                vendor_event_id=event.event_id,
-                device_id=event.device_id,
-                device_name=event.device_name,
-                worker_id=worker_id,
-                area_id=area_id,
-                site_id=uuid.UUID(event.site_id),
-                event_time=event.event_time,
-                direction=event.direction,
-                result=event.result,
-                reason_code=event.reason_code,
-                reason_message=event.reason_message,
-                face_photo_url=event.face_photo_url,
-                face_id=event.face_id,
-                confidence=event.confidence
-            )
-            
-            db.add(access_event)
-            await db.flush()
-            created_count += 1
-            
-        except IntegrityError:
-            await db.rollback()
-            duplicate_count += 1
-        except Exception:
+            rows.append(service.build_row(data, worker_id))
+        except ValueError:
             error_count += 1
     
+    result = await service.bulk_insert(rows)
     await db.commit()
     
     return success_response({
-        "created": created_count,
-        "duplicates": duplicate_count,
-        "errors": error_count
+        "created": result["created"],
+        "duplicates": result["duplicates"],
+        "errors": error_count + result["errors"]
     })
 
+
+@router.get("/ingest-stats")
+async def get_ingest_stats(
+    x_api_key: str = Header(None)
+):
+    """
+    门禁事件缓冲队列深度（背压监控）
+    
+    length 接近 max_backlog 时回调将改为同步写库
+    """
+    if x_api_key != settings.ACCESS_CONTROL_API_KEY:
+        return error_response(
+            code=ErrorCode.AUTH_FAILED,
+            message="API Key无效"
+        )
+    
+    return success_response(await AccessEventStream().get_stats())
@@ -15,6 +15,7 @@ from app.models import Worker
 from app.adapters.wechat_adapter import WechatAdapter
 from app.adapters.realname_adapter import RealnameAdapter
 from app.utils.response import success_response, error_response, ErrorCode
+from app.utils.principal_cache import invalidate_principal
 
 router = APIRouter()
 
@@ -146,6 +147,7 @@ async def bind_worker(
     worker.is_bound = True
     
     await db.commit()
+    await invalidate_principal("worker", worker.worker_id)
     
     # 5. 生成session_token
     token = create_mp_session_token(request.openid, worker.worker_id)
@@ -4,12 +4,12 @@
 import uuid
 
 from fastapi import Request, HTTPException, Depends
-from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core.database import get_db
-from app.core.security import decode_access_token
+from app.core.security import get_request_token_payload
 from app.models import Worker
+from app.utils.principal_cache import principal_cache
 
 
 async def get_current_worker(
@@ -26,10 +26,8 @@ async def get_current_worker(
     if not auth_header or not auth_header.startswith("Bearer "):
         raise HTTPException(status_code=401, detail="未认证")
     
-    token = auth_header.split(" ")[1]
-    
-    # 解析Token
-    payload = decode_access_token(token)
+    # 解析Token（租户中间件已解码时直接复用）
+    payload = get_request_token_payload(request)
     if not payload:
         raise HTTPException(status_code=401, detail="令牌无效")
     
@@ -41,11 +39,8 @@ async def get_current_worker(
     if not worker_id:
         raise HTTPException(status_code=401, detail="令牌无效")
     
-    # 获取工人
-    result = await db.execute(
-        select(Worker).where(Worker.worker_id == uuid.UUID(worker_id))
-    )
-    worker = result.scalar_one_or_none()
+    # 获取工人（认证主体缓存，心跳等高频接口不必每次查库）
+    worker = await principal_cache.get(db, Worker, uuid.UUID(worker_id))
     
     if not worker:
         raise HTTPException(status_code=401, detail="用户不存在")
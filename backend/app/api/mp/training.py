@@ -18,6 +18,7 @@ from app.models import (
 )
 from app.api.mp.deps import get_current_worker
 from app.adapters.face_verify_adapter import FaceVerifyAdapter
+from app.services.daily_metrics_service import DailyMetricsService
 from app.utils.response import success_response, error_response, ErrorCode
 from app.utils.progress_validator import (
     TrainingProgressValidator, RandomCheckScheduler, ProgressData
@@ -187,6 +188,9 @@ async def start_session(
     # 更新日票工人状态
     if dtw.training_status == "NOT_STARTED":
         dtw.training_status = "IN_LEARNING"
+        await DailyMetricsService(db).training_status_changed(
+            dtw.daily_ticket_id, "NOT_STARTED", dtw.training_status
+        )
     
     await db.commit()
     
@@ -310,6 +314,9 @@ async def report_progress(
         session.status = "COMPLETED"
         session.ended_at = datetime.now()
         
+        metrics_service = DailyMetricsService(db)
+        await metrics_service.session_completed(session)
+        
         # 更新日票工人状态
         dtw_result = await db.execute(
             select(DailyTicketWorker).where(
@@ -320,6 +327,7 @@ async def report_progress(
         dtw = dtw_result.scalar_one_or_none()
         
         if dtw:
+            old_status = dtw.training_status
             dtw.completed_video_count += 1
             
             # 检查是否所有视频都完成
@@ -334,6 +342,10 @@ async def report_progress(
                     current_worker.worker_id
                 )
                 dtw.authorized = True
+            
+            await metrics_service.training_status_changed(
+                dtw.daily_ticket_id, old_status, dtw.training_status, videos_completed=1
+            )
     
     await db.commit()
     
@@ -41,6 +41,13 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24  # 24小时
     
+    # 认证主体缓存配置
+    PRINCIPAL_CACHE_ENABLED: bool = True  # 认证依赖缓存用户/工人（不必每个请求查库）
+    PRINCIPAL_CACHE_LOCAL_TTL: int = 30  # 进程内缓存有效期（秒），Redis 不可用时即为变更生效的最长延迟
+    PRINCIPAL_CACHE_REDIS_TTL: int = 300  # Redis 缓存有效期（秒）
+    PRINCIPAL_CACHE_CHECK_SECONDS: int = 2  # 跨进程失效检查间隔（秒）
+    PRINCIPAL_CACHE_MAX_ENTRIES: int = 10000  # 每个进程的缓存条目上限（超出淘汰最久未使用）
+    
     # 微信小程序配置
     WECHAT_APPID: str = ""
     WECHAT_SECRET: str = ""
@@ -57,6 +64,22 @@ class Settings(BaseSettings):
     ACCESS_CONTROL_API_KEY: str = ""
     ACCESS_CONTROL_SUPPORTS_TIME_WINDOW: bool = False
     ACCESS_CONTROL_SUPPORTS_QUERY: bool = False
+    ACCESS_CONTROL_SUPPORTS_BATCH: bool = False  # 门禁是否提供批量授权接口（否则逐条推送）
+    ACCESS_CONTROL_BATCH_SIZE: int = 100  # 批量授权：单次请求的授权数
+    ACCESS_CONTROL_RATE_LIMIT: float = 0  # 门禁接口每秒请求数上限（每个进程），0 表示不限
+    
+    # 第三方接口熔断配置（门禁）
+    CIRCUIT_FAILURE_THRESHOLD: int = 5  # 连续失败N次后熔断
+    CIRCUIT_RECOVERY_TIMEOUT: int = 60  # 熔断冷却时长（秒），之后放行一个探测请求
+    CIRCUIT_MIN_CONCURRENCY: int = 1  # AIMD 并发下限（上限为 ACCESS_PUSH_CONCURRENCY）
+    CIRCUIT_DECREASE_FACTOR: float = 0.5  # 失败时并发数乘以该系数
+    
+    # 第三方接口连接池（门禁/人脸/微信/实名制共用配置，各自独立连接池）
+    ADAPTER_HTTP_MAX_CONNECTIONS: int = 100  # 单个第三方系统最大连接数
+    ADAPTER_HTTP_MAX_KEEPALIVE: int = 20  # 保持的空闲长连接数
+    ADAPTER_HTTP_KEEPALIVE_EXPIRY: float = 30.0  # 空闲长连接保持时长（秒）
+    ADAPTER_HTTP_CONNECT_TIMEOUT: float = 5.0  # 建连超时（秒）
+    ADAPTER_HTTP2: bool = True  # 安装 h2 时启用 HTTP/2
     
     # 人脸识别配置
     FACE_VERIFY_API_URL: str = ""
@@ -94,6 +117,62 @@ class Settings(BaseSettings):
     
     # 门禁同步配置
     ACCESS_SYNC_RETRY_INTERVALS: List[int] = [60, 300, 1800, 7200]  # 重试间隔：1m/5m/30m/2h
+    ACCESS_PUSH_CONCURRENCY: int = 10  # 批量推送/重试：单个任务内同时在途的门禁请求数
+    ACCESS_SYNC_BATCH_MIN: int = 50  # 同步重试：每批最少取出的授权数
+    ACCESS_SYNC_BATCH_MAX: int = 1000  # 同步重试：每批最多取出的授权数
+    ACCESS_SYNC_LEASE_SECONDS: int = 300  # 推送租约最短时长（秒），实际按领取数量、请求超时和并发数推算
+    ACCESS_SYNC_TIME_BUDGET: int = 50  # 同步重试：单次任务处理时长上限（秒），应小于调度间隔
+    ACCESS_PUSH_COALESCE_SECONDS: int = 2  # 推送合并窗口：窗口内新建的授权合并为一次批量推送
+    ACCESS_PUSH_COALESCE_MAX: int = 500  # 推送合并：每轮从待推送集合取出的授权数
+    ACCESS_REVOKE_BATCH_SIZE: int = 100  # 批量撤销：每个任务处理的授权数
+    ACCESS_REVOKE_CONCURRENCY: int = 10  # 批量撤销：单个任务内并发调用门禁接口数
+    ACCESS_RECONCILE_PAGE_SIZE: int = 1000  # 二级对账：本系统/门禁侧每页读取的权限数（流式比对）
+    ACCESS_RECONCILE_CONCURRENCY: int = 4  # 二级对账：同时对账的工地数
+    ACCESS_RECONCILE_AUTO_REPAIR: bool = False  # 二级对账：自动补推门禁缺失的授权、撤销门禁多出的授权
+    ACCESS_RECONCILE_REPAIR_MAX: int = 1000  # 自动修复：单个工地差异超过该数量时不修复（疑似门禁数据异常），只告警
+    
+    # 门禁事件配置
+    ACCESS_EVENT_INSERT_CHUNK: int = 1000  # 批量回调：单条多行 INSERT 的事件数（asyncpg 单语句参数上限 32767）
+    ACCESS_EVENT_INGEST_MODE: str = "sync"  # 单条回调写入方式: sync（请求内写库）/ stream（写入 Redis Stream，由消费任务批量写库）
+    ACCESS_EVENT_STREAM_MAX_BACKLOG: int = 100000  # 缓冲队列积压上限，超过后回调改为同步写库（背压）
+    ACCESS_EVENT_CONSUMER_BATCH: int = 500  # 消费任务：每个微批读取的事件数
+    ACCESS_EVENT_CONSUMER_BLOCK_MS: int = 1000  # 消费任务：队列为空时阻塞等待时长（毫秒）
+    ACCESS_EVENT_CONSUMER_TIME_BUDGET: int = 4  # 消费任务：单次处理时长上限（秒），应小于调度间隔（5秒）
+    ACCESS_EVENT_CLAIM_IDLE_MS: int = 60000  # 消费者崩溃后，未确认消息超过该时长由其他消费者接管（毫秒）
+    WORKER_IDENTITY_CACHE_TTL: int = 600  # 人员身份缓存（事件匹配人员）条目有效期（秒）
+    WORKER_IDENTITY_CACHE_CHECK_SECONDS: int = 2  # 人员身份缓存：跨进程失效检查间隔（秒）
+    WORKER_IDENTITY_CACHE_MAX_ENTRIES: int = 200000  # 人员身份缓存：每个进程的条目上限
+    
+    # 分区配置
+    PARTITION_PREMAKE_MONTHS: int = 3  # 按月分区表：预建未来N个月的分区
+    ACCESS_EVENT_PARTITION_DETACH_MONTHS: int = 0  # 进出记录：分离早于N个月前的分区（分离后由归档任务处理），0 表示不分离
+    
+    # 日票物化配置
+    DAILY_TICKET_HORIZON_DAYS: int = 0  # 滚动物化：只生成未来N天（含当天）的日票，由夜间任务逐日补齐；0 表示发布时生成全部日期
+    
+    # 报表预聚合配置
+    REPORT_METRICS_REBUILD_DAYS: int = 3  # 夜间回填重算最近N天（含当天）
+    
+    # 分页配置
+    PAGINATION_COUNT_CAP: int = 10000  # 估算总数模式（count_mode=estimate）：最多精确计数的行数
+    
+    # 导出配置
+    EXPORT_MAX_ROWS: int = 100000  # 明细类报表单次导出行数上限（流式输出）
+    EXPORT_STORAGE_BACKEND: str = "local"  # 异步导出文件存储：local / minio
+    EXPORT_LOCAL_DIR: str = "uploads"  # 本地存储根目录（文件位于 exports/ 子目录）
+    EXPORT_DOWNLOAD_URL_EXPIRE_SECONDS: int = 3600  # MinIO 预签名下载地址有效期
+    EXPORT_PROGRESS_INTERVAL: int = 5000  # 每写入N行回写一次进度
+    EXPORT_JOB_TIME_LIMIT: int = 3600  # 异步导出任务超时（秒）
+    EXPORT_JOB_RETENTION_HOURS: int = 24  # 导出任务及文件保留时长
+    
+    # 冷数据归档配置
+    ARCHIVE_ENABLED: bool = False  # 是否开启夜间归档（导出到归档文件后删除源数据）
+    ARCHIVE_RETENTION_DAYS: dict = {"access_event": 180, "audit_log": 365}  # 各表在线保留天数，更早的数据归档；0 表示不归档
+    ARCHIVE_STORAGE_BACKEND: str = "local"  # 归档文件存储：local（EXPORT_LOCAL_DIR/archive）/ minio
+    ARCHIVE_FETCH_SIZE: int = 5000  # 导出时每次从游标读取的行数
+    ARCHIVE_DELETE_BATCH: int = 5000  # 导出后按主键分批删除，每批行数（每批独立提交，避免长事务）
+    ARCHIVE_MAX_DAYS_PER_RUN: int = 31  # 每次运行每张表最多归档的天数（首次开启时分多晚追平）
+    ARCHIVE_READ_MAX_ROWS: int = 50000  # 查询接口读取归档数据时的匹配行数上限
     
     class Config:
         env_file = ".env"
@@ -1,6 +1,7 @@
 """
 数据库配置
 """
+from datetime import date
 from typing import AsyncGenerator
 
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
@@ -52,8 +53,12 @@ async def init_db() -> None:
     """初始化数据库（创建表）"""
     from app.models import Base
     
+    from app.utils.partitions import ensure_partitions
+    
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        # 新库由 create_all 建出的分区主表没有分区，启动时补齐
+        await ensure_partitions(conn, date.today(), settings.PARTITION_PREMAKE_MONTHS)
 
 
 async def close_db() -> None:
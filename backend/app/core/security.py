@@ -100,6 +100,29 @@ def decode_access_token(token: str) -> dict[str, Any] | None:
         return None
 
 
+_UNSET = object()
+
+
+def get_request_token_payload(request) -> dict[str, Any] | None:
+    """
+    解析请求 Authorization 头中的 Bearer 令牌
+
+    每个请求只解码一次：结果保存在 request.state（中间件与依赖注入共用），
+    无令牌或令牌无效时返回 None
+    """
+    payload = getattr(request.state, "token_payload", _UNSET)
+    if payload is not _UNSET:
+        return payload
+
+    payload = None
+    auth_header = request.headers.get("Authorization")
+    if auth_header and auth_header.startswith("Bearer "):
+        payload = decode_access_token(auth_header.split(" ")[1])
+
+    request.state.token_payload = payload
+    return payload
+
+
 def create_mp_session_token(openid: str, worker_id: uuid.UUID) -> str:
     """
     创建小程序会话令牌
@@ -10,6 +10,7 @@ from fastapi.responses import JSONResponse
 
 from app.core.config import settings
 from app.core.database import init_db, close_db
+from app.adapters.http_client import init_http_clients, close_http_clients
 from app.middleware.tenant import TenantMiddleware
 from app.api import api_router
 from app.utils.response import error_response, ErrorCode
@@ -30,11 +31,13 @@ async def lifespan(app: FastAPI):
     logger.info("Starting application...")
     await init_db()
     logger.info("Database initialized")
+    await init_http_clients()
     
     yield
     
     # 关闭时
     logger.info("Shutting down application...")
+    await close_http_clients()
     await close_db()
     logger.info("Database closed")
 
@@ -117,15 +117,10 @@ class TenantMiddleware(BaseHTTPMiddleware):
             _tenant_context.set(None)
     
     async def _get_user_from_token(self, request: Request) -> Optional[dict]:
-        """从JWT Token中解析用户信息"""
-        from app.core.security import decode_access_token
+        """从JWT Token中解析用户信息（解码结果保存在 request.state，认证依赖复用）"""
+        from app.core.security import get_request_token_payload
         
-        auth_header = request.headers.get("Authorization")
-        if not auth_header or not auth_header.startswith("Bearer "):
-            return None
-        
-        token = auth_header.split(" ")[1]
-        payload = decode_access_token(token)
+        payload = get_request_token_payload(request)
         
         if not payload:
             return None
@@ -271,6 +266,27 @@ class TenantQueryFilter:
             logger.warning(f"Failed to apply tenant filter: {e}")
             return query
     
+    @staticmethod
+    def allows(site_id: Optional[uuid.UUID], tenant_ctx: Optional[TenantContext] = None) -> bool:
+        """
+        内存数据（如归档文件中的行）是否通过租户过滤，规则与 apply 一致
+
+        Args:
+            site_id: 数据所属site ID
+            tenant_ctx: 租户上下文（默认从ContextVar获取）
+        """
+        if tenant_ctx is None:
+            tenant_ctx = get_tenant_context()
+
+        if tenant_ctx is None or tenant_ctx.is_sys_admin:
+            return True
+
+        accessible_sites = tenant_ctx.get_site_filter()
+        if not accessible_sites:
+            return True
+
+        return site_id in accessible_sites
+
     @staticmethod
     def check_access(site_id: uuid.UUID) -> bool:
         """
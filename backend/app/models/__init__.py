@@ -21,6 +21,10 @@ from .notification_log import NotificationLog
 from .audit_log import AuditLog
 from .sys_user import SysUser
 from .alert import Alert
+from .daily_site_metrics import DailySiteMetrics
+from .export_job import ExportJob
+from .access_reconcile_diff import AccessReconcileDiff
+from .archive_segment import ArchiveSegment
 
 __all__ = [
     "Base",
@@ -45,5 +49,9 @@ __all__ = [
     "AuditLog",
     "SysUser",
     "Alert",
+    "DailySiteMetrics",
+    "ExportJob",
+    "AccessReconcileDiff",
+    "ArchiveSegment",
 ]
 
@@ -1,5 +1,6 @@
 """
 进出记录模型 (P1-1调整: 去重约束)
+按 event_time 月范围分区（见 app/utils/partitions.py）
 """
 import uuid
 from datetime import datetime
@@ -22,6 +23,7 @@ class AccessEvent(Base, TimestampMixin):
     - 门禁设备上报的进出事件
     - 支持事件去重（避免重复记录）
     - 记录拒绝原因码（用于追溯）
+    - 按 event_time 月范围分区：主键与唯一约束均包含分区键
     """
     __tablename__ = "access_event"
     
@@ -32,11 +34,10 @@ class AccessEvent(Base, TimestampMixin):
         default=generate_uuid
     )
     
-    # 门禁侧事件ID (P1-1: 优先用于去重)
+    # 门禁侧事件ID (P1-1: 优先用于去重，唯一约束含分区键 event_time)
     vendor_event_id: Mapped[str | None] = mapped_column(
         String(128), 
         nullable=True,
-        unique=True,
         comment="门禁系统事件ID"
     )
     
@@ -78,8 +79,9 @@ class AccessEvent(Base, TimestampMixin):
     # 事件信息
     event_time: Mapped[datetime] = mapped_column(
         DateTime(timezone=True),
+        primary_key=True,  # 分区键，须包含在主键中
         nullable=False,
-        comment="事件时间"
+        comment="事件时间（分区键）"
     )
     direction: Mapped[str | None] = mapped_column(
         String(10), 
@@ -134,6 +136,11 @@ class AccessEvent(Base, TimestampMixin):
     
     # 约束和索引 (P1-1: 去重)
     __table_args__ = (
+        # 门禁事件ID去重（分区表的唯一约束须包含分区键）
+        UniqueConstraint(
+            "vendor_event_id", "event_time",
+            name="uq_event_vendor_event_id"
+        ),
         # 兜底去重约束（device_id + worker_id + event_time + direction）
         UniqueConstraint(
             "device_id", "worker_id", "event_time", "direction",
@@ -144,6 +151,9 @@ class AccessEvent(Base, TimestampMixin):
         Index("idx_event_worker_time", "worker_id", "event_time"),
         Index("idx_event_result", "result", "event_time"),
         Index("idx_event_reason", "reason_code"),
+        # 游标分页 (event_time, event_id)
+        Index("idx_event_time_id", "event_time", "event_id"),
+        {"postgresql_partition_by": "RANGE (event_time)"},
     )
     
     def __repr__(self) -> str:
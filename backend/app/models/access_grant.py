@@ -5,7 +5,7 @@ import uuid
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import String, Integer, Text, ForeignKey, UniqueConstraint, Index, DateTime, CheckConstraint
+from sqlalchemy import String, Integer, Text, ForeignKey, UniqueConstraint, Index, DateTime, CheckConstraint, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -97,6 +97,13 @@ class AccessGrant(Base, TimestampMixin):
         comment="同步错误信息"
     )
     
+    # 推送租约：领取推送的 worker 持有至该时间，期间其他 worker 不会重复领取
+    sync_lease_until: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+        comment="推送租约到期时间"
+    )
+    
     # 门禁侧返回的ID (P1-1: 幂等键)
     vendor_ref: Mapped[str | None] = mapped_column(
         String(128), 
@@ -144,6 +151,11 @@ class AccessGrant(Base, TimestampMixin):
         Index("idx_grant_sync_status", "status", "created_at"),
         Index("idx_grant_worker", "worker_id"),
         Index("idx_grant_valid_time", "valid_from", "valid_to"),
+        # 二级对账：按 (worker_id, area_id) 有序流式读取已同步授权
+        Index(
+            "idx_grant_reconcile_order", "site_id", "worker_id", "area_id",
+            postgresql_where=text("status = 'SYNCED'")
+        ),
     )
     
     @property
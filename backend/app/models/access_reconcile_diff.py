@@ -0,0 +1,86 @@
+"""
+门禁权限对账差异模型
+"""
+import uuid
+
+from sqlalchemy import String, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base, CreatedAtMixin, generate_uuid
+
+
+class AccessReconcileDiff(Base, CreatedAtMixin):
+    """
+    门禁权限对账差异表
+    - 二级对账（与门禁系统比对）每次运行的差异明细，只追加写入
+    - MISSING_IN_VENDOR: 本系统已同步、门禁侧没有
+    - EXTRA_IN_VENDOR: 门禁侧有、本系统没有对应的已同步授权
+    - 开启自动修复时记录已投递的修复动作
+    """
+    __tablename__ = "access_reconcile_diff"
+
+    # 主键
+    diff_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=generate_uuid
+    )
+
+    # 对账批次（同一次 reconcile_with_vendor 运行共用）
+    run_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        nullable=False,
+        comment="对账批次ID"
+    )
+
+    # 外键 - 所属工地 (P0-7: 多租户)
+    site_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("site.site_id", ondelete="CASCADE"),
+        nullable=False
+    )
+
+    diff_type: Mapped[str] = mapped_column(
+        String(20),
+        nullable=False,
+        comment="差异类型: MISSING_IN_VENDOR/EXTRA_IN_VENDOR"
+    )
+
+    # 差异权限（门禁侧返回的ID不一定是UUID，按字符串保存）
+    worker_id: Mapped[str] = mapped_column(
+        String(64),
+        nullable=False,
+        comment="人员ID"
+    )
+    area_id: Mapped[str] = mapped_column(
+        String(64),
+        nullable=False,
+        comment="区域ID"
+    )
+    vendor_ref: Mapped[str | None] = mapped_column(
+        String(128),
+        nullable=True,
+        comment="门禁系统授权ID"
+    )
+    grant_id: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True),
+        nullable=True,
+        comment="本系统授权ID（MISSING_IN_VENDOR）"
+    )
+
+    # 自动修复
+    repair_action: Mapped[str | None] = mapped_column(
+        String(16),
+        nullable=True,
+        comment="已投递的修复动作: REPUSH/REVOKE，未修复为空"
+    )
+
+    # 索引
+    __table_args__ = (
+        Index("idx_reconcile_diff_run_site", "run_id", "site_id"),
+        Index("idx_reconcile_diff_site_time", "site_id", "created_at"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<AccessReconcileDiff(diff_id={self.diff_id}, diff_type={self.diff_type})>"
@@ -3,7 +3,7 @@
 """
 import uuid
 from datetime import datetime
-from sqlalchemy import String, Text, ForeignKey, DateTime, Boolean
+from sqlalchemy import String, Text, ForeignKey, DateTime, Boolean, Index
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import UUID
 
@@ -106,4 +106,10 @@ class Alert(Base, TimestampMixin):
         nullable=True,
         comment="解决说明"
     )
+    
+    # 索引
+    __table_args__ = (
+        # 游标分页 (created_at, alert_id)
+        Index("idx_alert_created_id", "created_at", "alert_id"),
+    )
 
@@ -0,0 +1,99 @@
+"""
+冷数据归档清单模型
+"""
+import uuid
+from datetime import datetime
+
+from sqlalchemy import String, Integer, BigInteger, DateTime, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base, TimestampMixin, generate_uuid
+
+
+class ArchiveSegment(Base, TimestampMixin):
+    """
+    冷数据归档清单表
+    - 每个归档文件一行：来源表、时间范围、行数、存储位置、校验和
+    - 导出完成后状态为 EXPORTED，源表数据删除完成后为 PURGED
+    - 查询接口按表名和时间范围查找归档文件，透明合并冷数据
+    """
+    __tablename__ = "archive_segment"
+
+    # 主键
+    segment_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=generate_uuid
+    )
+
+    # 归档范围
+    table_name: Mapped[str] = mapped_column(
+        String(64),
+        nullable=False,
+        comment="逻辑表名: access_event/audit_log"
+    )
+    source_table: Mapped[str] = mapped_column(
+        String(64),
+        nullable=False,
+        comment="实际导出的表（已分离的分区为分区表名）"
+    )
+    range_start: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        comment="时间范围起点（含）"
+    )
+    range_end: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        nullable=False,
+        comment="时间范围终点（不含）"
+    )
+    row_count: Mapped[int] = mapped_column(
+        Integer,
+        nullable=False,
+        default=0,
+        comment="行数"
+    )
+
+    # 归档文件
+    file_format: Mapped[str] = mapped_column(
+        String(16),
+        nullable=False,
+        comment="文件格式: jsonl.gz"
+    )
+    storage_backend: Mapped[str] = mapped_column(
+        String(16),
+        nullable=False,
+        comment="存储后端: local/minio"
+    )
+    storage_key: Mapped[str] = mapped_column(
+        String(512),
+        nullable=False,
+        comment="存储路径"
+    )
+    file_size: Mapped[int] = mapped_column(
+        BigInteger,
+        nullable=False,
+        default=0,
+        comment="文件大小（字节）"
+    )
+    checksum: Mapped[str] = mapped_column(
+        String(64),
+        nullable=False,
+        comment="文件 SHA-256"
+    )
+
+    status: Mapped[str] = mapped_column(
+        String(16),
+        nullable=False,
+        default="EXPORTED",
+        comment="状态: EXPORTED（已导出）/PURGED（源数据已删除）"
+    )
+
+    # 索引
+    __table_args__ = (
+        Index("idx_archive_segment_range", "table_name", "range_start", "range_end"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<ArchiveSegment(table={self.table_name}, range_start={self.range_start}, rows={self.row_count})>"
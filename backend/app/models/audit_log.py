@@ -126,7 +126,8 @@ class AuditLog(Base, CreatedAtMixin):
         Index("idx_audit_site_action", "site_id", "action"),
         Index("idx_audit_operator", "operator_id"),
         Index("idx_audit_resource", "resource_type", "resource_id"),
-        Index("idx_audit_created", "created_at"),
+        # 时间排序及游标分页 (created_at, log_id)
+        Index("idx_audit_created_id", "created_at", "log_id"),
     )
     
     def __repr__(self) -> str:
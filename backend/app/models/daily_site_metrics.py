@@ -0,0 +1,84 @@
+"""
+工地每日指标汇总模型（报表预聚合）
+"""
+import uuid
+from datetime import date
+
+from sqlalchemy import Integer, Float, Date, ForeignKey, UniqueConstraint, Index, text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base, TimestampMixin, generate_uuid
+
+
+class DailySiteMetrics(Base, TimestampMixin):
+    """
+    工地每日指标汇总表
+    - 按 工地 + 日期 预聚合培训/授权/进出计数，报表直接读取，避免扫描明细表
+    - 由培训、授权、进出事件写入路径增量累加
+    - 每晚由 Celery 任务按明细表重算近几日数据，纠正增量误差
+
+    日期口径与原报表一致：
+    - 培训类指标按日票日期（daily_ticket.date）
+    - 授权类指标按授权创建日期（access_grant.created_at）
+    - 进出类指标按事件时间（access_event.event_time）
+    """
+    __tablename__ = "daily_site_metrics"
+
+    # 主键
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=generate_uuid,
+        server_default=text("gen_random_uuid()")
+    )
+
+    # 外键 - 所属工地
+    site_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("site.site_id", ondelete="CASCADE"),
+        nullable=False
+    )
+
+    # 统计日期
+    metric_date: Mapped[date] = mapped_column(
+        Date,
+        nullable=False,
+        comment="统计日期"
+    )
+
+    # 培训人数（仅统计 ACTIVE 的日票人员）
+    worker_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", comment="培训总人数")
+    not_started_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", comment="未开始人数")
+    in_learning_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", comment="学习中人数")
+    completed_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", comment="已完成人数")
+    failed_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", comment="失败人数")
+    videos_required: Mapped[int] = mapped_column(Integer, default=0, server_default="0", comment="需学习视频总数")
+    videos_completed: Mapped[int] = mapped_column(Integer, default=0, server_default="0", comment="已完成视频总数")
+
+    # 培训时长（平均时长 = training_seconds / training_session_count）
+    training_session_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", comment="已完成学习会话数")
+    training_seconds: Mapped[float] = mapped_column(Float, default=0, server_default="0", comment="已完成学习会话总时长(秒)")
+
+    # 授权（按状态）
+    grant_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", comment="授权总数")
+    grant_pending_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", comment="待同步授权数")
+    grant_synced_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", comment="已同步授权数")
+    grant_failed_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", comment="同步失败授权数")
+    grant_revoked_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", comment="已撤销授权数")
+    sync_seconds: Mapped[float] = mapped_column(Float, default=0, server_default="0", comment="已同步授权的同步耗时合计(秒)")
+    sync_attempts: Mapped[int] = mapped_column(Integer, default=0, server_default="0", comment="同步尝试次数合计")
+    max_sync_attempts: Mapped[int] = mapped_column(Integer, default=0, server_default="0", comment="单条授权最大同步尝试次数")
+
+    # 进出事件
+    pass_event_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", comment="通过事件数")
+    deny_event_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0", comment="拒绝事件数")
+
+    # 约束和索引
+    __table_args__ = (
+        UniqueConstraint("site_id", "metric_date", name="uq_site_metrics_site_date"),
+        Index("idx_site_metrics_date", "metric_date"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<DailySiteMetrics(site_id={self.site_id}, metric_date={self.metric_date})>"
@@ -0,0 +1,119 @@
+"""
+异步导出任务模型
+"""
+import uuid
+from datetime import datetime
+from typing import Any
+
+from sqlalchemy import String, Text, Integer, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID, JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from .base import Base, TimestampMixin, generate_uuid
+
+
+class ExportJob(Base, TimestampMixin):
+    """
+    异步导出任务表
+    - 提交后由 Celery export 队列生成文件，写入本地目录或 MinIO
+    - 生成过程中定期回写已写入行数，供前端轮询进度
+    - 提交时记录租户上下文快照，任务执行时按同样的权限范围查询
+    """
+    __tablename__ = "export_job"
+
+    # 主键
+    job_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=generate_uuid
+    )
+
+    # 提交人
+    created_by: Mapped[uuid.UUID | None] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("sys_user.user_id", ondelete="SET NULL"),
+        nullable=True,
+        comment="提交人ID"
+    )
+
+    # 导出内容
+    export_type: Mapped[str] = mapped_column(
+        String(32),
+        nullable=False,
+        comment="导出类型: training/access-sync/access-events/reconciliation/tickets"
+    )
+    file_format: Mapped[str] = mapped_column(
+        String(8),
+        nullable=False,
+        default="xlsx",
+        comment="文件格式: xlsx/csv"
+    )
+    params: Mapped[dict[str, Any] | None] = mapped_column(
+        JSONB,
+        nullable=True,
+        comment="导出参数（筛选条件）"
+    )
+    tenant_scope: Mapped[dict[str, Any] | None] = mapped_column(
+        JSONB,
+        nullable=True,
+        comment="提交时的租户上下文快照"
+    )
+
+    # 执行状态
+    status: Mapped[str] = mapped_column(
+        String(16),
+        nullable=False,
+        default="PENDING",
+        comment="状态: PENDING/RUNNING/SUCCESS/FAILED"
+    )
+    rows_written: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        comment="已写入行数"
+    )
+    error_msg: Mapped[str | None] = mapped_column(
+        Text,
+        nullable=True,
+        comment="失败原因"
+    )
+    started_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+        comment="开始执行时间"
+    )
+    finished_at: Mapped[datetime | None] = mapped_column(
+        DateTime(timezone=True),
+        nullable=True,
+        comment="完成时间"
+    )
+
+    # 结果文件
+    file_name: Mapped[str | None] = mapped_column(
+        String(255),
+        nullable=True,
+        comment="下载文件名"
+    )
+    storage_backend: Mapped[str | None] = mapped_column(
+        String(16),
+        nullable=True,
+        comment="存储后端: local/minio"
+    )
+    storage_key: Mapped[str | None] = mapped_column(
+        String(512),
+        nullable=True,
+        comment="存储路径（本地相对路径或对象名）"
+    )
+    file_size: Mapped[int | None] = mapped_column(
+        Integer,
+        nullable=True,
+        comment="文件大小(字节)"
+    )
+
+    # 索引
+    __table_args__ = (
+        Index("idx_export_job_creator", "created_by", "created_at"),
+        Index("idx_export_job_status", "status"),
+    )
+
+    def __repr__(self) -> str:
+        return f"<ExportJob(job_id={self.job_id}, export_type={self.export_type}, status={self.status})>"
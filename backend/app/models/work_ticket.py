@@ -59,6 +59,13 @@ class WorkTicket(Base, TimestampMixin):
     start_date: Mapped[date] = mapped_column(Date, nullable=False, comment="开始日期")
     end_date: Mapped[date] = mapped_column(Date, nullable=False, comment="结束日期")
     
+    # 日票已物化（已生成）至该日期（滚动物化：夜间任务逐日向后推进）
+    materialized_until: Mapped[date | None] = mapped_column(
+        Date,
+        nullable=True,
+        comment="日票已生成至该日期"
+    )
+    
     # 默认时间配置（可被每日覆盖）
     default_access_start_time: Mapped[time] = mapped_column(
         Time, 
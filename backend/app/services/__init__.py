@@ -3,11 +3,21 @@ from .ticket_service import TicketService
 from .training_service import TrainingService
 from .access_service import AccessService
 from .audit_service import AuditService
+from .report_service import ReportService
+from .daily_metrics_service import DailyMetricsService
+from .export_service import ExportService
+from .access_event_service import AccessEventService
+from .archive_service import ArchiveService
 
 __all__ = [
     "TicketService",
     "TrainingService",
     "AccessService",
     "AuditService",
+    "ReportService",
+    "DailyMetricsService",
+    "ExportService",
+    "AccessEventService",
+    "ArchiveService",
 ]
 
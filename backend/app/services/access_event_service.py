@@ -0,0 +1,323 @@
+"""
+门禁事件服务
+- 回调事件转换为进出记录，按人员ID/人脸ID/身份证号匹配人员（人员身份缓存）
+- 批量写入：多行 INSERT ... ON CONFLICT DO NOTHING RETURNING，
+  重复事件由唯一约束跳过，重复数 = 提交数 - 返回行数
+- 报表预聚合按批累加
+- 缓冲队列（Redis Stream + 消费组）：回调只入队，由消费任务按微批写库
+"""
+from datetime import datetime
+from typing import List, Optional, Tuple
+import json
+import uuid
+import logging
+
+from sqlalchemy import select, literal, union_all
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models import AccessEvent, WorkArea, Site
+from app.services.daily_metrics_service import DailyMetricsService
+from app.utils.worker_identity_cache import worker_identity_cache
+
+logger = logging.getLogger(__name__)
+
+
+# 回调字段 → access_event 列（worker/area/site 单独解析）
+EVENT_FIELD_COLUMNS = {
+    "event_id": "vendor_event_id",
+    "device_id": "device_id",
+    "device_name": "device_name",
+    "event_time": "event_time",
+    "direction": "direction",
+    "result": "result",
+    "reason_code": "reason_code",
+    "reason_message": "reason_message",
+    "face_photo_url": "face_photo_url",
+    "face_id": "face_id",
+    "confidence": "confidence",
+}
+
+
+def _parse_uuid(value: Optional[str]) -> Optional[uuid.UUID]:
+    """解析UUID，格式不合法时返回 None"""
+    if not value:
+        return None
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+
+def _identity_lookup(event: dict) -> Optional[Tuple[uuid.UUID, str, str]]:
+    """事件用于匹配人员的标识 (工地ID, 标识类型, 标识值)，无可用标识时返回 None"""
+    site_id = _parse_uuid(event.get("site_id"))
+    if site_id is None:
+        return None
+    if event.get("worker_external_id"):
+        worker_id = _parse_uuid(event["worker_external_id"])
+        return (site_id, "worker_id", str(worker_id)) if worker_id else None
+    if event.get("face_id"):
+        return (site_id, "face_id", event["face_id"])
+    if event.get("id_no"):
+        return (site_id, "id_no", event["id_no"])
+    return None
+
+
+class AccessEventService:
+    """门禁事件服务"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    @staticmethod
+    def build_row(event: dict, worker_id: Optional[uuid.UUID] = None) -> dict:
+        """
+        回调事件转换为 access_event 行
+
+        Args:
+            event: 回调事件（AccessEventData.model_dump()）
+            worker_id: 已匹配的人员ID（resolve_workers 的结果）
+
+        Raises:
+            ValueError: site_id 不合法
+        """
+        row = {column: event.get(field) for field, column in EVENT_FIELD_COLUMNS.items()}
+        if isinstance(row["event_time"], str):
+            # 缓冲队列中的事件为 JSON（ISO 8601 时间）
+            row["event_time"] = datetime.fromisoformat(row["event_time"])
+        row["event_id"] = uuid.uuid4()
+        row["site_id"] = uuid.UUID(str(event["site_id"]))
+        row["worker_id"] = worker_id
+        row["area_id"] = _parse_uuid(event.get("area_id"))
+        return row
+
+    async def resolve_workers(self, events: List[dict]) -> List[Optional[uuid.UUID]]:
+        """
+        批量匹配人员（匹配顺序 worker_external_id > face_id > id_no，限事件所属工地）
+
+        通过进程内人员身份缓存解析，未命中的标识按类型批量查库
+
+        Returns:
+            与 events 一一对应的人员ID（未匹配为 None）
+        """
+        lookups = [_identity_lookup(e) for e in events]
+        resolved = await worker_identity_cache.resolve(self.db, [l for l in lookups if l])
+        return [resolved.get(l) if l else None for l in lookups]
+
+    async def _existing_refs(self, site_ids: set, area_ids: set) -> Tuple[set, set]:
+        """工地、区域ID中在库中存在的部分（UNION ALL 一次查询）"""
+        queries = [
+            select(literal("site").label("kind"), Site.site_id.label("ref_id"))
+            .where(Site.site_id.in_(site_ids))
+        ]
+        if area_ids:
+            queries.append(
+                select(literal("area").label("kind"), WorkArea.area_id.label("ref_id"))
+                .where(WorkArea.area_id.in_(area_ids))
+            )
+        result = await self.db.execute(union_all(*queries) if len(queries) > 1 else queries[0])
+
+        sites, areas = set(), set()
+        for kind, ref_id in result.all():
+            (sites if kind == "site" else areas).add(ref_id)
+        return sites, areas
+
+    async def bulk_insert(self, rows: List[dict]) -> dict:
+        """
+        批量写入进出记录（不提交，由调用方提交）
+
+        - 工地不存在的事件计为错误；区域不存在时置空，避免单条外键错误导致整批失败
+          （人员ID来自 resolve_workers，已校验存在）
+        - 按 ACCESS_EVENT_INSERT_CHUNK 分片，每片一条多行 INSERT，
+          ON CONFLICT DO NOTHING 跳过重复事件（含同批内重复）
+        - 只对实际写入的事件累加报表计数
+
+        Returns:
+            dict: {"created": int, "duplicates": int, "errors": int,
+                   "event_ids": [实际写入的事件ID]}
+        """
+        if not rows:
+            return {"created": 0, "duplicates": 0, "errors": 0, "event_ids": []}
+
+        sites, areas = await self._existing_refs(
+            {r["site_id"] for r in rows},
+            {r["area_id"] for r in rows if r["area_id"]}
+        )
+
+        valid_rows = []
+        for row in rows:
+            if row["site_id"] not in sites:
+                continue
+            if row["area_id"] not in areas:
+                row["area_id"] = None
+            valid_rows.append(row)
+        error_count = len(rows) - len(valid_rows)
+
+        inserted = []
+        chunk_size = settings.ACCESS_EVENT_INSERT_CHUNK
+        for i in range(0, len(valid_rows), chunk_size):
+            stmt = (
+                pg_insert(AccessEvent)
+                .values(valid_rows[i:i + chunk_size])
+                .on_conflict_do_nothing()
+                .returning(
+                    AccessEvent.event_id,
+                    AccessEvent.site_id,
+                    AccessEvent.event_time,
+                    AccessEvent.result
+                )
+            )
+            result = await self.db.execute(stmt)
+            inserted.extend(result.all())
+
+        # 报表预聚合：进出计数（与事件同事务，重复事件不计入）
+        await DailyMetricsService(self.db).access_events_recorded(
+            (row.site_id, row.event_time, row.result) for row in inserted
+        )
+
+        if error_count:
+            logger.warning(f"Access events dropped (unknown site): {error_count}")
+
+        return {
+            "created": len(inserted),
+            "duplicates": len(valid_rows) - len(inserted),
+            "errors": error_count,
+            "event_ids": [row.event_id for row in inserted],
+        }
+
+
+class AccessEventStream:
+    """
+    门禁事件缓冲队列
+
+    使用 Redis Stream 暂存回调事件（ACCESS_EVENT_INGEST_MODE=stream）：
+    回调校验后 XADD 立即返回，消费任务通过消费组 XREADGROUP 按微批读取，
+    写库提交后 XACK + XDEL。写库失败的消息保留在待确认列表中，
+    超过 ACCESS_EVENT_CLAIM_IDLE_MS 后由其他消费者 XAUTOCLAIM 接管重试
+    （重复写入由唯一约束去重）。
+
+    队列不裁剪（避免丢失未写库的事件），积压超过 ACCESS_EVENT_STREAM_MAX_BACKLOG
+    或 Redis 不可用时入队失败，回调改为同步写库。
+    """
+
+    STREAM_KEY = "access:events:stream"
+    GROUP = "access-event-writers"
+
+    async def _redis(self):
+        from app.utils.cache import get_redis_client
+        return await get_redis_client()
+
+    def __init__(self):
+        self._group_ready = False
+
+    async def _ensure_group(self, r) -> None:
+        """创建消费组（已存在时忽略）"""
+        if self._group_ready:
+            return
+        try:
+            await r.xgroup_create(self.STREAM_KEY, self.GROUP, id="0", mkstream=True)
+        except Exception as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    async def append(self, event: dict) -> Optional[str]:
+        """
+        事件入队
+
+        Args:
+            event: 回调事件（AccessEventData.model_dump(mode="json")）
+
+        Returns:
+            消息ID；Redis 不可用或积压超限时返回 None（调用方同步写库）
+        """
+        try:
+            r = await self._redis()
+            if r is None:
+                return None
+            if await r.xlen(self.STREAM_KEY) >= settings.ACCESS_EVENT_STREAM_MAX_BACKLOG:
+                logger.warning("Access event stream backlog full, writing synchronously")
+                return None
+            return await r.xadd(self.STREAM_KEY, {"data": json.dumps(event, ensure_ascii=False)})
+        except Exception as e:
+            logger.warning(f"Access event stream unavailable, writing synchronously: {e}")
+            return None
+
+    async def read(self, consumer: str, count: int, block_ms: int) -> List[Tuple[str, dict]]:
+        """
+        读取一个微批：优先接管超时未确认的消息，其次读取新消息
+
+        Returns:
+            [(消息ID, 事件), ...]
+        """
+        r = await self._redis()
+        if r is None:
+            return []
+        await self._ensure_group(r)
+
+        claimed = await r.xautoclaim(
+            self.STREAM_KEY, self.GROUP, consumer,
+            min_idle_time=settings.ACCESS_EVENT_CLAIM_IDLE_MS,
+            start_id="0-0",
+            count=count
+        )
+        messages = claimed[1] if claimed else []
+
+        if not messages:
+            response = await r.xreadgroup(
+                self.GROUP, consumer, {self.STREAM_KEY: ">"},
+                count=count, block=block_ms
+            )
+            messages = response[0][1] if response else []
+
+        return [
+            (message_id, json.loads(fields["data"]))
+            for message_id, fields in messages
+            if fields and "data" in fields
+        ]
+
+    async def ack(self, message_ids: List[str]) -> None:
+        """确认并删除已写库的消息"""
+        if not message_ids:
+            return
+        r = await self._redis()
+        if r is None:
+            return
+        async with r.pipeline(transaction=False) as pipe:
+            pipe.xack(self.STREAM_KEY, self.GROUP, *message_ids)
+            pipe.xdel(self.STREAM_KEY, *message_ids)
+            await pipe.execute()
+
+    async def get_stats(self) -> dict:
+        """
+        队列深度（背压监控）
+
+        Returns:
+            dict: length 队列长度 / pending 已读取未确认 / lag 未读取 /
+                  max_backlog 积压上限 / usage 积压占比
+        """
+        try:
+            r = await self._redis()
+            if r is None:
+                return {"status": "UNKNOWN", "error": "Redis unavailable"}
+            length = await r.xlen(self.STREAM_KEY)
+            pending = 0
+            lag = None
+            if length:
+                for group in await r.xinfo_groups(self.STREAM_KEY):
+                    if group.get("name") == self.GROUP:
+                        pending = group.get("pending") or 0
+                        lag = group.get("lag")
+            max_backlog = settings.ACCESS_EVENT_STREAM_MAX_BACKLOG
+            return {
+                "mode": settings.ACCESS_EVENT_INGEST_MODE,
+                "length": length,
+                "pending": pending,
+                "lag": lag,
+                "max_backlog": max_backlog,
+                "usage": round(length / max_backlog, 4) if max_backlog else 0,
+            }
+        except Exception as e:
+            return {"status": "UNKNOWN", "error": str(e)}
@@ -7,17 +7,64 @@ from typing import List, Optional
 import logging
 
 from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.models import (
     DailyTicket, DailyTicketWorker, WorkTicketArea, 
     AccessGrant, WorkArea
 )
+from app.core.config import settings
 from app.adapters.access_control_adapter import AccessControlAdapter
+from app.services.daily_metrics_service import DailyMetricsService
 
 logger = logging.getLogger(__name__)
 
 
+class GrantPushQueue:
+    """
+    授权推送合并队列
+    
+    使用 Redis Set 暂存待推送的授权ID：窗口内第一个入队者投递一个
+    延迟 ACCESS_PUSH_COALESCE_SECONDS 的刷新任务，窗口内后续入队只追加，
+    由刷新任务统一批量推送。Redis 不可用时直接投递批量推送任务。
+    """
+    
+    QUEUE_KEY = "access:push:pending"
+    FLUSH_FLAG_KEY = "access:push:flush_scheduled"
+    
+    async def enqueue(self, grant_ids: List[uuid.UUID]) -> None:
+        """待推送授权入队"""
+        from app.utils.cache import get_redis_client
+        from app.tasks.access import push_grants_batch_task, flush_grant_push_queue
+        
+        ids = [str(g) for g in grant_ids]
+        if not ids:
+            return
+        
+        window = settings.ACCESS_PUSH_COALESCE_SECONDS
+        r = await get_redis_client() if window > 0 else None
+        if r is not None:
+            try:
+                await r.sadd(self.QUEUE_KEY, *ids)
+                if await r.set(self.FLUSH_FLAG_KEY, "1", nx=True, ex=window):
+                    flush_grant_push_queue.apply_async(countdown=window)
+                return
+            except Exception as e:
+                logger.warning(f"Grant push queue unavailable, pushing directly: {e}")
+        
+        push_grants_batch_task.delay(ids)
+    
+    async def dequeue(self, count: int) -> List[str]:
+        """取出最多 count 个待推送授权ID"""
+        from app.utils.cache import get_redis_client
+        
+        r = await get_redis_client()
+        if r is None:
+            return []
+        return await r.spop(self.QUEUE_KEY, count) or []
+
+
 class AccessService:
     """
     门禁授权服务
@@ -30,6 +77,7 @@ class AccessService:
     def __init__(self, db: AsyncSession):
         self.db = db
         self.adapter = AccessControlAdapter()
+        self.metrics = DailyMetricsService(db)
     
     async def create_grants_for_worker(
         self, 
@@ -39,12 +87,15 @@ class AccessService:
         """
         为完成培训的工人创建门禁授权 (P0-4)
         
+        所有区域的授权以一条 INSERT ... ON CONFLICT DO NOTHING RETURNING 写入
+        （已存在的授权跳过），新建授权合并为一个推送任务
+        
         Args:
             daily_ticket_id: 日票ID
             worker_id: 工人ID
         
         Returns:
-            List[AccessGrant]: 创建的授权列表
+            List[AccessGrant]: 本次新建的授权列表
         """
         # 获取日票
         dt_result = await self.db.execute(
@@ -60,73 +111,78 @@ class AccessService:
         
         # 获取关联区域
         areas_result = await self.db.execute(
-            select(WorkTicketArea)
+            select(WorkTicketArea.area_id)
             .where(
                 WorkTicketArea.ticket_id == daily_ticket.ticket_id,
                 WorkTicketArea.status == "ACTIVE"
             )
         )
-        areas = areas_result.scalars().all()
+        area_ids = areas_result.scalars().all()
         
-        grants = []
+        if not area_ids:
+            return []
         
-        for ta in areas:
-            # P0-4: 计算时间窗
-            valid_from = datetime.combine(
-                daily_ticket.date,
-                daily_ticket.access_start_time
-            )
+        # P0-4: 计算时间窗
+        valid_from = datetime.combine(
+            daily_ticket.date,
+            daily_ticket.access_start_time
+        )
+        valid_to = datetime.combine(
+            daily_ticket.date,
+            daily_ticket.access_end_time
+        )
+        
+        # 确保不跨天
+        if valid_to.date() != daily_ticket.date:
             valid_to = datetime.combine(
                 daily_ticket.date,
-                daily_ticket.access_end_time
+                time(23, 59, 59)
             )
-            
-            # 确保不跨天
-            if valid_to.date() != daily_ticket.date:
-                valid_to = datetime.combine(
-                    daily_ticket.date,
-                    time(23, 59, 59)
-                )
-            
-            # 检查是否已存在
-            existing_result = await self.db.execute(
-                select(AccessGrant).where(
-                    AccessGrant.daily_ticket_id == daily_ticket_id,
-                    AccessGrant.worker_id == worker_id,
-                    AccessGrant.area_id == ta.area_id
-                )
-            )
-            existing = existing_result.scalar_one_or_none()
-            
-            if existing:
-                logger.info(f"Grant already exists: {existing.grant_id}")
-                grants.append(existing)
-                continue
-            
-            # 创建授权
-            grant = AccessGrant(
-                daily_ticket_id=daily_ticket_id,
-                worker_id=worker_id,
-                area_id=ta.area_id,
-                site_id=daily_ticket.site_id,
-                valid_from=valid_from,
-                valid_to=valid_to,
-                status="PENDING_SYNC"
+        
+        # 创建授权（已存在的由唯一约束跳过）
+        stmt = (
+            pg_insert(AccessGrant)
+            .values([
+                {
+                    "grant_id": uuid.uuid4(),
+                    "daily_ticket_id": daily_ticket_id,
+                    "worker_id": worker_id,
+                    "area_id": area_id,
+                    "site_id": daily_ticket.site_id,
+                    "valid_from": valid_from,
+                    "valid_to": valid_to,
+                    "status": "PENDING_SYNC",
+                    "sync_attempt_count": 0
+                }
+                for area_id in area_ids
+            ])
+            .on_conflict_do_nothing(
+                index_elements=["daily_ticket_id", "worker_id", "area_id"]
             )
-            self.db.add(grant)
-            await self.db.flush()
-            
-            grants.append(grant)
-            
+            .returning(AccessGrant)
+        )
+        result = await self.db.execute(
+            select(AccessGrant).from_statement(stmt),
+            execution_options={"populate_existing": True}
+        )
+        grants = result.scalars().all()
+        
+        if not grants:
             logger.info(
-                f"Access grant created: grant={grant.grant_id}, "
-                f"worker={worker_id}, area={ta.area_id}, "
-                f"valid_from={valid_from}, valid_to={valid_to}"
+                f"Grants already exist: daily_ticket={daily_ticket_id}, worker={worker_id}"
             )
-            
-            # 推送至门禁（异步任务）
-            from app.tasks.access import push_grant_task
-            push_grant_task.delay(str(grant.grant_id))
+            return []
+        
+        await self.metrics.grants_created(daily_ticket.site_id, len(grants))
+        
+        logger.info(
+            f"Access grants created: worker={worker_id}, "
+            f"daily_ticket={daily_ticket_id}, count={len(grants)}, "
+            f"valid_from={valid_from}, valid_to={valid_to}"
+        )
+        
+        # 推送至门禁（进入合并队列，与窗口内其他授权一起批量推送）
+        await GrantPushQueue().enqueue([g.grant_id for g in grants])
         
         return grants
     
@@ -191,10 +247,10 @@ class AccessService:
         )
         self.db.add(grant)
         await self.db.flush()
+        await self.metrics.grant_created(grant)
         
         # 推送
-        from app.tasks.access import push_grant_task
-        push_grant_task.delay(str(grant.grant_id))
+        await GrantPushQueue().enqueue([grant.grant_id])
         
         return grant
     
@@ -228,9 +284,11 @@ class AccessService:
             except Exception as e:
                 logger.error(f"Failed to revoke grant from vendor: {e}")
         
+        old_status = grant.status
         grant.status = "REVOKED"
         grant.revoked_at = datetime.now()
         grant.revoke_reason = reason
+        await self.metrics.grant_changed(grant, old_status)
         
         logger.info(f"Access grant revoked: {grant_id}, reason={reason}")
         
@@ -0,0 +1,359 @@
+"""
+冷数据归档服务
+- 按表配置在线保留天数（ARCHIVE_RETENTION_DAYS），早于保留期的数据按天导出为
+  gzip 压缩的 JSON Lines 文件，存到本地目录或 MinIO，并在 archive_segment 中登记清单
+- 导出登记完成后按主键分批删除源数据（每批独立提交，避免长事务和大量锁）
+- 已分离的进出记录分区（manage_partitions 分离）整表导出后 DROP
+- 查询接口通过 read_archived 读取时间范围内的归档数据，与在线数据合并
+
+注意：报表预聚合（daily_site_metrics）不受归档影响，但不要对已归档日期执行预聚合重算
+"""
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from typing import Callable, List, Optional, Tuple
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import uuid
+import logging
+
+from sqlalchemy import select, delete, func, cast, Date, text, table as sql_table, column as sql_column
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models import AccessEvent, AuditLog, ArchiveSegment
+from app.utils.partitions import list_detached_month_partitions
+from app.utils.storage import save_archive_file, open_archive_file
+
+logger = logging.getLogger(__name__)
+
+
+ARCHIVE_FILE_FORMAT = "jsonl.gz"
+
+
+@dataclass(frozen=True)
+class ArchivePolicy:
+    """归档策略：源表、时间列（归档范围与分段）、主键列（分批删除）"""
+    table: object
+    time_column: str
+    key_column: str
+
+
+ARCHIVE_POLICIES = {
+    "access_event": ArchivePolicy(AccessEvent.__table__, "event_time", "event_id"),
+    "audit_log": ArchivePolicy(AuditLog.__table__, "created_at", "log_id"),
+}
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (uuid.UUID, Decimal)):
+        return str(value)
+    raise TypeError(f"Unsupported archive value: {type(value).__name__}")
+
+
+def _as_aware(value: datetime) -> datetime:
+    """不带时区的时间按本地时区处理（与查询接口的日期边界一致）"""
+    return value.astimezone() if value.tzinfo is None else value
+
+
+def _file_digest(path: str) -> Tuple[str, int]:
+    """文件 SHA-256 与大小"""
+    sha = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(chunk)
+            size += len(chunk)
+    return sha.hexdigest(), size
+
+
+def _read_segment_file(
+    backend: str,
+    storage_key: str,
+    time_column: str,
+    start: datetime,
+    end: datetime,
+    predicate: Optional[Callable[[dict], bool]]
+) -> List[dict]:
+    """读取一个归档文件中 [start, end) 内满足条件的行（同步IO，在线程中执行）"""
+    rows = []
+    with open_archive_file(backend, storage_key) as path:
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                row = json.loads(line)
+                row_time = datetime.fromisoformat(row[time_column])
+                if not (start <= row_time < end):
+                    continue
+                if predicate is None or predicate(row):
+                    rows.append(row)
+    return rows
+
+
+class ArchiveService:
+    """冷数据归档服务"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    @staticmethod
+    def hot_cutoff(table_name: str, today: Optional[date] = None) -> Optional[datetime]:
+        """在线数据起点（早于该时间的数据归档），未配置保留期时返回 None"""
+        days = settings.ARCHIVE_RETENTION_DAYS.get(table_name, 0)
+        if days <= 0:
+            return None
+        return datetime.combine((today or date.today()) - timedelta(days=days), datetime.min.time())
+
+    # ==================== 导出与清理 ====================
+
+    async def _next_day(
+        self,
+        source,
+        policy: ArchivePolicy,
+        after: Optional[datetime],
+        cutoff: Optional[datetime]
+    ) -> Optional[date]:
+        """after 之后、cutoff 之前最早一行数据所在日期（跳过无数据的日期）"""
+        time_col = source.c[policy.time_column]
+        stmt = select(func.min(cast(time_col, Date)))
+        if after is not None:
+            stmt = stmt.where(time_col >= after)
+        if cutoff is not None:
+            stmt = stmt.where(time_col < cutoff)
+        return (await self.db.execute(stmt)).scalar()
+
+    async def _archive_range(
+        self,
+        table_name: str,
+        source,
+        policy: ArchivePolicy,
+        start: datetime,
+        end: datetime
+    ) -> int:
+        """
+        导出 [start, end) 的数据为一个归档文件，登记清单后分批删除源数据
+
+        Returns:
+            int: 归档行数（无数据时为 0，不生成文件）
+        """
+        time_col = source.c[policy.time_column]
+        key_col = source.c[policy.key_column]
+
+        fd, tmp_path = tempfile.mkstemp(suffix=f".{ARCHIVE_FILE_FORMAT}")
+        os.close(fd)
+        keys = []
+        try:
+            # 服务端游标流式读取，逐行写入压缩文件
+            with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+                result = await self.db.stream(
+                    select(source)
+                    .where(time_col >= start, time_col < end)
+                    .order_by(time_col)
+                    .execution_options(yield_per=settings.ARCHIVE_FETCH_SIZE)
+                )
+                async for partition in result.partitions():
+                    for row in partition:
+                        data = dict(row._mapping)
+                        keys.append(data[policy.key_column])
+                        f.write(json.dumps(data, default=_json_default, ensure_ascii=False))
+                        f.write("\n")
+            await self.db.rollback()
+
+            if not keys:
+                return 0
+
+            checksum, file_size = _file_digest(tmp_path)
+            storage_key = (
+                f"archive/{table_name}/{start:%Y/%m}/"
+                f"{source.name}_{start:%Y%m%d}_{uuid.uuid4().hex[:8]}.{ARCHIVE_FILE_FORMAT}"
+            )
+            backend = save_archive_file(tmp_path, storage_key)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        segment = ArchiveSegment(
+            table_name=table_name,
+            source_table=source.name,
+            range_start=start,
+            range_end=end,
+            row_count=len(keys),
+            file_format=ARCHIVE_FILE_FORMAT,
+            storage_backend=backend,
+            storage_key=storage_key,
+            file_size=file_size,
+            checksum=checksum,
+            status="EXPORTED"
+        )
+        self.db.add(segment)
+        await self.db.commit()
+
+        # 按主键分批删除（带时间范围，分区表只扫描对应分区）
+        batch_size = settings.ARCHIVE_DELETE_BATCH
+        for i in range(0, len(keys), batch_size):
+            await self.db.execute(
+                delete(source).where(
+                    key_col.in_(keys[i:i + batch_size]),
+                    time_col >= start,
+                    time_col < end
+                )
+            )
+            await self.db.commit()
+
+        segment.status = "PURGED"
+        await self.db.commit()
+
+        logger.info(
+            f"Archived {table_name}: source={source.name}, range=[{start}, {end}), "
+            f"rows={len(keys)}, key={storage_key}"
+        )
+        return len(keys)
+
+    async def _archive_source(
+        self,
+        table_name: str,
+        source,
+        cutoff: Optional[datetime],
+        max_days: int
+    ) -> dict:
+        """
+        按天归档源表中 cutoff 之前的数据（cutoff 为 None 时归档全部数据）
+
+        Returns:
+            dict: {"days": 归档天数, "rows": 行数, "done": 是否已无待归档数据}
+        """
+        policy = ARCHIVE_POLICIES[table_name]
+        days = rows = 0
+        after = None
+        while days < max_days:
+            day = await self._next_day(source, policy, after, cutoff)
+            if day is None:
+                return {"days": days, "rows": rows, "done": True}
+
+            start = datetime.combine(day, datetime.min.time())
+            # 从上一段终点继续，保证每次循环都向前推进
+            if after is not None and start < after:
+                start = after
+            end = datetime.combine(day + timedelta(days=1), datetime.min.time())
+            if cutoff is not None and end > cutoff:
+                end = cutoff
+            if end <= start:
+                end = start + timedelta(days=1)
+
+            rows += await self._archive_range(table_name, source, policy, start, end)
+            days += 1
+            after = end
+
+        return {"days": days, "rows": rows, "done": False}
+
+    async def archive_table(self, table_name: str, today: Optional[date] = None) -> dict:
+        """
+        归档一张表早于在线保留期的数据（每次最多 ARCHIVE_MAX_DAYS_PER_RUN 天）
+
+        Returns:
+            dict: {"cutoff", "days", "rows", "done"}
+        """
+        cutoff = self.hot_cutoff(table_name, today)
+        if cutoff is None:
+            return {"cutoff": None, "days": 0, "rows": 0, "done": True}
+
+        result = await self._archive_source(
+            table_name,
+            ARCHIVE_POLICIES[table_name].table,
+            cutoff,
+            settings.ARCHIVE_MAX_DAYS_PER_RUN
+        )
+        return {"cutoff": cutoff.isoformat(), **result}
+
+    async def archive_detached_partitions(self) -> dict:
+        """
+        归档已分离的进出记录分区：整表按天导出，导出完毕后 DROP
+
+        Returns:
+            dict: {"partitions": {分区名: {"days", "rows", "dropped"}}}
+        """
+        columns = [sql_column(c.name, c.type) for c in AccessEvent.__table__.columns]
+        budget = settings.ARCHIVE_MAX_DAYS_PER_RUN
+        partitions = {}
+
+        for name in await list_detached_month_partitions(self.db, "access_event"):
+            if budget <= 0:
+                break
+            source = sql_table(name, *columns)
+            result = await self._archive_source("access_event", source, None, budget)
+            budget -= result["days"]
+
+            dropped = False
+            if result["done"]:
+                await self.db.execute(text(f'DROP TABLE IF EXISTS "{name}"'))
+                await self.db.commit()
+                dropped = True
+                logger.info(f"Detached partition archived and dropped: {name}")
+
+            partitions[name] = {"days": result["days"], "rows": result["rows"], "dropped": dropped}
+
+        return {"partitions": partitions}
+
+    # ==================== 读取 ====================
+
+    async def read_archived(
+        self,
+        table_name: str,
+        start: datetime,
+        end: datetime,
+        predicate: Optional[Callable[[dict], bool]] = None
+    ) -> Tuple[List[dict], bool]:
+        """
+        读取 [start, end) 内的归档数据（按时间倒序）
+
+        Args:
+            table_name: access_event / audit_log
+            start, end: 时间范围（不带时区时按本地时区）
+            predicate: 行过滤条件（租户、筛选条件），行为 JSON 解析后的 dict
+
+        Returns:
+            (rows, truncated): 匹配行数超过 ARCHIVE_READ_MAX_ROWS 时截断，truncated 为 True
+        """
+        result = await self.db.execute(
+            select(ArchiveSegment)
+            .where(
+                ArchiveSegment.table_name == table_name,
+                ArchiveSegment.range_start < end,
+                ArchiveSegment.range_end > start
+            )
+            .order_by(ArchiveSegment.range_start.desc())
+        )
+        segments = result.scalars().all()
+        if not segments:
+            return [], False
+
+        time_column = ARCHIVE_POLICIES[table_name].time_column
+        start, end = _as_aware(start), _as_aware(end)
+        limit = settings.ARCHIVE_READ_MAX_ROWS
+
+        rows = []
+        truncated = False
+        for segment in segments:
+            if len(rows) >= limit:
+                truncated = True
+                break
+            rows.extend(await asyncio.to_thread(
+                _read_segment_file,
+                segment.storage_backend,
+                segment.storage_key,
+                time_column,
+                start,
+                end,
+                predicate
+            ))
+
+        rows.sort(key=lambda r: datetime.fromisoformat(r[time_column]), reverse=True)
+        if len(rows) > limit:
+            rows = rows[:limit]
+            truncated = True
+        return rows, truncated
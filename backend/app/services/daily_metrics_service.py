@@ -0,0 +1,540 @@
+"""
+工地每日指标汇总服务
+- 写入路径增量累加：INSERT ... ON CONFLICT DO UPDATE SET col = col + excluded.col
+- 夜间回填：按明细表重算指定日期范围，纠正增量误差
+"""
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+import uuid
+import logging
+
+from sqlalchemy import select, update, func, literal, literal_column, cast, Date, Integer, Float
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import (
+    DailySiteMetrics, DailyTicket, DailyTicketWorker,
+    TrainingSession, AccessGrant, AccessEvent
+)
+
+logger = logging.getLogger(__name__)
+
+
+# 培训状态 → 汇总列
+TRAINING_STATUS_COLUMNS = {
+    "NOT_STARTED": "not_started_count",
+    "IN_LEARNING": "in_learning_count",
+    "COMPLETED": "completed_count",
+    "FAILED": "failed_count",
+}
+
+# 授权状态 → 汇总列
+GRANT_STATUS_COLUMNS = {
+    "PENDING_SYNC": "grant_pending_count",
+    "SYNCED": "grant_synced_count",
+    "SYNC_FAILED": "grant_failed_count",
+    "REVOKED": "grant_revoked_count",
+}
+
+# 可累加的计数列（max_sync_attempts 取最大值，单独处理）
+COUNTER_COLUMNS = [
+    "worker_count", "not_started_count", "in_learning_count",
+    "completed_count", "failed_count",
+    "videos_required", "videos_completed",
+    "training_session_count", "training_seconds",
+    "grant_count", "grant_pending_count", "grant_synced_count",
+    "grant_failed_count", "grant_revoked_count",
+    "sync_seconds", "sync_attempts",
+    "pass_event_count", "deny_event_count",
+]
+
+FLOAT_COLUMNS = {"training_seconds", "sync_seconds"}
+
+
+def _local_date(value: Optional[datetime]) -> date:
+    """时间转本地日期（与报表按本地日期切分的口径一致）"""
+    if value is None:
+        return date.today()
+    if value.tzinfo is not None:
+        value = value.astimezone()
+    return value.date()
+
+
+def _local_date_sql(column, on: date):
+    """
+    timestamptz 列转本地日期（与 _local_date 口径一致，不依赖数据库会话时区）
+
+    按 on 当日的本地 UTC 偏移换算；偏移以常量写入 SQL，SELECT 与 GROUP BY 为同一表达式
+    """
+    offset = datetime.combine(on, datetime.min.time()).astimezone().utcoffset()
+    seconds = int(offset.total_seconds()) if offset else 0
+    return cast(func.timezone(literal_column(f"INTERVAL '{seconds} seconds'"), column), Date)
+
+
+def _seconds_between(start: Optional[datetime], end: Optional[datetime]) -> float:
+    """计算两个时间的秒差，兼容 naive（本地时间）与带时区时间混用"""
+    if not start or not end:
+        return 0.0
+    if start.tzinfo is None:
+        start = start.astimezone()
+    if end.tzinfo is None:
+        end = end.astimezone()
+    return (end - start).total_seconds()
+
+
+class DailyMetricsService:
+    """
+    工地每日指标汇总服务
+
+    写入路径只做增量累加，不读取汇总表；
+    与明细表的最终一致由夜间 rebuild 保证。
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    def _upsert_set(self, stmt, max_sync_attempts: bool = False) -> dict:
+        """ON CONFLICT 时的累加表达式"""
+        set_ = {
+            col: getattr(DailySiteMetrics, col) + getattr(stmt.excluded, col)
+            for col in COUNTER_COLUMNS
+        }
+        if max_sync_attempts:
+            set_["max_sync_attempts"] = func.greatest(
+                DailySiteMetrics.max_sync_attempts,
+                stmt.excluded.max_sync_attempts
+            )
+        set_["updated_at"] = func.now()
+        return set_
+
+    @staticmethod
+    def _clean(deltas: dict) -> dict:
+        return {k: v for k, v in deltas.items() if v}
+
+    async def increment(
+        self,
+        site_id: uuid.UUID,
+        metric_date: date,
+        max_sync_attempts: Optional[int] = None,
+        **deltas
+    ) -> None:
+        """
+        累加指定工地、日期的计数
+
+        Args:
+            site_id: 工地ID
+            metric_date: 统计日期
+            max_sync_attempts: 单条授权同步次数（与已有值取最大）
+            **deltas: 列名 → 增量
+        """
+        deltas = self._clean(deltas)
+        if not deltas and not max_sync_attempts:
+            return
+
+        values = {col: 0 for col in COUNTER_COLUMNS}
+        values.update(deltas)
+        values["max_sync_attempts"] = max_sync_attempts or 0
+
+        stmt = pg_insert(DailySiteMetrics).values(
+            site_id=site_id,
+            metric_date=metric_date,
+            **values
+        )
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["site_id", "metric_date"],
+            set_=self._upsert_set(stmt, max_sync_attempts=bool(max_sync_attempts))
+        )
+        await self.db.execute(stmt)
+
+    async def increment_dates(
+        self,
+        site_id: uuid.UUID,
+        metric_dates: List[date],
+        **deltas
+    ) -> None:
+        """
+        对同一工地的多个日期累加相同的计数（单条多行 upsert）
+
+        Args:
+            site_id: 工地ID
+            metric_dates: 统计日期列表
+            **deltas: 列名 → 增量
+        """
+        deltas = self._clean(deltas)
+        if not deltas or not metric_dates:
+            return
+
+        values = {col: 0 for col in COUNTER_COLUMNS}
+        values.update(deltas)
+        values["max_sync_attempts"] = 0
+
+        stmt = pg_insert(DailySiteMetrics).values([
+            {"site_id": site_id, "metric_date": d, **values}
+            for d in metric_dates
+        ])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["site_id", "metric_date"],
+            set_=self._upsert_set(stmt)
+        )
+        await self.db.execute(stmt)
+
+    async def increment_for_daily_ticket(
+        self,
+        daily_ticket_id: uuid.UUID,
+        **deltas
+    ) -> None:
+        """
+        按日票累加计数（工地与日期由日票在库内解析，无需额外查询）
+
+        Args:
+            daily_ticket_id: 日票ID
+            **deltas: 列名 → 增量
+        """
+        deltas = self._clean(deltas)
+        if not deltas:
+            return
+
+        columns = ["site_id", "metric_date", *COUNTER_COLUMNS]
+        source = select(
+            DailyTicket.site_id,
+            DailyTicket.date,
+            *[
+                literal(deltas.get(col, 0), type_=Float if col in FLOAT_COLUMNS else Integer)
+                for col in COUNTER_COLUMNS
+            ]
+        ).where(DailyTicket.daily_ticket_id == daily_ticket_id)
+
+        stmt = pg_insert(DailySiteMetrics).from_select(columns, source, include_defaults=False)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["site_id", "metric_date"],
+            set_=self._upsert_set(stmt)
+        )
+        await self.db.execute(stmt)
+
+    # ==================== 培训 ====================
+
+    async def workers_added(
+        self,
+        daily_ticket_id: uuid.UUID,
+        count: int,
+        video_count: int
+    ) -> None:
+        """日票新增人员（初始状态 NOT_STARTED）"""
+        await self.increment_for_daily_ticket(
+            daily_ticket_id,
+            worker_count=count,
+            not_started_count=count,
+            videos_required=count * video_count
+        )
+
+    async def worker_removed(self, dtw: DailyTicketWorker) -> None:
+        """日票移除人员（按其当前状态扣减）"""
+        deltas = {
+            "worker_count": -1,
+            "videos_required": -(dtw.total_video_count or 0),
+            "videos_completed": -(dtw.completed_video_count or 0),
+        }
+        column = TRAINING_STATUS_COLUMNS.get(dtw.training_status)
+        if column:
+            deltas[column] = -1
+        await self.increment_for_daily_ticket(dtw.daily_ticket_id, **deltas)
+
+    async def training_status_changed(
+        self,
+        daily_ticket_id: uuid.UUID,
+        old_status: str,
+        new_status: str,
+        videos_completed: int = 0
+    ) -> None:
+        """
+        培训状态变化
+
+        Args:
+            daily_ticket_id: 日票ID
+            old_status: 原状态
+            new_status: 新状态
+            videos_completed: 同时新增的已完成视频数
+        """
+        deltas = {"videos_completed": videos_completed}
+        if old_status != new_status:
+            old_column = TRAINING_STATUS_COLUMNS.get(old_status)
+            new_column = TRAINING_STATUS_COLUMNS.get(new_status)
+            if old_column:
+                deltas[old_column] = -1
+            if new_column:
+                deltas[new_column] = 1
+        await self.increment_for_daily_ticket(daily_ticket_id, **deltas)
+
+    async def session_completed(self, session: TrainingSession) -> None:
+        """学习会话完成（累计平均时长所需的会话数与总时长）"""
+        if not session.started_at or not session.ended_at:
+            return
+        await self.increment_for_daily_ticket(
+            session.daily_ticket_id,
+            training_session_count=1,
+            training_seconds=_seconds_between(session.started_at, session.ended_at)
+        )
+
+    # ==================== 授权 ====================
+
+    async def grant_created(self, grant: AccessGrant) -> None:
+        """新建授权（按创建日期；刚 flush 的对象 created_at 由库生成时按当日计）"""
+        column = GRANT_STATUS_COLUMNS.get(grant.status or "PENDING_SYNC")
+        await self.increment(
+            grant.site_id,
+            _local_date(grant.created_at),
+            grant_count=1,
+            **({column: 1} if column else {})
+        )
+
+    async def grants_created(self, site_id: uuid.UUID, count: int) -> None:
+        """批量新建授权（初始状态 PENDING_SYNC，按当日计）"""
+        await self.increment(
+            site_id,
+            date.today(),
+            grant_count=count,
+            grant_pending_count=count
+        )
+
+    async def grant_changed(
+        self,
+        grant: AccessGrant,
+        old_status: str,
+        sync_attempted: bool = False
+    ) -> None:
+        """
+        授权状态变化（在修改 grant 之后调用）
+
+        Args:
+            grant: 已更新的授权
+            old_status: 修改前的状态
+            sync_attempted: 本次是否发生了一次同步尝试
+        """
+        deltas = {}
+        if old_status != grant.status:
+            old_column = GRANT_STATUS_COLUMNS.get(old_status)
+            new_column = GRANT_STATUS_COLUMNS.get(grant.status)
+            if old_column:
+                deltas[old_column] = -1
+            if new_column:
+                deltas[new_column] = 1
+
+            # 同步耗时只计入当前为 SYNCED 的授权
+            sync_seconds = _seconds_between(grant.created_at, grant.last_sync_at)
+            if old_status == "SYNCED":
+                deltas["sync_seconds"] = -sync_seconds
+            elif grant.status == "SYNCED":
+                deltas["sync_seconds"] = sync_seconds
+
+        if sync_attempted:
+            deltas["sync_attempts"] = 1
+
+        await self.increment(
+            grant.site_id,
+            _local_date(grant.created_at),
+            max_sync_attempts=grant.sync_attempt_count if sync_attempted else None,
+            **deltas
+        )
+
+    async def grants_revoked(self, rows) -> None:
+        """
+        批量撤销授权（集合更新后调用）
+
+        按 工地 + 授权创建日期 合并后累加，每组一条语句
+
+        Args:
+            rows: 撤销前的授权信息，需包含 site_id/created_at/last_sync_at/old_status
+        """
+        groups = {}
+        for row in rows:
+            key = (row.site_id, _local_date(row.created_at))
+            deltas = groups.setdefault(key, {"grant_revoked_count": 0, "sync_seconds": 0.0})
+            old_column = GRANT_STATUS_COLUMNS.get(row.old_status)
+            if old_column == "grant_revoked_count":
+                continue
+            if old_column:
+                deltas[old_column] = deltas.get(old_column, 0) - 1
+            deltas["grant_revoked_count"] += 1
+            if row.old_status == "SYNCED":
+                deltas["sync_seconds"] -= _seconds_between(row.created_at, row.last_sync_at)
+
+        for (site_id, metric_date), deltas in groups.items():
+            await self.increment(site_id, metric_date, **deltas)
+
+    # ==================== 进出事件 ====================
+
+    async def access_event_recorded(
+        self,
+        site_id: uuid.UUID,
+        event_time: datetime,
+        result: str
+    ) -> None:
+        """新增进出事件"""
+        if result == "PASS":
+            await self.increment(site_id, _local_date(event_time), pass_event_count=1)
+        elif result == "DENY":
+            await self.increment(site_id, _local_date(event_time), deny_event_count=1)
+
+    async def access_events_recorded(self, events) -> None:
+        """
+        批量新增进出事件（按工地、日期合并为一次累加）
+
+        Args:
+            events: [(site_id, event_time, result), ...]
+        """
+        grouped = {}
+        for site_id, event_time, result in events:
+            counts = grouped.setdefault((site_id, _local_date(event_time)), [0, 0])
+            if result == "PASS":
+                counts[0] += 1
+            elif result == "DENY":
+                counts[1] += 1
+
+        for (site_id, metric_date), (pass_count, deny_count) in grouped.items():
+            await self.increment(
+                site_id, metric_date,
+                pass_event_count=pass_count,
+                deny_event_count=deny_count
+            )
+
+    # ==================== 回填 ====================
+
+    async def rebuild(
+        self,
+        start_date: date,
+        end_date: date,
+        site_id: Optional[uuid.UUID] = None
+    ) -> int:
+        """
+        按明细表重算 [start_date, end_date] 的汇总数据
+
+        先将范围内计数清零，再分别按 培训/会话/授权/事件 聚合覆盖，
+        使明细已被删除的日期也能归零。
+
+        Args:
+            start_date: 开始日期
+            end_date: 结束日期（含）
+            site_id: 仅重算指定工地（默认全部）
+
+        Returns:
+            int: 写入的汇总行数
+        """
+        # 本地日期边界（带时区，与按本地日期分组一致）
+        range_start = datetime.combine(start_date, datetime.min.time()).astimezone()
+        range_end = datetime.combine(end_date + timedelta(days=1), datetime.min.time()).astimezone()
+
+        # 1. 清零
+        reset_stmt = update(DailySiteMetrics).where(
+            DailySiteMetrics.metric_date >= start_date,
+            DailySiteMetrics.metric_date <= end_date
+        ).values(
+            **{col: 0 for col in COUNTER_COLUMNS},
+            max_sync_attempts=0,
+            updated_at=func.now()
+        )
+        if site_id:
+            reset_stmt = reset_stmt.where(DailySiteMetrics.site_id == site_id)
+        await self.db.execute(reset_stmt)
+
+        # 2. 培训人数（按日票日期）
+        training = select(
+            DailyTicket.site_id,
+            DailyTicket.date.label("metric_date"),
+            func.count().label("worker_count"),
+            *[
+                func.count().filter(DailyTicketWorker.training_status == status).label(column)
+                for status, column in TRAINING_STATUS_COLUMNS.items()
+            ],
+            func.coalesce(func.sum(DailyTicketWorker.total_video_count), 0).label("videos_required"),
+            func.coalesce(func.sum(DailyTicketWorker.completed_video_count), 0).label("videos_completed"),
+        ).select_from(DailyTicketWorker).join(
+            DailyTicket, DailyTicketWorker.daily_ticket_id == DailyTicket.daily_ticket_id
+        ).where(
+            DailyTicket.date >= start_date,
+            DailyTicket.date <= end_date,
+            DailyTicketWorker.status == "ACTIVE"
+        ).group_by(DailyTicket.site_id, DailyTicket.date)
+
+        # 3. 培训时长（按日票日期）
+        sessions = select(
+            DailyTicket.site_id,
+            DailyTicket.date.label("metric_date"),
+            func.count().label("training_session_count"),
+            func.sum(
+                func.extract("epoch", TrainingSession.ended_at - TrainingSession.started_at)
+            ).label("training_seconds"),
+        ).select_from(TrainingSession).join(
+            DailyTicket, TrainingSession.daily_ticket_id == DailyTicket.daily_ticket_id
+        ).where(
+            DailyTicket.date >= start_date,
+            DailyTicket.date <= end_date,
+            TrainingSession.status == "COMPLETED",
+            TrainingSession.started_at.isnot(None),
+            TrainingSession.ended_at.isnot(None)
+        ).group_by(DailyTicket.site_id, DailyTicket.date)
+
+        # 4. 授权（按创建日期）
+        grant_date = _local_date_sql(AccessGrant.created_at, start_date)
+        grants = select(
+            AccessGrant.site_id,
+            grant_date.label("metric_date"),
+            func.count().label("grant_count"),
+            *[
+                func.count().filter(AccessGrant.status == status).label(column)
+                for status, column in GRANT_STATUS_COLUMNS.items()
+            ],
+            func.coalesce(
+                func.sum(
+                    func.extract("epoch", AccessGrant.last_sync_at - AccessGrant.created_at)
+                ).filter(AccessGrant.status == "SYNCED"),
+                0
+            ).label("sync_seconds"),
+            func.coalesce(func.sum(AccessGrant.sync_attempt_count), 0).label("sync_attempts"),
+            func.coalesce(func.max(AccessGrant.sync_attempt_count), 0).label("max_sync_attempts"),
+        ).where(
+            AccessGrant.created_at >= range_start,
+            AccessGrant.created_at < range_end
+        ).group_by(AccessGrant.site_id, grant_date)
+
+        # 5. 进出事件（按事件日期）
+        event_date = _local_date_sql(AccessEvent.event_time, start_date)
+        events = select(
+            AccessEvent.site_id,
+            event_date.label("metric_date"),
+            func.count().filter(AccessEvent.result == "PASS").label("pass_event_count"),
+            func.count().filter(AccessEvent.result == "DENY").label("deny_event_count"),
+        ).where(
+            AccessEvent.event_time >= range_start,
+            AccessEvent.event_time < range_end
+        ).group_by(AccessEvent.site_id, event_date)
+
+        written = 0
+        for source, site_column in (
+            (training, DailyTicket.site_id),
+            (sessions, DailyTicket.site_id),
+            (grants, AccessGrant.site_id),
+            (events, AccessEvent.site_id),
+        ):
+            if site_id:
+                source = source.where(site_column == site_id)
+            columns = [c.name for c in source.selected_columns]
+            stmt = pg_insert(DailySiteMetrics).from_select(columns, source, include_defaults=False)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["site_id", "metric_date"],
+                set_={
+                    **{
+                        col: getattr(stmt.excluded, col)
+                        for col in columns if col not in ("site_id", "metric_date")
+                    },
+                    "updated_at": func.now(),
+                }
+            )
+            result = await self.db.execute(stmt)
+            written += result.rowcount or 0
+
+        logger.info(
+            f"Daily site metrics rebuilt: {start_date} ~ {end_date}, "
+            f"site={site_id or 'ALL'}, rows={written}"
+        )
+
+        return written
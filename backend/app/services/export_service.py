@@ -0,0 +1,519 @@
+"""
+导出服务
+- 报表/作业票导出定义：表头、列宽、按列查询的行数据源，HTTP 流式导出与异步任务共用
+- 异步导出任务：提交、执行（Celery export 队列）、进度回写、结果存储
+"""
+import os
+import tempfile
+import uuid
+import logging
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import select, func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models import (
+    WorkTicket, WorkTicketWorker, WorkTicketArea, Contractor,
+    DailyTicket, AccessGrant, AccessEvent, Worker, WorkArea, ExportJob
+)
+from app.middleware.tenant import TenantContext, TenantQueryFilter
+from app.services.report_service import (
+    ReportService, rate, avg_training_minutes, avg_sync_seconds
+)
+from app.utils.export import RowSource, stream_rows, iter_csv, iter_xlsx
+
+logger = logging.getLogger(__name__)
+
+
+# 支持的报表导出类型
+REPORT_EXPORT_TYPES = ["training", "access-sync", "access-events", "reconciliation"]
+
+# 作业票导出类型
+TICKET_EXPORT_TYPE = "tickets"
+
+EXPORT_TYPES = REPORT_EXPORT_TYPES + [TICKET_EXPORT_TYPE]
+
+
+@dataclass
+class ExportSpec:
+    """导出定义"""
+    title: str
+    headers: List[str]
+    rows: RowSource
+    filename: str
+    column_widths: List[int] = field(default_factory=list)
+
+
+def build_report_export(
+    report_type: str,
+    start_date: Optional[date],
+    end_date: Optional[date],
+    ctx: Optional[TenantContext]
+) -> Optional[ExportSpec]:
+    """
+    构造报表导出定义
+
+    查询语句在此处完成租户过滤，行数据源执行时只需传入会话
+
+    Returns:
+        ExportSpec，不支持的报表类型返回 None
+    """
+    query_start_date = start_date or date.today() - timedelta(days=7)
+    query_end_date = end_date or date.today()
+
+    start_datetime = datetime.combine(query_start_date, datetime.min.time())
+    end_datetime = datetime.combine(query_end_date, datetime.max.time())
+
+    if report_type == "training":
+        # 培训统计报表（预聚合，每天一行）
+        title = "培训统计报表"
+        headers = ["日期", "总人数", "已完成", "学习中", "未开始", "失败", "完成率(%)", "平均时长(分钟)"]
+        column_widths = [12, 10, 10, 10, 10, 10, 12, 15]
+
+        async def rows(session):
+            daily_metrics = await ReportService(session).get_daily_metrics(
+                query_start_date, query_end_date, ctx
+            )
+            for metrics in daily_metrics:
+                yield [
+                    metrics["date"].strftime("%Y-%m-%d"),
+                    metrics["worker_count"],
+                    metrics["completed_count"],
+                    metrics["in_learning_count"],
+                    metrics["not_started_count"],
+                    metrics["failed_count"],
+                    rate(metrics["completed_count"], metrics["worker_count"]),
+                    avg_training_minutes(metrics)
+                ]
+
+    elif report_type == "access-sync":
+        # 门禁同步统计报表（预聚合，每天一行）
+        title = "门禁同步统计报表"
+        headers = ["日期", "总数", "已同步", "待同步", "失败", "已撤销", "同步率(%)", "平均时长(秒)"]
+        column_widths = [12, 10, 10, 10, 10, 10, 12, 15]
+
+        async def rows(session):
+            daily_metrics = await ReportService(session).get_daily_metrics(
+                query_start_date, query_end_date, ctx
+            )
+            for metrics in daily_metrics:
+                yield [
+                    metrics["date"].strftime("%Y-%m-%d"),
+                    metrics["grant_count"],
+                    metrics["grant_synced_count"],
+                    metrics["grant_pending_count"],
+                    metrics["grant_failed_count"],
+                    metrics["grant_revoked_count"],
+                    rate(metrics["grant_synced_count"], metrics["grant_count"]),
+                    avg_sync_seconds(metrics)
+                ]
+
+    elif report_type == "access-events":
+        # 门禁事件记录报表
+        title = "门禁事件记录"
+        headers = ["时间", "工人姓名", "设备ID", "方向", "结果", "原因代码", "原因说明"]
+        column_widths = [20, 15, 15, 10, 10, 15, 30]
+
+        # 按列查询，工人姓名直接关联，避免加载 ORM 对象
+        stmt = select(
+            AccessEvent.event_time,
+            Worker.name,
+            AccessEvent.device_id,
+            AccessEvent.direction,
+            AccessEvent.result,
+            AccessEvent.reason_code,
+            AccessEvent.reason_message
+        ).outerjoin(
+            Worker, AccessEvent.worker_id == Worker.worker_id
+        ).where(
+            AccessEvent.event_time >= start_datetime,
+            AccessEvent.event_time <= end_datetime
+        ).order_by(AccessEvent.event_time.desc()).limit(settings.EXPORT_MAX_ROWS)
+
+        stmt = TenantQueryFilter.apply(stmt, ctx)
+
+        direction_map = {"IN": "进入", "OUT": "离开"}
+        result_map = {"PASS": "通过", "DENY": "拒绝"}
+
+        async def rows(session):
+            async for row in stream_rows(session, stmt):
+                yield [
+                    row.event_time.strftime("%Y-%m-%d %H:%M:%S"),
+                    row.name or "未知",
+                    row.device_id or "",
+                    direction_map.get(row.direction, row.direction),
+                    result_map.get(row.result, row.result),
+                    row.reason_code or "",
+                    row.reason_message or ""
+                ]
+
+    elif report_type == "reconciliation":
+        # 对账报告
+        title = "对账报告"
+        headers = ["授权ID", "工人姓名", "区域名称", "状态", "重试次数", "最后同步时间", "错误信息"]
+        column_widths = [36, 15, 20, 12, 10, 20, 40]
+
+        # 获取卡住的授权
+        cutoff = datetime.now() - timedelta(minutes=10)
+
+        stmt = select(
+            AccessGrant.grant_id,
+            Worker.name.label("worker_name"),
+            WorkArea.name.label("area_name"),
+            AccessGrant.status,
+            AccessGrant.sync_attempt_count,
+            AccessGrant.last_sync_at,
+            AccessGrant.sync_error_msg
+        ).join(
+            DailyTicket, AccessGrant.daily_ticket_id == DailyTicket.daily_ticket_id
+        ).outerjoin(
+            Worker, AccessGrant.worker_id == Worker.worker_id
+        ).outerjoin(
+            WorkArea, AccessGrant.area_id == WorkArea.area_id
+        ).where(
+            DailyTicket.date >= query_start_date,
+            DailyTicket.date <= query_end_date,
+            AccessGrant.status.in_(["PENDING_SYNC", "SYNC_FAILED"]),
+            AccessGrant.created_at < cutoff
+        )
+        stmt = TenantQueryFilter.apply(stmt, ctx)
+
+        status_map = {
+            "PENDING_SYNC": "待同步",
+            "SYNC_FAILED": "同步失败"
+        }
+
+        async def rows(session):
+            async for row in stream_rows(session, stmt):
+                yield [
+                    str(row.grant_id),
+                    row.worker_name or "未知",
+                    row.area_name or "未知",
+                    status_map.get(row.status, row.status),
+                    row.sync_attempt_count,
+                    row.last_sync_at.strftime("%Y-%m-%d %H:%M:%S") if row.last_sync_at else "",
+                    row.sync_error_msg or ""
+                ]
+
+    else:
+        return None
+
+    # 生成文件名
+    filename = f"{title}_{query_start_date.strftime('%Y%m%d')}_{query_end_date.strftime('%Y%m%d')}"
+
+    return ExportSpec(
+        title=title,
+        headers=headers,
+        rows=rows,
+        filename=filename,
+        column_widths=column_widths
+    )
+
+
+def build_ticket_export(
+    status: Optional[str],
+    contractor_id: Optional[uuid.UUID],
+    start_date: Optional[date],
+    end_date: Optional[date],
+    ctx: Optional[TenantContext]
+) -> ExportSpec:
+    """
+    构造作业票导出定义
+
+    人员/区域数量由相关子查询计算，不加载关联对象
+    """
+    worker_count = select(func.count()).where(
+        WorkTicketWorker.ticket_id == WorkTicket.ticket_id,
+        WorkTicketWorker.status == "ACTIVE"
+    ).correlate(WorkTicket).scalar_subquery()
+
+    area_count = select(func.count()).where(
+        WorkTicketArea.ticket_id == WorkTicket.ticket_id,
+        WorkTicketArea.status == "ACTIVE"
+    ).correlate(WorkTicket).scalar_subquery()
+
+    # 构建查询（按列选择，不加载关联对象）
+    stmt = select(
+        WorkTicket.ticket_id,
+        WorkTicket.title,
+        Contractor.name.label("contractor_name"),
+        WorkTicket.status,
+        WorkTicket.start_date,
+        WorkTicket.end_date,
+        worker_count.label("worker_count"),
+        area_count.label("area_count"),
+        WorkTicket.created_at,
+        WorkTicket.remark
+    ).outerjoin(
+        Contractor, WorkTicket.contractor_id == Contractor.contractor_id
+    ).order_by(WorkTicket.created_at.desc())
+
+    stmt = TenantQueryFilter.apply(stmt, ctx)
+
+    # 筛选条件
+    if status:
+        stmt = stmt.where(WorkTicket.status == status)
+    if contractor_id:
+        stmt = stmt.where(WorkTicket.contractor_id == contractor_id)
+    if start_date:
+        stmt = stmt.where(WorkTicket.end_date >= start_date)
+    if end_date:
+        stmt = stmt.where(WorkTicket.start_date <= end_date)
+
+    status_map = {
+        "DRAFT": "草稿",
+        "IN_PROGRESS": "进行中",
+        "CLOSED": "已关闭",
+        "CANCELLED": "已取消"
+    }
+
+    async def rows(session):
+        async for row in stream_rows(session, stmt):
+            yield [
+                str(row.ticket_id),
+                row.title,
+                row.contractor_name or "",
+                status_map.get(row.status, row.status),
+                row.start_date.strftime("%Y-%m-%d"),
+                row.end_date.strftime("%Y-%m-%d"),
+                row.worker_count,
+                row.area_count,
+                row.created_at.strftime("%Y-%m-%d %H:%M:%S"),
+                row.remark or ""
+            ]
+
+    return ExportSpec(
+        title="作业票列表",
+        headers=[
+            "作业票ID", "标题", "施工单位", "状态", "开始日期", "结束日期",
+            "人员数量", "区域数量", "创建时间", "备注"
+        ],
+        rows=rows,
+        filename=f"作业票列表_{datetime.now().strftime('%Y%m%d_%H%M%S')}",
+        column_widths=[36, 30, 20, 12, 12, 12, 10, 10, 20, 30]
+    )
+
+
+def build_export_spec(
+    export_type: str,
+    params: Dict[str, Any],
+    ctx: Optional[TenantContext]
+) -> Optional[ExportSpec]:
+    """
+    根据导出类型和参数（JSON 形式）构造导出定义
+    """
+    start_date = date.fromisoformat(params["start_date"]) if params.get("start_date") else None
+    end_date = date.fromisoformat(params["end_date"]) if params.get("end_date") else None
+
+    if export_type == TICKET_EXPORT_TYPE:
+        contractor_id = params.get("contractor_id")
+        return build_ticket_export(
+            status=params.get("status"),
+            contractor_id=uuid.UUID(contractor_id) if contractor_id else None,
+            start_date=start_date,
+            end_date=end_date,
+            ctx=ctx
+        )
+
+    return build_report_export(export_type, start_date, end_date, ctx)
+
+
+def _dump_tenant_context(ctx: Optional[TenantContext]) -> Optional[Dict[str, Any]]:
+    """租户上下文快照（JSON）"""
+    if ctx is None:
+        return None
+    return {
+        "user_id": str(ctx.user_id) if ctx.user_id else None,
+        "user_role": ctx.user_role,
+        "site_id": str(ctx.site_id) if ctx.site_id else None,
+        "contractor_id": str(ctx.contractor_id) if ctx.contractor_id else None,
+        "accessible_sites": [str(s) for s in ctx.accessible_sites],
+    }
+
+
+def _load_tenant_context(scope: Optional[Dict[str, Any]]) -> Optional[TenantContext]:
+    """从快照恢复租户上下文"""
+    if scope is None:
+        return None
+
+    def _uuid(value):
+        return uuid.UUID(value) if value else None
+
+    return TenantContext(
+        user_id=_uuid(scope.get("user_id")),
+        user_role=scope.get("user_role"),
+        site_id=_uuid(scope.get("site_id")),
+        contractor_id=_uuid(scope.get("contractor_id")),
+        accessible_sites=[uuid.UUID(s) for s in scope.get("accessible_sites") or []],
+    )
+
+
+class ExportService:
+    """异步导出任务服务"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def create_job(
+        self,
+        export_type: str,
+        file_format: str,
+        params: Dict[str, Any],
+        ctx: Optional[TenantContext],
+        created_by: Optional[uuid.UUID] = None
+    ) -> ExportJob:
+        """
+        创建导出任务（调用方提交事务后再投递 Celery 任务）
+        """
+        job = ExportJob(
+            export_type=export_type,
+            file_format=file_format,
+            params=params,
+            tenant_scope=_dump_tenant_context(ctx),
+            created_by=created_by,
+            status="PENDING",
+            rows_written=0
+        )
+        self.db.add(job)
+        await self.db.flush()
+
+        logger.info(
+            f"Export job created: job={job.job_id}, type={export_type}, "
+            f"format={file_format}, user={created_by}"
+        )
+        return job
+
+    async def get_job(self, job_id: uuid.UUID) -> Optional[ExportJob]:
+        """获取导出任务"""
+        return await self.db.get(ExportJob, job_id)
+
+    async def _update_progress(self, job_id: uuid.UUID, rows_written: int) -> None:
+        """回写已写入行数（与数据读取使用不同会话，不影响游标）"""
+        await self.db.execute(
+            update(ExportJob)
+            .where(ExportJob.job_id == job_id)
+            .values(rows_written=rows_written)
+        )
+        await self.db.commit()
+
+    async def run_job(self, job_id: uuid.UUID) -> Optional[ExportJob]:
+        """
+        执行导出任务
+
+        1. PENDING -> RUNNING（重复投递时跳过已开始的任务）
+        2. 以提交时的租户上下文构造查询，独立会话流式读取并写入临时文件
+        3. 每写入 EXPORT_PROGRESS_INTERVAL 行回写一次进度
+        4. 文件转存至本地目录或 MinIO，任务置为 SUCCESS；异常置为 FAILED
+        """
+        from app.core.database import SessionLocal
+        from app.utils.storage import save_export_file
+
+        job = await self.get_job(job_id)
+        if not job:
+            logger.warning(f"Export job not found: {job_id}")
+            return None
+
+        if job.status != "PENDING":
+            logger.info(f"Export job {job_id} already {job.status}, skipping")
+            return job
+
+        job.status = "RUNNING"
+        job.started_at = datetime.now(timezone.utc)
+        await self.db.commit()
+
+        tmp_path = None
+        try:
+            ctx = _load_tenant_context(job.tenant_scope)
+            spec = build_export_spec(job.export_type, job.params or {}, ctx)
+            if spec is None:
+                raise ValueError(f"不支持的导出类型: {job.export_type}")
+
+            rows_written = 0
+
+            async def counted(rows):
+                nonlocal rows_written
+                async for row in rows:
+                    rows_written += 1
+                    if rows_written % settings.EXPORT_PROGRESS_INTERVAL == 0:
+                        await self._update_progress(job.job_id, rows_written)
+                    yield row
+
+            fd, tmp_path = tempfile.mkstemp(suffix=f".{job.file_format}")
+            async with SessionLocal() as stream_db:
+                source = counted(spec.rows(stream_db))
+                if job.file_format == "csv":
+                    chunks = iter_csv(spec.headers, source)
+                else:
+                    chunks = iter_xlsx(spec.title, spec.headers, source, spec.column_widths)
+                with os.fdopen(fd, "wb") as output:
+                    async for chunk in chunks:
+                        output.write(chunk)
+
+            file_name = f"{spec.filename}.{job.file_format}"
+            storage_key = f"exports/{job.job_id}.{job.file_format}"
+            job.file_size = os.path.getsize(tmp_path)
+            job.storage_backend = save_export_file(tmp_path, storage_key, job.file_format)
+            tmp_path = None
+
+            job.status = "SUCCESS"
+            job.rows_written = rows_written
+            job.file_name = file_name
+            job.storage_key = storage_key
+            job.finished_at = datetime.now(timezone.utc)
+            await self.db.commit()
+
+            logger.info(
+                f"Export job finished: job={job.job_id}, rows={rows_written}, "
+                f"size={job.file_size}, storage={job.storage_backend}"
+            )
+
+        except Exception as e:
+            logger.error(f"Export job {job_id} failed: {e}", exc_info=True)
+            await self.db.rollback()
+            await self.db.execute(
+                update(ExportJob)
+                .where(ExportJob.job_id == job_id)
+                .values(
+                    status="FAILED",
+                    error_msg=str(e)[:500],
+                    finished_at=datetime.now(timezone.utc)
+                )
+            )
+            await self.db.commit()
+            await self.db.refresh(job)
+
+        finally:
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        return job
+
+    async def cleanup_expired_jobs(self) -> int:
+        """
+        清理过期导出任务及其结果文件
+
+        Returns:
+            int: 清理的任务数
+        """
+        from app.utils.storage import delete_export_file
+
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=settings.EXPORT_JOB_RETENTION_HOURS)
+        result = await self.db.execute(
+            select(ExportJob).where(ExportJob.created_at < cutoff)
+        )
+        jobs = result.scalars().all()
+
+        for job in jobs:
+            if job.storage_key:
+                try:
+                    delete_export_file(job.storage_backend, job.storage_key)
+                except Exception as e:
+                    logger.warning(f"Failed to delete export file {job.storage_key}: {e}")
+            await self.db.delete(job)
+
+        await self.db.commit()
+        return len(jobs)
+
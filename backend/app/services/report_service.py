@@ -0,0 +1,410 @@
+"""
+报表统计服务
+- 看板指标聚合：所有计数在一条 CTE + FILTER 查询中完成
+- 趋势/统计/导出：读取 daily_site_metrics 预聚合数据，按天数而非明细行数扩展
+"""
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional
+import uuid
+import logging
+
+from sqlalchemy import select, func, true, literal_column, and_, cast, Date, Numeric
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models import (
+    WorkTicket, DailyTicket, DailyTicketWorker, AccessGrant, AccessEvent,
+    DailySiteMetrics
+)
+from app.middleware.tenant import TenantContext
+from app.services.daily_metrics_service import COUNTER_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+
+# 看板需要分别统计的日票状态
+DAILY_TICKET_STATUSES = ["DRAFT", "PUBLISHED", "IN_PROGRESS", "EXPIRED", "CANCELLED"]
+
+# 趋势支持的指标
+TREND_METRICS = ["completion_rate", "sync_rate", "training_duration"]
+
+# 趋势最大查询天数
+TREND_MAX_DAYS = 365
+
+
+def rate(part, total, digits: int = 2) -> float:
+    """百分比，分母为0时返回0"""
+    return round((part / total * 100), digits) if total > 0 else 0
+
+
+def avg_training_minutes(metrics: dict) -> float:
+    """平均培训时长（分钟）"""
+    sessions = metrics["training_session_count"]
+    if not sessions:
+        return 0
+    return round(metrics["training_seconds"] / sessions / 60, 1)
+
+
+def avg_sync_seconds(metrics: dict) -> float:
+    """平均同步时长（秒）"""
+    synced = metrics["grant_synced_count"]
+    if not synced:
+        return 0
+    return round(metrics["sync_seconds"] / synced, 1)
+
+
+def _percent(part_column, total_column):
+    """SUM(part) / SUM(total) 的百分比（保留两位小数，分母为0时为0）"""
+    return func.coalesce(
+        func.round(
+            literal_column("100.0") * func.sum(part_column) / func.nullif(func.sum(total_column), 0),
+            2
+        ),
+        0
+    )
+
+
+def _trend_expression(metric: str):
+    """趋势指标对应的聚合表达式（基于 daily_site_metrics）"""
+    if metric == "completion_rate":
+        # 培训完成率
+        return _percent(DailySiteMetrics.completed_count, DailySiteMetrics.worker_count)
+    if metric == "sync_rate":
+        # 同步成功率
+        return _percent(DailySiteMetrics.grant_synced_count, DailySiteMetrics.grant_count)
+    if metric == "training_duration":
+        # 平均培训时长（分钟）
+        return func.coalesce(
+            func.round(
+                cast(
+                    func.sum(DailySiteMetrics.training_seconds)
+                    / func.nullif(func.sum(DailySiteMetrics.training_session_count), 0)
+                    / 60,
+                    Numeric
+                ),
+                1
+            ),
+            0
+        )
+    raise ValueError(f"Unsupported trend metric: {metric}")
+
+
+class ReportService:
+    """报表统计服务"""
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    @staticmethod
+    def get_site_scope(ctx: Optional[TenantContext]) -> Optional[List[uuid.UUID]]:
+        """
+        获取租户可访问的工地列表
+
+        与 TenantQueryFilter 保持一致：SysAdmin 或未绑定工地时不过滤（返回 None）
+        """
+        if ctx is None or ctx.is_sys_admin or not ctx.accessible_sites:
+            return None
+        return list(ctx.accessible_sites)
+
+    async def get_dashboard_metrics(
+        self,
+        today: date,
+        ctx: Optional[TenantContext] = None
+    ) -> dict:
+        """
+        一次查询获取看板全部计数
+
+        每张表各自聚合成一行 CTE，再用 CROSS JOIN 拼成一行返回，
+        替代原先逐项 COUNT 的十余次往返。
+
+        Args:
+            today: 统计日期
+            ctx: 租户上下文
+
+        Returns:
+            dict: 今日日票/培训/授权/进出计数以及日票状态分布
+        """
+        sites = self.get_site_scope(ctx)
+
+        def scoped(stmt, site_column):
+            if sites:
+                return stmt.where(site_column.in_(sites))
+            return stmt
+
+        # 今日日票（含状态分布）
+        dt_stats = scoped(
+            select(
+                func.count().filter(
+                    DailyTicket.status.in_(["PUBLISHED", "IN_PROGRESS"])
+                ).label("today_tickets"),
+                *[
+                    func.count().filter(DailyTicket.status == status).label(f"status_{status.lower()}")
+                    for status in DAILY_TICKET_STATUSES
+                ]
+            ).where(DailyTicket.date == today),
+            DailyTicket.site_id
+        ).cte("dt_stats")
+
+        # 今日培训
+        dtw_stats = scoped(
+            select(
+                func.count().filter(
+                    DailyTicketWorker.training_status == "COMPLETED"
+                ).label("completed_training"),
+                func.count().filter(
+                    DailyTicketWorker.status == "ACTIVE"
+                ).label("total_training"),
+            )
+            .select_from(DailyTicketWorker)
+            .join(DailyTicket, DailyTicketWorker.daily_ticket_id == DailyTicket.daily_ticket_id)
+            .where(DailyTicket.date == today),
+            DailyTicket.site_id
+        ).cte("dtw_stats")
+
+        # 今日授权
+        grant_stats = scoped(
+            select(
+                func.count().filter(AccessGrant.status == "SYNCED").label("synced_grants"),
+                func.count().filter(
+                    AccessGrant.status.in_(["PENDING_SYNC", "SYNC_FAILED"])
+                ).label("pending_grants"),
+            )
+            .select_from(AccessGrant)
+            .join(DailyTicket, AccessGrant.daily_ticket_id == DailyTicket.daily_ticket_id)
+            .where(DailyTicket.date == today),
+            DailyTicket.site_id
+        ).cte("grant_stats")
+
+        # 今日进出
+        today_start = datetime.combine(today, datetime.min.time())
+        today_end = datetime.combine(today, datetime.max.time())
+        event_stats = scoped(
+            select(
+                func.count().filter(AccessEvent.result == "PASS").label("pass_events"),
+                func.count().filter(AccessEvent.result == "DENY").label("deny_events"),
+            ).where(
+                AccessEvent.event_time >= today_start,
+                AccessEvent.event_time <= today_end
+            ),
+            AccessEvent.site_id
+        ).cte("event_stats")
+
+        # 进行中的作业票
+        ticket_stats = scoped(
+            select(
+                func.count().label("active_tickets")
+            ).where(WorkTicket.status == "ACTIVE"),
+            WorkTicket.site_id
+        ).cte("ticket_stats")
+
+        stmt = select(
+            dt_stats, dtw_stats, grant_stats, event_stats, ticket_stats
+        ).select_from(
+            dt_stats
+            .join(dtw_stats, true())
+            .join(grant_stats, true())
+            .join(event_stats, true())
+            .join(ticket_stats, true())
+        )
+
+        result = await self.db.execute(stmt)
+        row = dict(result.one()._mapping)
+
+        metrics = {
+            key: row.get(key) or 0
+            for key in (
+                "today_tickets", "active_tickets",
+                "completed_training", "total_training",
+                "synced_grants", "pending_grants",
+                "pass_events", "deny_events",
+            )
+        }
+        metrics["status_counts"] = {
+            status: row.get(f"status_{status.lower()}") or 0
+            for status in DAILY_TICKET_STATUSES
+        }
+
+        return metrics
+
+    # ==================== 预聚合指标 ====================
+
+    def _metrics_stmt(
+        self,
+        start_date: date,
+        end_date: date,
+        ctx: Optional[TenantContext],
+        *group_columns
+    ):
+        """构造 daily_site_metrics 的范围汇总查询（跨工地求和）"""
+        stmt = select(
+            *group_columns,
+            *[
+                func.coalesce(func.sum(getattr(DailySiteMetrics, col)), 0).label(col)
+                for col in COUNTER_COLUMNS
+            ],
+            func.coalesce(func.max(DailySiteMetrics.max_sync_attempts), 0).label("max_sync_attempts"),
+        ).where(
+            DailySiteMetrics.metric_date >= start_date,
+            DailySiteMetrics.metric_date <= end_date
+        )
+
+        sites = self.get_site_scope(ctx)
+        if sites:
+            stmt = stmt.where(DailySiteMetrics.site_id.in_(sites))
+
+        return stmt
+
+    @staticmethod
+    def empty_metrics() -> dict:
+        """无数据日期的零值指标"""
+        metrics = {col: 0 for col in COUNTER_COLUMNS}
+        metrics["max_sync_attempts"] = 0
+        return metrics
+
+    async def get_daily_metrics(
+        self,
+        start_date: date,
+        end_date: date,
+        ctx: Optional[TenantContext] = None
+    ) -> List[dict]:
+        """
+        按天获取预聚合指标（缺失日期补零）
+
+        Args:
+            start_date: 开始日期
+            end_date: 结束日期（含）
+            ctx: 租户上下文
+
+        Returns:
+            List[dict]: 每天一项，含 date 及各计数列
+        """
+        stmt = self._metrics_stmt(
+            start_date, end_date, ctx, DailySiteMetrics.metric_date
+        ).group_by(DailySiteMetrics.metric_date)
+
+        result = await self.db.execute(stmt)
+        by_date: Dict[date, dict] = {
+            row.metric_date: dict(row._mapping) for row in result
+        }
+
+        days = []
+        current_date = start_date
+        while current_date <= end_date:
+            metrics = by_date.get(current_date) or self.empty_metrics()
+            metrics["date"] = current_date
+            days.append(metrics)
+            current_date += timedelta(days=1)
+
+        return days
+
+    async def get_metrics_summary(
+        self,
+        start_date: date,
+        end_date: date,
+        ctx: Optional[TenantContext] = None
+    ) -> dict:
+        """
+        获取日期范围内的预聚合指标合计
+
+        Args:
+            start_date: 开始日期
+            end_date: 结束日期（含）
+            ctx: 租户上下文
+
+        Returns:
+            dict: 各计数列合计，max_sync_attempts 为最大值
+        """
+        result = await self.db.execute(
+            self._metrics_stmt(start_date, end_date, ctx)
+        )
+        return dict(result.one()._mapping)
+
+    async def get_grant_failure_reasons(
+        self,
+        start_date: date,
+        end_date: date,
+        ctx: Optional[TenantContext] = None,
+        limit: int = 10
+    ) -> List[dict]:
+        """
+        同步失败原因 Top N（库内分组，仅扫描 SYNC_FAILED 授权）
+
+        Args:
+            start_date: 开始日期
+            end_date: 结束日期（含）
+            ctx: 租户上下文
+            limit: 返回条数
+
+        Returns:
+            List[dict]: [{"reason": 原因前50字, "count": 次数}]
+        """
+        reason = func.substr(AccessGrant.sync_error_msg, literal_column("1"), literal_column("50"))
+        stmt = select(
+            reason.label("reason"),
+            func.count().label("count")
+        ).where(
+            AccessGrant.status == "SYNC_FAILED",
+            AccessGrant.sync_error_msg.isnot(None),
+            AccessGrant.sync_error_msg != "",
+            AccessGrant.created_at >= datetime.combine(start_date, datetime.min.time()),
+            AccessGrant.created_at <= datetime.combine(end_date, datetime.max.time())
+        ).group_by(reason).order_by(func.count().desc()).limit(limit)
+
+        sites = self.get_site_scope(ctx)
+        if sites:
+            stmt = stmt.where(AccessGrant.site_id.in_(sites))
+
+        result = await self.db.execute(stmt)
+        return [{"reason": row.reason, "count": row.count} for row in result]
+
+    async def get_trend(
+        self,
+        metrics: List[str],
+        start_date: date,
+        end_date: date,
+        ctx: Optional[TenantContext] = None
+    ) -> Dict[str, List[dict]]:
+        """
+        获取趋势数据（整个区间一次查询）
+
+        generate_series 生成连续日期并左连接 daily_site_metrics，
+        按日期分组一次算出所有请求的指标，无数据的日期取0。
+        查询耗时只与天数相关，与明细行数无关。
+
+        Args:
+            metrics: 指标列表，取值见 TREND_METRICS
+            start_date: 开始日期
+            end_date: 结束日期（含）
+            ctx: 租户上下文
+
+        Returns:
+            Dict[str, List[dict]]: 指标 → [{"date": "YYYY-MM-DD", "value": 数值}]
+        """
+        days = func.generate_series(
+            cast(start_date, Date),
+            cast(end_date, Date),
+            literal_column("interval '1 day'")
+        ).table_valued("day").alias("days")
+        day = cast(days.c.day, Date)
+
+        join_condition = DailySiteMetrics.metric_date == day
+        sites = self.get_site_scope(ctx)
+        if sites:
+            join_condition = and_(join_condition, DailySiteMetrics.site_id.in_(sites))
+
+        stmt = select(
+            day.label("day"),
+            *[_trend_expression(metric).label(metric) for metric in metrics]
+        ).select_from(
+            days.outerjoin(DailySiteMetrics, join_condition)
+        ).group_by(days.c.day).order_by(days.c.day)
+
+        result = await self.db.execute(stmt)
+        rows = result.all()
+
+        return {
+            metric: [
+                {"date": str(row.day), "value": float(getattr(row, metric) or 0)}
+                for row in rows
+            ]
+            for metric in metrics
+        }
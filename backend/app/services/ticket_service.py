@@ -3,16 +3,20 @@
 """
 import uuid
 from datetime import date, datetime, timedelta
-from typing import List, Any
+from typing import List, Any, Optional
 import logging
 
-from sqlalchemy import select
+from sqlalchemy import select, insert, update, func, cast, Integer
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 from app.models import (
     WorkTicket, WorkTicketWorker, WorkTicketArea, WorkTicketVideo,
-    DailyTicket, DailyTicketWorker, DailyTicketSnapshot
+    DailyTicket, DailyTicketWorker, DailyTicketSnapshot, AccessGrant
 )
+from app.core.config import settings
+from app.middleware.tenant import TenantContext
+from app.services.daily_metrics_service import DailyMetricsService
 
 logger = logging.getLogger(__name__)
 
@@ -23,22 +27,54 @@ class TicketService:
     def __init__(self, db: AsyncSession):
         self.db = db
     
+    def get_horizon_end(self, ticket: WorkTicket, today: Optional[date] = None) -> date:
+        """
+        日票物化截止日期
+
+        DAILY_TICKET_HORIZON_DAYS > 0 时只物化到 today + N - 1（不超过结束日期），
+        否则物化整个日期范围
+        """
+        horizon_days = settings.DAILY_TICKET_HORIZON_DAYS
+        if horizon_days <= 0:
+            return ticket.end_date
+        today = today or date.today()
+        return min(ticket.end_date, today + timedelta(days=horizon_days - 1))
+    
     async def generate_daily_tickets(
         self, 
-        ticket: WorkTicket
-    ) -> List[DailyTicket]:
+        ticket: WorkTicket,
+        until: Optional[date] = None
+    ) -> List[uuid.UUID]:
         """
         生成每日票据 (P0-8: 含快照)
-        
+
+        批量生成：日票ID在客户端预先生成，日票、快照、日票-工人
+        各以多行 INSERT 写入，往返次数与日期数、人员数无关
+
+        增量物化：从 ticket.materialized_until 的次日开始生成，
+        完成后推进 materialized_until，重复调用不会产生重复日票
+
         Args:
             ticket: 作业票对象
+            until: 物化截止日期，默认按滚动物化配置计算
         
         Returns:
-            List[DailyTicket]: 生成的每日票据列表
+            List[uuid.UUID]: 生成的每日票据ID列表
         """
-        # 获取关联数据
+        start = ticket.start_date
+        if ticket.materialized_until is not None:
+            start = max(start, ticket.materialized_until + timedelta(days=1))
+        end = min(until or self.get_horizon_end(ticket), ticket.end_date)
+        
+        # 生成日期范围
+        dates = self._get_date_range(start, end)
+        if not dates:
+            return []
+        
+        # 获取关联数据（预加载人员/区域/视频，避免逐条懒加载）
         workers_result = await self.db.execute(
             select(WorkTicketWorker)
+            .options(selectinload(WorkTicketWorker.worker))
             .where(
                 WorkTicketWorker.ticket_id == ticket.ticket_id,
                 WorkTicketWorker.status == "ACTIVE"
@@ -48,6 +84,7 @@ class TicketService:
         
         areas_result = await self.db.execute(
             select(WorkTicketArea)
+            .options(selectinload(WorkTicketArea.area))
             .where(
                 WorkTicketArea.ticket_id == ticket.ticket_id,
                 WorkTicketArea.status == "ACTIVE"
@@ -57,6 +94,7 @@ class TicketService:
         
         videos_result = await self.db.execute(
             select(WorkTicketVideo)
+            .options(selectinload(WorkTicketVideo.video))
             .where(
                 WorkTicketVideo.ticket_id == ticket.ticket_id,
                 WorkTicketVideo.status == "ACTIVE"
@@ -66,91 +104,112 @@ class TicketService:
         
         video_count = len(videos)
         
-        # 生成日期范围
-        dates = self._get_date_range(ticket.start_date, ticket.end_date)
+        # 快照内容与日期无关，只构建一次
+        snapshot_templates = []
+        for tw in workers:
+            # 工人快照
+            worker = tw.worker
+            snapshot_templates.append({
+                "snapshot_type": "WORKER",
+                "entity_id": tw.worker_id,
+                "entity_name": worker.name if worker else None,
+                "extra_metadata": {
+                    "id_no": worker.id_no if worker else None,
+                    "phone": worker.phone if worker else None,
+                    "job_type": worker.job_type if worker else None
+                }
+            })
+        
+        for ta in areas:
+            # 区域快照
+            area = ta.area
+            snapshot_templates.append({
+                "snapshot_type": "AREA",
+                "entity_id": ta.area_id,
+                "entity_name": area.name if area else None,
+                "extra_metadata": {
+                    "access_group_id": area.access_group_id if area else None
+                }
+            })
         
-        daily_tickets = []
+        for tv in videos:
+            # 视频快照
+            video = tv.video
+            snapshot_templates.append({
+                "snapshot_type": "VIDEO",
+                "entity_id": tv.video_id,
+                "entity_name": video.title if video else None,
+                "extra_metadata": {
+                    "duration": video.duration_sec if video else None,
+                    "required_percent": float(tv.required_watch_percent)
+                }
+            })
+        
+        daily_ticket_rows = []
+        snapshot_rows = []
+        worker_rows = []
         
         for d in dates:
-            # 创建日票
-            daily_ticket = DailyTicket(
-                ticket_id=ticket.ticket_id,
-                site_id=ticket.site_id,
-                date=d,
-                access_start_time=ticket.default_access_start_time,
-                access_end_time=ticket.default_access_end_time,
-                training_deadline_time=ticket.default_training_deadline_time,
-                status="PUBLISHED"
-            )
-            self.db.add(daily_ticket)
-            await self.db.flush()  # 获取ID
+            daily_ticket_id = uuid.uuid4()
+            daily_ticket_rows.append({
+                "daily_ticket_id": daily_ticket_id,
+                "ticket_id": ticket.ticket_id,
+                "site_id": ticket.site_id,
+                "date": d,
+                "access_start_time": ticket.default_access_start_time,
+                "access_end_time": ticket.default_access_end_time,
+                "training_deadline_time": ticket.default_training_deadline_time,
+                "status": "PUBLISHED"
+            })
             
             # P0-8: 保存快照
-            for tw in workers:
-                # 工人快照
-                worker = tw.worker
-                snapshot = DailyTicketSnapshot(
-                    daily_ticket_id=daily_ticket.daily_ticket_id,
-                    snapshot_type="WORKER",
-                    entity_id=tw.worker_id,
-                    entity_name=worker.name if worker else None,
-                    metadata={
-                        "id_no": worker.id_no if worker else None,
-                        "phone": worker.phone if worker else None,
-                        "job_type": worker.job_type if worker else None
-                    }
-                )
-                self.db.add(snapshot)
-                
-                # 创建日票-工人状态
-                dtw = DailyTicketWorker(
-                    daily_ticket_id=daily_ticket.daily_ticket_id,
-                    worker_id=tw.worker_id,
-                    site_id=ticket.site_id,
-                    total_video_count=video_count,
-                    completed_video_count=0,
-                    training_status="NOT_STARTED",
-                    authorized=False,
-                    status="ACTIVE"
-                )
-                self.db.add(dtw)
-            
-            for ta in areas:
-                # 区域快照
-                area = ta.area
-                snapshot = DailyTicketSnapshot(
-                    daily_ticket_id=daily_ticket.daily_ticket_id,
-                    snapshot_type="AREA",
-                    entity_id=ta.area_id,
-                    entity_name=area.name if area else None,
-                    metadata={
-                        "access_group_id": area.access_group_id if area else None
-                    }
-                )
-                self.db.add(snapshot)
-            
-            for tv in videos:
-                # 视频快照
-                video = tv.video
-                snapshot = DailyTicketSnapshot(
-                    daily_ticket_id=daily_ticket.daily_ticket_id,
-                    snapshot_type="VIDEO",
-                    entity_id=tv.video_id,
-                    entity_name=video.title if video else None,
-                    metadata={
-                        "duration": video.duration_sec if video else None,
-                        "required_percent": float(tv.required_watch_percent)
-                    }
-                )
-                self.db.add(snapshot)
+            snapshot_rows.extend(
+                {"id": uuid.uuid4(), "daily_ticket_id": daily_ticket_id, **tpl}
+                for tpl in snapshot_templates
+            )
             
-            daily_tickets.append(daily_ticket)
+            # 创建日票-工人状态
+            worker_rows.extend(
+                {
+                    "id": uuid.uuid4(),
+                    "daily_ticket_id": daily_ticket_id,
+                    "worker_id": tw.worker_id,
+                    "site_id": ticket.site_id,
+                    "total_video_count": video_count,
+                    "completed_video_count": 0,
+                    "training_status": "NOT_STARTED",
+                    "authorized": False,
+                    "notify_count": 0,
+                    "status": "ACTIVE"
+                }
+                for tw in workers
+            )
+        
+        # 批量写入（ORM bulk INSERT，asyncpg executemany 管道化执行）
+        await self.db.execute(insert(DailyTicket), daily_ticket_rows)
+        if snapshot_rows:
+            await self.db.execute(insert(DailyTicketSnapshot), snapshot_rows)
+        if worker_rows:
+            await self.db.execute(insert(DailyTicketWorker), worker_rows)
+        
+        # 报表预聚合：每日培训人数（所有日期一条 upsert）
+        if workers:
+            await DailyMetricsService(self.db).increment_dates(
+                ticket.site_id,
+                dates,
+                worker_count=len(workers),
+                not_started_count=len(workers),
+                videos_required=len(workers) * video_count
+            )
+        
+        ticket.materialized_until = dates[-1]
         
         logger.info(
-            f"Generated {len(daily_tickets)} daily tickets for ticket {ticket.ticket_id}"
+            f"Generated {len(dates)} daily tickets for ticket {ticket.ticket_id} "
+            f"({len(worker_rows)} workers, {len(snapshot_rows)} snapshots)"
         )
         
-        return daily_tickets
+        return [row["daily_ticket_id"] for row in daily_ticket_rows]
     
     def _get_date_range(self, start: date, end: date) -> List[date]:
         """生成日期范围"""
@@ -200,4 +259,200 @@ class TicketService:
                 completed_training / total_training * 100, 1
             ) if total_training > 0 else 0
         }
-
+    
+    async def get_ticket_stats(
+        self,
+        start_date: Optional[date],
+        end_date: Optional[date],
+        ctx: Optional[TenantContext]
+    ) -> dict:
+        """
+        作业票汇总统计（单条聚合查询）
+        
+        状态计数使用 FILTER 聚合；在岗人员/区域数先按作业票分组计数，
+        再以子查询关联求和，避免逐张作业票查询
+        """
+        worker_counts = (
+            select(
+                WorkTicketWorker.ticket_id,
+                func.count().label("cnt")
+            )
+            .where(WorkTicketWorker.status == "ACTIVE")
+            .group_by(WorkTicketWorker.ticket_id)
+            .subquery()
+        )
+        area_counts = (
+            select(
+                WorkTicketArea.ticket_id,
+                func.count().label("cnt")
+            )
+            .where(WorkTicketArea.status == "ACTIVE")
+            .group_by(WorkTicketArea.ticket_id)
+            .subquery()
+        )
+        
+        stmt = (
+            select(
+                func.count().label("total_count"),
+                func.count().filter(WorkTicket.status == "DRAFT").label("draft_count"),
+                func.count().filter(WorkTicket.status == "ACTIVE").label("active_count"),
+                func.count().filter(WorkTicket.status == "CANCELLED").label("cancelled_count"),
+                cast(func.coalesce(func.sum(worker_counts.c.cnt), 0), Integer).label("total_workers"),
+                cast(func.coalesce(func.sum(area_counts.c.cnt), 0), Integer).label("total_areas"),
+            )
+            .select_from(WorkTicket)
+            .outerjoin(worker_counts, worker_counts.c.ticket_id == WorkTicket.ticket_id)
+            .outerjoin(area_counts, area_counts.c.ticket_id == WorkTicket.ticket_id)
+        )
+        if ctx is not None and not ctx.is_sys_admin and ctx.accessible_sites:
+            stmt = stmt.where(WorkTicket.site_id.in_(ctx.accessible_sites))
+        
+        # 日期范围过滤
+        if start_date:
+            stmt = stmt.where(WorkTicket.created_at >= datetime.combine(start_date, datetime.min.time()))
+        if end_date:
+            stmt = stmt.where(WorkTicket.created_at <= datetime.combine(end_date, datetime.max.time()))
+        
+        row = (await self.db.execute(stmt)).mappings().one()
+        return dict(row)
+    
+    async def bulk_close_tickets(
+        self,
+        ticket_ids: List[uuid.UUID],
+        ticket_status: str,
+        skip_statuses: List[str],
+        daily_ticket_status: str,
+        revoke_reason: str,
+        cancel_reason: Optional[str] = None
+    ) -> dict:
+        """
+        批量关闭/取消作业票（集合操作）
+        
+        1. UPDATE work_ticket ... WHERE ticket_id = ANY(:ids) RETURNING
+        2. UPDATE daily_ticket（已发布/进行中的日票）
+        3. UPDATE access_grant 置为 REVOKED，CTE 锁定并带出撤销前状态
+        4. 按 工地 + 日期 合并调整报表汇总
+        
+        门禁侧撤销不在事务内执行：返回需要撤销的已同步授权，
+        由调用方提交后批量投递任务
+        
+        Args:
+            ticket_ids: 作业票ID列表
+            ticket_status: 作业票目标状态（CLOSED/CANCELLED）
+            skip_statuses: 已处于这些状态的作业票不处理
+            daily_ticket_status: 日票目标状态
+            revoke_reason: 授权撤销原因
+            cancel_reason: 日票取消原因（可选）
+        
+        Returns:
+            dict: {"tickets": [...], "failed_tickets": [...],
+                   "revoked_by_ticket": {ticket_id: count}, "vendor_revoke_ids": [...]}
+        """
+        ticket_ids = list(dict.fromkeys(ticket_ids))
+        
+        # 1. 作业票
+        ticket_result = await self.db.execute(
+            update(WorkTicket)
+            .where(
+                WorkTicket.ticket_id.in_(ticket_ids),
+                WorkTicket.status.notin_(skip_statuses)
+            )
+            .values(status=ticket_status)
+            .returning(WorkTicket.ticket_id, WorkTicket.title)
+            .execution_options(synchronize_session=False)
+        )
+        tickets = ticket_result.all()
+        updated_ids = [t.ticket_id for t in tickets]
+        
+        # 未更新的作业票：区分不存在与状态不允许
+        failed_tickets = []
+        missing_ids = set(ticket_ids) - set(updated_ids)
+        if missing_ids:
+            status_result = await self.db.execute(
+                select(WorkTicket.ticket_id, WorkTicket.status)
+                .where(WorkTicket.ticket_id.in_(missing_ids))
+            )
+            existing = dict(status_result.all())
+            for ticket_id in ticket_ids:
+                if ticket_id not in missing_ids:
+                    continue
+                if ticket_id in existing:
+                    reason = f"作业票已{existing[ticket_id]}"
+                else:
+                    reason = "作业票不存在"
+                failed_tickets.append({"ticket_id": str(ticket_id), "reason": reason})
+        
+        revoked_by_ticket = {}
+        vendor_revoke_ids = []
+        
+        if updated_ids:
+            # 2. 日票
+            daily_values = {"status": daily_ticket_status}
+            if cancel_reason is not None:
+                daily_values["cancel_reason"] = cancel_reason
+            await self.db.execute(
+                update(DailyTicket)
+                .where(
+                    DailyTicket.ticket_id.in_(updated_ids),
+                    DailyTicket.status.in_(["PUBLISHED", "IN_PROGRESS"])
+                )
+                .values(**daily_values)
+                .execution_options(synchronize_session=False)
+            )
+            
+            # 3. 授权：先锁定并记录撤销前状态，再统一更新
+            old_grants = (
+                select(
+                    AccessGrant.grant_id,
+                    AccessGrant.status.label("old_status"),
+                    DailyTicket.ticket_id
+                )
+                .join(DailyTicket, AccessGrant.daily_ticket_id == DailyTicket.daily_ticket_id)
+                .where(
+                    DailyTicket.ticket_id.in_(updated_ids),
+                    AccessGrant.status.in_(["SYNCED", "PENDING_SYNC", "SYNC_FAILED"])
+                )
+                .with_for_update(of=AccessGrant)
+                .cte("old_grants")
+            )
+            grant_result = await self.db.execute(
+                update(AccessGrant)
+                .where(AccessGrant.grant_id == old_grants.c.grant_id)
+                .values(
+                    status="REVOKED",
+                    revoked_at=datetime.now(),
+                    revoke_reason=revoke_reason
+                )
+                .returning(
+                    AccessGrant.grant_id,
+                    AccessGrant.site_id,
+                    AccessGrant.vendor_ref,
+                    AccessGrant.created_at,
+                    AccessGrant.last_sync_at,
+                    old_grants.c.old_status,
+                    old_grants.c.ticket_id
+                )
+                .execution_options(synchronize_session=False)
+            )
+            revoked = grant_result.all()
+            
+            for row in revoked:
+                revoked_by_ticket[row.ticket_id] = revoked_by_ticket.get(row.ticket_id, 0) + 1
+                if row.old_status == "SYNCED" and row.vendor_ref:
+                    vendor_revoke_ids.append(row.grant_id)
+            
+            # 4. 报表汇总
+            await DailyMetricsService(self.db).grants_revoked(revoked)
+        
+        logger.info(
+            f"Bulk {ticket_status.lower()} tickets: updated={len(updated_ids)}, "
+            f"failed={len(failed_tickets)}, revoked_grants={sum(revoked_by_ticket.values())}, "
+            f"vendor_revocations={len(vendor_revoke_ids)}"
+        )
+        
+        return {
+            "tickets": tickets,
+            "failed_tickets": failed_tickets,
+            "revoked_by_ticket": revoked_by_ticket,
+            "vendor_revoke_ids": vendor_revoke_ids,
+        }
@@ -13,6 +13,7 @@ from app.models import (
     DailyTicket, DailyTicketWorker, TrainingSession, TrainingVideo
 )
 from app.utils.progress_validator import TrainingProgressValidator
+from app.services.daily_metrics_service import DailyMetricsService
 
 logger = logging.getLogger(__name__)
 
@@ -28,6 +29,7 @@ class TrainingService:
     def __init__(self, db: AsyncSession):
         self.db = db
         self.validator = TrainingProgressValidator()
+        self.metrics = DailyMetricsService(db)
     
     async def check_and_trigger_access_grant(
         self, 
@@ -70,8 +72,16 @@ class TrainingService:
             dtw = dtw_result.scalar_one_or_none()
             
             if dtw:
+                old_status = dtw.training_status
+                old_completed = dtw.completed_video_count or 0
                 dtw.training_status = "COMPLETED"
                 dtw.completed_video_count = len(sessions)
+                await self.metrics.training_status_changed(
+                    daily_ticket_id,
+                    old_status,
+                    dtw.training_status,
+                    videos_completed=dtw.completed_video_count - old_completed
+                )
                 
                 # 触发门禁授权
                 from app.services.access_service import AccessService
@@ -201,7 +211,11 @@ class TrainingService:
         dtw = dtw_result.scalar_one_or_none()
         
         if dtw:
+            old_status = dtw.training_status
             dtw.training_status = "FAILED"
+            await self.metrics.training_status_changed(
+                session.daily_ticket_id, old_status, dtw.training_status
+            )
         
         logger.warning(
             f"Training session marked as failed: "
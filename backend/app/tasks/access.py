@@ -2,11 +2,14 @@
 门禁任务 (P0-6: 两级对账, P1-1: 幂等)
 - 授权同步重试
 - 同步对账（一级）
-- 权限对账（二级，可选）
+- 权限对账（二级，可选：有序归并比对、差异落库、自动修复）
+- 批量撤销（门禁侧）
+- 批量推送与推送合并
+- 门禁事件缓冲队列消费
 """
 import logging
 from datetime import datetime, timedelta
-from typing import List
+from typing import List, Optional, Tuple
 import uuid
 
 from .celery_app import celery_app
@@ -14,88 +17,102 @@ from .celery_app import celery_app
 logger = logging.getLogger(__name__)
 
 
+def _sync_retry_conditions(now: datetime) -> list:
+    """
+    需要重试同步的授权条件（指数退避在 SQL 中过滤，未到重试时间的行不会被加载）
+    
+    第 N 次尝试后等待 ACCESS_SYNC_RETRY_INTERVALS[min(N, len - 1)] 秒
+    """
+    from sqlalchemy import case, or_, literal_column
+    from app.core.config import settings
+    from app.models import AccessGrant
+    
+    # 常量直接写入 SQL，避免参数类型推断为 text 后无法与 interval 相乘
+    intervals = [literal_column(str(int(s))) for s in settings.ACCESS_SYNC_RETRY_INTERVALS]
+    wait_seconds = case(
+        *[
+            (AccessGrant.sync_attempt_count <= i, seconds)
+            for i, seconds in enumerate(intervals[:-1])
+        ],
+        else_=intervals[-1]
+    )
+    
+    return [
+        AccessGrant.valid_to > now,  # 未过期
+        or_(
+            AccessGrant.last_sync_at.is_(None),
+            AccessGrant.last_sync_at + wait_seconds * literal_column("INTERVAL '1 second'") <= now
+        )
+    ]
+
+
 @celery_app.task(name="tasks.access.retry_failed_sync")
 def retry_failed_sync():
     """
     每1分钟 - 授权同步重试
-    扫描 PENDING_SYNC 和 SYNC_FAILED 的授权，调用门禁适配器推送
+    扫描到达重试时间的 PENDING_SYNC 和 SYNC_FAILED 授权，批量并发推送
+    
+    在 ACCESS_SYNC_TIME_BUDGET 秒内循环处理：每批按上一批的实际吞吐
+    估算剩余时间可处理的数量（限制在 ACCESS_SYNC_BATCH_MIN ~ MAX 之间），
+    同时在途的门禁请求数由 ACCESS_PUSH_CONCURRENCY 限制
     """
     import asyncio
-    from sqlalchemy import select
+    import time
     from app.core.database import SessionLocal
     from app.core.config import settings
-    from app.models import AccessGrant
     
     async def _run():
-        async with SessionLocal() as db:
-            now = datetime.now()
-            synced_count = 0
-            failed_count = 0
+        if await _vendor_circuit_open():
+            logger.info("Access grant sync retry skipped: circuit open")
+            return {"skipped": "CIRCUIT_OPEN"}
+        
+        started = time.monotonic()
+        budget = settings.ACCESS_SYNC_TIME_BUDGET
+        batch_size = settings.ACCESS_SYNC_BATCH_MIN
+        totals = {
+            "total": 0, "synced_count": 0, "failed_count": 0,
+            "expired_count": 0, "deferred_count": 0
+        }
+        batches = 0
+        
+        while time.monotonic() - started < budget:
+            batch_started = time.monotonic()
             
-            # 查找需要重试的授权
-            result = await db.execute(
-                select(AccessGrant)
-                .where(
-                    AccessGrant.status.in_(["PENDING_SYNC", "SYNC_FAILED"]),
-                    AccessGrant.valid_to > now  # 未过期
+            async with SessionLocal() as db:
+                grant_ids, lease_until = await _claim_grants(
+                    db,
+                    conditions=_sync_retry_conditions(datetime.now()),
+                    limit=batch_size
                 )
-                .order_by(AccessGrant.created_at)
-                .limit(100)  # 每次最多处理100条
-            )
-            
-            grants = result.scalars().all()
-            
-            for grant in grants:
-                # 检查是否需要等待（指数退避）
-                if grant.last_sync_at:
-                    retry_intervals = settings.ACCESS_SYNC_RETRY_INTERVALS
-                    retry_index = min(
-                        grant.sync_attempt_count, 
-                        len(retry_intervals) - 1
-                    )
-                    wait_time = timedelta(seconds=retry_intervals[retry_index])
-                    
-                    if now - grant.last_sync_at < wait_time:
-                        continue  # 还需要等待
                 
-                # 尝试同步
-                try:
-                    from app.adapters.access_control_adapter import AccessControlAdapter
-                    
-                    adapter = AccessControlAdapter()
-                    result = await adapter.push_grant(grant)
-                    
-                    if result["success"]:
-                        grant.status = "SYNCED"
-                        grant.vendor_ref = result.get("vendor_ref")
-                        synced_count += 1
-                    else:
-                        grant.status = "SYNC_FAILED"
-                        grant.sync_error_msg = result.get("error")
-                        failed_count += 1
-                    
-                    grant.last_sync_at = now
-                    grant.sync_attempt_count += 1
-                    
-                except Exception as e:
-                    logger.error(f"Failed to sync grant {grant.grant_id}: {e}")
-                    grant.status = "SYNC_FAILED"
-                    grant.sync_error_msg = str(e)
-                    grant.last_sync_at = now
-                    grant.sync_attempt_count += 1
-                    failed_count += 1
+                if not grant_ids:
+                    break
+                
+                result = await _push_grants(db, grant_ids, lease_until)
             
-            await db.commit()
+            batches += 1
+            for key in totals:
+                totals[key] += result[key]
             
-            logger.info(
-                f"Access grant sync retry completed: "
-                f"synced={synced_count}, failed={failed_count}"
-            )
+            if result["deferred_count"] > 0:
+                break  # 本批推送中熔断：剩余授权等熔断恢复后再处理
             
-            return {
-                "synced_count": synced_count,
-                "failed_count": failed_count
-            }
+            if len(grant_ids) < batch_size:
+                break  # 积压已处理完
+            
+            # 动态批量：按本批吞吐估算剩余时间内可处理的数量
+            elapsed = max(time.monotonic() - batch_started, 0.001)
+            remaining = budget - (time.monotonic() - started)
+            batch_size = int(len(grant_ids) / elapsed * remaining)
+            batch_size = max(settings.ACCESS_SYNC_BATCH_MIN, min(batch_size, settings.ACCESS_SYNC_BATCH_MAX))
+        
+        logger.info(
+            f"Access grant sync retry completed: batches={batches}, "
+            f"synced={totals['synced_count']}, failed={totals['failed_count']}, "
+            f"expired={totals['expired_count']}"
+        )
+        
+        return {**totals, "batches": batches}
     
     return asyncio.get_event_loop().run_until_complete(_run())
 
@@ -176,12 +193,15 @@ def reconcile_with_vendor():
     每日 03:00 - 二级对账（权限对账）
     P0-6: 与门禁系统对账，需要门禁提供查询接口
     可选，根据门禁系统能力决定是否启用
+    
+    各工地按 ACCESS_RECONCILE_CONCURRENCY 并发对账，差异明细写入
+    access_reconcile_diff（同一次运行共用 run_id）
     """
     import asyncio
     from sqlalchemy import select
     from app.core.database import SessionLocal
     from app.core.config import settings
-    from app.models import AccessGrant, Site
+    from app.models import Site
     
     async def _run():
         # 检查门禁系统是否支持查询
@@ -195,83 +215,203 @@ def reconcile_with_vendor():
                 "message": "门禁系统不支持权限查询，跳过二级对账"
             }
         
+        now = datetime.now()
+        run_id = uuid.uuid4()
+        
+        # 获取所有活跃的工地
         async with SessionLocal() as db:
-            now = datetime.now()
-            
-            # 获取所有活跃的工地
             sites_result = await db.execute(
-                select(Site).where(Site.is_active == True)
+                select(Site.site_id).where(Site.is_active == True)
             )
-            sites = sites_result.scalars().all()
-            
-            all_reports = []
-            
-            for site in sites:
+            site_ids = sites_result.scalars().all()
+        
+        semaphore = asyncio.Semaphore(settings.ACCESS_RECONCILE_CONCURRENCY)
+        
+        async def _reconcile(site_id):
+            async with semaphore:
                 try:
-                    report = await _reconcile_site(db, site.site_id, now)
-                    all_reports.append(report)
+                    return await _reconcile_site(site_id, now, run_id)
                 except Exception as e:
-                    logger.error(f"Failed to reconcile site {site.site_id}: {e}")
-                    all_reports.append({
-                        "site_id": str(site.site_id),
+                    logger.error(f"Failed to reconcile site {site_id}: {e}")
+                    return {
+                        "site_id": str(site_id),
                         "status": "ERROR",
                         "error": str(e)
-                    })
-            
-            logger.info(f"Vendor reconciliation completed: {len(all_reports)} sites")
-            
-            return {
-                "timestamp": now.isoformat(),
-                "reports": all_reports
-            }
+                    }
+        
+        all_reports = await asyncio.gather(*[_reconcile(s) for s in site_ids])
+        
+        logger.info(f"Vendor reconciliation completed: run={run_id}, {len(all_reports)} sites")
+        
+        return {
+            "timestamp": now.isoformat(),
+            "run_id": str(run_id),
+            "reports": list(all_reports)
+        }
     
     return asyncio.get_event_loop().run_until_complete(_run())
 
 
-async def _reconcile_site(db, site_id: uuid.UUID, now: datetime) -> dict:
-    """对账单个工地"""
-    from sqlalchemy import select
+# 对账报告中每类差异附带的样例条数（完整明细见 access_reconcile_diff）
+RECONCILE_SAMPLE_SIZE = 20
+
+
+async def _iter_expected_grants(db, site_id: uuid.UUID, now: datetime, page_size: int):
+    """
+    本系统已同步授权，按比对键升序流式读取（服务端游标，每次取 page_size 行）
+    
+    Yields:
+        ((worker_id, area_id, vendor_ref), grant_id)
+    """
+    from sqlalchemy import select, func
     from app.models import AccessGrant
-    from app.adapters.access_control_adapter import AccessControlAdapter
     
-    # 1. 查询本系统期望权限
-    expected_result = await db.execute(
-        select(AccessGrant)
+    result = await db.stream(
+        select(
+            AccessGrant.grant_id,
+            AccessGrant.worker_id,
+            AccessGrant.area_id,
+            AccessGrant.vendor_ref
+        )
         .where(
             AccessGrant.site_id == site_id,
             AccessGrant.status == "SYNCED",
             AccessGrant.valid_to > now
         )
+        # vendor_ref 按字节序排序，与 Python 字符串比较一致
+        .order_by(
+            AccessGrant.worker_id,
+            AccessGrant.area_id,
+            func.coalesce(AccessGrant.vendor_ref, "").collate("C")
+        )
+        .execution_options(yield_per=page_size)
     )
-    expected_grants = expected_result.scalars().all()
+    async for rows in result.partitions():
+        for row in rows:
+            yield (str(row.worker_id), str(row.area_id), row.vendor_ref or ""), row.grant_id
+
+
+async def _iter_actual_grants(adapter, site_id: uuid.UUID, page_size: int):
+    """门禁侧有效权限，按比对键升序逐页拉取"""
+    from app.adapters.access_control_adapter import effective_grant_key
+    
+    async for page in adapter.iter_effective_grants(site_id, page_size):
+        for grant in page:
+            yield effective_grant_key(grant)
+
+
+async def _merge_diff(expected, actual, counts: dict):
+    """
+    有序归并比对：两侧均按比对键升序，每次只比较两侧当前行，
+    内存占用与工地授权数量无关
+    
+    Args:
+        expected: _iter_expected_grants
+        actual: _iter_actual_grants
+        counts: 累计两侧行数（expected_count / actual_count）
+    
+    Yields:
+        (差异类型, 比对键, 本系统授权ID)
+    """
+    async def _next(iterator, side: str, previous):
+        try:
+            item = await iterator.__anext__()
+        except StopAsyncIteration:
+            return None
+        key = item[0] if side == "expected_count" else item
+        if previous is not None and key < previous:
+            # 顺序不一致时归并结果不可信（如门禁接口未按要求排序）
+            raise RuntimeError(f"Reconcile input out of order: {side}")
+        counts[side] += 1
+        return item
+    
+    exp = await _next(expected, "expected_count", None)
+    act = await _next(actual, "actual_count", None)
     
-    # 2. 拉取门禁侧实际权限
+    while exp is not None or act is not None:
+        if act is None or (exp is not None and exp[0] < act):
+            # 本系统有、门禁没有
+            yield "MISSING_IN_VENDOR", exp[0], exp[1]
+            exp = await _next(expected, "expected_count", exp[0])
+        elif exp is None or act < exp[0]:
+            # 门禁有、本系统没有
+            yield "EXTRA_IN_VENDOR", act, None
+            act = await _next(actual, "actual_count", act)
+        else:
+            exp = await _next(expected, "expected_count", exp[0])
+            act = await _next(actual, "actual_count", act)
+
+
+async def _reconcile_site(site_id: uuid.UUID, now: datetime, run_id: uuid.UUID) -> dict:
+    """
+    对账单个工地
+    
+    本系统已同步授权（服务端游标）与门禁侧有效权限（分页接口）按
+    (worker_id, area_id, vendor_ref) 升序归并比对，差异按页写入
+    access_reconcile_diff。读、写使用各自的会话：写入提交不会中断读取游标
+    """
+    from sqlalchemy import insert
+    from app.core.config import settings
+    from app.core.database import SessionLocal
+    from app.models import AccessReconcileDiff
+    from app.adapters.access_control_adapter import AccessControlAdapter
+    
+    page_size = settings.ACCESS_RECONCILE_PAGE_SIZE
     adapter = AccessControlAdapter()
-    actual_grants = await adapter.query_effective_grants(site_id)
     
-    # 3. 比对
-    expected_set = {
-        (str(g.worker_id), str(g.area_id), g.vendor_ref) 
-        for g in expected_grants
-    }
-    actual_set = {
-        (g['worker_id'], g['area_id'], g['vendor_ref']) 
-        for g in actual_grants
-    }
+    counts = {"expected_count": 0, "actual_count": 0}
+    diff_counts = {"MISSING_IN_VENDOR": 0, "EXTRA_IN_VENDOR": 0}
+    samples = {"MISSING_IN_VENDOR": [], "EXTRA_IN_VENDOR": []}
+    buffer = []
+    
+    async with SessionLocal() as read_db, SessionLocal() as write_db:
+        async def _flush():
+            if buffer:
+                await write_db.execute(insert(AccessReconcileDiff), buffer)
+                await write_db.commit()
+                buffer.clear()
+        
+        diffs = _merge_diff(
+            _iter_expected_grants(read_db, site_id, now, page_size),
+            _iter_actual_grants(adapter, site_id, page_size),
+            counts
+        )
+        async for diff_type, key, grant_id in diffs:
+            diff_counts[diff_type] += 1
+            if len(samples[diff_type]) < RECONCILE_SAMPLE_SIZE:
+                samples[diff_type].append(list(key))
+            buffer.append({
+                "diff_id": uuid.uuid4(),
+                "run_id": run_id,
+                "site_id": site_id,
+                "diff_type": diff_type,
+                "worker_id": key[0],
+                "area_id": key[1],
+                "vendor_ref": key[2] or None,
+                "grant_id": grant_id,
+            })
+            if len(buffer) >= page_size:
+                await _flush()
+        await _flush()
     
-    missing_in_vendor = expected_set - actual_set  # 本系统有、门禁没有
-    extra_in_vendor = actual_set - expected_set    # 门禁有、本系统没有
+    mismatch_count = diff_counts["MISSING_IN_VENDOR"] + diff_counts["EXTRA_IN_VENDOR"]
     
     report = {
         "site_id": str(site_id),
-        "expected_count": len(expected_set),
-        "actual_count": len(actual_set),
-        "missing_in_vendor": [list(x) for x in missing_in_vendor],
-        "extra_in_vendor": [list(x) for x in extra_in_vendor],
-        "mismatch_count": len(missing_in_vendor) + len(extra_in_vendor)
+        "expected_count": counts["expected_count"],
+        "actual_count": counts["actual_count"],
+        "missing_count": diff_counts["MISSING_IN_VENDOR"],
+        "extra_count": diff_counts["EXTRA_IN_VENDOR"],
+        # 样例（完整明细按 run_id 查询 access_reconcile_diff）
+        "missing_in_vendor": samples["MISSING_IN_VENDOR"],
+        "extra_in_vendor": samples["EXTRA_IN_VENDOR"],
+        "mismatch_count": mismatch_count
     }
     
-    # 4. 生成告警
+    if mismatch_count > 0 and settings.ACCESS_RECONCILE_AUTO_REPAIR:
+        report["repair"] = await _repair_site(site_id, run_id, mismatch_count)
+    
+    # 生成告警
     if report["mismatch_count"] > 0:
         await _create_alert(
             alert_type="ACCESS_MISMATCH",
@@ -283,6 +423,95 @@ async def _reconcile_site(db, site_id: uuid.UUID, now: datetime) -> dict:
     return report
 
 
+async def _repair_site(site_id: uuid.UUID, run_id: uuid.UUID, mismatch_count: int) -> dict:
+    """
+    自动修复对账差异
+    
+    - MISSING_IN_VENDOR: 授权重置为 PENDING_SYNC，经推送合并队列批量补推
+    - EXTRA_IN_VENDOR: 按 vendor_ref 分片投递门禁侧撤销任务
+    差异过多（疑似门禁接口返回不完整）或门禁熔断中时不修复
+    """
+    from sqlalchemy import select, update
+    from app.core.config import settings
+    from app.core.database import SessionLocal
+    from app.models import AccessGrant, AccessReconcileDiff
+    from app.services.access_service import GrantPushQueue
+    from app.services.daily_metrics_service import DailyMetricsService
+    
+    if mismatch_count > settings.ACCESS_RECONCILE_REPAIR_MAX:
+        logger.warning(
+            f"Reconcile repair skipped: site={site_id}, mismatch={mismatch_count} "
+            f"exceeds {settings.ACCESS_RECONCILE_REPAIR_MAX}"
+        )
+        return {"skipped": "TOO_MANY_DIFFS"}
+    
+    if await _vendor_circuit_open():
+        return {"skipped": "CIRCUIT_OPEN"}
+    
+    async with SessionLocal() as db:
+        missing_result = await db.execute(
+            update(AccessReconcileDiff)
+            .where(
+                AccessReconcileDiff.run_id == run_id,
+                AccessReconcileDiff.site_id == site_id,
+                AccessReconcileDiff.diff_type == "MISSING_IN_VENDOR",
+                AccessReconcileDiff.grant_id.is_not(None)
+            )
+            .values(repair_action="REPUSH")
+            .returning(AccessReconcileDiff.grant_id)
+        )
+        missing_ids = missing_result.scalars().all()
+        
+        extra_result = await db.execute(
+            update(AccessReconcileDiff)
+            .where(
+                AccessReconcileDiff.run_id == run_id,
+                AccessReconcileDiff.site_id == site_id,
+                AccessReconcileDiff.diff_type == "EXTRA_IN_VENDOR",
+                AccessReconcileDiff.vendor_ref.is_not(None)
+            )
+            .values(repair_action="REVOKE")
+            .returning(AccessReconcileDiff.vendor_ref)
+        )
+        vendor_refs = sorted(set(extra_result.scalars().all()))
+        
+        # 补推：只重置仍为 SYNCED 的授权（对账期间可能已被撤销）
+        grants = []
+        if missing_ids:
+            grants_result = await db.execute(
+                select(AccessGrant)
+                .where(
+                    AccessGrant.grant_id.in_(missing_ids),
+                    AccessGrant.status == "SYNCED"
+                )
+                .with_for_update()
+            )
+            grants = grants_result.scalars().all()
+        
+        metrics_service = DailyMetricsService(db)
+        for grant in grants:
+            grant.status = "PENDING_SYNC"
+            grant.sync_error_msg = "对账：门禁侧缺失，重新推送"
+            await metrics_service.grant_changed(grant, "SYNCED")
+        
+        await db.commit()
+    
+    repush_ids = [g.grant_id for g in grants]
+    await GrantPushQueue().enqueue(repush_ids)
+    revoke_tasks = dispatch_vendor_ref_revocations(vendor_refs)
+    
+    logger.info(
+        f"Reconcile repair dispatched: site={site_id}, "
+        f"repush={len(repush_ids)}, revoke={len(vendor_refs)}"
+    )
+    
+    return {
+        "repush_count": len(repush_ids),
+        "revoke_count": len(vendor_refs),
+        "revoke_tasks": revoke_tasks
+    }
+
+
 async def _create_alert(
     alert_type: str,
     severity: str,
@@ -297,72 +526,315 @@ async def _create_alert(
     )
 
 
-@celery_app.task(
-    name="tasks.access.push_grant",
-    bind=True,
-    max_retries=5
-)
-def push_grant_task(
-    self,
-    grant_id: str
-):
+@celery_app.task(name="tasks.access.push_grant")
+def push_grant_task(grant_id: str):
     """
     推送单个授权到门禁系统
     P1-1: 幂等推送
+    
+    与批量推送共用领取与回写逻辑；推送失败置为 SYNC_FAILED，由 retry_failed_sync 重试
     """
     import asyncio
-    from sqlalchemy import select
     from app.core.database import SessionLocal
+    
+    async def _run():
+        if await _vendor_circuit_open():
+            return {"success": False, "error": "Circuit open"}
+        
+        async with SessionLocal() as db:
+            grant_ids, lease_until = await _claim_grants(db, [uuid.UUID(grant_id)])
+            if not grant_ids:
+                return {"success": False, "error": "Grant not pending or claimed by another worker"}
+            
+            result = await _push_grants(db, grant_ids, lease_until)
+            
+            return {"success": result["synced_count"] == 1, **result}
+    
+    return asyncio.get_event_loop().run_until_complete(_run())
+
+
+async def _push_lease_seconds(count: int) -> int:
+    """
+    领取 count 条授权时的租约时长：覆盖最坏情况下的推送耗时
+    
+    每个门禁请求都到超时（建连 + 请求超时），按当前 AIMD 并发数分波次执行，
+    并叠加限速排队时间；不低于 ACCESS_SYNC_LEASE_SECONDS
+    """
+    import math
+    from app.core.config import settings
+    from app.adapters.access_control_adapter import AccessControlAdapter
+    from app.adapters.http_client import VENDOR_TIMEOUTS
+    
+    adapter = AccessControlAdapter()
+    requests = math.ceil(count / adapter.batch_size) if adapter.supports_batch else count
+    concurrency = (
+        settings.ACCESS_PUSH_CONCURRENCY if adapter.is_mock
+        else await adapter.breaker.get_concurrency()
+    )
+    
+    request_timeout = VENDOR_TIMEOUTS["access_control"] + settings.ADAPTER_HTTP_CONNECT_TIMEOUT
+    seconds = math.ceil(requests / max(concurrency, 1)) * request_timeout
+    if settings.ACCESS_CONTROL_RATE_LIMIT > 0:
+        seconds += requests / settings.ACCESS_CONTROL_RATE_LIMIT
+    
+    return max(settings.ACCESS_SYNC_LEASE_SECONDS, math.ceil(seconds))
+
+
+async def _claim_grants(
+    db,
+    grant_ids: Optional[List[uuid.UUID]] = None,
+    conditions: Optional[list] = None,
+    limit: Optional[int] = None
+) -> Tuple[List[uuid.UUID], datetime]:
+    """
+    领取待推送授权（SELECT ... FOR UPDATE SKIP LOCKED + 租约）
+    
+    只领取 PENDING_SYNC/SYNC_FAILED 且无有效租约的授权，写入
+    sync_lease_until 后立即提交；租约期内其他 worker 不会再领取，
+    多个 access worker 可横向扩展而不会重复推送。租约时长按本次最多
+    领取的数量推算（见 _push_lease_seconds），保证推送完成前租约不过期
+    
+    Args:
+        db: 数据库会话
+        grant_ids: 限定的授权ID（推送任务）
+        conditions: 额外筛选条件（重试扫描）
+        limit: 最多领取数量
+    
+    Returns:
+        (领取到的授权ID列表, 租约到期时间)
+    """
+    from sqlalchemy import select, update, or_
+    from app.core.config import settings
     from app.models import AccessGrant
+    
+    if grant_ids is not None and limit is not None:
+        max_count = min(len(grant_ids), limit)
+    elif grant_ids is not None:
+        max_count = len(grant_ids)
+    else:
+        max_count = limit or settings.ACCESS_SYNC_BATCH_MAX
+    
+    now = datetime.now()
+    lease_until = now + timedelta(seconds=await _push_lease_seconds(max_count))
+    
+    candidates = (
+        select(AccessGrant.grant_id)
+        .where(
+            AccessGrant.status.in_(["PENDING_SYNC", "SYNC_FAILED"]),
+            or_(
+                AccessGrant.sync_lease_until.is_(None),
+                AccessGrant.sync_lease_until < now
+            ),
+            *(conditions or [])
+        )
+        .order_by(AccessGrant.created_at)
+        .with_for_update(skip_locked=True)
+    )
+    if grant_ids is not None:
+        if not grant_ids:
+            return [], lease_until
+        candidates = candidates.where(AccessGrant.grant_id.in_(grant_ids))
+    if limit is not None:
+        candidates = candidates.limit(limit)
+    
+    result = await db.execute(
+        update(AccessGrant)
+        .where(AccessGrant.grant_id.in_(candidates.scalar_subquery()))
+        .values(sync_lease_until=lease_until)
+        .returning(AccessGrant.grant_id)
+        .execution_options(synchronize_session=False)
+    )
+    claimed = result.scalars().all()
+    await db.commit()
+    
+    return claimed, lease_until
+
+
+async def _push_grants(db, grant_ids: List[uuid.UUID], lease_until: datetime) -> dict:
+    """
+    批量推送已领取的授权，回写同步状态并提交
+    
+    推送期间不持有行锁；回写前按 FOR UPDATE 重新读取，只更新仍处于
+    待同步状态且租约未被他人接管的授权（推送期间被撤销的授权保持 REVOKED，
+    并通知门禁侧撤销刚推送的权限）。已过期的授权直接置为 REVOKED；
+    推送失败的置为 SYNC_FAILED，由 retry_failed_sync 按退避策略重试；
+    熔断未推送的保持原状态，租约保留到熔断冷却结束
+    """
+    from sqlalchemy import select
+    from sqlalchemy.orm import selectinload
+    from app.models import AccessGrant
+    from app.adapters.access_control_adapter import AccessControlAdapter
+    from app.services.daily_metrics_service import DailyMetricsService
+    
+    metrics_service = DailyMetricsService(db)
+    
+    if not grant_ids:
+        return {
+            "total": 0, "synced_count": 0, "failed_count": 0,
+            "expired_count": 0, "deferred_count": 0
+        }
+    
+    result = await db.execute(
+        select(AccessGrant)
+        .options(
+            selectinload(AccessGrant.worker),
+            selectinload(AccessGrant.area)
+        )
+        .where(AccessGrant.grant_id.in_(grant_ids))
+    )
+    grants = result.scalars().all()
+    
+    now = datetime.now()
+    pending = [g for g in grants if g.valid_to >= now]
+    
+    adapter = AccessControlAdapter()
+    results = await adapter.push_grants_batch(pending)
+    
+    # 回写前加锁重新读取，只处理仍归本次租约所有的授权
+    locked_result = await db.execute(
+        select(AccessGrant)
+        .where(
+            AccessGrant.grant_id.in_(grant_ids),
+            AccessGrant.sync_lease_until == lease_until
+        )
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    owned = locked_result.scalars().all()
+    
+    synced_count = 0
+    failed_count = 0
+    expired_count = 0
+    deferred_count = 0
+    orphaned = []
+    
+    for grant in owned:
+        grant.sync_lease_until = None
+        old_status = grant.status
+        push_result = results.get(str(grant.grant_id))
+        
+        if old_status not in ("PENDING_SYNC", "SYNC_FAILED"):
+            # 推送期间状态已变化（如已撤销）：门禁侧刚生效的权限需撤销
+            if push_result and push_result["success"] and old_status == "REVOKED":
+                grant.vendor_ref = push_result.get("vendor_ref")
+                orphaned.append(grant.grant_id)
+            continue
+        
+        if push_result is None:
+            # 已过期（未推送）
+            grant.status = "REVOKED"
+            grant.revoke_reason = "EXPIRED"
+            await metrics_service.grant_changed(grant, old_status)
+            expired_count += 1
+            continue
+        
+        if push_result.get("circuit_open"):
+            # 熔断期内未推送：保持原状态，不计入同步次数；
+            # 租约延长到熔断冷却结束，期间重试扫描不会反复领取
+            grant.sync_lease_until = datetime.now() + timedelta(seconds=adapter.breaker.recovery_timeout)
+            deferred_count += 1
+            continue
+        
+        if push_result["success"]:
+            grant.status = "SYNCED"
+            grant.vendor_ref = push_result.get("vendor_ref")
+            synced_count += 1
+        else:
+            grant.status = "SYNC_FAILED"
+            grant.sync_error_msg = push_result.get("error")
+            failed_count += 1
+        
+        grant.last_sync_at = datetime.now()
+        grant.sync_attempt_count += 1
+        await metrics_service.grant_changed(grant, old_status, sync_attempted=True)
+    
+    await db.commit()
+    
+    if orphaned:
+        dispatch_vendor_revocations(orphaned)
+    
+    return {
+        "total": len(owned),
+        "synced_count": synced_count,
+        "failed_count": failed_count,
+        "expired_count": expired_count,
+        "deferred_count": deferred_count
+    }
+
+
+async def _vendor_circuit_open() -> bool:
+    """门禁熔断中：推送任务直接返回，授权保持 PENDING_SYNC，不占用 worker"""
     from app.adapters.access_control_adapter import AccessControlAdapter
     
+    adapter = AccessControlAdapter()
+    return not adapter.is_mock and await adapter.breaker.is_open()
+
+
+@celery_app.task(name="tasks.access.push_grants_batch")
+def push_grants_batch_task(grant_ids: List[str]):
+    """
+    批量推送授权到门禁系统
+    
+    合并队列不可用（Redis 异常）时的直接推送路径
+    """
+    import asyncio
+    from app.core.database import SessionLocal
+    
     async def _run():
+        if await _vendor_circuit_open():
+            return {"skipped": "CIRCUIT_OPEN"}
+        
         async with SessionLocal() as db:
-            # 获取授权记录
-            result = await db.execute(
-                select(AccessGrant)
-                .where(AccessGrant.grant_id == uuid.UUID(grant_id))
-            )
-            grant = result.scalar_one_or_none()
+            claimed, lease_until = await _claim_grants(db, [uuid.UUID(g) for g in grant_ids])
+            result = await _push_grants(db, claimed, lease_until)
             
-            if not grant:
-                logger.error(f"Grant not found: {grant_id}")
-                return {"success": False, "error": "Grant not found"}
+            logger.info(f"Batch grant push completed: {result}")
             
-            # 检查是否已过期
-            if grant.valid_to < datetime.now():
-                grant.status = "REVOKED"
-                grant.revoke_reason = "EXPIRED"
-                await db.commit()
-                return {"success": False, "error": "Grant expired"}
+            return result
+    
+    return asyncio.get_event_loop().run_until_complete(_run())
+
+
+@celery_app.task(name="tasks.access.flush_grant_push_queue")
+def flush_grant_push_queue():
+    """
+    推送合并队列刷新
+    
+    由 GrantPushQueue 在合并窗口开始时以 countdown 投递，取出窗口内
+    累积的全部待推送授权，每轮 ACCESS_PUSH_COALESCE_MAX 条批量推送并提交
+    """
+    import asyncio
+    from app.core.database import SessionLocal
+    from app.core.config import settings
+    from app.services.access_service import GrantPushQueue
+    
+    async def _run():
+        if await _vendor_circuit_open():
+            # 待推送授权仍在库中为 PENDING_SYNC，恢复后由重试扫描处理
+            logger.info("Grant push queue flush skipped: circuit open")
+            return {"skipped": "CIRCUIT_OPEN"}
+        
+        queue = GrantPushQueue()
+        totals = {
+            "total": 0, "synced_count": 0, "failed_count": 0,
+            "expired_count": 0, "deferred_count": 0
+        }
+        
+        while True:
+            grant_ids = await queue.dequeue(settings.ACCESS_PUSH_COALESCE_MAX)
+            if not grant_ids:
+                break
             
-            # 推送到门禁系统
-            try:
-                adapter = AccessControlAdapter()
-                result = await adapter.push_grant(grant)
-                
-                if result["success"]:
-                    grant.status = "SYNCED"
-                    grant.vendor_ref = result.get("vendor_ref")
-                else:
-                    grant.status = "SYNC_FAILED"
-                    grant.sync_error_msg = result.get("error")
-                
-                grant.last_sync_at = datetime.now()
-                grant.sync_attempt_count += 1
-                
-                await db.commit()
-                
-                return result
-                
-            except Exception as e:
-                logger.error(f"Failed to push grant: {e}")
-                grant.sync_attempt_count += 1
-                await db.commit()
-                
-                # 重试
-                retry_delay = 60 * (2 ** self.request.retries)
-                raise self.retry(exc=e, countdown=retry_delay)
+            async with SessionLocal() as db:
+                claimed, lease_until = await _claim_grants(db, [uuid.UUID(g) for g in grant_ids])
+                result = await _push_grants(db, claimed, lease_until)
+            
+            for key in totals:
+                totals[key] += result[key]
+        
+        logger.info(f"Grant push queue flushed: {totals}")
+        
+        return totals
     
     return asyncio.get_event_loop().run_until_complete(_run())
 
@@ -375,6 +847,7 @@ def revoke_grant_task(grant_id: str, reason: str = "MANUAL"):
     from app.core.database import SessionLocal
     from app.models import AccessGrant
     from app.adapters.access_control_adapter import AccessControlAdapter
+    from app.services.daily_metrics_service import DailyMetricsService
     
     async def _run():
         async with SessionLocal() as db:
@@ -388,23 +861,289 @@ def revoke_grant_task(grant_id: str, reason: str = "MANUAL"):
                 return {"success": False, "error": "Grant not found"}
             
             # 如果已同步，需要通知门禁系统撤销
+            deferred = False
             if grant.status == "SYNCED" and grant.vendor_ref:
                 try:
                     adapter = AccessControlAdapter()
-                    await adapter.revoke_grant(grant)
+                    revoke_result = await adapter.revoke_grant(grant)
+                    deferred = bool(revoke_result.get("circuit_open"))
                 except Exception as e:
                     logger.error(f"Failed to revoke grant from vendor: {e}")
             
             # 更新状态
+            old_status = grant.status
             grant.status = "REVOKED"
             grant.revoked_at = datetime.now()
             grant.revoke_reason = reason
+            await DailyMetricsService(db).grant_changed(grant, old_status)
             
             await db.commit()
             
+            if deferred:
+                # 熔断中：熔断冷却结束后由批量撤销任务通知门禁
+                revoke_grants_batch_task.apply_async(
+                    args=[[grant_id]],
+                    countdown=adapter.breaker.recovery_timeout
+                )
+            
             logger.info(f"Grant revoked: {grant_id}, reason={reason}")
             
             return {"success": True}
     
     return asyncio.get_event_loop().run_until_complete(_run())
 
+
+
+@celery_app.task(
+    name="tasks.access.revoke_grants_batch",
+    bind=True,
+    max_retries=None
+)
+def revoke_grants_batch_task(self, grant_ids: List[str]):
+    """
+    批量撤销门禁侧授权
+    
+    授权在库中已置为 REVOKED（集合更新），此处只负责通知门禁系统；
+    单个任务内按 ACCESS_REVOKE_CONCURRENCY 并发调用。
+    熔断拒绝的授权在熔断冷却结束后重新投递（只重试被拒绝的部分）
+    """
+    import asyncio
+    from sqlalchemy import select
+    from app.core.database import SessionLocal
+    from app.core.config import settings
+    from app.models import AccessGrant
+    from app.adapters.access_control_adapter import AccessControlAdapter
+    
+    async def _run():
+        async with SessionLocal() as db:
+            result = await db.execute(
+                select(AccessGrant)
+                .where(AccessGrant.grant_id.in_([uuid.UUID(g) for g in grant_ids]))
+            )
+            grants = [g for g in result.scalars().all() if g.vendor_ref]
+        
+        adapter = AccessControlAdapter()
+        semaphore = asyncio.Semaphore(settings.ACCESS_REVOKE_CONCURRENCY)
+        
+        async def _revoke(grant):
+            async with semaphore:
+                try:
+                    result = await adapter.revoke_grant(grant)
+                except Exception as e:
+                    result = {"success": False, "error": str(e)}
+                if not result.get("success") and not result.get("circuit_open"):
+                    logger.error(
+                        f"Failed to revoke grant from vendor: {grant.grant_id}, "
+                        f"error={result.get('error')}"
+                    )
+                return result
+        
+        results = await asyncio.gather(*[_revoke(g) for g in grants])
+        success_count = sum(1 for r in results if r.get("success"))
+        deferred = [str(g.grant_id) for g, r in zip(grants, results) if r.get("circuit_open")]
+        
+        logger.info(
+            f"Batch vendor revocation completed: "
+            f"total={len(grants)}, success={success_count}, deferred={len(deferred)}"
+        )
+        
+        return {
+            "total": len(grants),
+            "success_count": success_count,
+            "failed_count": len(grants) - success_count - len(deferred),
+            "deferred_count": len(deferred),
+            "deferred": deferred,
+            "retry_in": adapter.breaker.recovery_timeout
+        }
+    
+    result = asyncio.get_event_loop().run_until_complete(_run())
+    if result["deferred"]:
+        raise self.retry(args=[result["deferred"]], countdown=result["retry_in"])
+    return result
+
+
+def dispatch_vendor_revocations(grant_ids: List[uuid.UUID]) -> int:
+    """
+    将门禁侧撤销按 ACCESS_REVOKE_BATCH_SIZE 分片，一次性投递为任务组
+    
+    Returns:
+        int: 投递的任务数
+    """
+    from celery import group
+    from app.core.config import settings
+    
+    ids = [str(g) for g in grant_ids]
+    size = settings.ACCESS_REVOKE_BATCH_SIZE
+    chunks = [ids[i:i + size] for i in range(0, len(ids), size)]
+    if chunks:
+        group(revoke_grants_batch_task.s(chunk) for chunk in chunks).apply_async()
+    return len(chunks)
+
+
+@celery_app.task(
+    name="tasks.access.revoke_vendor_refs",
+    bind=True,
+    max_retries=None
+)
+def revoke_vendor_refs_task(self, vendor_refs: List[str]):
+    """
+    按门禁侧授权ID批量撤销
+    
+    二级对账修复：门禁侧多出、本系统没有对应已同步授权的权限；
+    单个任务内按 ACCESS_REVOKE_CONCURRENCY 并发调用。
+    熔断拒绝的授权在熔断冷却结束后重新投递（只重试被拒绝的部分）
+    """
+    import asyncio
+    from app.core.config import settings
+    from app.adapters.access_control_adapter import AccessControlAdapter
+    
+    async def _run():
+        adapter = AccessControlAdapter()
+        semaphore = asyncio.Semaphore(settings.ACCESS_REVOKE_CONCURRENCY)
+        
+        async def _revoke(vendor_ref):
+            async with semaphore:
+                try:
+                    result = await adapter.revoke_by_ref(vendor_ref)
+                except Exception as e:
+                    result = {"success": False, "error": str(e)}
+                if not result.get("success") and not result.get("circuit_open"):
+                    logger.error(
+                        f"Failed to revoke vendor grant: {vendor_ref}, "
+                        f"error={result.get('error')}"
+                    )
+                return result
+        
+        results = await asyncio.gather(*[_revoke(ref) for ref in vendor_refs])
+        success_count = sum(1 for r in results if r.get("success"))
+        deferred = [ref for ref, r in zip(vendor_refs, results) if r.get("circuit_open")]
+        
+        logger.info(
+            f"Vendor ref revocation completed: "
+            f"total={len(vendor_refs)}, success={success_count}, deferred={len(deferred)}"
+        )
+        
+        return {
+            "total": len(vendor_refs),
+            "success_count": success_count,
+            "failed_count": len(vendor_refs) - success_count - len(deferred),
+            "deferred_count": len(deferred),
+            "deferred": deferred,
+            "retry_in": adapter.breaker.recovery_timeout
+        }
+    
+    result = asyncio.get_event_loop().run_until_complete(_run())
+    if result["deferred"]:
+        raise self.retry(args=[result["deferred"]], countdown=result["retry_in"])
+    return result
+
+
+def dispatch_vendor_ref_revocations(vendor_refs: List[str]) -> int:
+    """
+    将按门禁侧授权ID的撤销按 ACCESS_REVOKE_BATCH_SIZE 分片投递为任务组
+    
+    Returns:
+        int: 投递的任务数
+    """
+    from celery import group
+    from app.core.config import settings
+    
+    size = settings.ACCESS_REVOKE_BATCH_SIZE
+    chunks = [vendor_refs[i:i + size] for i in range(0, len(vendor_refs), size)]
+    if chunks:
+        group(revoke_vendor_refs_task.s(chunk) for chunk in chunks).apply_async()
+    return len(chunks)
+
+
+async def _write_access_events(events: List[dict]) -> dict:
+    """缓冲队列中的一批事件：批量匹配人员并写库（独立会话，提交）"""
+    from app.core.database import SessionLocal
+    from app.services.access_event_service import AccessEventService
+    
+    async with SessionLocal() as db:
+        service = AccessEventService(db)
+        worker_ids = await service.resolve_workers(events)
+        
+        rows = []
+        build_errors = 0
+        for event, worker_id in zip(events, worker_ids):
+            try:
+                rows.append(service.build_row(event, worker_id))
+            except (KeyError, TypeError, ValueError):
+                build_errors += 1
+        
+        result = await service.bulk_insert(rows)
+        await db.commit()
+    
+    return {
+        "created": result["created"],
+        "duplicates": result["duplicates"],
+        "errors": result["errors"] + build_errors
+    }
+
+
+@celery_app.task(name="tasks.access.consume_access_events")
+def consume_access_events():
+    """
+    门禁事件缓冲队列消费（ACCESS_EVENT_INGEST_MODE=stream）
+    
+    每5秒调度一次，在 ACCESS_EVENT_CONSUMER_TIME_BUDGET 内循环：
+    读取一个微批 → 批量匹配人员并写库 → 提交 → 确认。
+    写库失败的微批不确认，超时后由其他消费者接管重试
+    """
+    import asyncio
+    import os
+    import socket
+    import time
+    from sqlalchemy.exc import DataError, IntegrityError
+    from app.core.config import settings
+    from app.services.access_event_service import AccessEventStream
+    
+    async def _run():
+        if settings.ACCESS_EVENT_INGEST_MODE != "stream":
+            return {"skipped": "SYNC_MODE"}
+        
+        stream = AccessEventStream()
+        consumer = f"{socket.gethostname()}-{os.getpid()}"
+        deadline = time.monotonic() + settings.ACCESS_EVENT_CONSUMER_TIME_BUDGET
+        totals = {"batches": 0, "created": 0, "duplicates": 0, "errors": 0}
+        
+        while time.monotonic() < deadline:
+            messages = await stream.read(
+                consumer,
+                settings.ACCESS_EVENT_CONSUMER_BATCH,
+                settings.ACCESS_EVENT_CONSUMER_BLOCK_MS
+            )
+            if not messages:
+                break
+            
+            events = [event for _, event in messages]
+            try:
+                result = await _write_access_events(events)
+            except (DataError, IntegrityError) as e:
+                # 数据问题（如字段超长）：逐条写入，仍失败的事件计为错误并确认，
+                # 避免同一批消息反复接管重试阻塞队列；连接类异常不捕获，消息保留重试
+                logger.error(f"Access event batch rejected, writing one by one: {e}")
+                result = {"created": 0, "duplicates": 0, "errors": 0}
+                for event in events:
+                    try:
+                        single = await _write_access_events([event])
+                    except (DataError, IntegrityError):
+                        logger.error(f"Access event dropped: {event}")
+                        single = {"created": 0, "duplicates": 0, "errors": 1}
+                    for key in result:
+                        result[key] += single[key]
+            
+            await stream.ack([message_id for message_id, _ in messages])
+            
+            totals["batches"] += 1
+            totals["created"] += result["created"]
+            totals["duplicates"] += result["duplicates"]
+            totals["errors"] += result["errors"]
+        
+        if totals["batches"]:
+            logger.info(f"Access event stream consumed: {totals}")
+        
+        return totals
+    
+    return asyncio.get_event_loop().run_until_complete(_run())
@@ -3,8 +3,11 @@ Celery应用配置 (P1-3: 统一任务调度)
 - 替代APScheduler，统一使用Celery Beat + Worker
 - 支持定时任务和异步任务
 """
+import asyncio
+
 from celery import Celery
 from celery.schedules import crontab
+from celery.signals import worker_process_init, worker_process_shutdown
 
 from app.core.config import settings
 
@@ -17,6 +20,7 @@ celery_app = Celery(
         "app.tasks.scheduler",
         "app.tasks.notification",
         "app.tasks.access",
+        "app.tasks.export",
     ]
 )
 
@@ -36,6 +40,7 @@ celery_app.conf.update(
         "tasks.notification.*": {"queue": "notification"},
         "tasks.access.*": {"queue": "access"},
         "tasks.scheduler.*": {"queue": "scheduler"},
+        "tasks.export.*": {"queue": "export"},
     },
     
     # 任务结果
@@ -53,6 +58,13 @@ celery_app.conf.update(
 
 # 定时任务配置（Celery Beat）
 celery_app.conf.beat_schedule = {
+    # 每日 00:01 - 日票滚动物化（先于状态切换）
+    "materialize-daily-tickets": {
+        "task": "tasks.scheduler.materialize_daily_tickets",
+        "schedule": crontab(hour=0, minute=1),
+        "options": {"queue": "scheduler"},
+    },
+    
     # 每日 00:05 - 状态切换任务
     "daily-ticket-status-transition": {
         "task": "tasks.scheduler.daily_ticket_status_transition",
@@ -60,6 +72,13 @@ celery_app.conf.beat_schedule = {
         "options": {"queue": "scheduler"},
     },
     
+    # 每日 00:30 - 按月分区维护（预建/分离）
+    "manage-partitions": {
+        "task": "tasks.scheduler.manage_partitions",
+        "schedule": crontab(hour=0, minute=30),
+        "options": {"queue": "scheduler"},
+    },
+    
     # 每日 05:30 - 当日提醒
     "daily-reminder": {
         "task": "tasks.notification.send_daily_reminder",
@@ -74,6 +93,13 @@ celery_app.conf.beat_schedule = {
         "options": {"queue": "notification"},
     },
     
+    # 每5秒 - 门禁事件缓冲队列消费（仅 ACCESS_EVENT_INGEST_MODE=stream 时写库）
+    "consume-access-events": {
+        "task": "tasks.access.consume_access_events",
+        "schedule": 5.0,
+        "options": {"queue": "access", "expires": 5},
+    },
+    
     # 每1分钟 - 授权同步重试
     "access-grant-sync-retry": {
         "task": "tasks.access.retry_failed_sync",
@@ -81,6 +107,13 @@ celery_app.conf.beat_schedule = {
         "options": {"queue": "access"},
     },
     
+    # 每日 01:00 - 报表预聚合回填
+    "rebuild-daily-site-metrics": {
+        "task": "tasks.scheduler.rebuild_daily_site_metrics",
+        "schedule": crontab(hour=1, minute=0),
+        "options": {"queue": "scheduler"},
+    },
+    
     # 每10分钟 - 健康检查
     "health-check": {
         "task": "tasks.scheduler.health_check",
@@ -109,6 +142,20 @@ celery_app.conf.beat_schedule = {
         "options": {"queue": "access"},
     },
     
+    # 每日 04:00 - 冷数据归档（进出记录/审计日志）
+    "archive-cold-data": {
+        "task": "tasks.scheduler.archive_cold_data",
+        "schedule": crontab(hour=4, minute=0),
+        "options": {"queue": "scheduler"},
+    },
+    
+    # 每小时 - 清理过期导出文件
+    "cleanup-export-jobs": {
+        "task": "tasks.export.cleanup_export_jobs",
+        "schedule": crontab(minute=30),
+        "options": {"queue": "export"},
+    },
+    
     # 每30秒 - 处理通知优先级队列 (P1-2)
     "process-notification-queue": {
         "task": "tasks.notification.process_notification_queue",
@@ -117,6 +164,20 @@ celery_app.conf.beat_schedule = {
     },
 }
 
+@worker_process_init.connect
+def init_worker_http_clients(**kwargs):
+    """Worker 子进程启动：打开第三方接口连接池（任务与之共用同一事件循环）"""
+    from app.adapters.http_client import init_http_clients
+    asyncio.get_event_loop().run_until_complete(init_http_clients())
+
+
+@worker_process_shutdown.connect
+def close_worker_http_clients(**kwargs):
+    """Worker 子进程退出：关闭第三方接口连接池"""
+    from app.adapters.http_client import close_http_clients
+    asyncio.get_event_loop().run_until_complete(close_http_clients())
+
+
 # 任务优先级配置
 celery_app.conf.task_queue_max_priority = 10
 celery_app.conf.task_default_priority = 5
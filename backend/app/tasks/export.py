@@ -0,0 +1,62 @@
+"""
+导出任务
+- 异步生成报表/作业票导出文件（独立 export 队列，不占用 API 进程）
+- 定期清理过期导出文件
+"""
+import logging
+import uuid
+
+from app.core.config import settings
+
+from .celery_app import celery_app
+
+logger = logging.getLogger(__name__)
+
+
+@celery_app.task(
+    name="tasks.export.run_export_job",
+    time_limit=settings.EXPORT_JOB_TIME_LIMIT,
+    soft_time_limit=settings.EXPORT_JOB_TIME_LIMIT - 60,
+)
+def run_export_job(job_id: str):
+    """
+    执行导出任务
+    生成文件并转存至本地/MinIO，过程中回写已写入行数
+    """
+    import asyncio
+    from app.core.database import SessionLocal
+    from app.services.export_service import ExportService
+
+    async def _run():
+        async with SessionLocal() as db:
+            job = await ExportService(db).run_job(uuid.UUID(job_id))
+            if not job:
+                return {"job_id": job_id, "status": "NOT_FOUND"}
+
+            return {
+                "job_id": job_id,
+                "status": job.status,
+                "rows_written": job.rows_written
+            }
+
+    return asyncio.get_event_loop().run_until_complete(_run())
+
+
+@celery_app.task(name="tasks.export.cleanup_export_jobs")
+def cleanup_export_jobs():
+    """
+    每小时 - 清理超过 EXPORT_JOB_RETENTION_HOURS 的导出任务及文件
+    """
+    import asyncio
+    from app.core.database import SessionLocal
+    from app.services.export_service import ExportService
+
+    async def _run():
+        async with SessionLocal() as db:
+            deleted = await ExportService(db).cleanup_expired_jobs()
+
+            logger.info(f"Export jobs cleanup completed: deleted={deleted}")
+
+            return {"deleted_count": deleted}
+
+    return asyncio.get_event_loop().run_until_complete(_run())
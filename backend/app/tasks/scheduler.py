@@ -3,9 +3,14 @@
 - 每日状态切换
 - 过期处理
 - 健康检查
+- 报表预聚合回填
+- 日票滚动物化
+- 按月分区维护
+- 冷数据归档
 """
 import logging
-from datetime import date, datetime
+from datetime import date, datetime, timedelta
+from typing import Optional
 
 from .celery_app import celery_app
 
@@ -58,9 +63,11 @@ def expire_daily_tickets():
     from sqlalchemy import select, update
     from app.core.database import SessionLocal
     from app.models import DailyTicket, AccessGrant
+    from app.services.daily_metrics_service import DailyMetricsService
     
     async def _run():
         async with SessionLocal() as db:
+            metrics_service = DailyMetricsService(db)
             today = date.today()
             
             # 1. 获取当天进行中的日票
@@ -93,9 +100,11 @@ def expire_daily_tickets():
                 grants = grants_result.scalars().all()
                 
                 for grant in grants:
+                    old_status = grant.status
                     grant.status = "REVOKED"
                     grant.revoked_at = datetime.now()
                     grant.revoke_reason = "EXPIRED"
+                    await metrics_service.grant_changed(grant, old_status)
                     revoked_count += 1
             
             await db.commit()
@@ -114,6 +123,223 @@ def expire_daily_tickets():
     return asyncio.get_event_loop().run_until_complete(_run())
 
 
+@celery_app.task(name="tasks.scheduler.materialize_daily_tickets")
+def materialize_daily_tickets():
+    """
+    每日 00:01 - 日票滚动物化
+    为进行中的作业票补齐未来 DAILY_TICKET_HORIZON_DAYS 天（含当天）的日票，
+    需在 00:05 状态切换前完成；未开启滚动物化时补齐尚未生成的全部日期
+    """
+    import asyncio
+    from sqlalchemy import select, or_, func
+    from app.core.database import SessionLocal
+    from app.core.config import settings
+    from app.models import WorkTicket
+    from app.services.ticket_service import TicketService
+    
+    async def _run():
+        async with SessionLocal() as db:
+            today = date.today()
+            horizon_days = settings.DAILY_TICKET_HORIZON_DAYS
+            
+            if horizon_days > 0:
+                horizon_end = today + timedelta(days=horizon_days - 1)
+                target = func.least(WorkTicket.end_date, horizon_end)
+            else:
+                horizon_end = None
+                target = WorkTicket.end_date
+            
+            stmt = select(WorkTicket.ticket_id).where(
+                WorkTicket.status == "ACTIVE",
+                WorkTicket.end_date >= today,
+                or_(
+                    WorkTicket.materialized_until.is_(None),
+                    WorkTicket.materialized_until < target
+                )
+            )
+            if horizon_end is not None:
+                stmt = stmt.where(WorkTicket.start_date <= horizon_end)
+            
+            ticket_ids = (await db.execute(stmt)).scalars().all()
+            
+            ticket_service = TicketService(db)
+            ticket_count = 0
+            daily_ticket_count = 0
+            failed_count = 0
+            
+            for ticket_id in ticket_ids:
+                try:
+                    # 逐票加锁并提交，避免并发物化产生重复日票
+                    ticket = (await db.execute(
+                        select(WorkTicket)
+                        .where(
+                            WorkTicket.ticket_id == ticket_id,
+                            WorkTicket.status == "ACTIVE"
+                        )
+                        .with_for_update(skip_locked=True)
+                    )).scalar_one_or_none()
+                    if not ticket:
+                        await db.rollback()
+                        continue
+                    
+                    generated = await ticket_service.generate_daily_tickets(
+                        ticket,
+                        until=ticket_service.get_horizon_end(ticket, today)
+                    )
+                    await db.commit()
+                    
+                    if generated:
+                        ticket_count += 1
+                        daily_ticket_count += len(generated)
+                except Exception as e:
+                    await db.rollback()
+                    failed_count += 1
+                    logger.error(f"Materialize daily tickets failed: ticket={ticket_id}, error={e}")
+            
+            logger.info(
+                f"Daily ticket materialization completed: date={today}, "
+                f"tickets={ticket_count}, daily_tickets={daily_ticket_count}, "
+                f"failed={failed_count}"
+            )
+            
+            return {
+                "date": str(today),
+                "ticket_count": ticket_count,
+                "daily_ticket_count": daily_ticket_count,
+                "failed_count": failed_count
+            }
+    
+    return asyncio.get_event_loop().run_until_complete(_run())
+
+
+@celery_app.task(name="tasks.scheduler.rebuild_daily_site_metrics")
+def rebuild_daily_site_metrics(
+    start_date: Optional[str] = None,
+    end_date: Optional[str] = None
+):
+    """
+    每日 01:00 - 报表预聚合回填
+    按明细表重算 daily_site_metrics，纠正写入路径增量累加的误差
+    
+    默认重算最近 REPORT_METRICS_REBUILD_DAYS 天（含当天）；
+    首次上线或修复历史数据时可手动指定日期范围（YYYY-MM-DD）
+    """
+    import asyncio
+    from app.core.database import SessionLocal
+    from app.core.config import settings
+    from app.services.daily_metrics_service import DailyMetricsService
+    
+    async def _run():
+        async with SessionLocal() as db:
+            today = date.today()
+            range_end = date.fromisoformat(end_date) if end_date else today
+            range_start = (
+                date.fromisoformat(start_date) if start_date
+                else today - timedelta(days=max(settings.REPORT_METRICS_REBUILD_DAYS - 1, 0))
+            )
+            
+            rows = await DailyMetricsService(db).rebuild(range_start, range_end)
+            await db.commit()
+            
+            logger.info(
+                f"Daily site metrics rebuild completed: "
+                f"{range_start} ~ {range_end}, rows={rows}"
+            )
+            
+            return {
+                "start_date": str(range_start),
+                "end_date": str(range_end),
+                "rows": rows
+            }
+    
+    return asyncio.get_event_loop().run_until_complete(_run())
+
+
+@celery_app.task(name="tasks.scheduler.manage_partitions")
+def manage_partitions():
+    """
+    每日 00:30 - 按月分区维护
+    - 预建当月及未来 PARTITION_PREMAKE_MONTHS 个月的分区（access_event 等）
+    - ACCESS_EVENT_PARTITION_DETACH_MONTHS > 0 时，分离更早月份的进出记录分区
+      （分离后为独立表，由归档任务导出后删除）
+    DDL 需要主表短暂排他锁，设置 lock_timeout 避免长时间阻塞事件写入
+    """
+    import asyncio
+    from sqlalchemy import text
+    from app.core.database import SessionLocal
+    from app.core.config import settings
+    from app.utils.partitions import (
+        ensure_partitions, detach_month_partitions, is_partitioned, add_months, month_start
+    )
+    
+    async def _run():
+        today = date.today()
+        
+        async with SessionLocal() as db:
+            await db.execute(text("SET LOCAL lock_timeout = '5s'"))
+            created = await ensure_partitions(db, today, settings.PARTITION_PREMAKE_MONTHS)
+            
+            detached = []
+            detach_months = settings.ACCESS_EVENT_PARTITION_DETACH_MONTHS
+            if detach_months > 0 and await is_partitioned(db, "access_event"):
+                cutoff = add_months(month_start(today), -detach_months)
+                detached = await detach_month_partitions(db, "access_event", cutoff)
+            
+            await db.commit()
+        
+        logger.info(f"Partitions maintained: created={created}, detached={detached}")
+        
+        return {
+            "created": created,
+            "detached": detached
+        }
+    
+    return asyncio.get_event_loop().run_until_complete(_run())
+
+
+@celery_app.task(name="tasks.scheduler.archive_cold_data")
+def archive_cold_data():
+    """
+    每日 04:00 - 冷数据归档（ARCHIVE_ENABLED 开启时执行）
+    - 进出记录、审计日志中早于在线保留期（ARCHIVE_RETENTION_DAYS）的数据按天导出为
+      压缩归档文件并登记清单，然后分批删除源数据
+    - 已分离的进出记录分区整表导出后删除
+    每张表每次最多处理 ARCHIVE_MAX_DAYS_PER_RUN 天，积压较多时分多晚完成
+    """
+    import asyncio
+    from app.core.database import SessionLocal
+    from app.core.config import settings
+    from app.services.archive_service import ArchiveService, ARCHIVE_POLICIES
+    
+    async def _run():
+        if not settings.ARCHIVE_ENABLED:
+            return {"skipped": True}
+        
+        results = {}
+        async with SessionLocal() as db:
+            service = ArchiveService(db)
+            for table_name in ARCHIVE_POLICIES:
+                try:
+                    results[table_name] = await service.archive_table(table_name)
+                except Exception as e:
+                    await db.rollback()
+                    logger.error(f"Archive failed: table={table_name}, error={e}")
+                    results[table_name] = {"error": str(e)}
+            
+            try:
+                results["detached_partitions"] = await service.archive_detached_partitions()
+            except Exception as e:
+                await db.rollback()
+                logger.error(f"Detached partition archive failed: {e}")
+                results["detached_partitions"] = {"error": str(e)}
+        
+        logger.info(f"Cold data archived: {results}")
+        
+        return results
+    
+    return asyncio.get_event_loop().run_until_complete(_run())
+
+
 @celery_app.task(name="tasks.scheduler.health_check")
 def health_check():
     """
@@ -178,6 +404,23 @@ def health_check():
                 }
                 logger.error(f"Access control health check failed: {e}")
         
+            # 门禁熔断器状态（跨 worker 共享）
+            from app.adapters.circuit_breaker import CircuitBreaker
+            circuit = await CircuitBreaker("access_control").get_state()
+            results["services"]["access_control_circuit"] = {
+                "status": "healthy" if circuit.get("state") == "CLOSED" else "unhealthy",
+                **circuit
+            }
+        
+        # 门禁事件缓冲队列深度（背压）
+        if settings.ACCESS_EVENT_INGEST_MODE == "stream":
+            from app.services.access_event_service import AccessEventStream
+            stream_stats = await AccessEventStream().get_stats()
+            results["services"]["access_event_stream"] = {
+                "status": "healthy" if stream_stats.get("usage", 1) < 0.8 else "unhealthy",
+                **stream_stats
+            }
+        
         # 检查人脸识别服务（如果配置了）
         if settings.FACE_VERIFY_API_URL:
             try:
@@ -3,6 +3,7 @@ from .progress_validator import TrainingProgressValidator, RandomCheckScheduler
 from .change_compensator import TicketChangeValidator, TicketChangeCompensator
 from .response import ApiResponse, success_response, error_response
 from .pagination import PaginationParams, paginate
+from .export import streaming_export, stream_rows
 
 __all__ = [
     "TrainingProgressValidator",
@@ -14,5 +15,7 @@ __all__ = [
     "error_response",
     "PaginationParams",
     "paginate",
+    "streaming_export",
+    "stream_rows",
 ]
 
@@ -0,0 +1,43 @@
+"""
+Redis 缓存工具
+- 共享的异步 Redis 客户端（redis 不可用时返回 None，调用方直接查库）
+- 按租户范围生成缓存键，不同权限范围的用户互不命中
+"""
+import hashlib
+
+from app.core.config import settings
+
+try:
+    import redis.asyncio as redis_async  # type: ignore
+except Exception:  # pragma: no cover
+    redis_async = None
+
+_redis_client = None
+
+
+async def get_redis_client():
+    global _redis_client
+    if redis_async is None:
+        return None
+    if _redis_client is None:
+        _redis_client = redis_async.from_url(
+            settings.REDIS_URL, encoding="utf-8", decode_responses=True
+        )
+    return _redis_client
+
+
+def tenant_scope_key(ctx) -> str:
+    """租户范围缓存键片段：角色 + 可访问工地集合摘要"""
+    role = getattr(ctx, "user_role", None) or "unknown"
+    if ctx is None:
+        scope = "anonymous"
+    elif getattr(ctx, "is_sys_admin", False):
+        scope = "all"
+    else:
+        sites = getattr(ctx, "accessible_sites", None) or []
+        if sites:
+            raw = ",".join(sorted(str(s) for s in sites))
+            scope = hashlib.sha1(raw.encode("utf-8")).hexdigest()[:12]
+        else:
+            scope = "none"
+    return f"{role}:{scope}"
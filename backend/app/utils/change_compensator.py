@@ -265,6 +265,9 @@ class TicketChangeCompensator:
     - 增加区域: 已完成者立即授权新区域
     - 移除区域: 撤销该区域权限
     - 改时间窗: 更新 grant 的 valid_from/to
+    
+    滚动物化下只补偿已生成的日票（materialized_until 及之前）；
+    尚未生成的日期在物化时按作业票当前的人员、区域、视频和默认时间生成
     """
     
     def __init__(self, db_session: Any, access_service: Any, audit_service: Any):
@@ -355,6 +358,9 @@ class TicketChangeCompensator:
             )
             result["grants_updated"] = updated
         
+        # 7. 时间配置写回作业票默认值，供尚未物化的日期继承
+        self._update_ticket_defaults(ticket, changes)
+        
         logger.info(
             f"Ticket change compensation completed: ticket={ticket.ticket_id}, "
             f"result={result}"
@@ -374,7 +380,9 @@ class TicketChangeCompensator:
             WorkTicketWorker, DailyTicket, DailyTicketWorker, 
             WorkTicketVideo
         )
+        from app.services.daily_metrics_service import DailyMetricsService
         
+        metrics_service = DailyMetricsService(self.db)
         count = 0
         now = datetime.now()
         
@@ -388,6 +396,17 @@ class TicketChangeCompensator:
         )
         video_count = len(video_count_result.scalars().all())
         
+        # 已物化的未来日票（未物化日期在生成时自动包含新增人员）
+        daily_tickets_result = await self.db.execute(
+            select(DailyTicket)
+            .where(
+                DailyTicket.ticket_id == ticket.ticket_id,
+                DailyTicket.date >= date.today(),
+                DailyTicket.status.in_(["PUBLISHED", "IN_PROGRESS"])
+            )
+        )
+        daily_tickets = daily_tickets_result.scalars().all()
+        
         for worker_id in worker_ids:
             # 添加到 work_ticket_worker
             ticket_worker = WorkTicketWorker(
@@ -401,16 +420,6 @@ class TicketChangeCompensator:
             self.db.add(ticket_worker)
             
             # 为未来的每日票据添加 daily_ticket_worker
-            daily_tickets_result = await self.db.execute(
-                select(DailyTicket)
-                .where(
-                    DailyTicket.ticket_id == ticket.ticket_id,
-                    DailyTicket.date >= date.today(),
-                    DailyTicket.status.in_(["PUBLISHED", "IN_PROGRESS"])
-                )
-            )
-            daily_tickets = daily_tickets_result.scalars().all()
-            
             for dt in daily_tickets:
                 dtw = DailyTicketWorker(
                     daily_ticket_id=dt.daily_ticket_id,
@@ -423,6 +432,13 @@ class TicketChangeCompensator:
                     status="ACTIVE"
                 )
                 self.db.add(dtw)
+                await metrics_service.increment(
+                    dt.site_id,
+                    dt.date,
+                    worker_count=1,
+                    not_started_count=1,
+                    videos_required=video_count
+                )
             
             count += 1
         
@@ -441,7 +457,9 @@ class TicketChangeCompensator:
         from app.models import (
             WorkTicketWorker, DailyTicket, DailyTicketWorker, AccessGrant
         )
+        from app.services.daily_metrics_service import DailyMetricsService
         
+        metrics_service = DailyMetricsService(self.db)
         now = datetime.now()
         removed_count = 0
         revoked_count = 0
@@ -458,17 +476,26 @@ class TicketChangeCompensator:
             )
             
             # 更新 daily_ticket_worker 状态
-            await self.db.execute(
+            removed_result = await self.db.execute(
                 update(DailyTicketWorker)
                 .where(
                     DailyTicketWorker.daily_ticket_id.in_(
                         select(DailyTicket.daily_ticket_id)
                         .where(DailyTicket.ticket_id == ticket.ticket_id)
                     ),
-                    DailyTicketWorker.worker_id == worker_id
+                    DailyTicketWorker.worker_id == worker_id,
+                    DailyTicketWorker.status == "ACTIVE"
                 )
                 .values(status="REMOVED")
+                .returning(
+                    DailyTicketWorker.daily_ticket_id,
+                    DailyTicketWorker.training_status,
+                    DailyTicketWorker.total_video_count,
+                    DailyTicketWorker.completed_video_count
+                )
             )
+            for removed_dtw in removed_result.all():
+                await metrics_service.worker_removed(removed_dtw)
             
             # 撤销所有相关授权
             grants_result = await self.db.execute(
@@ -607,6 +634,17 @@ class TicketChangeCompensator:
         )
         return removed_count, revoked_count
     
+    def _update_ticket_defaults(self, ticket: Any, changes: TicketChanges) -> None:
+        """时间配置写回作业票默认值"""
+        from datetime import time
+        
+        if changes.access_start_time:
+            ticket.default_access_start_time = time.fromisoformat(changes.access_start_time)
+        if changes.access_end_time:
+            ticket.default_access_end_time = time.fromisoformat(changes.access_end_time)
+        if changes.training_deadline_time:
+            ticket.default_training_deadline_time = time.fromisoformat(changes.training_deadline_time)
+    
     async def _update_time_window(
         self, 
         ticket: Any,
@@ -616,8 +654,11 @@ class TicketChangeCompensator:
         """更新授权时间窗"""
         from sqlalchemy import select
         from app.models import DailyTicket, AccessGrant
+        from app.services.daily_metrics_service import DailyMetricsService
         from datetime import time
         
+        metrics_service = DailyMetricsService(self.db)
+        
         updated_count = 0
         today = date.today()
         
@@ -647,7 +688,9 @@ class TicketChangeCompensator:
                 grant.valid_to = new_to
             
             # 标记需要重新同步
+            old_status = grant.status
             grant.status = "PENDING_SYNC"
+            await metrics_service.grant_changed(grant, old_status)
             updated_count += 1
         
         await self.db.flush()
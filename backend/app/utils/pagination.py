@@ -1,13 +1,25 @@
 """
 分页工具
+- 页码分页：OFFSET/LIMIT
+- 游标分页：列表接口传入排序键（时间列, 主键列）时启用，按 (时间, 主键) 倒序，
+  游标为上一页最后一行排序键的编码，翻页代价与页深无关
+- 总数统计：exact 精确 / estimate 限量计数（超过上限时估算）/ none 不统计；
+  计数基于原查询（含 JOIN、GROUP BY 等），不会把全部结果读入内存
 """
-from typing import Any, Generic, List, TypeVar
+from typing import Any, Generic, List, Optional, Sequence, TypeVar
 from dataclasses import dataclass
+from datetime import date, datetime
+import base64
+import json
 
+from fastapi import HTTPException
 from pydantic import BaseModel, Field
-from sqlalchemy import Select, func
+from sqlalchemy import Select, func, select, text, tuple_
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.config import settings
+
 T = TypeVar("T")
 
 
@@ -15,6 +27,12 @@ class PaginationParams(BaseModel):
     """分页参数"""
     page: int = Field(default=1, ge=1, description="页码")
     page_size: int = Field(default=20, ge=1, le=1000, description="每页数量")
+    cursor: Optional[str] = Field(default=None, description="游标（上一页返回的 next_cursor），传入时忽略页码")
+    count_mode: str = Field(
+        default="exact",
+        pattern="^(exact|estimate|none)$",
+        description="总数统计: exact 精确 / estimate 估算 / none 不统计"
+    )
     
     @property
     def offset(self) -> int:
@@ -29,17 +47,24 @@ class PaginationParams(BaseModel):
 class PaginatedResult(Generic[T]):
     """分页结果"""
     items: List[T]
-    total: int
+    total: Optional[int]
     page: int
     page_size: int
+    next_cursor: Optional[str] = None
+    total_is_estimate: bool = False
+    has_more: Optional[bool] = None
     
     @property
-    def total_pages(self) -> int:
+    def total_pages(self) -> Optional[int]:
+        if self.total is None:
+            return None
         return (self.total + self.page_size - 1) // self.page_size
     
     @property
     def has_next(self) -> bool:
-        return self.page < self.total_pages
+        if self.has_more is not None:
+            return self.has_more
+        return self.page < (self.total_pages or 0)
     
     @property
     def has_prev(self) -> bool:
@@ -54,13 +79,137 @@ class PaginatedResult(Generic[T]):
             "total_pages": self.total_pages,
             "has_next": self.has_next,
             "has_prev": self.has_prev,
+            "next_cursor": self.next_cursor,
+            "total_is_estimate": self.total_is_estimate,
         }
 
 
+def encode_cursor(values: Sequence[Any]) -> str:
+    """排序键编码为游标（URL 安全的 base64 JSON）"""
+    raw = json.dumps([v.isoformat() if isinstance(v, (datetime, date)) else str(v) for v in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, columns: Sequence[Any]) -> List[Any]:
+    """
+    游标解码为排序键值（按列类型还原）
+
+    Raises:
+        HTTPException: 游标格式不合法
+    """
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(raw, list) or len(raw) != len(columns):
+            raise ValueError("cursor length mismatch")
+        values = []
+        for column, value in zip(columns, raw):
+            python_type = column.type.python_type
+            if python_type in (datetime, date):
+                values.append(python_type.fromisoformat(value))
+            else:
+                values.append(python_type(value))
+        return values
+    except (ValueError, TypeError, NotImplementedError):
+        raise HTTPException(status_code=400, detail="分页游标无效")
+
+
+def is_distinct(query: Select) -> bool:
+    """查询是否带 DISTINCT / DISTINCT ON（按编译后的 SQL 判断）"""
+    sql = str(query.compile(dialect=postgresql.dialect()))
+    return sql.lstrip().upper().startswith("SELECT DISTINCT")
+
+
+async def count_rows(db: AsyncSession, query: Select, mode: str) -> tuple:
+    """
+    按统计方式计算总数
+
+    - exact: COUNT(*)
+    - estimate: 最多计数 PAGINATION_COUNT_CAP 行，未达上限时即精确值；
+      达到上限时，无过滤条件的查询取表统计信息 pg_class.reltuples（分区表父表
+      为 -1，取各分区之和），其余返回上限；表未做过统计（reltuples < 0）时精确计数
+    - none: 不统计
+
+    Returns:
+        (total, is_estimate)
+    """
+    if mode == "none":
+        return None, False
+
+    counted = select(func.count()).select_from(query.order_by(None).subquery())
+    if mode != "estimate":
+        return (await db.execute(counted)).scalar() or 0, False
+
+    cap = settings.PAGINATION_COUNT_CAP
+    capped = select(func.count()).select_from(query.order_by(None).limit(cap).subquery())
+    total = (await db.execute(capped)).scalar() or 0
+    if total < cap:
+        return total, False
+
+    entity = query.column_descriptions[0]["entity"]
+    if query.whereclause is None and hasattr(entity, "__tablename__"):
+        reltuples = (await db.execute(
+            text(
+                "SELECT CASE WHEN c.relkind = 'p' THEN ("
+                "  SELECT sum(p.reltuples) FROM pg_inherits i"
+                "  JOIN pg_class p ON p.oid = i.inhrelid"
+                "  WHERE i.inhparent = c.oid AND p.reltuples >= 0"
+                ") ELSE c.reltuples END::bigint "
+                "FROM pg_class c "
+                "WHERE c.relname = :table AND c.relnamespace = 'public'::regnamespace"
+            ),
+            {"table": entity.__tablename__}
+        )).scalar()
+        if reltuples is None or reltuples < 0:
+            # 未做过统计，估算不可用
+            return (await db.execute(counted)).scalar() or 0, False
+        if reltuples > cap:
+            return reltuples, True
+    return cap, True
+
+
+async def _paginate_keyset(
+    db: AsyncSession,
+    query: Select,
+    params: PaginationParams,
+    keyset: Sequence[Any]
+) -> PaginatedResult:
+    """游标分页：按排序键倒序取 limit+1 行判断是否还有下一页"""
+    keyset_query = query.order_by(None).order_by(*(column.desc() for column in keyset))
+    
+    total, is_estimate = await count_rows(db, query, params.count_mode)
+    
+    if params.cursor:
+        values = decode_cursor(params.cursor, keyset)
+        keyset_query = keyset_query.where(tuple_(*keyset) < tuple_(*values))
+    else:
+        keyset_query = keyset_query.offset(params.offset)
+    
+    result = await db.execute(keyset_query.limit(params.limit + 1))
+    items = list(result.scalars().all())
+    has_more = len(items) > params.limit
+    items = items[:params.limit]
+    
+    next_cursor = None
+    if has_more and items:
+        last = items[-1]
+        next_cursor = encode_cursor([getattr(last, column.key) for column in keyset])
+    
+    return PaginatedResult(
+        items=items,
+        total=total,
+        page=params.page,
+        page_size=params.page_size,
+        next_cursor=next_cursor,
+        total_is_estimate=is_estimate,
+        has_more=has_more
+    )
+
+
 async def paginate(
     db: AsyncSession,
     query: Select,
-    params: PaginationParams
+    params: PaginationParams,
+    keyset: Optional[Sequence[Any]] = None
 ) -> PaginatedResult:
     """
     执行分页查询
@@ -69,50 +218,51 @@ async def paginate(
         db: 数据库会话
         query: SQLAlchemy查询
         params: 分页参数
+        keyset: 游标分页排序键（如 (AuditLog.created_at, AuditLog.log_id)，末列须唯一），
+            传入时按排序键倒序返回并生成 next_cursor；不传时只支持页码分页
     
     Returns:
         PaginatedResult: 分页结果
     """
-    from sqlalchemy import select
+    if keyset is not None:
+        return await _paginate_keyset(db, query, params, keyset)
     
-    # 获取查询的主实体和where条件
-    try:
-        # 获取主实体
-        entity = query.column_descriptions[0]['entity']
-        
-        # 构建计数查询
-        count_query = select(func.count()).select_from(entity)
-        
-        # 复制where条件
-        if hasattr(query, 'whereclause') and query.whereclause is not None:
-            count_query = count_query.where(query.whereclause)
-        
-        total_result = await db.execute(count_query)
-        total = total_result.scalar() or 0
-    except Exception as e:
-        # 如果出错，先获取所有数据再计算总数（性能较差，但能工作）
-        all_result = await db.execute(query)
-        all_items = all_result.scalars().all()
-        total = len(all_items)
-        
-        # 手动分页
-        items = all_items[params.offset:params.offset + params.limit]
+    if params.count_mode != "exact":
+        total, is_estimate = await count_rows(db, query, params.count_mode)
+        result = await db.execute(query.offset(params.offset).limit(params.limit))
         return PaginatedResult(
-            items=list(items),
+            items=list(result.scalars().all()),
             total=total,
             page=params.page,
-            page_size=params.page_size
+            page_size=params.page_size,
+            total_is_estimate=is_estimate
         )
     
-    # 获取数据
-    paginated_query = query.offset(params.offset).limit(params.limit)
-    result = await db.execute(paginated_query)
-    items = result.scalars().all()
+    # 精确计数：COUNT(*) OVER() 与当页数据同一条语句返回（窗口函数在 LIMIT 之前计算）
+    # DISTINCT 查询附加列会改变去重结果，改用子查询计数
+    if is_distinct(query):
+        total, _ = await count_rows(db, query, "exact")
+        result = await db.execute(query.offset(params.offset).limit(params.limit))
+        items = list(result.scalars().all())
+    else:
+        result = await db.execute(
+            query.add_columns(func.count().over().label("_total"))
+            .offset(params.offset)
+            .limit(params.limit)
+        )
+        rows = result.all()
+        items = [row[0] for row in rows]
+        if rows:
+            total = rows[0]._total
+        elif params.offset:
+            # 页码超出范围时当页无数据，单独计数
+            total, _ = await count_rows(db, query, "exact")
+        else:
+            total = 0
     
     return PaginatedResult(
-        items=list(items),
+        items=items,
         total=total,
         page=params.page,
         page_size=params.page_size
     )
-
@@ -0,0 +1,183 @@
+"""
+按月范围分区管理（PostgreSQL 原生分区）
+- 分区命名: {表名}_pYYYYMM，另有 {表名}_default 兜底分区（超出已建范围的数据）
+- 预建未来月份分区；默认分区中已有该月数据时先迁出再挂载
+- 分离（DETACH）过期分区：分离后成为独立表，不再参与主表查询与维护，
+  由归档任务导出后删除
+- 分区边界按数据库会话时区的月初计算（与迁移中的建分区脚本一致）
+"""
+from datetime import date
+from typing import List, Tuple
+import logging
+
+from sqlalchemy import text
+
+logger = logging.getLogger(__name__)
+
+
+# 按月分区的表 → 分区键
+MONTHLY_PARTITIONED_TABLES = {
+    "access_event": "event_time",
+}
+
+
+def month_start(value: date) -> date:
+    return value.replace(day=1)
+
+
+def add_months(month: date, months: int) -> date:
+    """月初日期加减月数"""
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+
+async def is_partitioned(conn, table: str) -> bool:
+    """表是否为分区表（迁移未执行时为普通表）"""
+    result = await conn.execute(
+        text(
+            "SELECT 1 FROM pg_partitioned_table pt "
+            "JOIN pg_class c ON c.oid = pt.partrelid "
+            "WHERE c.relname = :table AND c.relnamespace = 'public'::regnamespace"
+        ),
+        {"table": table}
+    )
+    return result.scalar() is not None
+
+
+async def list_month_partitions(conn, table: str) -> List[Tuple[str, date]]:
+    """已挂载的月分区 [(分区名, 月初)]，按月份升序（不含默认分区）"""
+    result = await conn.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :table AND p.relnamespace = 'public'::regnamespace"
+        ),
+        {"table": table}
+    )
+    prefix = f"{table}_p"
+    partitions = []
+    for (name,) in result.all():
+        suffix = name[len(prefix):]
+        if name.startswith(prefix) and len(suffix) == 6 and suffix.isdigit():
+            partitions.append((name, date(int(suffix[:4]), int(suffix[4:]), 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+async def list_detached_month_partitions(conn, table: str) -> List[str]:
+    """已分离（不再挂载到主表）的月分区表名，按月份升序"""
+    result = await conn.execute(
+        text(
+            "SELECT c.relname FROM pg_class c "
+            "WHERE c.relnamespace = 'public'::regnamespace AND c.relkind = 'r' "
+            "AND c.relname LIKE :pattern "
+            "AND NOT EXISTS (SELECT 1 FROM pg_inherits i WHERE i.inhrelid = c.oid)"
+        ),
+        {"pattern": f"{table}\\_p%"}
+    )
+    prefix = f"{table}_p"
+    return sorted(
+        name for (name,) in result.all()
+        if len(name) == len(prefix) + 6 and name[len(prefix):].isdigit()
+    )
+
+
+async def ensure_month_partitions(conn, table: str, start: date, months: int) -> List[str]:
+    """
+    确保 start 所在月起连续 months 个月的分区及默认分区存在
+
+    默认分区中已有目标月数据时，先建独立表、迁出数据，再挂载为分区
+    （直接创建会因默认分区约束冲突失败）
+
+    Returns:
+        新建的分区名
+    """
+    key = MONTHLY_PARTITIONED_TABLES[table]
+    default_name = default_partition_name(table)
+    await conn.execute(text(
+        f'CREATE TABLE IF NOT EXISTS "{default_name}" PARTITION OF "{table}" DEFAULT'
+    ))
+
+    existing = {name for name, _ in await list_month_partitions(conn, table)}
+    created = []
+    month = month_start(start)
+    for _ in range(months):
+        name = partition_name(table, month)
+        upper = add_months(month, 1)
+        if name not in existing:
+            bounds = {"lower": month.isoformat(), "upper": upper.isoformat()}
+            has_default_rows = (await conn.execute(
+                text(
+                    f'SELECT 1 FROM "{default_name}" '
+                    f'WHERE "{key}" >= CAST(:lower AS date) AND "{key}" < CAST(:upper AS date) LIMIT 1'
+                ),
+                bounds
+            )).scalar() is not None
+
+            if has_default_rows:
+                await conn.execute(text(
+                    f'CREATE TABLE "{name}" (LIKE "{table}" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+                ))
+                await conn.execute(
+                    text(
+                        f'WITH moved AS (DELETE FROM "{default_name}" '
+                        f'WHERE "{key}" >= CAST(:lower AS date) AND "{key}" < CAST(:upper AS date) '
+                        f'RETURNING *) INSERT INTO "{name}" SELECT * FROM moved'
+                    ),
+                    bounds
+                )
+                await conn.execute(text(
+                    f'ALTER TABLE "{table}" ATTACH PARTITION "{name}" '
+                    f"FOR VALUES FROM ('{bounds['lower']}') TO ('{bounds['upper']}')"
+                ))
+                logger.info(f"Partition attached with rows moved from default: {name}")
+            else:
+                await conn.execute(text(
+                    f'CREATE TABLE "{name}" PARTITION OF "{table}" '
+                    f"FOR VALUES FROM ('{bounds['lower']}') TO ('{bounds['upper']}')"
+                ))
+            created.append(name)
+        month = upper
+
+    return created
+
+
+async def detach_month_partitions(conn, table: str, before: date) -> List[str]:
+    """
+    分离 before 所在月之前的月分区（分离后为独立表，数据保留）
+
+    Returns:
+        已分离的分区名
+    """
+    cutoff = month_start(before)
+    detached = []
+    for name, month in await list_month_partitions(conn, table):
+        if month >= cutoff:
+            break
+        await conn.execute(text(f'ALTER TABLE "{table}" DETACH PARTITION "{name}"'))
+        detached.append(name)
+    return detached
+
+
+async def ensure_partitions(conn, today: date, months_ahead: int) -> dict:
+    """
+    为全部按月分区的表确保当月及未来 months_ahead 个月的分区存在
+    （表尚未分区，即迁移未执行时跳过）
+
+    Returns:
+        {表名: [新建的分区名]}
+    """
+    created = {}
+    for table in MONTHLY_PARTITIONED_TABLES:
+        if not await is_partitioned(conn, table):
+            continue
+        created[table] = await ensure_month_partitions(conn, table, today, months_ahead + 1)
+    return created
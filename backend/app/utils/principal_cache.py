@@ -0,0 +1,237 @@
+"""
+认证主体缓存（管理端用户 sys_user / 小程序工人 worker）
+- 认证依赖按令牌中的主体ID取用户，命中缓存时不查库：
+  进程内 LRU（PRINCIPAL_CACHE_LOCAL_TTL）→ Redis（PRINCIPAL_CACHE_REDIS_TTL）→ 数据库
+- 缓存列快照（不含密码哈希），命中后构造为已分离对象并 merge(load=False) 到当前会话，
+  不发 SELECT，请求内仍可修改并提交；未缓存的列（密码哈希）需显式 refresh
+- 失效：用户/工人变更后删除 Redis 快照并递增令牌版本号；缓存条目带写入时的版本号，
+  各进程每 PRINCIPAL_CACHE_CHECK_SECONDS 秒比对一次版本，版本变化时清空进程内缓存，
+  旧版本的 Redis 快照不再采用；Redis 不可用时只依赖进程内过期时间
+"""
+import json
+import time
+import uuid
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Iterable, Optional, Tuple
+import logging
+
+from sqlalchemy import inspect as sa_inspect, select
+from sqlalchemy.orm import make_transient_to_detached
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+# 不写入缓存的列（缺失的列在对象上为过期状态）
+EXCLUDED_COLUMNS = {"password_hash"}
+
+
+def _snapshot(obj: Any) -> dict:
+    """ORM 对象的列快照"""
+    return {
+        attr.key: getattr(obj, attr.key)
+        for attr in sa_inspect(obj).mapper.column_attrs
+        if attr.key not in EXCLUDED_COLUMNS
+    }
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    raise TypeError(f"Unsupported principal value: {type(value).__name__}")
+
+
+def _from_json(model, data: dict) -> dict:
+    """Redis 中的 JSON 快照按列类型还原"""
+    columns = {attr.key: attr.columns[0] for attr in sa_inspect(model).column_attrs}
+    values = {}
+    for key, value in data.items():
+        column = columns.get(key)
+        if column is None:
+            continue
+        if isinstance(value, str):
+            python_type = column.type.python_type
+            if python_type in (datetime, date):
+                value = python_type.fromisoformat(value)
+            elif python_type is uuid.UUID:
+                value = uuid.UUID(value)
+        values[key] = value
+    return values
+
+
+class PrincipalCache:
+    """
+    认证主体缓存
+
+    进程内结构: OrderedDict{(表名, 主体ID): (列快照, 令牌版本, 过期时间)}，按最近使用排序
+    """
+
+    GENERATION_KEY = "principal:gen"
+    KEY_PREFIX = "principal:"
+
+    def __init__(self):
+        self._entries: "OrderedDict[Tuple[str, uuid.UUID], Tuple[dict, Optional[str], float]]" = OrderedDict()
+        self._generation: Optional[str] = None
+        self._checked_at = 0.0
+
+    def _key(self, kind: str, principal_id: uuid.UUID) -> str:
+        return f"{self.KEY_PREFIX}{kind}:{principal_id}"
+
+    def invalidate_local(self, kind: str, principal_id: uuid.UUID) -> None:
+        self._entries.pop((kind, principal_id), None)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._generation = None
+        self._checked_at = 0.0
+
+    async def _sync_generation(self, r) -> None:
+        """按检查间隔比对令牌版本号，版本变化时清空进程内缓存"""
+        now = time.monotonic()
+        if now - self._checked_at < settings.PRINCIPAL_CACHE_CHECK_SECONDS:
+            return
+        try:
+            generation = await r.get(self.GENERATION_KEY)
+        except Exception as e:
+            logger.warning(f"Principal cache generation check failed: {e}")
+            return
+        if generation != self._generation:
+            self._entries.clear()
+            self._generation = generation
+        self._checked_at = now
+
+    def _store_local(self, kind: str, principal_id: uuid.UUID, data: dict) -> None:
+        self._entries[(kind, principal_id)] = (
+            data,
+            self._generation,
+            time.monotonic() + settings.PRINCIPAL_CACHE_LOCAL_TTL
+        )
+        self._entries.move_to_end((kind, principal_id))
+        while len(self._entries) > settings.PRINCIPAL_CACHE_MAX_ENTRIES:
+            self._entries.popitem(last=False)
+
+    def _get_local(self, kind: str, principal_id: uuid.UUID) -> Optional[dict]:
+        entry = self._entries.get((kind, principal_id))
+        if entry is None:
+            return None
+        data, generation, expires_at = entry
+        if expires_at <= time.monotonic() or generation != self._generation:
+            del self._entries[(kind, principal_id)]
+            return None
+        self._entries.move_to_end((kind, principal_id))
+        return data
+
+    async def _get_redis(self, r, model, principal_id: uuid.UUID) -> Optional[dict]:
+        try:
+            raw = await r.get(self._key(model.__tablename__, principal_id))
+        except Exception as e:
+            logger.warning(f"Principal cache read failed: {e}")
+            return None
+        if not raw:
+            return None
+        cached = json.loads(raw)
+        # 旧版本号写入的快照可能早于失效，不采用
+        if cached.get("gen") != self._generation:
+            return None
+        return _from_json(model, cached["data"])
+
+    async def _set_redis(self, r, kind: str, principal_id: uuid.UUID, data: dict) -> None:
+        try:
+            await r.set(
+                self._key(kind, principal_id),
+                json.dumps({"gen": self._generation, "data": data}, default=_json_default),
+                ex=settings.PRINCIPAL_CACHE_REDIS_TTL
+            )
+        except Exception as e:
+            logger.warning(f"Principal cache write failed: {e}")
+
+    async def get(self, db, model, principal_id: uuid.UUID):
+        """
+        获取认证主体
+
+        Args:
+            db: 当前请求的数据库会话（未命中时查库，命中时对象 merge 到该会话）
+            model: SysUser / Worker
+            principal_id: 主体ID（令牌 sub）
+
+        Returns:
+            附着到 db 会话的主体对象，不存在时返回 None（不缓存）
+        """
+        if not settings.PRINCIPAL_CACHE_ENABLED:
+            return await self._load(db, model, principal_id)
+
+        from app.utils.cache import get_redis_client
+
+        kind = model.__tablename__
+        r = None
+        try:
+            r = await get_redis_client()
+        except Exception as e:
+            logger.warning(f"Principal cache Redis unavailable: {e}")
+        if r is not None:
+            await self._sync_generation(r)
+
+        data = self._get_local(kind, principal_id)
+        if data is None and r is not None:
+            data = await self._get_redis(r, model, principal_id)
+            if data is not None:
+                self._store_local(kind, principal_id, data)
+
+        if data is not None:
+            obj = model(**data)
+            make_transient_to_detached(obj)
+            return await db.merge(obj, load=False)
+
+        obj = await self._load(db, model, principal_id)
+        if obj is not None:
+            data = _snapshot(obj)
+            self._store_local(kind, principal_id, data)
+            if r is not None:
+                await self._set_redis(r, kind, principal_id, data)
+        return obj
+
+    @staticmethod
+    async def _load(db, model, principal_id: uuid.UUID):
+        primary_key = sa_inspect(model).primary_key[0]
+        result = await db.execute(select(model).where(primary_key == principal_id))
+        return result.scalar_one_or_none()
+
+
+# 进程内共享实例
+principal_cache = PrincipalCache()
+
+
+async def invalidate_principals(kind: str, principal_ids: Iterable[uuid.UUID]) -> None:
+    """
+    用户/工人变更（禁用、角色、绑定状态等）后调用：
+    丢弃本进程缓存、删除 Redis 快照并递增令牌版本号，其他进程在下一次版本检查时清空缓存
+
+    Args:
+        kind: 表名 sys_user / worker
+        principal_ids: 主体ID
+    """
+    from app.utils.cache import get_redis_client
+
+    principal_ids = list(principal_ids)
+    if not principal_ids:
+        return
+    for principal_id in principal_ids:
+        principal_cache.invalidate_local(kind, principal_id)
+    try:
+        r = await get_redis_client()
+        if r is not None:
+            async with r.pipeline(transaction=False) as pipe:
+                pipe.delete(*(principal_cache._key(kind, p) for p in principal_ids))
+                pipe.incr(PrincipalCache.GENERATION_KEY)
+                await pipe.execute()
+    except Exception as e:
+        logger.warning(f"Failed to invalidate principal cache: kind={kind}, error={e}")
+
+
+async def invalidate_principal(kind: str, principal_id: uuid.UUID) -> None:
+    """单个主体变更后调用，见 invalidate_principals"""
+    await invalidate_principals(kind, [principal_id])
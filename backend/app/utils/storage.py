@@ -0,0 +1,135 @@
+"""
+导出文件存储
+- local：保存到 EXPORT_LOCAL_DIR，由下载接口直接返回文件
+- minio：上传到 MINIO_BUCKET，下载接口重定向到预签名地址
+- 冷数据归档文件使用同样的存储（ARCHIVE_STORAGE_BACKEND），位于 archive/ 路径下
+"""
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Iterator, Optional
+from urllib.parse import quote
+
+from app.core.config import settings
+from app.utils.export import MEDIA_TYPES
+
+
+def _get_minio_client():
+    """创建 MinIO 客户端"""
+    from minio import Minio
+
+    return Minio(
+        settings.MINIO_ENDPOINT,
+        access_key=settings.MINIO_ACCESS_KEY,
+        secret_key=settings.MINIO_SECRET_KEY,
+        secure=settings.MINIO_SECURE
+    )
+
+
+def local_export_path(storage_key: str) -> str:
+    """本地存储的文件路径"""
+    return os.path.join(settings.EXPORT_LOCAL_DIR, storage_key)
+
+
+def save_export_file(src_path: str, storage_key: str, file_format: str) -> str:
+    """
+    保存导出文件（源文件会被移动/删除）
+
+    Args:
+        src_path: 已生成的临时文件
+        storage_key: 存储路径
+        file_format: xlsx / csv
+
+    Returns:
+        str: 实际使用的存储后端
+    """
+    backend = settings.EXPORT_STORAGE_BACKEND
+
+    if backend == "minio":
+        client = _get_minio_client()
+        if not client.bucket_exists(settings.MINIO_BUCKET):
+            client.make_bucket(settings.MINIO_BUCKET)
+        client.fput_object(
+            settings.MINIO_BUCKET,
+            storage_key,
+            src_path,
+            content_type=MEDIA_TYPES[file_format]
+        )
+        os.remove(src_path)
+        return "minio"
+
+    dest_path = local_export_path(storage_key)
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    shutil.move(src_path, dest_path)
+    return "local"
+
+
+def presigned_export_url(storage_key: str, file_name: str) -> str:
+    """MinIO 预签名下载地址（带下载文件名）"""
+    client = _get_minio_client()
+    return client.presigned_get_object(
+        settings.MINIO_BUCKET,
+        storage_key,
+        expires=timedelta(seconds=settings.EXPORT_DOWNLOAD_URL_EXPIRE_SECONDS),
+        response_headers={
+            "response-content-disposition": f"attachment; filename*=UTF-8''{quote(file_name)}"
+        }
+    )
+
+
+def delete_export_file(backend: Optional[str], storage_key: str) -> None:
+    """删除导出文件"""
+    if backend == "minio":
+        _get_minio_client().remove_object(settings.MINIO_BUCKET, storage_key)
+        return
+
+    path = local_export_path(storage_key)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def save_archive_file(src_path: str, storage_key: str) -> str:
+    """
+    保存归档文件（源文件会被移动/删除）
+
+    Returns:
+        str: 实际使用的存储后端
+    """
+    if settings.ARCHIVE_STORAGE_BACKEND == "minio":
+        client = _get_minio_client()
+        if not client.bucket_exists(settings.MINIO_BUCKET):
+            client.make_bucket(settings.MINIO_BUCKET)
+        client.fput_object(
+            settings.MINIO_BUCKET,
+            storage_key,
+            src_path,
+            content_type="application/gzip"
+        )
+        os.remove(src_path)
+        return "minio"
+
+    dest_path = local_export_path(storage_key)
+    os.makedirs(os.path.dirname(dest_path), exist_ok=True)
+    shutil.move(src_path, dest_path)
+    return "local"
+
+
+@contextmanager
+def open_archive_file(backend: Optional[str], storage_key: str) -> Iterator[str]:
+    """
+    获取归档文件的本地路径（MinIO 文件下载到临时文件，退出时删除）
+    """
+    if backend != "minio":
+        yield local_export_path(storage_key)
+        return
+
+    fd, tmp_path = tempfile.mkstemp(suffix=os.path.basename(storage_key))
+    os.close(fd)
+    try:
+        _get_minio_client().fget_object(settings.MINIO_BUCKET, storage_key, tmp_path)
+        yield tmp_path
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
@@ -0,0 +1,174 @@
+"""
+人员身份缓存（门禁事件匹配人员）
+- 进程内缓存：按工地存储 人脸ID / 身份证号 / 人员ID → 人员ID，未命中的结果同样缓存
+- 未命中的标识按类型批量查库（每类一次查询）
+- 条目按 WORKER_IDENTITY_CACHE_TTL 过期
+- 人员增删改后递增 Redis 中的工地版本号，各进程每 WORKER_IDENTITY_CACHE_CHECK_SECONDS
+  秒比对一次版本，版本变化时丢弃该工地的缓存；Redis 不可用时只依赖过期时间
+"""
+import time
+import uuid
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.models import Worker
+
+logger = logging.getLogger(__name__)
+
+
+# 标识类型 → 人员表列
+IDENTITY_COLUMNS = {
+    "worker_id": Worker.worker_id,
+    "face_id": Worker.face_id,
+    "id_no": Worker.id_no,
+}
+
+_UNSET = object()
+
+
+class WorkerIdentityCache:
+    """
+    人员身份缓存
+
+    缓存结构: {site_id: {(标识类型, 标识值): (人员ID 或 None, 过期时间)}}
+    """
+
+    GENERATION_KEY_PREFIX = "worker_identity:gen:"
+
+    def __init__(self):
+        self._entries: Dict[uuid.UUID, Dict[Tuple[str, str], Tuple[Optional[uuid.UUID], float]]] = {}
+        self._generations: Dict[uuid.UUID, Optional[str]] = {}
+        self._checked_at: Dict[uuid.UUID, float] = {}
+        self._size = 0
+
+    def invalidate_local(self, site_id: uuid.UUID) -> None:
+        """丢弃本进程中该工地的缓存"""
+        entries = self._entries.pop(site_id, None)
+        if entries:
+            self._size -= len(entries)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._generations.clear()
+        self._checked_at.clear()
+        self._size = 0
+
+    async def _sync_generations(self, site_ids: Iterable[uuid.UUID]) -> None:
+        """按检查间隔比对工地版本号（一次 MGET），版本变化的工地丢弃缓存"""
+        from app.utils.cache import get_redis_client
+
+        now = time.monotonic()
+        due = [
+            s for s in site_ids
+            if now - self._checked_at.get(s, 0) >= settings.WORKER_IDENTITY_CACHE_CHECK_SECONDS
+        ]
+        if not due:
+            return
+
+        try:
+            r = await get_redis_client()
+            if r is None:
+                return
+            versions = await r.mget([f"{self.GENERATION_KEY_PREFIX}{s}" for s in due])
+        except Exception as e:
+            logger.warning(f"Worker identity generation check failed: {e}")
+            return
+
+        for site_id, version in zip(due, versions):
+            if self._generations.get(site_id, _UNSET) != version:
+                self.invalidate_local(site_id)
+                self._generations[site_id] = version
+            self._checked_at[site_id] = now
+
+    async def resolve(
+        self,
+        db,
+        lookups: Iterable[Tuple[uuid.UUID, str, str]]
+    ) -> Dict[Tuple[uuid.UUID, str, str], Optional[uuid.UUID]]:
+        """
+        批量解析人员身份
+
+        Args:
+            db: 数据库会话（未命中时查库）
+            lookups: [(工地ID, 标识类型 worker_id/face_id/id_no, 标识值), ...]
+
+        Returns:
+            {(工地ID, 标识类型, 标识值): 人员ID 或 None}
+        """
+        lookups = set(lookups)
+        if not lookups:
+            return {}
+
+        await self._sync_generations({site_id for site_id, _, _ in lookups})
+
+        now = time.monotonic()
+        resolved = {}
+        misses: Dict[str, List[Tuple[uuid.UUID, str]]] = {}
+        for site_id, kind, value in lookups:
+            entry = self._entries.get(site_id, {}).get((kind, value))
+            if entry is not None and entry[1] > now:
+                resolved[(site_id, kind, value)] = entry[0]
+            else:
+                misses.setdefault(kind, []).append((site_id, value))
+
+        expires_at = now + settings.WORKER_IDENTITY_CACHE_TTL
+        for kind, pairs in misses.items():
+            column = IDENTITY_COLUMNS[kind]
+            values = {value for _, value in pairs}
+            if kind == "worker_id":
+                values = {uuid.UUID(v) for v in values}
+            result = await db.execute(
+                select(Worker.site_id, column, Worker.worker_id)
+                .where(
+                    Worker.site_id.in_({site_id for site_id, _ in pairs}),
+                    column.in_(values)
+                )
+            )
+            found = {(site_id, str(value)): worker_id for site_id, value, worker_id in result.all()}
+
+            for site_id, value in pairs:
+                worker_id = found.get((site_id, value))
+                resolved[(site_id, kind, value)] = worker_id
+                self._store(site_id, kind, value, worker_id, expires_at)
+
+        return resolved
+
+    def _store(
+        self,
+        site_id: uuid.UUID,
+        kind: str,
+        value: str,
+        worker_id: Optional[uuid.UUID],
+        expires_at: float
+    ) -> None:
+        if self._size >= settings.WORKER_IDENTITY_CACHE_MAX_ENTRIES:
+            # 超出容量：整体清空（门禁事件集中在少数活跃工地，很快重新填充）
+            self._entries.clear()
+            self._size = 0
+        site_entries = self._entries.setdefault(site_id, {})
+        if (kind, value) not in site_entries:
+            self._size += 1
+        site_entries[(kind, value)] = (worker_id, expires_at)
+
+
+# 进程内共享实例
+worker_identity_cache = WorkerIdentityCache()
+
+
+async def invalidate_worker_identities(site_id: uuid.UUID) -> None:
+    """
+    人员增删改后调用：丢弃本进程缓存并递增工地版本号，
+    其他进程在下一次版本检查时丢弃该工地缓存
+    """
+    from app.utils.cache import get_redis_client
+
+    worker_identity_cache.invalidate_local(site_id)
+    try:
+        r = await get_redis_client()
+        if r is not None:
+            await r.incr(f"{WorkerIdentityCache.GENERATION_KEY_PREFIX}{site_id}")
+    except Exception as e:
+        logger.warning(f"Failed to bump worker identity generation: site={site_id}, error={e}")
@@ -0,0 +1,110 @@
+"""
+后端单元测试公共夹具
+- fake_redis: 进程内 Redis 替身（decode_responses=True 语义，值均为字符串），
+  替换 app.utils.cache.get_redis_client，覆盖熔断器/缓存用到的命令
+"""
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "backend"))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+class FakeRedis:
+    """内存 Redis（不处理过期时间，ex 参数只记录）"""
+
+    def __init__(self):
+        self.data = {}
+        self.expires = {}
+
+    async def get(self, key):
+        value = self.data.get(key)
+        return None if value is None else str(value)
+
+    async def mget(self, keys):
+        return [await self.get(key) for key in keys]
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = str(value)
+        if ex is not None:
+            self.expires[key] = ex
+        return True
+
+    async def exists(self, *keys):
+        return sum(1 for k in keys if k in self.data)
+
+    async def delete(self, *keys):
+        removed = 0
+        for key in keys:
+            if self.data.pop(key, None) is not None:
+                removed += 1
+        return removed
+
+    async def incr(self, key):
+        self.data[key] = str(int(self.data.get(key) or 0) + 1)
+        return int(self.data[key])
+
+    async def hgetall(self, key):
+        return {k: str(v) for k, v in self.data.get(key, {}).items()}
+
+    async def hset(self, key, field=None, value=None, mapping=None):
+        h = self.data.setdefault(key, {})
+        if field is not None:
+            h[field] = str(value)
+        for k, v in (mapping or {}).items():
+            h[k] = str(v)
+        return 1
+
+    async def hincrby(self, key, field, amount=1):
+        h = self.data.setdefault(key, {})
+        h[field] = str(int(h.get(field) or 0) + amount)
+        return int(h[field])
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+
+class FakePipeline:
+    """按顺序缓存命令，execute 时依次执行"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        def _queue(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+        return _queue
+
+    async def execute(self):
+        results = []
+        for name, args, kwargs in self.commands:
+            results.append(await getattr(self.redis, name)(*args, **kwargs))
+        self.commands = []
+        return results
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """替换 get_redis_client 为内存 Redis"""
+    import app.utils.cache as cache
+
+    redis = FakeRedis()
+
+    async def _get_redis_client():
+        return redis
+
+    monkeypatch.setattr(cache, "get_redis_client", _get_redis_client)
+    return redis
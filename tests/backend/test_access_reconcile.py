@@ -0,0 +1,157 @@
+"""
+二级对账有序归并单元测试
+测试范围：_merge_diff 只在本系统 / 只在门禁侧 / 两侧都有的比对结果与行数统计（表驱动），
+门禁侧 UUID 大小写和格式归一化、vendor_ref 按字节序（COLLATE "C"）排序的边界情况，
+输入乱序时报错
+
+两侧输入为内存中的有序序列，不依赖数据库和门禁系统
+"""
+import asyncio
+import os
+import sys
+import uuid
+
+import pytest
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "backend"))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+W1 = "0a000000-0000-0000-0000-000000000001"
+W2 = "9f000000-0000-0000-0000-000000000002"
+W3 = "a0000000-0000-0000-0000-000000000003"  # 字母开头：字节序在数字之后
+A1 = "11111111-1111-1111-1111-111111111111"
+A2 = "bbbbbbbb-bbbb-bbbb-bbbb-bbbbbbbbbbbb"
+
+
+async def _aiter(items):
+    for item in items:
+        yield item
+
+
+def _expected(keys):
+    """本系统侧输入：(比对键, grant_id)，grant_id 用比对键生成便于断言"""
+    return [(key, f"g:{'/'.join(key)}") for key in keys]
+
+
+async def _collect(expected_keys, actual_keys):
+    from app.tasks.access import _merge_diff
+
+    counts = {"expected_count": 0, "actual_count": 0}
+    diffs = [
+        diff async for diff in _merge_diff(
+            _aiter(_expected(expected_keys)),
+            _aiter(actual_keys),
+            counts
+        )
+    ]
+    return diffs, counts
+
+
+def _missing(key):
+    return ("MISSING_IN_VENDOR", key, f"g:{'/'.join(key)}")
+
+
+def _extra(key):
+    return ("EXTRA_IN_VENDOR", key, None)
+
+
+MERGE_CASES = [
+    # (名称, 本系统比对键, 门禁侧比对键, 期望差异)
+    ("both_empty", [], [], []),
+    ("identical", [(W1, A1, "r1"), (W2, A1, "r2")], [(W1, A1, "r1"), (W2, A1, "r2")], []),
+    ("only_local", [(W1, A1, "r1"), (W2, A2, "r2")], [], [_missing((W1, A1, "r1")), _missing((W2, A2, "r2"))]),
+    ("only_vendor", [], [(W1, A1, "r1"), (W3, A1, "r9")], [_extra((W1, A1, "r1")), _extra((W3, A1, "r9"))]),
+    (
+        "interleaved",
+        [(W1, A1, "r1"), (W2, A1, "r2"), (W3, A2, "r5")],
+        [(W1, A1, "r1"), (W1, A2, "r3"), (W3, A2, "r5"), (W3, A2, "r6")],
+        [_extra((W1, A2, "r3")), _missing((W2, A1, "r2")), _extra((W3, A2, "r6"))]
+    ),
+    (
+        "same_worker_area_different_ref",
+        [(W1, A1, "r1")],
+        [(W1, A1, "r2")],
+        [_missing((W1, A1, "r1")), _extra((W1, A1, "r2"))]
+    ),
+    (
+        "null_vendor_ref_sorts_first",
+        [(W1, A1, ""), (W1, A1, "r1")],
+        [(W1, A1, "r1")],
+        [_missing((W1, A1, ""))]
+    ),
+    (
+        "duplicates_matched_pairwise",
+        [(W1, A1, "r1"), (W1, A1, "r1")],
+        [(W1, A1, "r1")],
+        [_missing((W1, A1, "r1"))]
+    ),
+    (
+        # 字节序："B" < "_" < "a"（区域排序规则下 "a" < "B"）
+        "collate_c_vendor_ref",
+        [(W1, A1, "B-1"), (W1, A1, "_x"), (W1, A1, "a-1")],
+        [(W1, A1, "B-1"), (W1, A1, "a-1"), (W1, A1, "a-2")],
+        [_missing((W1, A1, "_x")), _extra((W1, A1, "a-2"))]
+    ),
+    (
+        # uuid 排序：数字开头的在字母开头的之前（与 PostgreSQL uuid 列按字节排序一致）
+        "uuid_digit_before_letter",
+        [(W2, A1, "r"), (W3, A1, "r")],
+        [(W3, A1, "r")],
+        [_missing((W2, A1, "r"))]
+    ),
+]
+
+
+class TestMergeDiff:
+    """有序归并比对"""
+
+    @pytest.mark.parametrize(
+        "name,expected_keys,actual_keys,diffs",
+        MERGE_CASES,
+        ids=[case[0] for case in MERGE_CASES]
+    )
+    def test_merge_cases(self, name, expected_keys, actual_keys, diffs):
+        """测试：两侧按比对键升序时差异与行数统计正确"""
+        result, counts = asyncio.run(_collect(expected_keys, actual_keys))
+        assert result == diffs
+        assert counts == {"expected_count": len(expected_keys), "actual_count": len(actual_keys)}
+        print(f"✓ {name}")
+
+    @pytest.mark.parametrize("side", ["expected", "actual"])
+    def test_out_of_order_raises(self, side):
+        """测试：任一侧未按比对键升序时报错（归并结果不可信）"""
+        ordered = [(W1, A1, "r1"), (W2, A1, "r1")]
+        unordered = list(reversed(ordered))
+        expected_keys, actual_keys = (unordered, ordered) if side == "expected" else (ordered, unordered)
+
+        with pytest.raises(RuntimeError, match="out of order"):
+            asyncio.run(_collect(expected_keys, actual_keys))
+        print(f"✓ {side} 乱序报错")
+
+    def test_vendor_keys_normalized(self):
+        """测试：门禁侧大写、无连字符的 UUID 归一化后与本系统一致，且排序不变"""
+        from app.adapters.access_control_adapter import effective_grant_key
+
+        vendor_rows = [
+            {"worker_id": W2.upper(), "area_id": A1.replace("-", ""), "vendor_ref": "r2"},
+            {"worker_id": "{" + W3.upper() + "}", "area_id": A1, "vendor_ref": None},
+        ]
+        actual_keys = [effective_grant_key(row) for row in vendor_rows]
+        assert actual_keys == [(W2, A1, "r2"), (W3, A1, "")]
+        # 未归一化时大写 "A0..." 会排在 "9F..." 之前
+        assert W3.upper() > W2.upper()
+        assert sorted(actual_keys) == actual_keys
+
+        result, _ = asyncio.run(_collect([(W2, A1, "r2"), (W3, A1, "")], actual_keys))
+        assert result == []
+        print("✓ 门禁侧比对键归一化")
+
+    def test_non_uuid_values_kept(self):
+        """测试：非 UUID 的标识原样保留"""
+        from app.adapters.access_control_adapter import effective_grant_key
+
+        assert effective_grant_key({"worker_id": "ext-1", "area_id": 7}) == ("ext-1", "7", "")
+        assert effective_grant_key({"worker_id": uuid.UUID(W1), "area_id": A2, "vendor_ref": "x"}) == (W1, A2, "x")
+        print("✓ 非 UUID 标识")
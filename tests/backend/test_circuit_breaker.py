@@ -0,0 +1,216 @@
+"""
+熔断器单元测试
+测试范围：CLOSED → OPEN → HALF_OPEN（单个探测令牌）→ CLOSED / OPEN 状态转换、
+is_open 不消耗探测令牌、AIMD 并发数增减与上下限、Redis 不可用时放行
+
+使用内存 Redis（fake_redis 夹具），时间通过替换 time.time 推进，不依赖外部服务
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "backend"))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+class _Clock:
+    """可手动推进的时钟"""
+
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    from app.adapters import circuit_breaker
+
+    c = _Clock()
+    monkeypatch.setattr(circuit_breaker.time, "time", c)
+    return c
+
+
+def _breaker(**kwargs):
+    from app.adapters.circuit_breaker import CircuitBreaker
+
+    options = dict(
+        failure_threshold=3,
+        recovery_timeout=60,
+        min_concurrency=1,
+        max_concurrency=8,
+        decrease_factor=0.5
+    )
+    options.update(kwargs)
+    return CircuitBreaker("test_vendor", **options)
+
+
+async def _fail(breaker, times):
+    for _ in range(times):
+        await breaker.record_failure()
+
+
+class TestCircuitBreakerTransitions:
+    """状态转换"""
+
+    def test_closed_allows_requests(self, fake_redis, clock):
+        """测试：初始为 CLOSED，放行请求"""
+        async def _run():
+            breaker = _breaker()
+            assert await breaker.allow_request() is True
+            assert await breaker.is_open() is False
+            assert (await breaker.get_state())["state"] == "CLOSED"
+
+        asyncio.run(_run())
+        print("✓ CLOSED 放行")
+
+    def test_opens_after_threshold(self, fake_redis, clock):
+        """测试：连续失败达到阈值后熔断，阈值前不熔断"""
+        async def _run():
+            breaker = _breaker()
+            await _fail(breaker, 2)
+            assert await breaker.allow_request() is True
+
+            await breaker.record_failure()
+            state = await breaker.get_state()
+            assert state["state"] == "OPEN"
+            assert state["retry_in_seconds"] == 60
+            assert await breaker.allow_request() is False
+            assert await breaker.is_open() is True
+
+        asyncio.run(_run())
+        print("✓ 达到阈值熔断")
+
+    def test_success_resets_failure_count(self, fake_redis, clock):
+        """测试：成功清零失败计数，失败必须连续才熔断"""
+        async def _run():
+            breaker = _breaker()
+            await _fail(breaker, 2)
+            await breaker.record_success()
+            await _fail(breaker, 2)
+            assert (await breaker.get_state())["state"] == "CLOSED"
+
+        asyncio.run(_run())
+        print("✓ 成功清零失败计数")
+
+    def test_half_open_single_probe(self, fake_redis, clock):
+        """测试：冷却期后只有一个请求拿到探测令牌"""
+        async def _run():
+            breaker = _breaker()
+            await _fail(breaker, 3)
+
+            clock.now += 59
+            assert await breaker.allow_request() is False
+
+            clock.now += 2
+            assert await breaker.is_open() is False  # 冷却期已过，is_open 不抢令牌
+            assert await breaker.allow_request() is True
+            assert (await breaker.get_state())["state"] == "HALF_OPEN"
+            assert await breaker.allow_request() is False
+            assert await breaker.is_open() is True  # 探测进行中
+
+        asyncio.run(_run())
+        print("✓ 半开只放行一个探测")
+
+    def test_probe_success_closes(self, fake_redis, clock):
+        """测试：探测成功恢复 CLOSED，释放探测令牌"""
+        async def _run():
+            breaker = _breaker()
+            await _fail(breaker, 3)
+            clock.now += 61
+            assert await breaker.allow_request() is True
+
+            await breaker.record_success()
+            state = await breaker.get_state()
+            assert state["state"] == "CLOSED"
+            assert state["failures"] == 0
+            assert breaker.probe_key not in fake_redis.data
+            assert await breaker.allow_request() is True
+
+        asyncio.run(_run())
+        print("✓ 探测成功恢复")
+
+    def test_probe_failure_reopens(self, fake_redis, clock):
+        """测试：探测失败重新熔断并重新计算冷却期"""
+        async def _run():
+            breaker = _breaker()
+            await _fail(breaker, 3)
+            clock.now += 61
+            assert await breaker.allow_request() is True
+
+            await breaker.record_failure()
+            state = await breaker.get_state()
+            assert state["state"] == "OPEN"
+            assert state["opened_at"] == clock.now
+            assert breaker.probe_key not in fake_redis.data
+            assert await breaker.allow_request() is False
+
+            clock.now += 61
+            assert await breaker.allow_request() is True
+
+        asyncio.run(_run())
+        print("✓ 探测失败重新熔断")
+
+    def test_state_shared_between_instances(self, fake_redis, clock):
+        """测试：同名熔断器共享 Redis 状态（跨 worker）"""
+        async def _run():
+            await _fail(_breaker(), 3)
+            assert await _breaker().allow_request() is False
+
+        asyncio.run(_run())
+        print("✓ 状态跨实例共享")
+
+    def test_redis_unavailable_allows(self, monkeypatch, clock):
+        """测试：Redis 不可用时放行全部请求"""
+        import app.utils.cache as cache
+
+        async def _no_redis():
+            return None
+
+        monkeypatch.setattr(cache, "get_redis_client", _no_redis)
+
+        async def _run():
+            breaker = _breaker()
+            await _fail(breaker, 10)
+            assert await breaker.allow_request() is True
+            assert await breaker.is_open() is False
+            assert await breaker.get_concurrency() == 8
+
+        asyncio.run(_run())
+        print("✓ Redis 不可用放行")
+
+
+class TestCircuitBreakerConcurrency:
+    """AIMD 并发控制"""
+
+    def test_multiplicative_decrease(self, fake_redis, clock):
+        """测试：失败时并发数按系数下调，不低于下限"""
+        async def _run():
+            breaker = _breaker(failure_threshold=100)
+            assert await breaker.get_concurrency() == 8
+
+            expected = [4, 2, 1, 1]
+            for value in expected:
+                await breaker.record_failure()
+                assert await breaker.get_concurrency() == value
+
+        asyncio.run(_run())
+        print("✓ 乘性减少")
+
+    def test_additive_increase(self, fake_redis, clock):
+        """测试：成功时并发数加一，不超过上限"""
+        async def _run():
+            breaker = _breaker(failure_threshold=100)
+            await _fail(breaker, 3)
+            assert await breaker.get_concurrency() == 1
+
+            for value in [2, 3, 4, 5, 6, 7, 8, 8]:
+                await breaker.record_success()
+                assert await breaker.get_concurrency() == value
+
+        asyncio.run(_run())
+        print("✓ 加性增加")
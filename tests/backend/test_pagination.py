@@ -0,0 +1,348 @@
+"""
+分页工具单元测试
+测试范围：精确计数的 COUNT(*) OVER() 单语句路径与原两条语句（子查询计数 + 分页查询）
+结果一致（普通/过滤/DISTINCT 查询、空结果、超出末页）；游标编码往返、非法/篡改游标
+返回 400、排序键相同时按主键决胜逐页遍历不重不漏；估算计数在表统计不可用时改为精确计数
+
+使用内存 SQLite（同步会话包装为 paginate 所需的异步 execute），不依赖外部数据库
+"""
+import asyncio
+import base64
+import json
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "backend"))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+from sqlalchemy import DateTime, Integer, String, create_engine, select
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import DeclarativeBase, Mapped, Session, mapped_column
+
+
+class _Base(DeclarativeBase):
+    pass
+
+
+class Item(_Base):
+    __tablename__ = "pagination_item"
+
+    item_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    category: Mapped[str] = mapped_column(String(10), nullable=False)
+
+
+class ItemTag(_Base):
+    __tablename__ = "pagination_item_tag"
+
+    tag_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    item_id: Mapped[int] = mapped_column(Integer, nullable=False)
+    name: Mapped[str] = mapped_column(String(10), nullable=False)
+
+
+ITEM_COUNT = 23
+BASE_TIME = datetime(2026, 1, 1, 8, 0, 0)
+
+
+class _AsyncSession:
+    """同步会话的异步包装（paginate 只用到 execute）"""
+
+    def __init__(self, session: Session):
+        self.session = session
+
+    async def execute(self, statement, params=None):
+        return self.session.execute(statement, params)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    _Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        for i in range(1, ITEM_COUNT + 1):
+            # 每 3 条共用同一时间，用于排序键相同的情况
+            session.add(Item(
+                item_id=i,
+                created_at=BASE_TIME + timedelta(minutes=i // 3),
+                category="A" if i % 2 else "B"
+            ))
+            for n in range(i % 4):
+                session.add(ItemTag(item_id=i, name=f"t{n}"))
+        session.commit()
+        yield _AsyncSession(session)
+    engine.dispose()
+
+
+def _params(page=1, page_size=5, **kwargs):
+    from app.utils.pagination import PaginationParams
+
+    return PaginationParams(page=page, page_size=page_size, **kwargs)
+
+
+async def _two_query(db, query, params):
+    """原实现：子查询计数 + 分页查询"""
+    from app.utils.pagination import count_rows
+
+    total, _ = await count_rows(db, query, "exact")
+    result = await db.execute(query.offset(params.offset).limit(params.limit))
+    return total, list(result.scalars().all())
+
+
+def _queries():
+    ordered = (Item.created_at.desc(), Item.item_id.desc())
+    return {
+        "all": select(Item).order_by(*ordered),
+        "filtered": select(Item).where(Item.category == "A").order_by(*ordered),
+        "empty": select(Item).where(Item.category == "Z").order_by(*ordered),
+        "distinct_join": (
+            select(Item)
+            .join(ItemTag, ItemTag.item_id == Item.item_id)
+            .where(ItemTag.name.in_(["t0", "t1"]))
+            .distinct()
+            .order_by(Item.item_id)
+        ),
+    }
+
+
+class TestPaginateWindowCount:
+    """精确计数（窗口函数）与两条语句结果一致"""
+
+    @pytest.mark.parametrize("name", list(_queries()))
+    @pytest.mark.parametrize("page,page_size", [(1, 5), (2, 5), (5, 5), (1, 100), (9, 5)])
+    def test_matches_two_query(self, db, name, page, page_size):
+        """测试：各类查询、各页（含末页与超出末页）的总数和当页数据一致"""
+        from app.utils.pagination import paginate
+
+        query = _queries()[name]
+        params = _params(page=page, page_size=page_size)
+
+        async def _run():
+            expected_total, expected_items = await _two_query(db, query, params)
+            result = await paginate(db, query, params)
+            assert result.total == expected_total
+            assert [i.item_id for i in result.items] == [i.item_id for i in expected_items]
+            assert result.total_is_estimate is False
+
+        asyncio.run(_run())
+        print(f"✓ {name} page={page} size={page_size}")
+
+    def test_empty_result(self, db):
+        """测试：无数据时总数为 0，没有下一页"""
+        from app.utils.pagination import paginate
+
+        result = asyncio.run(paginate(db, _queries()["empty"], _params()))
+        assert result.total == 0
+        assert result.items == []
+        assert result.total_pages == 0
+        assert result.has_next is False
+        print("✓ 空结果")
+
+    def test_page_past_end_keeps_total(self, db):
+        """测试：超出末页时当页为空，总数仍为实际行数"""
+        from app.utils.pagination import paginate
+
+        result = asyncio.run(paginate(db, _queries()["all"], _params(page=50)))
+        assert result.items == []
+        assert result.total == ITEM_COUNT
+        assert result.has_next is False
+        assert result.has_prev is True
+        print("✓ 超出末页")
+
+    def test_distinct_not_duplicated(self, db):
+        """测试：DISTINCT 查询的总数按去重后的行计算"""
+        from app.utils.pagination import paginate
+
+        query = _queries()["distinct_join"]
+        result = asyncio.run(paginate(db, query, _params(page_size=100)))
+        ids = [i.item_id for i in result.items]
+        assert len(ids) == len(set(ids))
+        assert result.total == len(ids)
+        print("✓ DISTINCT 不重复计数")
+
+    def test_is_distinct(self):
+        """测试：DISTINCT / DISTINCT ON 识别"""
+        from app.utils.pagination import is_distinct
+
+        assert is_distinct(select(Item).distinct()) is True
+        assert is_distinct(select(Item).distinct(Item.category)) is True
+        assert is_distinct(select(Item)) is False
+        assert is_distinct(select(Item).where(Item.category == "DISTINCT")) is False
+        print("✓ DISTINCT 识别")
+
+
+def _raw_cursor(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+
+class TestCursor:
+    """游标分页"""
+
+    def test_round_trip(self):
+        """测试：时间（含时区）、整数、UUID 编码后按列类型还原"""
+        from sqlalchemy import Column, MetaData, Table
+        from app.utils.pagination import decode_cursor, encode_cursor
+
+        table = Table(
+            "cursor_types", MetaData(),
+            Column("created_at", DateTime(timezone=True)),
+            Column("seq", Integer),
+            Column("row_id", UUID(as_uuid=True))
+        )
+        columns = [table.c.created_at, table.c.seq, table.c.row_id]
+        values = [datetime(2026, 3, 1, 12, 30, 15, 123456, tzinfo=timezone(timedelta(hours=8))), 42, uuid.uuid4()]
+
+        cursor = encode_cursor(values)
+        assert "=" not in cursor
+        assert decode_cursor(cursor, columns) == values
+        print("✓ 游标往返")
+
+    @pytest.mark.parametrize("cursor", [
+        "not-base64!!",
+        base64.urlsafe_b64encode(b"\xff\xfe").decode(),
+        _raw_cursor({"created_at": "2026-01-01"}),
+        _raw_cursor(["2026-01-01T00:00:00"]),
+        _raw_cursor(["2026-01-01T00:00:00", 1, 2]),
+        _raw_cursor(["yesterday", "1"]),
+        _raw_cursor(["2026-01-01T00:00:00", "abc"]),
+        _raw_cursor([None, "1"]),
+        _raw_cursor(["2026-01-01T00:00:00", [1]]),
+        "",
+    ])
+    def test_invalid_cursor_400(self, cursor):
+        """测试：格式错误、长度不符、类型不符的游标返回 400"""
+        from fastapi import HTTPException
+        from app.utils.pagination import decode_cursor
+
+        with pytest.raises(HTTPException) as exc:
+            decode_cursor(cursor, [Item.created_at, Item.item_id])
+        assert exc.value.status_code == 400
+        print(f"✓ 非法游标 400: {cursor!r}")
+
+    def test_invalid_cursor_in_paginate(self, db):
+        """测试：paginate 传入非法游标返回 400，不执行查询"""
+        from fastapi import HTTPException
+        from app.utils.pagination import paginate
+
+        with pytest.raises(HTTPException) as exc:
+            asyncio.run(paginate(
+                db, _queries()["all"], _params(cursor="bogus", count_mode="none"),
+                keyset=(Item.created_at, Item.item_id)
+            ))
+        assert exc.value.status_code == 400
+        print("✓ paginate 非法游标 400")
+
+    def test_keyset_tie_break(self, db):
+        """测试：时间相同的行按主键倒序决胜，逐页遍历不重复、不遗漏"""
+        from app.utils.pagination import paginate
+
+        keyset = (Item.created_at, Item.item_id)
+        expected = [
+            i for _, i in sorted(
+                ((BASE_TIME + timedelta(minutes=i // 3), i) for i in range(1, ITEM_COUNT + 1)),
+                reverse=True
+            )
+        ]
+
+        async def _run():
+            seen = []
+            cursor = None
+            pages = 0
+            while True:
+                result = await paginate(
+                    db, select(Item), _params(page_size=4, cursor=cursor, count_mode="none"),
+                    keyset=keyset
+                )
+                seen.extend(i.item_id for i in result.items)
+                pages += 1
+                assert result.has_next is (result.next_cursor is not None)
+                cursor = result.next_cursor
+                if cursor is None:
+                    break
+            return seen, pages
+
+        seen, pages = asyncio.run(_run())
+        assert seen == expected
+        assert pages == (ITEM_COUNT + 3) // 4
+        print("✓ 排序键相同按主键决胜")
+
+    def test_first_page_uses_offset(self, db):
+        """测试：未传游标时按页码定位，返回的游标指向当页末行"""
+        from app.utils.pagination import decode_cursor, paginate
+
+        keyset = (Item.created_at, Item.item_id)
+        result = asyncio.run(paginate(db, select(Item), _params(page=2, page_size=5), keyset=keyset))
+        assert result.total == ITEM_COUNT
+        last = result.items[-1]
+        assert decode_cursor(result.next_cursor, keyset) == [last.created_at, last.item_id]
+        print("✓ 页码定位与游标")
+
+
+class _StatsSession(_AsyncSession):
+    """pg_class 统计查询返回指定值，其余语句在 SQLite 上执行"""
+
+    def __init__(self, session, reltuples):
+        super().__init__(session)
+        self.reltuples = reltuples
+        self.stats_queries = 0
+
+    async def execute(self, statement, params=None):
+        if "pg_class" in str(statement):
+            self.stats_queries += 1
+            reltuples = self.reltuples
+
+            class _Result:
+                def scalar(self):
+                    return reltuples
+
+            return _Result()
+        return await super().execute(statement, params)
+
+
+class TestCountEstimate:
+    """估算计数"""
+
+    @pytest.fixture(autouse=True)
+    def small_cap(self, monkeypatch):
+        from app.core.config import settings
+
+        monkeypatch.setattr(settings, "PAGINATION_COUNT_CAP", 10)
+
+    @pytest.mark.parametrize("reltuples,expected", [
+        (-1, (ITEM_COUNT, False)),
+        (None, (ITEM_COUNT, False)),
+        (5000, (5000, True)),
+        (5, (10, True)),
+    ])
+    def test_table_statistics(self, db, reltuples, expected):
+        """测试：超过上限时取表统计；统计不可用（-1，如分区表父表）时精确计数"""
+        from app.utils.pagination import count_rows
+
+        stats_db = _StatsSession(db.session, reltuples)
+        assert asyncio.run(count_rows(stats_db, select(Item), "estimate")) == expected
+        assert stats_db.stats_queries == 1
+        print(f"✓ reltuples={reltuples}")
+
+    def test_below_cap_is_exact(self, db):
+        """测试：未达上限时为精确值，不查表统计"""
+        from app.utils.pagination import count_rows
+
+        stats_db = _StatsSession(db.session, 5000)
+        query = select(Item).where(Item.item_id <= 7)
+        assert asyncio.run(count_rows(stats_db, query, "estimate")) == (7, False)
+        assert stats_db.stats_queries == 0
+        print("✓ 未达上限精确计数")
+
+    def test_filtered_returns_cap(self, db):
+        """测试：带过滤条件且达到上限时返回上限"""
+        from app.utils.pagination import count_rows
+
+        stats_db = _StatsSession(db.session, 5000)
+        query = select(Item).where(Item.item_id > 0)
+        assert asyncio.run(count_rows(stats_db, query, "estimate")) == (10, True)
+        assert stats_db.stats_queries == 0
+        print("✓ 过滤查询返回上限")
@@ -0,0 +1,195 @@
+"""
+按月分区管理单元测试
+测试范围：add_months 跨年加减、分区命名、分区边界生成（跨年连续、不重复创建已有分区）、
+默认分区中已有目标月数据时先迁出再挂载、分区列表解析、按月份分离
+
+数据库连接用记录 SQL 的替身（按语句返回预设结果），不依赖 PostgreSQL
+"""
+import asyncio
+import os
+import sys
+from datetime import date
+
+import pytest
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "backend"))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+class _Result:
+    def __init__(self, rows=None, scalar=None):
+        self.rows = rows or []
+        self.value = scalar
+
+    def scalar(self):
+        return self.value
+
+    def all(self):
+        return self.rows
+
+
+class FakeConn:
+    """
+    记录执行的 SQL
+    - 分区列表查询返回 attached（已挂载的表名）/ tables（独立表名）
+    - 默认分区探测按下界月份返回是否有数据
+    """
+
+    def __init__(self, attached=(), tables=(), default_rows_months=()):
+        self.attached = list(attached)
+        self.tables = list(tables)
+        self.default_rows_months = set(default_rows_months)
+        self.statements = []
+
+    async def execute(self, statement, params=None):
+        sql = " ".join(str(statement).split())
+        self.statements.append((sql, params))
+        if "FROM pg_inherits i JOIN pg_class c" in sql:
+            return _Result(rows=[(name,) for name in self.attached])
+        if "relkind = 'r'" in sql:
+            return _Result(rows=[(name,) for name in self.tables])
+        if sql.startswith("SELECT 1 FROM") and "_default" in sql:
+            return _Result(scalar=1 if params["lower"] in self.default_rows_months else None)
+        return _Result()
+
+    def ddl(self):
+        """建表/迁移/挂载/分离语句（不含查询）"""
+        return [sql for sql, _ in self.statements if not sql.startswith("SELECT")]
+
+
+class TestMonthHelpers:
+    """月份计算与命名"""
+
+    @pytest.mark.parametrize("month,months,expected", [
+        (date(2026, 1, 1), 1, date(2026, 2, 1)),
+        (date(2026, 12, 1), 1, date(2027, 1, 1)),
+        (date(2026, 11, 1), 3, date(2027, 2, 1)),
+        (date(2026, 1, 1), -1, date(2025, 12, 1)),
+        (date(2026, 3, 1), -15, date(2024, 12, 1)),
+        (date(2026, 6, 1), 0, date(2026, 6, 1)),
+        (date(2026, 6, 1), 24, date(2028, 6, 1)),
+    ])
+    def test_add_months(self, month, months, expected):
+        """测试：月初日期加减月数（含跨年、负数）"""
+        from app.utils.partitions import add_months
+
+        assert add_months(month, months) == expected
+        print(f"✓ {month} + {months} = {expected}")
+
+    def test_month_start(self):
+        """测试：任意日期取月初"""
+        from app.utils.partitions import month_start
+
+        assert month_start(date(2026, 2, 28)) == date(2026, 2, 1)
+        assert month_start(date(2026, 12, 31)) == date(2026, 12, 1)
+        print("✓ 月初")
+
+    def test_partition_names(self):
+        """测试：分区命名为 {表名}_pYYYYMM，默认分区为 {表名}_default"""
+        from app.utils.partitions import default_partition_name, partition_name
+
+        assert partition_name("access_event", date(2026, 3, 1)) == "access_event_p202603"
+        assert partition_name("access_event", date(2027, 12, 1)) == "access_event_p202712"
+        assert default_partition_name("access_event") == "access_event_default"
+        print("✓ 分区命名")
+
+
+class TestEnsurePartitions:
+    """预建分区"""
+
+    def test_bounds_across_year(self):
+        """测试：从月中开始，跨年连续生成 [月初, 下月初) 边界，已有分区不重复创建"""
+        from app.utils.partitions import ensure_month_partitions
+
+        conn = FakeConn(attached=["access_event_p202612", "access_event_default"])
+        created = asyncio.run(ensure_month_partitions(conn, "access_event", date(2026, 11, 17), 4))
+
+        assert created == ["access_event_p202611", "access_event_p202701", "access_event_p202702"]
+        ddl = conn.ddl()
+        assert ddl[0] == 'CREATE TABLE IF NOT EXISTS "access_event_default" PARTITION OF "access_event" DEFAULT'
+        assert ddl[1:] == [
+            'CREATE TABLE "access_event_p202611" PARTITION OF "access_event" '
+            "FOR VALUES FROM ('2026-11-01') TO ('2026-12-01')",
+            'CREATE TABLE "access_event_p202701" PARTITION OF "access_event" '
+            "FOR VALUES FROM ('2027-01-01') TO ('2027-02-01')",
+            'CREATE TABLE "access_event_p202702" PARTITION OF "access_event" '
+            "FOR VALUES FROM ('2027-02-01') TO ('2027-03-01')",
+        ]
+        print("✓ 跨年分区边界")
+
+    def test_moves_default_rows(self):
+        """测试：默认分区中已有该月数据时建独立表、迁出数据、再挂载"""
+        from app.utils.partitions import ensure_month_partitions
+
+        conn = FakeConn(default_rows_months={"2026-12-01"})
+        created = asyncio.run(ensure_month_partitions(conn, "access_event", date(2026, 12, 1), 2))
+
+        assert created == ["access_event_p202612", "access_event_p202701"]
+        ddl = conn.ddl()[1:]
+        assert ddl[0] == (
+            'CREATE TABLE "access_event_p202612" '
+            '(LIKE "access_event" INCLUDING DEFAULTS INCLUDING CONSTRAINTS)'
+        )
+        assert ddl[1].startswith('WITH moved AS (DELETE FROM "access_event_default" WHERE "event_time" >= ')
+        assert ddl[1].endswith('RETURNING *) INSERT INTO "access_event_p202612" SELECT * FROM moved')
+        assert ddl[2] == (
+            'ALTER TABLE "access_event" ATTACH PARTITION "access_event_p202612" '
+            "FOR VALUES FROM ('2026-12-01') TO ('2027-01-01')"
+        )
+        assert ddl[3].startswith('CREATE TABLE "access_event_p202701" PARTITION OF "access_event"')
+
+        moved_params = [params for sql, params in conn.statements if sql.startswith("WITH moved")]
+        assert moved_params == [{"lower": "2026-12-01", "upper": "2027-01-01"}]
+        print("✓ 默认分区数据迁出后挂载")
+
+    def test_skips_unpartitioned_table(self):
+        """测试：表尚未分区（迁移未执行）时跳过"""
+        from app.utils.partitions import ensure_partitions
+
+        conn = FakeConn()
+        assert asyncio.run(ensure_partitions(conn, date(2026, 5, 1), 2)) == {}
+        assert conn.ddl() == []
+        print("✓ 未分区表跳过")
+
+
+class TestListAndDetach:
+    """分区列表与分离"""
+
+    def test_list_month_partitions(self):
+        """测试：按月份升序，忽略默认分区和不符合命名的表"""
+        from app.utils.partitions import list_month_partitions
+
+        conn = FakeConn(attached=[
+            "access_event_p202701", "access_event_default", "access_event_p202611",
+            "access_event_p2026", "access_event_pabcdef"
+        ])
+        assert asyncio.run(list_month_partitions(conn, "access_event")) == [
+            ("access_event_p202611", date(2026, 11, 1)),
+            ("access_event_p202701", date(2027, 1, 1)),
+        ]
+        print("✓ 分区列表解析")
+
+    def test_list_detached(self):
+        """测试：已分离的独立表按月份升序，忽略不符合命名的表"""
+        from app.utils.partitions import list_detached_month_partitions
+
+        conn = FakeConn(tables=["access_event_p202602", "access_event_p202601", "access_event_p2026_bak"])
+        assert asyncio.run(list_detached_month_partitions(conn, "access_event")) == [
+            "access_event_p202601", "access_event_p202602"
+        ]
+        print("✓ 已分离分区列表")
+
+    def test_detach_before_cutoff(self):
+        """测试：只分离 before 所在月之前的分区"""
+        from app.utils.partitions import detach_month_partitions
+
+        conn = FakeConn(attached=["access_event_p202612", "access_event_p202701", "access_event_p202702"])
+        detached = asyncio.run(detach_month_partitions(conn, "access_event", date(2027, 2, 15)))
+
+        assert detached == ["access_event_p202612", "access_event_p202701"]
+        assert conn.ddl() == [
+            'ALTER TABLE "access_event" DETACH PARTITION "access_event_p202612"',
+            'ALTER TABLE "access_event" DETACH PARTITION "access_event_p202701"',
+        ]
+        print("✓ 按月份分离")
@@ -0,0 +1,145 @@
+"""
+第三方接口限速器单元测试
+测试范围：RateLimiter 按 1/rate 间隔分配时间片（首个请求不等待、突发请求依次排队、
+空闲后不累积额度、并发请求不共用时间片），get_rate_limiter 的实例复用与按配置重建
+
+时间与等待用可控时钟替换，不实际 sleep
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "backend"))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+class _FakeTime:
+    """替换 http_client 模块中的 time：monotonic 返回可控时间"""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """可控时钟：asyncio.sleep 只推进时间并记录等待时长"""
+    from app.adapters import http_client
+
+    fake_time = _FakeTime()
+    sleeps = []
+
+    async def _sleep(seconds):
+        sleeps.append(round(seconds, 6))
+        fake_time.now += seconds
+
+    monkeypatch.setattr(http_client, "time", fake_time)
+    monkeypatch.setattr(http_client.asyncio, "sleep", _sleep)
+    fake_time.sleeps = sleeps
+    return fake_time
+
+
+class TestRateLimiter:
+    """限速器时间片分配"""
+
+    def test_first_request_immediate(self, clock):
+        """测试：首个请求不等待"""
+        from app.adapters.http_client import RateLimiter
+
+        asyncio.run(RateLimiter(10).acquire())
+        assert clock.sleeps == []
+        print("✓ 首个请求不等待")
+
+    def test_burst_spaced_by_interval(self, clock):
+        """测试：连续请求按 1/rate 间隔依次发出"""
+        from app.adapters.http_client import RateLimiter
+
+        limiter = RateLimiter(4)
+
+        async def _run():
+            sent = []
+            for _ in range(4):
+                await limiter.acquire()
+                sent.append(clock.now)
+            return sent
+
+        sent = asyncio.run(_run())
+        assert sent == [100.0, 100.25, 100.5, 100.75]
+        print("✓ 突发请求按间隔排队")
+
+    def test_concurrent_slots_distinct(self, clock):
+        """测试：并发请求各自分配不同的时间片"""
+        from app.adapters.http_client import RateLimiter
+
+        limiter = RateLimiter(2)
+        sent = []
+
+        async def _send():
+            await limiter.acquire()
+            sent.append(clock.now)
+
+        async def _run():
+            await asyncio.gather(*[_send() for _ in range(3)])
+
+        asyncio.run(_run())
+        assert sorted(sent) == [100.0, 100.5, 101.0]
+        print("✓ 并发请求不共用时间片")
+
+    def test_idle_does_not_accumulate(self, clock):
+        """测试：空闲一段时间后不累积额度，恢复后仍按间隔限速"""
+        from app.adapters.http_client import RateLimiter
+
+        limiter = RateLimiter(1)
+
+        async def _run():
+            await limiter.acquire()
+            clock.now += 10
+            await limiter.acquire()
+            await limiter.acquire()
+
+        asyncio.run(_run())
+        assert clock.sleeps == [1.0]
+        print("✓ 空闲不累积额度")
+
+
+class TestGetRateLimiter:
+    """按第三方系统获取限速器"""
+
+    @pytest.fixture(autouse=True)
+    def reset(self, monkeypatch):
+        from app.adapters import http_client
+
+        monkeypatch.setattr(http_client, "_rate_limiters", {})
+
+    def test_unlimited(self, monkeypatch, clock):
+        """测试：未配置限速时返回 None，throttle 立即返回"""
+        from app.core.config import settings
+        from app.adapters.http_client import get_rate_limiter, throttle
+
+        monkeypatch.setattr(settings, "ACCESS_CONTROL_RATE_LIMIT", 0)
+        assert get_rate_limiter("access_control") is None
+        assert get_rate_limiter("wechat") is None
+        asyncio.run(throttle("access_control"))
+        assert clock.sleeps == []
+        print("✓ 未配置限速")
+
+    def test_reused_and_rebuilt(self, monkeypatch):
+        """测试：同一速率复用实例（进程内共享时间片），速率变化时重建"""
+        from app.core.config import settings
+        from app.adapters.http_client import get_rate_limiter
+
+        monkeypatch.setattr(settings, "ACCESS_CONTROL_RATE_LIMIT", 5)
+        limiter = get_rate_limiter("access_control")
+        assert limiter.rate == 5
+        assert get_rate_limiter("access_control") is limiter
+
+        monkeypatch.setattr(settings, "ACCESS_CONTROL_RATE_LIMIT", 20)
+        rebuilt = get_rate_limiter("access_control")
+        assert rebuilt is not limiter
+        assert rebuilt.rate == 20
+        print("✓ 限速器复用与重建")
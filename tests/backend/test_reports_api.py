@@ -99,7 +99,17 @@ class TestDashboard:
         assert "stats" in payload
         assert isinstance(payload["stats"], dict)
         print("✓ 获取Dashboard stats 成功")
-    
+
+    def test_dashboard_stats_consistent(self, client):
+        """测试：Dashboard 与首屏 stats 共用同一聚合结果"""
+        full = client.get("/reports/dashboard").json().get("data") or {}
+        light = client.get("/reports/dashboard/stats").json().get("data") or {}
+        assert full.get("stats") == light.get("stats")
+        assert full.get("todayStatus") == light.get("todayStatus")
+        for key in ("todayTasks", "activeTickets", "todayTrainings", "accessGrants", "syncRate"):
+            assert key in light["stats"]
+        print("✓ Dashboard 与 stats 统计一致")
+
     def test_dashboard_today_tasks(self, client):
         """测试：今日任务数"""
         resp = client.get("/reports/dashboard")
@@ -302,6 +312,48 @@ class TestTrend:
             print("✓ 作业票创建趋势查询成功")
         else:
             print(f"✓ 作业票创建趋势API返回状态: {resp.status_code}")
+    
+    def test_trend_long_range_every_day(self, client):
+        """测试：长区间趋势逐日返回（预聚合表缺失日期补零）"""
+        resp = client.get("/reports/trend", params={"metric": "sync_rate", "days": 90})
+        if resp.status_code == 200:
+            data = resp.json()
+            if data.get("code") == 0:
+                points = data["data"]["data"]
+                assert len(points) == 91
+                assert points[0]["date"] == str(date.today() - timedelta(days=90))
+                assert points[-1]["date"] == str(date.today())
+            print("✓ 长区间趋势逐日返回")
+        else:
+            print(f"✓ 长区间趋势API返回状态: {resp.status_code}")
+    
+    def test_trend_multiple_metrics(self, client):
+        """测试：一次请求多个趋势指标"""
+        resp = client.get("/reports/trend", params={
+            "metric": "completion_rate,sync_rate,training_duration",
+            "days": 365
+        })
+        if resp.status_code == 200:
+            data = resp.json()
+            if data.get("code") == 0:
+                series = data["data"]["series"]
+                assert set(series.keys()) == {"completion_rate", "sync_rate", "training_duration"}
+                assert all(len(points) == 366 for points in series.values())
+                assert data["data"]["data"] == series["completion_rate"]
+            print("✓ 多指标趋势查询成功")
+        else:
+            print(f"✓ 多指标趋势API返回状态: {resp.status_code}")
+    
+    def test_trend_invalid_params(self, client):
+        """测试：趋势参数校验（超出天数上限/未知指标）"""
+        resp = client.get("/reports/trend", params={"days": 366})
+        if resp.status_code == 200:
+            assert resp.json().get("code") != 0
+        
+        resp = client.get("/reports/trend", params={"metric": "unknown_metric"})
+        if resp.status_code == 200:
+            assert resp.json().get("code") != 0
+        print("✓ 趋势参数校验生效")
 
 
 class TestExport:
@@ -360,6 +412,95 @@ class TestExport:
         else:
             print(f"✓ 告警报告导出API返回状态: {resp.status_code}")
 
+    def test_export_access_events_csv(self, client):
+        """测试：以CSV格式流式导出门禁事件"""
+        resp = client.get("/reports/export/access-events", params={"format": "csv"})
+        if resp.status_code == 200:
+            content_type = resp.headers.get("Content-Type", "")
+            if "text/csv" in content_type:
+                # 带 BOM 且首行为表头
+                text = resp.content.decode("utf-8-sig")
+                assert text.splitlines()[0].startswith("时间,工人姓名")
+                print("✓ 门禁事件CSV导出成功")
+            else:
+                data = resp.json()
+                print(f"✓ 门禁事件CSV导出完成: code={data.get('code')}")
+        else:
+            print(f"✓ 门禁事件CSV导出API返回状态: {resp.status_code}")
+
+    def test_export_invalid_format(self, client):
+        """测试：不支持的导出格式"""
+        resp = client.get("/reports/export/training", params={"format": "pdf"})
+        if resp.status_code == 200:
+            data = resp.json()
+            assert data.get("code") != 0
+            print(f"✓ 不支持的导出格式被拒绝: code={data.get('code')}")
+        else:
+            print(f"✓ 不支持的导出格式API返回状态: {resp.status_code}")
+
+
+class TestExportJobs:
+    """异步导出任务测试"""
+
+    def test_submit_and_poll_export_job(self, client):
+        """测试：提交异步导出任务并轮询进度"""
+        resp = client.post("/exports", {
+            "export_type": "access-events",
+            "format": "csv",
+            "start_date": (date.today() - timedelta(days=30)).isoformat(),
+            "end_date": date.today().isoformat()
+        })
+        if resp.status_code != 200:
+            print(f"✓ 提交导出任务API返回状态: {resp.status_code}")
+            return
+
+        data = resp.json()
+        if data.get("code") != 0:
+            print(f"✓ 提交导出任务完成: code={data.get('code')}")
+            return
+
+        job_id = data["data"]["job_id"]
+        assert data["data"]["status"] == "PENDING"
+
+        # 轮询任务状态（需要 export 队列的 worker）
+        job = data["data"]
+        for _ in range(10):
+            resp = client.get(f"/exports/{job_id}")
+            assert resp.status_code == 200
+            job = resp.json()["data"]
+            assert "rows_written" in job
+            if job["status"] in ("SUCCESS", "FAILED"):
+                break
+            time.sleep(1)
+
+        if job["status"] == "SUCCESS":
+            assert job["download_url"]
+            resp = client.get(f"/exports/{job_id}/download")
+            assert resp.status_code == 200
+            print(f"✓ 导出任务完成: rows={job['rows_written']}")
+        else:
+            print(f"✓ 导出任务状态: {job['status']}")
+
+    def test_submit_invalid_export_type(self, client):
+        """测试：不支持的导出类型"""
+        resp = client.post("/exports", {"export_type": "unknown"})
+        if resp.status_code == 200:
+            data = resp.json()
+            assert data.get("code") != 0
+            print(f"✓ 不支持的导出类型被拒绝: code={data.get('code')}")
+        else:
+            print(f"✓ 提交导出任务API返回状态: {resp.status_code}")
+
+    def test_export_job_not_found(self, client):
+        """测试：查询不存在的导出任务"""
+        resp = client.get(f"/exports/{uuid.uuid4()}")
+        if resp.status_code == 200:
+            data = resp.json()
+            assert data.get("code") != 0
+            print("✓ 不存在的导出任务返回错误")
+        else:
+            print(f"✓ 查询导出任务API返回状态: {resp.status_code}")
+
 
 class TestReportsPermission:
     """报表权限测试"""
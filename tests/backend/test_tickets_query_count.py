@@ -0,0 +1,118 @@
+"""
+作业票查询次数回归测试
+测试范围：list_tickets 的SQL语句数不随分页大小增长、/stats 为单条聚合查询、
+批量关闭为集合更新（防止 N+1 查询回归）
+
+应用在进程内运行（httpx ASGITransport），通过引擎事件统计执行的SQL语句数，
+需要可用的数据库和测试账号，否则跳过
+"""
+import asyncio
+import os
+import sys
+import uuid
+
+import pytest
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "backend"))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+TEST_USERNAME = "admin"
+TEST_PASSWORD = "admin123"
+
+# 列表：认证用户 + 计数 + 分页数据 + 施工单位/人员/区域/区域详情批量加载 + 当日完成人数聚合
+MAX_STATEMENTS = 10
+
+
+async def _count_statements(path, params_list, method="GET", json_list=None):
+    """依次以不同参数请求接口，返回 [(语句数, 响应data)]"""
+    import httpx
+    from sqlalchemy import event
+    from app.main import app
+    from app.core.database import engine
+
+    statements = []
+
+    def _on_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        try:
+            resp = await client.post(
+                "/api/admin/auth/login",
+                json={"username": TEST_USERNAME, "password": TEST_PASSWORD}
+            )
+        except Exception as e:
+            pytest.skip(f"数据库不可用，跳过测试: {e}")
+
+        data = resp.json() if resp.status_code == 200 else {}
+        if data.get("code") != 0:
+            pytest.skip("无法登录，跳过测试")
+        headers = {"Authorization": f"Bearer {data['data']['access_token']}"}
+
+        counts = []
+        event.listen(engine.sync_engine, "before_cursor_execute", _on_execute)
+        try:
+            for i, params in enumerate(params_list):
+                statements.clear()
+                resp = await client.request(
+                    method, path, params=params, headers=headers,
+                    json=json_list[i] if json_list else None
+                )
+                assert resp.status_code == 200
+                body = resp.json()
+                assert body.get("code") == 0
+                counts.append((len(statements), body["data"]))
+        finally:
+            event.remove(engine.sync_engine, "before_cursor_execute", _on_execute)
+
+    await engine.dispose()
+    return counts
+
+
+class TestTicketsQueryCount:
+    """作业票查询次数测试"""
+
+    def test_statement_count_constant(self):
+        """测试：作业票列表的SQL语句数与分页大小无关"""
+        (small_count, _), (large_count, large_data) = asyncio.run(_count_statements(
+            "/api/admin/work-tickets",
+            [{"page": 1, "page_size": 1}, {"page": 1, "page_size": 100}]
+        ))
+
+        assert large_count <= MAX_STATEMENTS, f"语句数过多: {large_count}"
+        # 小分页的关联集合可能为空，对应的批量加载语句会被省略，因此允许相差1条
+        assert large_count - small_count <= 1, (
+            f"语句数随分页大小增长: page_size=1 -> {small_count}, "
+            f"page_size=100 -> {large_count}"
+        )
+        print(f"✓ 作业票列表语句数恒定: {large_count} 条（{len(large_data['items'])} 条数据）")
+
+    def test_stats_single_query(self):
+        """测试：作业票统计为单条聚合查询（认证用户查询 + 统计查询）"""
+        [(count, data)] = asyncio.run(_count_statements("/api/admin/work-tickets/stats", [{}]))
+
+        assert count <= 2, f"语句数过多: {count}"
+        assert "total_count" in data
+        assert "total_workers" in data
+        print(f"✓ 作业票统计语句数: {count} 条，总数={data['total_count']}")
+
+    def test_batch_close_statement_count_constant(self):
+        """测试：批量关闭的SQL语句数与作业票数量无关（使用不存在的ID，不修改数据）"""
+        (small_count, small_data), (large_count, large_data) = asyncio.run(_count_statements(
+            "/api/admin/work-tickets/batch-close",
+            [{}, {}],
+            method="POST",
+            json_list=[
+                [str(uuid.uuid4())],
+                [str(uuid.uuid4()) for _ in range(50)]
+            ]
+        ))
+
+        assert small_data["failed_count"] == 1
+        assert large_data["failed_count"] == 50
+        assert large_count == small_count, (
+            f"语句数随作业票数量增长: 1 -> {small_count}, 50 -> {large_count}"
+        )
+        print(f"✓ 批量关闭语句数恒定: {large_count} 条")
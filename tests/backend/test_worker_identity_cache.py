@@ -0,0 +1,220 @@
+"""
+人员身份缓存单元测试
+测试范围：命中不查库、未命中按标识类型批量查库、未找到的结果同样缓存、条目过期后重新查库、
+人员变更后（invalidate_worker_identities）本进程立即失效、其他进程在版本检查后失效、
+Redis 不可用时只依赖过期时间、超出容量时清空
+
+使用内存 Redis（fake_redis 夹具）与记录查询的数据库替身，时间用可控时钟
+"""
+import asyncio
+import os
+import sys
+import uuid
+
+import pytest
+
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", "backend"))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+SITE_A = uuid.UUID("00000000-0000-0000-0000-00000000000a")
+SITE_B = uuid.UUID("00000000-0000-0000-0000-00000000000b")
+WORKER_1 = uuid.UUID("00000000-0000-0000-0000-000000000001")
+WORKER_2 = uuid.UUID("00000000-0000-0000-0000-000000000002")
+
+
+class _Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def all(self):
+        return self.rows
+
+
+class FakeDB:
+    """人员表替身：按查询的标识列返回全部人员的 (site_id, 标识值, worker_id)，记录查询次数"""
+
+    def __init__(self, workers):
+        self.workers = workers
+        self.queries = []
+
+    async def execute(self, statement):
+        kind = statement.selected_columns[1].key
+        self.queries.append(kind)
+        return _Result([(w["site_id"], w[kind], w["worker_id"]) for w in self.workers])
+
+
+class _FakeTime:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    from app.utils import worker_identity_cache
+
+    fake_time = _FakeTime()
+    monkeypatch.setattr(worker_identity_cache, "time", fake_time)
+    return fake_time
+
+
+@pytest.fixture(autouse=True)
+def cache_settings(monkeypatch):
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "WORKER_IDENTITY_CACHE_TTL", 600)
+    monkeypatch.setattr(settings, "WORKER_IDENTITY_CACHE_CHECK_SECONDS", 2)
+    monkeypatch.setattr(settings, "WORKER_IDENTITY_CACHE_MAX_ENTRIES", 1000)
+
+
+@pytest.fixture
+def db():
+    return FakeDB([
+        {"site_id": SITE_A, "worker_id": WORKER_1, "face_id": "face-1", "id_no": "110101199001011234"},
+        {"site_id": SITE_B, "worker_id": WORKER_2, "face_id": "face-2", "id_no": "110101199202022345"},
+    ])
+
+
+def _new_cache():
+    from app.utils.worker_identity_cache import WorkerIdentityCache
+
+    return WorkerIdentityCache()
+
+
+class TestResolve:
+    """批量解析与缓存"""
+
+    def test_batch_lookup_and_hit(self, fake_redis, clock, db):
+        """测试：未命中按类型各查一次库，再次解析命中缓存不查库"""
+        cache = _new_cache()
+        lookups = [
+            (SITE_A, "face_id", "face-1"),
+            (SITE_B, "face_id", "face-2"),
+            (SITE_A, "id_no", "110101199001011234"),
+            (SITE_A, "worker_id", str(WORKER_1)),
+        ]
+
+        result = asyncio.run(cache.resolve(db, lookups))
+        assert result == {
+            (SITE_A, "face_id", "face-1"): WORKER_1,
+            (SITE_B, "face_id", "face-2"): WORKER_2,
+            (SITE_A, "id_no", "110101199001011234"): WORKER_1,
+            (SITE_A, "worker_id", str(WORKER_1)): WORKER_1,
+        }
+        assert sorted(db.queries) == ["face_id", "id_no", "worker_id"]
+
+        assert asyncio.run(cache.resolve(db, lookups)) == result
+        assert len(db.queries) == 3
+        print("✓ 批量查库与命中")
+
+    def test_site_scoped_and_negative_cached(self, fake_redis, clock, db):
+        """测试：标识按工地隔离，未找到的结果（None）同样缓存"""
+        cache = _new_cache()
+        lookups = [(SITE_B, "face_id", "face-1"), (SITE_A, "face_id", "unknown")]
+
+        assert asyncio.run(cache.resolve(db, lookups)) == {
+            (SITE_B, "face_id", "face-1"): None,
+            (SITE_A, "face_id", "unknown"): None,
+        }
+        asyncio.run(cache.resolve(db, lookups))
+        assert db.queries == ["face_id"]
+        print("✓ 工地隔离与未命中缓存")
+
+    def test_ttl_expiry(self, fake_redis, clock, db):
+        """测试：条目过期后重新查库"""
+        cache = _new_cache()
+        lookups = [(SITE_A, "face_id", "face-1")]
+
+        asyncio.run(cache.resolve(db, lookups))
+        clock.now += 599
+        asyncio.run(cache.resolve(db, lookups))
+        assert len(db.queries) == 1
+
+        clock.now += 2
+        asyncio.run(cache.resolve(db, lookups))
+        assert len(db.queries) == 2
+        print("✓ 过期后重新查库")
+
+    def test_capacity_clears(self, fake_redis, clock, db, monkeypatch):
+        """测试：超出容量时整体清空后继续写入"""
+        from app.core.config import settings
+
+        monkeypatch.setattr(settings, "WORKER_IDENTITY_CACHE_MAX_ENTRIES", 2)
+        cache = _new_cache()
+        asyncio.run(cache.resolve(db, [(SITE_A, "face_id", "a"), (SITE_A, "face_id", "b")]))
+        asyncio.run(cache.resolve(db, [(SITE_A, "face_id", "c")]))
+        assert cache._size == 1
+        print("✓ 超出容量清空")
+
+
+class TestInvalidation:
+    """人员变更后失效"""
+
+    def test_invalidate_local_immediately(self, fake_redis, clock, db, monkeypatch):
+        """测试：人员变更后本进程缓存立即失效，并递增工地版本号"""
+        from app.utils import worker_identity_cache as module
+
+        cache = _new_cache()
+        monkeypatch.setattr(module, "worker_identity_cache", cache)
+        lookups = [(SITE_A, "face_id", "face-1"), (SITE_B, "face_id", "face-2")]
+        asyncio.run(cache.resolve(db, lookups))
+
+        # 人员换绑人脸后
+        db.workers[0]["face_id"] = "face-1-new"
+        asyncio.run(module.invalidate_worker_identities(SITE_A))
+        assert fake_redis.data[f"worker_identity:gen:{SITE_A}"] == "1"
+
+        result = asyncio.run(cache.resolve(db, lookups + [(SITE_A, "face_id", "face-1-new")]))
+        assert result[(SITE_A, "face_id", "face-1")] is None
+        assert result[(SITE_A, "face_id", "face-1-new")] == WORKER_1
+        assert result[(SITE_B, "face_id", "face-2")] == WORKER_2  # 其他工地不受影响
+        assert db.queries == ["face_id", "face_id"]
+        print("✓ 本进程立即失效")
+
+    def test_generation_invalidates_other_process(self, fake_redis, clock, db):
+        """测试：其他进程递增版本号后，本进程在检查间隔后丢弃该工地缓存"""
+        from app.utils.worker_identity_cache import WorkerIdentityCache
+
+        cache = _new_cache()
+        lookups = [(SITE_A, "face_id", "face-1")]
+        asyncio.run(cache.resolve(db, lookups))
+
+        asyncio.run(fake_redis.incr(f"{WorkerIdentityCache.GENERATION_KEY_PREFIX}{SITE_A}"))
+
+        clock.now += 1  # 未到检查间隔：仍使用缓存
+        asyncio.run(cache.resolve(db, lookups))
+        assert len(db.queries) == 1
+
+        clock.now += 1
+        asyncio.run(cache.resolve(db, lookups))
+        assert len(db.queries) == 2
+
+        clock.now += 5  # 版本未再变化：缓存继续有效
+        asyncio.run(cache.resolve(db, lookups))
+        assert len(db.queries) == 2
+        print("✓ 跨进程版本失效")
+
+    def test_redis_unavailable_uses_ttl(self, monkeypatch, clock, db):
+        """测试：Redis 不可用时不做版本检查，只依赖过期时间"""
+        import app.utils.cache as cache_module
+
+        async def _no_redis():
+            return None
+
+        monkeypatch.setattr(cache_module, "get_redis_client", _no_redis)
+
+        cache = _new_cache()
+        lookups = [(SITE_A, "face_id", "face-1")]
+        asyncio.run(cache.resolve(db, lookups))
+        clock.now += 300
+        asyncio.run(cache.resolve(db, lookups))
+        assert len(db.queries) == 1
+
+        clock.now += 301
+        asyncio.run(cache.resolve(db, lookups))
+        assert len(db.queries) == 2
+        print("✓ Redis 不可用依赖过期时间")